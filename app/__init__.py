@@ -10,8 +10,6 @@ from flask import render_template
 from datetime import datetime, timedelta
 import json
 from flask_moment import Moment
-import boto3
-from botocore.exceptions import ClientError, NoCredentialsError
 import logging
 
 db = SQLAlchemy()
@@ -21,8 +19,41 @@ mail = Mail()
 csrf = CSRFProtect()
 moment = Moment()
 
+def get_s3_client(app=None, transfer=False):
+    """Shared S3 client, created on first use; None when S3 is not configured.
+
+    transfer=True returns a separate client for large uploads (adaptive
+    retries, long read/connect timeouts).
+    """
+    from flask import current_app
+    app = app or current_app._get_current_object()
+    key = 's3_transfer_client' if transfer else 's3_client'
+    if key not in app.extensions:
+        required_config = ['AWS_ACCESS_KEY_ID', 'AWS_SECRET_ACCESS_KEY', 'S3_BUCKET']
+        if any(not app.config.get(name) for name in required_config):
+            app.extensions[key] = None
+        else:
+            import boto3
+            from botocore.config import Config
+            config = None
+            if transfer:
+                config = Config(
+                    retries={"max_attempts": 3, "mode": "adaptive"},
+                    read_timeout=3600,  # 1 hour
+                    connect_timeout=300  # 5 minutes
+                )
+            app.extensions[key] = boto3.client(
+                's3',
+                aws_access_key_id=app.config['AWS_ACCESS_KEY_ID'],
+                aws_secret_access_key=app.config['AWS_SECRET_ACCESS_KEY'],
+                region_name=app.config.get('S3_REGION') or app.config.get('AWS_REGION', 'ap-south-1'),
+                config=config
+            )
+    return app.extensions[key]
+
 def initialize_s3(app):
-    """Initialize AWS S3 client with proper error handling"""
+    """Check S3 configuration and bucket access (run by `flask perf init`, not at startup)"""
+    from botocore.exceptions import ClientError, NoCredentialsError
     try:
         # Check if all required S3 config is present
         required_config = ['AWS_ACCESS_KEY_ID', 'AWS_SECRET_ACCESS_KEY', 'S3_BUCKET']
@@ -33,13 +64,7 @@ def initialize_s3(app):
             app.s3_client = None
             return False
         
-        # Create S3 client
-        s3_client = boto3.client(
-            's3',
-            aws_access_key_id=app.config['AWS_ACCESS_KEY_ID'],
-            aws_secret_access_key=app.config['AWS_SECRET_ACCESS_KEY'],
-            region_name=app.config.get('AWS_REGION', 'ap-south-1')
-        )
+        s3_client = get_s3_client(app)
         
         # Test S3 connection
         try:
@@ -68,20 +93,21 @@ def initialize_s3(app):
         return False
 
 def create_app(config_class=Config):
+    from app.utils.startup_timing import StartupTimer
+    timer = StartupTimer()
+
     app = Flask(__name__)
     app.config.from_object(config_class)
     
     # Setup logging
     logging.basicConfig(level=logging.INFO)
+    timer.mark('config')
     
     # Initialize Flask extensions
     db.init_app(app)
     migrate.init_app(app, db)
     
-    # Initialize S3
-    s3_initialized = initialize_s3(app)
-    if not s3_initialized:
-        app.logger.warning("S3 features will be disabled")
+    # S3 client is created on first use (get_s3_client); `flask perf init` checks bucket access
     
     # Register error handlers for consistent error responses
     try:
@@ -94,7 +120,20 @@ def create_app(config_class=Config):
     login.init_app(app)
     mail.init_app(app)
     csrf.init_app(app)
+    
+    # Outbound email queue (durable outbox + pooled SMTP workers)
+    from app.utils.email_queue import email_queue
+    email_queue.init_app(app)
+    
+    # Delayed jobs (reminders, sequence steps) run by one leader process
+    from app.utils.job_scheduler import job_scheduler
+    job_scheduler.init_app(app)
+    
+    # Server-push feed for the live monitoring page
+    from app.utils.live_feed import live_feed
+    live_feed.init_app(app)
     moment.init_app(app)
+    timer.mark('extensions')
     
     
     # Configure login (will be updated for fast login if available)
@@ -114,13 +153,17 @@ def create_app(config_class=Config):
         app.logger.info("📝 Install performance modules for ultra-fast loading")
     except Exception as e:
         app.logger.error(f"❌ Performance initialization failed: {e}")
+    timer.mark('performance')
 
     # Register Blueprints
     register_blueprints(app)
+    timer.mark('blueprints')
     
     # Register template filters and context processors
     register_template_filters(app)
     register_context_processors(app)
+    timer.mark('templates')
+    timer.finish(app)
     
     return app
 
@@ -291,6 +334,15 @@ def register_template_filters(app):
             return date_obj.strftime(fmt)
         return ''
 
+    @app.template_filter('strftime')
+    def strftime_filter(value, fmt='%d %b %Y'):
+        """Format a date/datetime; "now" formats the current time (email footers)"""
+        if value == 'now':
+            value = datetime.now()
+        if hasattr(value, 'strftime'):
+            return value.strftime(fmt)
+        return value or ''
+
     @app.template_filter('currency')
     def currency_filter(amount):
         if amount:
@@ -381,7 +433,7 @@ def register_context_processors(app):
 # User loader for Flask-Login
 @login.user_loader
 def load_user(user_id):
-    from app.models.user import User
-    return User.query.get(int(user_id))
+    from app.utils.principal import load_cached_user
+    return load_cached_user(int(user_id))
 
 
@@ -5,6 +5,7 @@ from app.models.department import Department
 from app.models.tutor import Tutor
 from app.models.student import Student
 from app.models.class_model import Class
+from app.models.class_student import ClassStudent
 from app.models.attendance import Attendance
 from app.models.system_document import SystemDocument
 from app.models.escalation import Escalation
@@ -14,6 +15,9 @@ from app.models.reschedule_request import RescheduleRequest
 from app.models.student_graduation import StudentGraduation
 from app.models.student_drop import StudentDrop
 from app.models.student_status_history import StudentStatusHistory
+from app.models.email_outbox import EmailOutbox
+from app.models.scheduled_job import ScheduledJob
+from app.models.daily_stats import DailyClassStats, DailyAttendanceStats
 
 __all__ = [
     'User', 
@@ -21,6 +25,7 @@ __all__ = [
     'Tutor', 
     'Student', 
     'Class', 
+    'ClassStudent',
     'Attendance', 
     'SystemDocument', 
     'Escalation',
@@ -31,5 +36,9 @@ __all__ = [
     'RescheduleRequest',
     'StudentGraduation',
     'StudentDrop', 
-    'StudentStatusHistory'
+    'StudentStatusHistory',
+    'EmailOutbox',
+    'ScheduledJob',
+    'DailyClassStats',
+    'DailyAttendanceStats'
 ]
\ No newline at end of file
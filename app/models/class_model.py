@@ -297,17 +297,51 @@ class Class(db.Model):
         
         if tutor_id:
             query = query.filter_by(tutor_id=tutor_id)
-        
+
         if student_id:
-            # For group classes, need to check JSON field
-            classes = query.all()
-            filtered_classes = []
-            for cls in classes:
-                if cls.primary_student_id == student_id or student_id in cls.get_students():
-                    filtered_classes.append(cls)
-            return filtered_classes
-        
+            query = Class.join_student(query, student_id, date_obj, date_obj)
+
         return query.all()
+
+    @staticmethod
+    def student_filter(student_id, start_date=None, end_date=None):
+        """SQL criterion matching classes a student is enrolled in (one-on-one or group).
+
+        Uses the class_students (student_id, scheduled_date) index instead of
+        decoding the JSON students column.
+        """
+        from app.models.class_student import ClassStudent
+
+        enrolled = db.select(ClassStudent.class_id).where(ClassStudent.student_id == student_id)
+        if start_date:
+            enrolled = enrolled.where(ClassStudent.scheduled_date >= start_date)
+        if end_date:
+            enrolled = enrolled.where(ClassStudent.scheduled_date <= end_date)
+        return Class.id.in_(enrolled)
+
+    @staticmethod
+    def join_student(query, student_id, start_date=None, end_date=None):
+        """Restrict a Class query to one student's classes via an indexed join"""
+        from app.models.class_student import ClassStudent
+
+        query = query.join(ClassStudent, ClassStudent.class_id == Class.id)\
+                     .filter(ClassStudent.student_id == student_id)
+        if start_date:
+            query = query.filter(ClassStudent.scheduled_date >= start_date)
+        if end_date:
+            query = query.filter(ClassStudent.scheduled_date <= end_date)
+        return query
+
+    @staticmethod
+    def enrolled_student_ids(class_query=None):
+        """Distinct student IDs enrolled in the classes selected by class_query (all classes if None)"""
+        from app.models.class_student import ClassStudent
+
+        query = db.session.query(ClassStudent.student_id).distinct()
+        if class_query is not None:
+            class_ids = class_query.with_entities(Class.id).order_by(None)
+            query = query.filter(ClassStudent.class_id.in_(class_ids.scalar_subquery()))
+        return {row[0] for row in query.all()}
     
     @staticmethod
     def check_time_conflict(tutor_id, date_obj, start_time, duration, exclude_class_id=None):
@@ -674,59 +708,73 @@ class Class(db.Model):
     @classmethod
     def get_dashboard_stats(cls, user=None, date_range=None):
         """Get dashboard statistics for classes"""
-        from sqlalchemy import func
+        from app.models.tutor import Tutor
+        from app.models.daily_stats import DailyClassStats
+        from app.utils.aggregates import aggregate_sums, period_bounds
         
-        # Base query
-        query = cls.query
+        # Base query over the daily rollup
+        query = DailyClassStats.query
         
         # Filter by user role and permissions
         if user:
             if user.role == 'coordinator':
-                query = query.join(Tutor).join(User).filter(User.department_id == user.department_id)
+                query = query.filter(DailyClassStats.department_id == user.department_id)
             elif user.role == 'tutor':
                 tutor = Tutor.query.filter_by(user_id=user.id).first()
                 if tutor:
-                    query = query.filter(cls.tutor_id == tutor.id)
+                    query = query.filter(DailyClassStats.tutor_id == tutor.id)
         
         # Date range filter
         if date_range:
             if 'start' in date_range:
-                query = query.filter(cls.scheduled_date >= date_range['start'])
+                query = query.filter(DailyClassStats.stat_date >= date_range['start'])
             if 'end' in date_range:
-                query = query.filter(cls.scheduled_date <= date_range['end'])
-        
-        # Get counts by status
-        stats = {}
-        
-        # Overall stats
-        stats['total_classes'] = query.count()
-        stats['scheduled'] = query.filter(cls.status == 'scheduled').count()
-        stats['completed'] = query.filter(cls.status == 'completed').count()
-        stats['cancelled'] = query.filter(cls.status == 'cancelled').count()
-        stats['ongoing'] = query.filter(cls.status == 'ongoing').count()
-        
-        # Today's stats
-        today = datetime.now().date()
-        today_query = query.filter(cls.scheduled_date == today)
-        stats['today'] = {
-            'total': today_query.count(),
-            'scheduled': today_query.filter(cls.status == 'scheduled').count(),
-            'completed': today_query.filter(cls.status == 'completed').count(),
-            'ongoing': today_query.filter(cls.status == 'ongoing').count(),
-            'cancelled': today_query.filter(cls.status == 'cancelled').count()
-        }
+                query = query.filter(DailyClassStats.stat_date <= date_range['end'])
+        
+        bounds = period_bounds()
+        today = bounds['today']
+        is_today = DailyClassStats.stat_date == today
+        this_week = (DailyClassStats.stat_date >= bounds['week_start']) & (DailyClassStats.stat_date <= bounds['week_end'])
+        
+        # All counters in one round trip
+        classes = DailyClassStats.class_count
+        counts = aggregate_sums(query, {
+            'total': (classes, None),
+            'scheduled': (classes, DailyClassStats.status == 'scheduled'),
+            'completed': (classes, DailyClassStats.status == 'completed'),
+            'cancelled': (classes, DailyClassStats.status == 'cancelled'),
+            'ongoing': (classes, DailyClassStats.status == 'ongoing'),
+            'today': (classes, is_today),
+            'today_scheduled': (classes, is_today & (DailyClassStats.status == 'scheduled')),
+            'today_completed': (classes, is_today & (DailyClassStats.status == 'completed')),
+            'today_ongoing': (classes, is_today & (DailyClassStats.status == 'ongoing')),
+            'today_cancelled': (classes, is_today & (DailyClassStats.status == 'cancelled')),
+            'week': (classes, this_week),
+            'week_completed': (classes, this_week & (DailyClassStats.status == 'completed')),
+            'week_scheduled': (classes, this_week & (DailyClassStats.status == 'scheduled')),
+            # Upcoming classes (next 7 days)
+            'upcoming': (classes, (DailyClassStats.stat_date > today) & (DailyClassStats.stat_date <= today + timedelta(days=7)) &
+                         (DailyClassStats.status == 'scheduled'))
+        })
         
-        # This week's stats
-        week_start = today - timedelta(days=today.weekday())
-        week_end = week_start + timedelta(days=6)
-        week_query = query.filter(
-            cls.scheduled_date >= week_start,
-            cls.scheduled_date <= week_end
-        )
-        stats['this_week'] = {
-            'total': week_query.count(),
-            'completed': week_query.filter(cls.status == 'completed').count(),
-            'scheduled': week_query.filter(cls.status == 'scheduled').count()
+        stats = {
+            'total_classes': counts['total'],
+            'scheduled': counts['scheduled'],
+            'completed': counts['completed'],
+            'cancelled': counts['cancelled'],
+            'ongoing': counts['ongoing'],
+            'today': {
+                'total': counts['today'],
+                'scheduled': counts['today_scheduled'],
+                'completed': counts['today_completed'],
+                'ongoing': counts['today_ongoing'],
+                'cancelled': counts['today_cancelled']
+            },
+            'this_week': {
+                'total': counts['week'],
+                'completed': counts['week_completed'],
+                'scheduled': counts['week_scheduled']
+            }
         }
         
         # Calculate completion rate
@@ -735,13 +783,7 @@ class Class(db.Model):
         else:
             stats['completion_rate'] = 0
         
-        # Upcoming classes (next 7 days)
-        upcoming_query = query.filter(
-            cls.scheduled_date > today,
-            cls.scheduled_date <= today + timedelta(days=7),
-            cls.status == 'scheduled'
-        )
-        stats['upcoming_count'] = upcoming_query.count()
+        stats['upcoming_count'] = counts['upcoming']
         
         return stats
 
@@ -766,26 +808,24 @@ class Class(db.Model):
     @classmethod
     def get_busiest_days(cls, weeks=4):
         """Get busiest days of the week"""
-        from sqlalchemy import func, extract
+        from app.models.daily_stats import DailyClassStats
         
         # Get classes from last X weeks
         start_date = datetime.now().date() - timedelta(weeks=weeks)
         
-        # PostgreSQL: EXTRACT(DOW FROM scheduled_date)
-        # SQLite: strftime('%w', scheduled_date)
-        # MySQL: DAYOFWEEK(scheduled_date)
-        
-        # Use a database-agnostic approach
-        classes = cls.query.filter(
-            cls.scheduled_date >= start_date,
-            cls.status.in_(['scheduled', 'completed'])
-        ).all()
+        # One pre-aggregated row per day; weekday() stays in Python so it works on every database
+        daily_totals = db.session.query(
+            DailyClassStats.stat_date,
+            db.func.sum(DailyClassStats.class_count)
+        ).filter(
+            DailyClassStats.stat_date >= start_date,
+            DailyClassStats.status.in_(['scheduled', 'completed'])
+        ).group_by(DailyClassStats.stat_date).all()
         
         day_counts = {0: 0, 1: 0, 2: 0, 3: 0, 4: 0, 5: 0, 6: 0}  # Mon-Sun
         
-        for class_item in classes:
-            day_of_week = class_item.scheduled_date.weekday()  # 0=Monday
-            day_counts[day_of_week] += 1
+        for stat_date, count in daily_totals:
+            day_counts[stat_date.weekday()] += int(count or 0)  # 0=Monday
         
         day_names = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
         
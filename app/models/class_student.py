@@ -0,0 +1,157 @@
+from datetime import datetime
+from sqlalchemy import event, inspect
+from app import db
+from app.models.class_model import Class
+import json
+
+class ClassStudent(db.Model):
+    """Normalized class enrollment.
+
+    Mirrors ``Class.primary_student_id`` and the JSON ``Class.students`` column so
+    that "which classes does this student have" is an indexed join instead of a
+    full scan that decodes JSON in Python. Rows are kept in sync by the mapper
+    events at the bottom of this module; ``scheduled_date`` is denormalized from
+    the class so date-bounded lookups stay inside the composite index.
+    """
+    __tablename__ = 'class_students'
+    __table_args__ = (
+        db.Index('ix_class_students_student_date', 'student_id', 'scheduled_date'),
+    )
+
+    class_id = db.Column(db.Integer, db.ForeignKey('classes.id', ondelete='CASCADE'), primary_key=True)
+    student_id = db.Column(db.Integer, db.ForeignKey('students.id', ondelete='CASCADE'), primary_key=True)
+    scheduled_date = db.Column(db.Date, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    @staticmethod
+    def student_ids_for(class_type, primary_student_id, students_json):
+        """Regular student IDs enrolled in a class (demo students live in their own table)"""
+        if class_type == 'demo':
+            return set()
+
+        student_ids = set()
+        if primary_student_id:
+            student_ids.add(primary_student_id)
+
+        if students_json:
+            try:
+                parsed = json.loads(students_json)
+            except (ValueError, TypeError):
+                parsed = []
+            if isinstance(parsed, list):
+                for sid in parsed:
+                    try:
+                        student_ids.add(int(sid))
+                    except (ValueError, TypeError):
+                        continue
+
+        return student_ids
+
+    @staticmethod
+    def _existing_student_ids(connection, student_ids):
+        """Drop stale IDs left in old JSON payloads so the foreign key holds"""
+        if not student_ids:
+            return set()
+        from app.models.student import Student
+        result = connection.execute(
+            db.select(Student.id).where(Student.id.in_(list(student_ids)))
+        )
+        return {row[0] for row in result}
+
+    @staticmethod
+    def _build_rows(connection, class_rows):
+        """Turn (id, class_type, primary_student_id, students, scheduled_date) tuples into rows"""
+        wanted = []
+        for class_id, class_type, primary_student_id, students_json, scheduled_date in class_rows:
+            if not class_id or not scheduled_date:
+                continue
+            for sid in ClassStudent.student_ids_for(class_type, primary_student_id, students_json):
+                wanted.append((class_id, sid, scheduled_date))
+
+        existing = ClassStudent._existing_student_ids(connection, {sid for _, sid, _ in wanted})
+        now = datetime.utcnow()
+        return [
+            {'class_id': class_id, 'student_id': sid, 'scheduled_date': scheduled_date, 'created_at': now}
+            for class_id, sid, scheduled_date in wanted
+            if sid in existing
+        ]
+
+    @staticmethod
+    def sync(connection, class_obj):
+        """Replace the enrollment rows of one class using the given connection"""
+        table = ClassStudent.__table__
+        connection.execute(table.delete().where(table.c.class_id == class_obj.id))
+        rows = ClassStudent._build_rows(connection, [(
+            class_obj.id, class_obj.class_type, class_obj.primary_student_id,
+            class_obj.students, class_obj.scheduled_date
+        )])
+        if rows:
+            connection.execute(table.insert(), rows)
+
+    @staticmethod
+    def sync_many(class_ids):
+        """Re-sync enrollment for classes written without the ORM (bulk inserts/updates)"""
+        class_ids = list(class_ids or [])
+        if not class_ids:
+            return 0
+
+        table = ClassStudent.__table__
+        source = db.session.query(
+            Class.id, Class.class_type, Class.primary_student_id, Class.students, Class.scheduled_date
+        ).filter(Class.id.in_(class_ids)).all()
+        rows = ClassStudent._build_rows(db.session.connection(), source)
+
+        db.session.execute(table.delete().where(table.c.class_id.in_(class_ids)))
+        if rows:
+            db.session.execute(table.insert(), rows)
+        return len(rows)
+
+    @staticmethod
+    def rebuild(batch_size=1000):
+        """Rebuild the whole table from classes (backfill for databases created with create_all)"""
+        table = ClassStudent.__table__
+        db.session.execute(table.delete())
+
+        total = 0
+        last_id = 0
+        while True:
+            batch = db.session.query(
+                Class.id, Class.class_type, Class.primary_student_id, Class.students, Class.scheduled_date
+            ).filter(Class.id > last_id).order_by(Class.id).limit(batch_size).all()
+            if not batch:
+                break
+
+            rows = ClassStudent._build_rows(db.session.connection(), batch)
+            if rows:
+                db.session.execute(table.insert(), rows)
+                total += len(rows)
+            last_id = batch[-1][0]
+
+        db.session.commit()
+        return total
+
+    def __repr__(self):
+        return f'<ClassStudent class={self.class_id} student={self.student_id}>'
+
+
+# ============ ENROLLMENT SYNC ============
+
+_ENROLLMENT_FIELDS = ('class_type', 'primary_student_id', 'students', 'scheduled_date')
+
+
+@event.listens_for(Class, 'after_insert')
+def _class_enrollment_after_insert(mapper, connection, target):
+    ClassStudent.sync(connection, target)
+
+
+@event.listens_for(Class, 'after_update')
+def _class_enrollment_after_update(mapper, connection, target):
+    state = inspect(target)
+    if any(state.attrs[field].history.has_changes() for field in _ENROLLMENT_FIELDS):
+        ClassStudent.sync(connection, target)
+
+
+@event.listens_for(Class, 'before_delete')
+def _class_enrollment_before_delete(mapper, connection, target):
+    table = ClassStudent.__table__
+    connection.execute(table.delete().where(table.c.class_id == target.id))
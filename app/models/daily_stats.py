@@ -0,0 +1,280 @@
+from datetime import datetime
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+from app import db
+from app.models.class_model import Class
+from app.models.attendance import Attendance
+from app.utils.aggregates import count_where, upsert_counters
+
+# Rollup key value used when a class has no tutor or the tutor no department
+NO_ID = 0
+
+
+class DailyClassStats(db.Model):
+    """Per-day class counts keyed by (date, tutor, department, status).
+
+    Analytics read these O(days) rows instead of scanning ``classes``. Rows are
+    adjusted incrementally by the ``after_flush`` hook at the bottom of this
+    module; ``rebuild`` recomputes a date range from scratch (backfills, Core
+    bulk writes, or drift after a tutor changes department).
+    """
+    __tablename__ = 'daily_class_stats'
+    __table_args__ = (
+        db.UniqueConstraint('stat_date', 'tutor_id', 'department_id', 'status', name='uq_daily_class_stats_key'),
+        db.Index('ix_daily_class_stats_department_date', 'department_id', 'stat_date'),
+        db.Index('ix_daily_class_stats_tutor_date', 'tutor_id', 'stat_date'),
+    )
+
+    KEY = ('stat_date', 'tutor_id', 'department_id', 'status')
+
+    id = db.Column(db.Integer, primary_key=True)
+    stat_date = db.Column(db.Date, nullable=False)
+    tutor_id = db.Column(db.Integer, nullable=False, default=NO_ID)
+    department_id = db.Column(db.Integer, nullable=False, default=NO_ID)
+    status = db.Column(db.String(20), nullable=False)
+
+    class_count = db.Column(db.Integer, nullable=False, default=0)
+    total_minutes = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    @staticmethod
+    def contribution(values, departments):
+        """(key, counters) a class with the given column values adds to the rollup"""
+        if not values['scheduled_date'] or not values['status']:
+            return None
+        tutor_id = values['tutor_id'] or NO_ID
+        key = (values['scheduled_date'], tutor_id, departments.get(tutor_id, NO_ID), values['status'])
+        return key, {'class_count': 1, 'total_minutes': values['duration'] or 0}
+
+    @staticmethod
+    def source_query():
+        """Grouped SELECT over classes matching the rollup columns"""
+        from app.models.tutor import Tutor
+        from app.models.user import User
+
+        return select(
+            Class.scheduled_date,
+            db.func.coalesce(Class.tutor_id, NO_ID),
+            db.func.coalesce(User.department_id, NO_ID),
+            Class.status,
+            db.func.count(),
+            db.func.coalesce(db.func.sum(Class.duration), 0),
+        ).select_from(Class).outerjoin(Tutor, Tutor.id == Class.tutor_id)\
+            .outerjoin(User, User.id == Tutor.user_id)\
+            .where(Class.scheduled_date.isnot(None), Class.status.isnot(None))\
+            .group_by(Class.scheduled_date, Class.tutor_id, User.department_id, Class.status)
+
+    @staticmethod
+    def record_inserted(rows):
+        """Count classes written with Core INSERTs (the flush hook cannot see them). Does not commit."""
+        connection = db.session.connection()
+        departments = _tutor_departments(connection, {row.get('tutor_id') for row in rows})
+        deltas = {}
+        for row in rows:
+            part = DailyClassStats.contribution({
+                field: row.get(field) for field in ('scheduled_date', 'tutor_id', 'status', 'duration')
+            }, departments)
+            if part:
+                _add_counters(deltas, part, 1)
+        _apply_deltas(connection, DailyClassStats, deltas)
+
+    @staticmethod
+    def rebuild(start_date=None, end_date=None):
+        """Recompute rows for a date range (all dates when omitted); returns rows written"""
+        return _rebuild(DailyClassStats, Class.scheduled_date,
+                        ('class_count', 'total_minutes'), start_date, end_date)
+
+    def __repr__(self):
+        return f'<DailyClassStats {self.stat_date} tutor={self.tutor_id} {self.status}={self.class_count}>'
+
+
+class DailyAttendanceStats(db.Model):
+    """Per-day attendance counts keyed by (date, tutor, department); see DailyClassStats"""
+    __tablename__ = 'daily_attendance_stats'
+    __table_args__ = (
+        db.UniqueConstraint('stat_date', 'tutor_id', 'department_id', name='uq_daily_attendance_stats_key'),
+        db.Index('ix_daily_attendance_stats_department_date', 'department_id', 'stat_date'),
+        db.Index('ix_daily_attendance_stats_tutor_date', 'tutor_id', 'stat_date'),
+    )
+
+    KEY = ('stat_date', 'tutor_id', 'department_id')
+    LATE_MINUTES = 5  # Late threshold used by the dashboards
+
+    id = db.Column(db.Integer, primary_key=True)
+    stat_date = db.Column(db.Date, nullable=False)
+    tutor_id = db.Column(db.Integer, nullable=False, default=NO_ID)
+    department_id = db.Column(db.Integer, nullable=False, default=NO_ID)
+
+    record_count = db.Column(db.Integer, nullable=False, default=0)
+    present_count = db.Column(db.Integer, nullable=False, default=0)  # Tutor and student present
+    absent_count = db.Column(db.Integer, nullable=False, default=0)  # Tutor or student absent
+    late_count = db.Column(db.Integer, nullable=False, default=0)
+    tutor_present_count = db.Column(db.Integer, nullable=False, default=0)
+    student_present_count = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    @staticmethod
+    def contribution(values, departments):
+        """(key, counters) an attendance record with the given column values adds to the rollup"""
+        if not values['class_date']:
+            return None
+        tutor_id = values['tutor_id'] or NO_ID
+        late = DailyAttendanceStats.LATE_MINUTES
+        key = (values['class_date'], tutor_id, departments.get(tutor_id, NO_ID))
+        return key, {
+            'record_count': 1,
+            'present_count': int(bool(values['tutor_present'] and values['student_present'])),
+            'absent_count': int(values['tutor_present'] is False or values['student_present'] is False),
+            'late_count': int((values['tutor_late_minutes'] or 0) > late or (values['student_late_minutes'] or 0) > late),
+            'tutor_present_count': int(bool(values['tutor_present'])),
+            'student_present_count': int(bool(values['student_present'])),
+        }
+
+    @staticmethod
+    def source_query():
+        """Grouped SELECT over attendance matching the rollup columns"""
+        from app.models.tutor import Tutor
+        from app.models.user import User
+
+        late = DailyAttendanceStats.LATE_MINUTES
+        return select(
+            Attendance.class_date,
+            db.func.coalesce(Attendance.tutor_id, NO_ID),
+            db.func.coalesce(User.department_id, NO_ID),
+            db.func.count(),
+            count_where(Attendance.tutor_present.is_(True) & Attendance.student_present.is_(True)),
+            count_where(Attendance.tutor_present.is_(False) | Attendance.student_present.is_(False)),
+            count_where((Attendance.tutor_late_minutes > late) | (Attendance.student_late_minutes > late)),
+            count_where(Attendance.tutor_present.is_(True)),
+            count_where(Attendance.student_present.is_(True)),
+        ).select_from(Attendance).outerjoin(Tutor, Tutor.id == Attendance.tutor_id)\
+            .outerjoin(User, User.id == Tutor.user_id)\
+            .where(Attendance.class_date.isnot(None))\
+            .group_by(Attendance.class_date, Attendance.tutor_id, User.department_id)
+
+    @staticmethod
+    def rebuild(start_date=None, end_date=None):
+        """Recompute rows for a date range (all dates when omitted); returns rows written"""
+        return _rebuild(DailyAttendanceStats, Attendance.class_date,
+                        ('record_count', 'present_count', 'absent_count', 'late_count',
+                         'tutor_present_count', 'student_present_count'), start_date, end_date)
+
+    def __repr__(self):
+        return f'<DailyAttendanceStats {self.stat_date} tutor={self.tutor_id} records={self.record_count}>'
+
+
+def _rebuild(rollup, date_column, counters, start_date, end_date):
+    table = rollup.__table__
+    source = rollup.source_query()
+    delete = table.delete()
+    if start_date:
+        source = source.where(date_column >= start_date)
+        delete = delete.where(table.c.stat_date >= start_date)
+    if end_date:
+        source = source.where(date_column <= end_date)
+        delete = delete.where(table.c.stat_date <= end_date)
+
+    db.session.execute(delete)
+    rows = db.session.execute(source).all()
+    columns = rollup.KEY + counters
+    now = datetime.utcnow()
+    records = [dict(zip(columns, row), updated_at=now) for row in rows]
+    if records:
+        db.session.execute(table.insert(), records)
+    db.session.commit()
+    return len(records)
+
+
+# ============ INCREMENTAL MAINTENANCE ============
+
+_ROLLUPS = (
+    (Class, DailyClassStats, ('scheduled_date', 'tutor_id', 'status', 'duration')),
+    (Attendance, DailyAttendanceStats, ('class_date', 'tutor_id', 'tutor_present', 'student_present',
+                                        'tutor_late_minutes', 'student_late_minutes')),
+)
+
+
+def _load_old_value(target, value, oldvalue, initiator):
+    """No-op; registering it with active_history makes SQLAlchemy load the replaced value"""
+
+
+# Objects are expired after every commit, so without active history a plain assignment
+# would not know which rollup row the record was counted in
+for _model, _rollup, _fields in _ROLLUPS:
+    for _field in _fields:
+        event.listen(getattr(_model, _field), 'set', _load_old_value, active_history=True)
+
+
+def _values(obj, fields, old):
+    """Column values of obj now, or as loaded before this flush when old is True"""
+    state = inspect(obj)
+    values = {}
+    for field in fields:
+        history = state.attrs[field].history
+        if old and history.deleted:
+            values[field] = history.deleted[0]
+        elif old and history.added:
+            # Changed from an unloaded/NULL value
+            values[field] = None
+        else:
+            values[field] = getattr(obj, field)
+    return values
+
+
+def _tutor_departments(connection, tutor_ids):
+    from app.models.tutor import Tutor
+    from app.models.user import User
+
+    tutor_ids = {tutor_id for tutor_id in tutor_ids if tutor_id}
+    if not tutor_ids:
+        return {}
+    return dict(connection.execute(
+        select(Tutor.id, User.department_id).join(User, User.id == Tutor.user_id).where(Tutor.id.in_(tutor_ids))
+    ).all())
+
+
+def _add_counters(deltas, part, sign):
+    key, counters = part
+    totals = deltas.setdefault(key, {})
+    for column, amount in counters.items():
+        totals[column] = totals.get(column, 0) + sign * amount
+
+
+def _apply_deltas(connection, rollup, deltas):
+    """UPDATE counters in place, inserting the key row the first time it is seen"""
+    upsert_counters(connection, rollup.__table__, rollup.KEY, deltas, values={'updated_at': datetime.utcnow()})
+
+
+@event.listens_for(Session, 'after_flush')
+def _update_daily_stats(session, flush_context):
+    changes = []
+    for model, rollup, fields in _ROLLUPS:
+        for obj in session.new:
+            if isinstance(obj, model):
+                changes.append((rollup, None, _values(obj, fields, old=False)))
+        for obj in session.dirty:
+            if isinstance(obj, model) and session.is_modified(obj):
+                old, new = _values(obj, fields, old=True), _values(obj, fields, old=False)
+                if old != new:
+                    changes.append((rollup, old, new))
+        for obj in session.deleted:
+            if isinstance(obj, model):
+                changes.append((rollup, _values(obj, fields, old=True), None))
+    if not changes:
+        return
+
+    connection = session.connection()
+    departments = _tutor_departments(connection, {
+        values['tutor_id'] for _, old, new in changes for values in (old, new) if values
+    })
+
+    deltas = {}
+    for rollup, old, new in changes:
+        per_key = deltas.setdefault(rollup, {})
+        for values, sign in ((old, -1), (new, 1)):
+            part = values and rollup.contribution(values, departments)
+            if part:
+                _add_counters(per_key, part, sign)
+
+    for rollup, per_key in deltas.items():
+        _apply_deltas(connection, rollup, per_key)
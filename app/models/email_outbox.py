@@ -0,0 +1,83 @@
+from datetime import datetime
+from app import db
+import json
+
+class EmailOutbox(db.Model):
+    """Durable outbound email queue.
+
+    ``send_email`` writes a row here and returns; the worker pool in
+    ``app/utils/email_queue.py`` claims pending rows in batches, delivers them
+    over one SMTP connection per batch and records the outcome, so queued mail
+    survives restarts and callers can look up delivery status by id.
+    """
+    __tablename__ = 'email_outbox'
+    __table_args__ = (
+        db.Index('ix_email_outbox_status_next_attempt', 'status', 'next_attempt_at'),
+    )
+
+    STATUS_PENDING = 'pending'
+    STATUS_SENDING = 'sending'
+    STATUS_SENT = 'sent'
+    STATUS_FAILED = 'failed'
+
+    id = db.Column(db.Integer, primary_key=True)
+    subject = db.Column(db.String(500), nullable=False)
+    sender = db.Column(db.String(255))
+    recipients = db.Column(db.Text, nullable=False)  # JSON list
+    cc = db.Column(db.Text)  # JSON list
+    bcc = db.Column(db.Text)  # JSON list
+    text_body = db.Column(db.Text)
+    html_body = db.Column(db.Text)
+    email_type = db.Column(db.String(50))  # Optional caller category for reporting
+
+    # Delivery state
+    status = db.Column(db.String(20), nullable=False, default=STATUS_PENDING)
+    priority = db.Column(db.Integer, nullable=False, default=0)  # Higher is sent first
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=5)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    last_error = db.Column(db.Text)
+    provider = db.Column(db.String(255))  # SMTP host the message went through
+    locked_by = db.Column(db.String(100))  # Worker token while status == 'sending'
+    locked_at = db.Column(db.DateTime)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime)
+
+    def get_recipients(self):
+        return self._load_list(self.recipients)
+
+    def get_cc(self):
+        return self._load_list(self.cc)
+
+    def get_bcc(self):
+        return self._load_list(self.bcc)
+
+    @staticmethod
+    def _load_list(raw):
+        if not raw:
+            return []
+        try:
+            parsed = json.loads(raw)
+        except (ValueError, TypeError):
+            return []
+        return parsed if isinstance(parsed, list) else []
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'subject': self.subject,
+            'recipients': self.get_recipients(),
+            'email_type': self.email_type,
+            'status': self.status,
+            'attempts': self.attempts,
+            'max_attempts': self.max_attempts,
+            'next_attempt_at': self.next_attempt_at.isoformat() if self.next_attempt_at else None,
+            'last_error': self.last_error,
+            'provider': self.provider,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'sent_at': self.sent_at.isoformat() if self.sent_at else None
+        }
+
+    def __repr__(self):
+        return f'<EmailOutbox {self.id} {self.status} {self.subject!r}>'
@@ -276,6 +276,39 @@ class UserActivityLog(db.Model):
         }
 
 
+class ActivityMinuteStats(db.Model):
+    """Per-minute request and error counters.
+
+    Maintained by the activity log writer (app/utils/activity_log.py) so the
+    error rate is read from at most 60 rows per hour instead of counting
+    ``user_activity_logs`` and ``error_logs``.
+    """
+    __tablename__ = 'activity_minute_stats'
+
+    minute = db.Column(db.DateTime, primary_key=True)  # UTC, truncated to the minute
+    request_count = db.Column(db.Integer, nullable=False, default=0)  # Activity rows recorded
+    failed_count = db.Column(db.Integer, nullable=False, default=0)  # Activity rows with success=False
+    error_count = db.Column(db.Integer, nullable=False, default=0)  # High/critical ErrorLog rows
+
+    COUNTERS = ('request_count', 'failed_count', 'error_count')
+
+    @staticmethod
+    def add_counts(connection, deltas):
+        """Add {minute: {counter: n}} in place, inserting a minute row the first time it is seen"""
+        from app.utils.aggregates import upsert_counters
+        upsert_counters(connection, ActivityMinuteStats.__table__, ('minute',),
+                        {(minute,): counters for minute, counters in deltas.items()})
+
+    @staticmethod
+    def totals(since):
+        """{counter: sum} over the minutes starting at or after since"""
+        row = db.session.query(*(
+            db.func.coalesce(db.func.sum(getattr(ActivityMinuteStats, column)), 0)
+            for column in ActivityMinuteStats.COUNTERS
+        )).filter(ActivityMinuteStats.minute >= since).one()
+        return dict(zip(ActivityMinuteStats.COUNTERS, row))
+
+
 class SystemHealthLog(db.Model):
     """System health monitoring"""
     __tablename__ = 'system_health_logs'
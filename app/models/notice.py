@@ -84,6 +84,19 @@ class Notice(db.Model):
             return False
         return True
     
+    def target_user_ids_select(self):
+        """SELECT of the active user IDs this notice targets (for set-based fan-out)"""
+        from app.models.user import User
+        
+        query = db.select(User.id).where(User.is_active == True)
+        if self.target_type == 'all':
+            return query
+        if self.target_type == 'department':
+            return query.where(User.department_id.in_(self.get_target_departments() or []))
+        if self.target_type == 'individual':
+            return query.where(User.id.in_(self.get_target_users() or []))
+        return query.where(db.false())
+    
     def get_delivery_stats(self):
         """Get delivery statistics"""
         distributions = self.distributions.all()
@@ -51,105 +51,17 @@ class RescheduleRequest(db.Model):
     
     def check_conflicts(self):
         """Check for scheduling conflicts with the requested time"""
-        from app.models.class_model import Class
-        
-        conflicts = []
-        
-        # Get the class item if not already loaded
-        if not self.class_item:
-            self.class_item = Class.query.get(self.class_id)
-        
-        # Check if we have a valid class item
-        if not self.class_item:
-            conflicts.append({
-                'type': 'invalid_class',
-                'message': 'Class not found or invalid'
-            })
-            self.has_conflicts = True
-            import json
-            self.conflict_details = json.dumps(conflicts) if conflicts else None
-            return conflicts
-        
-        # Check if class has a tutor assigned
-        if not self.class_item.tutor_id:
-            conflicts.append({
-                'type': 'no_tutor',
-                'message': 'Class has no tutor assigned'
-            })
-            self.has_conflicts = True
-            import json
-            self.conflict_details = json.dumps(conflicts) if conflicts else None
-            return conflicts
-        
-        # Check if tutor has another class at the requested time
-        tutor_conflict = Class.query.filter_by(
-            tutor_id=self.class_item.tutor_id,
-            scheduled_date=self.requested_date,
-            status='scheduled'
-        ).filter(
-            Class.id != self.class_id  # Exclude current class
-        ).first()
-        
-        if tutor_conflict:
-            # Check for time overlap
-            requested_end = self._add_duration_to_time(self.requested_time, self.class_item.duration)
-            existing_end = tutor_conflict.end_time
-            
-            if (self.requested_time < existing_end and 
-                requested_end > tutor_conflict.scheduled_time):
-                conflicts.append({
-                    'type': 'tutor_conflict',
-                    'message': f'Tutor already has a class from {tutor_conflict.scheduled_time} to {existing_end}',
-                    'conflicting_class_id': tutor_conflict.id
-                })
-        
-        # Check if students have conflicts (for group classes)
-        if self.class_item.class_type == 'group':
-            student_ids = self.class_item.get_students()
-            for student_id in student_ids:
-                student_conflicts = Class.query.filter(
-                    or_(
-                        Class.primary_student_id == student_id,
-                        Class.students.contains(str(student_id))
-                    )
-                ).filter_by(
-                    scheduled_date=self.requested_date,
-                    status='scheduled'
-                ).filter(
-                    Class.id != self.class_id
-                ).all()
-                
-                for conflict in student_conflicts:
-                    requested_end = self._add_duration_to_time(self.requested_time, self.class_item.duration)
-                    existing_end = conflict.end_time
-                    
-                    if (self.requested_time < existing_end and 
-                        requested_end > conflict.scheduled_time):
-                        conflicts.append({
-                            'type': 'student_conflict',
-                            'message': f'Student has another class from {conflict.scheduled_time} to {existing_end}',
-                            'student_id': student_id,
-                            'conflicting_class_id': conflict.id
-                        })
-        
-        # Check tutor availability
-        if self.class_item.tutor and hasattr(self.class_item.tutor, 'is_available_at'):
-            day_of_week = self.requested_date.strftime('%A').lower()
-            time_str = self.requested_time.strftime('%H:%M')
-            
-            if not self.class_item.tutor.is_available_at(day_of_week, time_str):
-                conflicts.append({
-                    'type': 'tutor_unavailable',
-                    'message': f'Tutor is not available on {day_of_week} at {time_str}'
-                })
-        
+        from app.utils.reschedule_conflicts import RescheduleConflictEngine
+
+        conflicts = RescheduleConflictEngine([self]).conflicts_for(self)
+
         self.has_conflicts = len(conflicts) > 0
         if conflicts:
             import json
             self.conflict_details = json.dumps(conflicts)
         else:
             self.conflict_details = None
-        
+
         return conflicts
     
     def _add_duration_to_time(self, time_obj, duration_minutes):
@@ -223,8 +135,8 @@ class RescheduleRequest(db.Model):
     def __repr__(self):
         return f'<RescheduleRequest {self.id} - Class {self.class_id} - {self.status}>'
     
-    def approve(self, reviewer, notes=None):
-        """Approve the reschedule request and send notifications"""
+    def apply_approval(self, reviewer, notes=None):
+        """Mark approved and move the class, without committing or notifying"""
         self.status = 'approved'
         self.reviewed_by = reviewer.id
         self.reviewed_at = datetime.utcnow()
@@ -235,7 +147,10 @@ class RescheduleRequest(db.Model):
         self.class_item.scheduled_time = self.requested_time
         self.class_item.calculate_end_time()
         self.class_item.updated_at = datetime.utcnow()
-        
+    
+    def approve(self, reviewer, notes=None):
+        """Approve the reschedule request and send notifications"""
+        self.apply_approval(reviewer, notes)
         db.session.commit()
         
         # Send notification
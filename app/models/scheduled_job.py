@@ -0,0 +1,67 @@
+from datetime import datetime
+from app import db
+import json
+
+class ScheduledJob(db.Model):
+    """Delayed work executed by the in-app job scheduler.
+
+    Rows are written by ``job_scheduler.schedule`` (email sequence steps, video
+    upload reminders and deadlines, ...) and run by the elected scheduler leader
+    in ``app/utils/job_scheduler.py`` once ``run_at`` passes. ``key`` groups the
+    jobs that belong to one thing (e.g. ``video_upload:42``) so they can be
+    cancelled or moved together.
+    """
+    __tablename__ = 'scheduled_jobs'
+    __table_args__ = (
+        db.Index('ix_scheduled_jobs_status_run_at', 'status', 'run_at'),
+    )
+
+    STATUS_PENDING = 'pending'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CANCELLED = 'cancelled'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)  # Registered handler name
+    key = db.Column(db.String(200), index=True)  # Cancel/reschedule group
+    payload = db.Column(db.Text)  # JSON
+    run_at = db.Column(db.DateTime, nullable=False)
+
+    # Execution state
+    status = db.Column(db.String(20), nullable=False, default=STATUS_PENDING)
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=3)
+    last_error = db.Column(db.Text)
+    locked_by = db.Column(db.String(100))  # Claim token while status == 'running'
+    locked_at = db.Column(db.DateTime)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime)
+
+    def get_payload(self):
+        if not self.payload:
+            return {}
+        try:
+            parsed = json.loads(self.payload)
+        except (ValueError, TypeError):
+            return {}
+        return parsed if isinstance(parsed, dict) else {}
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'name': self.name,
+            'key': self.key,
+            'payload': self.get_payload(),
+            'run_at': self.run_at.isoformat() if self.run_at else None,
+            'status': self.status,
+            'attempts': self.attempts,
+            'max_attempts': self.max_attempts,
+            'last_error': self.last_error,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'finished_at': self.finished_at.isoformat() if self.finished_at else None
+        }
+
+    def __repr__(self):
+        return f'<ScheduledJob {self.id} {self.name} {self.status} at {self.run_at}>'
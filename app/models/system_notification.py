@@ -136,44 +136,42 @@ class SystemNotification(db.Model):
         
         return False
     
-    def get_target_user_ids(self):
-        """Get all target user IDs based on targeting criteria"""
+    def target_user_ids_select(self):
+        """SELECT of the target user IDs (for set-based fan-out)"""
         from app.models.user import User
-        from app.models.department import Department
-        
-        target_user_ids = set()
         
         if self.target_type == 'all':
             # All active users
-            users = User.query.filter_by(is_active=True).all()
-            target_user_ids.update([u.id for u in users])
-            
-        elif self.target_type == 'department':
+            return db.select(User.id).where(User.is_active == True)
+        
+        if self.target_type == 'department':
             # Users in specific departments
-            dept_ids = self.get_target_departments()
-            if dept_ids:
-                users = User.query.filter(
-                    User.department_id.in_(dept_ids),
-                    User.is_active == True
-                ).all()
-                target_user_ids.update([u.id for u in users])
-                
-        elif self.target_type == 'role':
+            return db.select(User.id).where(
+                User.department_id.in_(self.get_target_departments() or []),
+                User.is_active == True
+            )
+        
+        if self.target_type == 'role':
             # Users with specific roles
-            roles = self.get_target_roles()
-            if roles:
-                users = User.query.filter(
-                    User.role.in_(roles),
-                    User.is_active == True
-                ).all()
-                target_user_ids.update([u.id for u in users])
-                
-        elif self.target_type == 'individual':
+            return db.select(User.id).where(
+                User.role.in_(self.get_target_roles() or []),
+                User.is_active == True
+            )
+        
+        if self.target_type == 'individual':
             # Specific users
-            user_ids = self.get_target_users()
-            target_user_ids.update(user_ids)
+            return db.select(User.id).where(User.id.in_(self.get_target_users() or []))
         
-        return list(target_user_ids)
+        return db.select(User.id).where(db.false())
+    
+    def get_target_user_ids(self):
+        """Get all target user IDs based on targeting criteria"""
+        return db.session.execute(self.target_user_ids_select()).scalars().all()
+    
+    def count_target_users(self):
+        return db.session.execute(
+            db.select(db.func.count()).select_from(self.target_user_ids_select().subquery())
+        ).scalar()
     
     def mark_as_sent(self):
         """Mark notification as sent"""
@@ -190,7 +188,7 @@ class SystemNotification(db.Model):
     
     def get_delivery_stats(self):
         """Get delivery statistics"""
-        target_count = len(self.get_target_user_ids())
+        target_count = self.count_target_users()
         user_notifications = self.user_notifications.all()
         
         delivered_count = len([un for un in user_notifications if un.delivered_at])
@@ -218,26 +218,45 @@ class Tutor(db.Model):
 
         return min(base_score, 100)  # Cap at 100
 
+    def get_weekly_availability(self):
+        """Get compiled availability (sorted minute intervals per weekday), cached per availability change"""
+        from app.utils.availability_engine import compiled_availability
+        return compiled_availability(self)
+
     def is_available_at(self, day_of_week, time_str):
         """Check if tutor is available at specific day and time
         Args:
             day_of_week: 'monday', 'tuesday', etc.
             time_str: '14:30' format
         """
-        availability = self.get_availability()
-        if day_of_week.lower() not in availability:
+        from app.utils.availability_engine import parse_minutes
+
+        minute = parse_minutes(time_str)
+        if minute is None:
             return False
+        return self.get_weekly_availability().contains(day_of_week, minute)
 
-        day_slots = availability[day_of_week.lower()]
-        for slot in day_slots:
-            # Convert times to comparable format for accurate comparison
-            start_time = self._normalize_time_string(slot["start"])
-            end_time = self._normalize_time_string(slot["end"])
-            check_time = self._normalize_time_string(time_str)
-            
-            if start_time <= check_time <= end_time:
-                return True
-        return False
+    def is_free_for(self, date_obj, start_time, duration, exclude_class_id=None):
+        """Check availability slot and existing classes for [start, start + duration) on a date"""
+        from app.utils.availability_engine import DAY_NAMES, parse_minutes, busy_intervals, find_overlap
+
+        start = parse_minutes(start_time)
+        if start is None:
+            return False
+        if not self.get_weekly_availability().covers(DAY_NAMES[date_obj.weekday()], start, duration):
+            return False
+        busy = busy_intervals([self.id], date_obj, exclude_class_id)[self.id]
+        return find_overlap(busy, start, start + duration) is None
+
+    def get_free_slots(self, date_obj, duration=60, step=30):
+        """List free [start, start + duration) slots on a date (one classes query)"""
+        from app.utils.availability_engine import busy_intervals, free_slots
+
+        weekly = self.get_weekly_availability()
+        if not weekly:
+            return []
+        busy = busy_intervals([self.id], date_obj)[self.id]
+        return free_slots(weekly, date_obj, busy, duration, step)
     
     def _normalize_time_string(self, time_str):
         """Convert time string to HH:MM format for comparison"""
@@ -312,22 +331,16 @@ class Tutor(db.Model):
     @staticmethod
     def get_available_tutors(subject=None, grade=None, board=None, day=None, time=None):
         """Get available tutors based on criteria"""
-        query = Tutor.query.filter_by(status="active")
+        from app.utils.tutor_index import tutor_index
+
+        # The capability index is the only source of truth for subject/grade/board
+        candidate_ids = tutor_index.candidates(subject=subject, grade=grade, board=board)
+        if not candidate_ids:
+            return []
+        query = Tutor.query.filter(Tutor.id.in_(candidate_ids))
 
         available_tutors = []
         for tutor in query:
-            # Check subject compatibility
-            if subject and not tutor.can_teach_subject(subject):
-                continue
-
-            # Check grade compatibility
-            if grade and not tutor.can_teach_grade(grade):
-                continue
-
-            # Check board compatibility
-            if board and not tutor.can_teach_board(board):
-                continue
-
             # Check availability
             if day and time and not tutor.is_available_at(day, time):
                 continue
@@ -552,11 +565,13 @@ class Tutor(db.Model):
                 score += 5
                 reasons.append("Specialist expertise")
 
+        return score, reasons
+
     def get_smart_availability_status(self, day=None, time=None):
         """Get detailed availability status for smart matching"""
-        availability = self.get_availability()
+        weekly = self.get_weekly_availability()
 
-        if not availability:
+        if not weekly:
             return {
                 "status": "no_schedule",
                 "message": "No availability schedule set",
@@ -564,25 +579,8 @@ class Tutor(db.Model):
                 "total_hours_per_week": 0,
             }
 
-        available_days = []
-        total_hours = 0
-
-        for day_name, slots in availability.items():
-            if slots:
-                available_days.append(day_name.title())
-                # Calculate hours for this day
-                for slot in slots:
-                    try:
-                        from datetime import datetime, date
-
-                        start = datetime.strptime(slot["start"], "%H:%M").time()
-                        end = datetime.strptime(slot["end"], "%H:%M").time()
-                        start_dt = datetime.combine(date.today(), start)
-                        end_dt = datetime.combine(date.today(), end)
-                        hours = (end_dt - start_dt).total_seconds() / 3600
-                        total_hours += hours
-                    except:
-                        continue
+        available_days = [day_name.title() for day_name in weekly.available_days]
+        total_hours = weekly.total_hours()
 
         status_info = {
             "status": "available",
@@ -782,31 +780,35 @@ class Tutor(db.Model):
     @staticmethod
     def find_best_matches_for_student(student, subject=None, limit=10):
         """Find best tutor matches for a student with detailed scoring"""
-        active_tutors = Tutor.query.filter_by(status="active").all()
-        scored_tutors = []
+        from app.utils.tutor_index import tutor_index
+        from app.utils.match_scoring import MatchFeatures, compatibility_scores, top_indices
 
-        for tutor in active_tutors:
-            # Must have availability
-            if not tutor.get_availability():
-                continue
-
-            score, reasons = tutor.get_compatibility_score(student, subject)
+        # Grade and board are mandatory in get_compatibility_score, so only score tutors matching both
+        candidate_ids = tutor_index.candidates(
+            grade=student.grade, board=student.board, require_availability=True
+        )
+        if not candidate_ids:
+            return []
+        active_tutors = Tutor.query.filter(Tutor.id.in_(candidate_ids)).all()
 
-            if score > 0:  # Only include compatible tutors
-                scored_tutors.append(
-                    {
-                        "tutor": tutor,
-                        "score": score,
-                        "reasons": reasons,
-                        "availability_status": tutor.get_smart_availability_status(),
-                        "performance_metrics": tutor.get_performance_metrics(),
-                    }
-                )
+        # Rank every candidate in one vectorized pass; build reasons only for the returned tutors
+        scores = compatibility_scores(MatchFeatures(active_tutors, [student]), subject)[0]
+        scored_tutors = []
 
-        # Sort by score (highest first)
-        scored_tutors.sort(key=lambda x: x["score"], reverse=True)
+        for index in top_indices(scores, limit):
+            tutor = active_tutors[index]
+            score, reasons = tutor.get_compatibility_score(student, subject)
+            scored_tutors.append(
+                {
+                    "tutor": tutor,
+                    "score": score,
+                    "reasons": reasons,
+                    "availability_status": tutor.get_smart_availability_status(),
+                    "performance_metrics": tutor.get_performance_metrics(),
+                }
+            )
 
-        return scored_tutors[:limit]
+        return scored_tutors
 
     @staticmethod
     def search_tutors_advanced(search_criteria):
@@ -89,87 +89,27 @@ class User(UserMixin, db.Model):
     
     # ============ ADVANCED PERMISSION SYSTEM ============
     
+    @property
+    def principal(self):
+        """Permission snapshot (memoized per request, cached across requests)"""
+        from app.utils.principal import get_principal
+        return get_principal(self)
+
     def has_permission(self, permission):
         """Enhanced permission checking with department integration"""
-        if self.role == 'superadmin':
-            return True
-        
-        # For admin role - has all permissions  
-        if self.role == 'admin':
-            return True
-        
-        # For coordinator - check department permissions first
-        if self.role == 'coordinator':
-            if self.department:
-                dept_permissions = self.department.get_permissions()
-                return permission in dept_permissions
-            return False
-        
-        # For tutor - expanded permissions  
-        if self.role == 'tutor':
-            tutor_permissions = [
-                'class_management', 'attendance_management', 
-                'profile_management', 'communication', 'schedule_management',
-                'student_management',  # Can manage their own students
-                'report_generation'   # Can generate their reports
-            ]
-            return permission in tutor_permissions
-        
-        # For student - basic permissions
-        if self.role == 'student':
-            student_permissions = [
-                'profile_management', 'communication'
-            ]
-            return permission in student_permissions
-        
-        return False
+        return self.principal.has_permission(permission)
 
     def can_access_department_data(self, department_id):
         """Check if user can access specific department data"""
-        if self.role == 'superadmin':
-            return True
-        if self.role == 'admin':
-            return True  # Admins can access all departments
-        if self.role == 'coordinator':
-            return self.department_id == department_id
-        if self.role in ['tutor', 'student']:
-            # Tutors and students can only access their own department
-            return self.department_id == department_id
-        return False
+        return self.principal.can_access_department(department_id)
 
     def get_permission_level(self):
         """Get user's permission level"""
-        if self.role == 'superadmin':
-            return 'high'
-        if self.role == 'admin':
-            return 'high'
-        if self.role == 'coordinator':
-            return self.department.permission_level if self.department else 'medium'
-        return 'low'
+        return self.principal.permission_level
 
     def get_all_permissions(self):
         """Get list of all permissions this user has"""
-        if self.role == 'superadmin':
-            from app.utils.advanced_permissions import PermissionRegistry
-            return list(PermissionRegistry.PERMISSION_STRUCTURE.keys())
-        
-        if self.role == 'admin':
-            from app.utils.advanced_permissions import PermissionRegistry
-            return list(PermissionRegistry.PERMISSION_STRUCTURE.keys())
-        
-        if self.role == 'coordinator' and self.department:
-            return self.department.get_permissions()
-        
-        # Role-based permissions for other roles
-        role_permissions = {
-            'tutor': [
-                'class_management', 'attendance_management', 'profile_management', 
-                'communication', 'schedule_management'
-            ],
-            'student': ['profile_management', 'communication']
-        }
-        
-        return role_permissions.get(self.role, [])
+        return list(self.principal.listed)
 
     def get_permission_summary(self):
         """Get detailed permission summary"""
@@ -178,7 +118,7 @@ class User(UserMixin, db.Model):
 
     def get_menu_permissions(self):
         """Get permissions for menu display"""
-        permissions = self.get_all_permissions()
+        permissions = frozenset(self.principal.listed)
         
         return {
             'can_manage_users': 'user_management' in permissions,
@@ -429,4 +369,5 @@ class User(UserMixin, db.Model):
 
 @login.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
\ No newline at end of file
+    from app.utils.principal import load_cached_user
+    return load_cached_user(int(user_id))
\ No newline at end of file
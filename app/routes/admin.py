@@ -12,6 +12,7 @@ from app.models.department import Department
 from app.models.tutor import Tutor
 from app.models.student import Student
 from app.models.class_model import Class
+from app.models.class_student import ClassStudent
 from app.models.attendance import Attendance
 from app.forms.user import CreateUserForm, EditUserForm, TutorRegistrationForm, StudentRegistrationForm
 from app.utils.tutor_matching import TutorMatchingEngine, SearchQueryProcessor, AvailabilityChecker, monitor_search_performance
@@ -1159,10 +1160,7 @@ def student_details(student_id):
     
     # Optimized query for student's classes - direct SQL search instead of loading all classes
     student_classes = Class.query.filter(
-        or_(
-            Class.primary_student_id == student_id,
-            Class.students.like(f'%{student_id}%')
-        )
+        Class.student_filter(student_id)
     ).options(
         db.joinedload(Class.tutor).joinedload(Tutor.user)
     ).order_by(Class.scheduled_date.desc()).limit(20).all()
@@ -1178,10 +1176,7 @@ def student_details(student_id):
     # Optimized query for upcoming classes
     upcoming_classes = Class.query.filter(
         and_(
-            or_(
-                Class.primary_student_id == student_id,
-                Class.students.like(f'%{student_id}%')
-            ),
+            Class.student_filter(student_id),
             Class.scheduled_date >= date.today(),
             Class.status == 'scheduled'
         )
@@ -1902,34 +1897,51 @@ def delete_student(student_id):
 @require_permission('class_management')
 def classes():
     """Class management page"""
-    page = request.args.get('page', 1, type=int)
+    from sqlalchemy.orm import joinedload
+    from app.models.daily_stats import DailyClassStats
+    from app.utils.aggregates import aggregate_sums
+    from app.utils.keyset import keyset_paginate
+
+    cursor = request.args.get('cursor', '')
+    before = request.args.get('before') or None
     date_filter = request.args.get('date', '')
     tutor_filter = request.args.get('tutor', '', type=int)
     status_filter = request.args.get('status', '')
     class_type_filter = request.args.get('class_type', '')
     
-    query = Class.query
+    query = Class.query.options(joinedload(Class.tutor).joinedload(Tutor.user))
+    # Same filters on the daily rollup give the total without counting classes
+    stats_filters = []
     
     # Apply filters
     if date_filter:
         try:
             filter_date = datetime.strptime(date_filter, '%Y-%m-%d').date()
             query = query.filter_by(scheduled_date=filter_date)
+            stats_filters.append(DailyClassStats.stat_date == filter_date)
         except ValueError:
             pass
     
     if tutor_filter:
         query = query.filter_by(tutor_id=tutor_filter)
+        stats_filters.append(DailyClassStats.tutor_id == tutor_filter)
     
     if status_filter:
         query = query.filter_by(status=status_filter)
+        stats_filters.append(DailyClassStats.status == status_filter)
         
     if class_type_filter:
         query = query.filter_by(class_type=class_type_filter)
+        total = query.order_by(None).count()
+    else:
+        total = aggregate_sums(DailyClassStats, {'total': (DailyClassStats.class_count, None)},
+                               where=and_(*stats_filters) if stats_filters else None)['total']
     
-    classes = query.order_by(Class.scheduled_date, Class.scheduled_time).paginate(
-        page=page, per_page=20, error_out=False
-    )
+    # Keyset pages: each page seeks from the previous page's last row instead of skipping OFFSET rows
+    classes = keyset_paginate(query, [Class.scheduled_date, Class.scheduled_time, Class.id],
+                              cursor=cursor, before=before, per_page=20, total=total)
+    # Filters carried over by the pagination links
+    filter_args = {key: value for key, value in request.args.items() if key not in ('cursor', 'before') and value}
     
     # Get tutors - only those with availability set AND with user relationship
     available_tutors = []
@@ -2003,6 +2015,7 @@ def classes():
     
     return render_template('admin/classes.html', 
                          classes=classes, 
+                         filter_args=filter_args,
                          tutors=available_tutors,  # Only tutors with availability
                          all_tutors=all_tutors,    # All tutors for reference
                          tutors_without_availability=tutors_without_availability,
@@ -2105,10 +2118,12 @@ def create_class():
 @login_required
 @require_permission('class_management')
 def bulk_create_classes():
-    """Create multiple classes in bulk with availability validation"""
+    """Create multiple classes in bulk with availability validation.
+    
+    Returns a JSON created/skipped report when the client sends Accept: application/json.
+    """
+    wants_json = request.accept_mimetypes.best == 'application/json'
     try:
-        from datetime import timedelta
-        
         # Get form data with sanitization and validation
         subject = InputSanitizer.sanitize_text(request.form.get('subject', ''), max_length=100)
         grade = InputSanitizer.sanitize_grade(request.form.get('grade', ''))
@@ -2186,65 +2201,31 @@ def bulk_create_classes():
             flash('One or more selected students do not exist.', 'error')
             return redirect(url_for('admin.classes'))
         
-        # Create classes
-        created_count = 0
-        skipped_count = 0
-        current_date = start_date
+        # Create classes: expand the recurrence, check conflicts in one query, insert in one statement
+        from app.utils.bulk_scheduler import BulkClassScheduler, expand_weekly_recurrence
         
-        while current_date <= end_date:
-            # Check if current day is in selected days of week
-            if current_date.weekday() in days_of_week:
-                day_of_week = current_date.strftime('%A').lower()
-                time_str = start_time.strftime('%H:%M')
-                
-                # Check tutor availability for this day/time
-                if tutor.is_available_at(day_of_week, time_str):
-                    # Check for existing classes at this time
-                    existing_class = Class.query.filter_by(
-                        tutor_id=tutor_id,
-                        scheduled_date=current_date,
-                        scheduled_time=start_time,
-                        status='scheduled'
-                    ).first()
-                    
-                    if not existing_class:
-                        # Create the class
-                        class_data = {
-                            'subject': subject,
-                            'class_type': class_type,
-                            'scheduled_date': current_date,
-                            'scheduled_time': start_time,
-                            'duration': duration,
-                            'tutor_id': tutor_id,
-                            'grade': grade,
-                            'meeting_link': request.form.get('meeting_link', ''),
-                            'class_notes': request.form.get('class_notes', ''),
-                            'status': 'scheduled',
-                            'created_by': current_user.id
-                        }
-                        
-                        new_class = Class(**class_data)
-                        db.session.add(new_class)
-                        db.session.flush()  # Get the ID
-                        
-                        # Set students for the class
-                        if hasattr(new_class, 'set_students'):
-                            new_class.set_students(students)
-                        else:
-                            # Fallback if set_students method doesn't exist
-                            if students:
-                                new_class.primary_student_id = students[0]
-                        
-                        created_count += 1
-                    else:
-                        skipped_count += 1
-                else:
-                    skipped_count += 1
-            
-            current_date += timedelta(days=1)
+        scheduler = BulkClassScheduler(tutor, start_time, duration)
+        report = scheduler.create(
+            expand_weekly_recurrence(start_date, end_date, days_of_week),
+            {
+                'subject': subject,
+                'class_type': class_type,
+                'grade': grade,
+                'meeting_link': request.form.get('meeting_link', ''),
+                'class_notes': request.form.get('class_notes', ''),
+                'created_by': current_user.id
+            },
+            students
+        )
         
         db.session.commit()
         
+        created_count = report['created_count']
+        skipped_count = report['skipped_count']
+        
+        if wants_json:
+            return jsonify({'success': True, 'report': report})
+        
         # Show results
         if created_count > 0:
             message = f'{created_count} classes created successfully!'
@@ -2256,8 +2237,10 @@ def bulk_create_classes():
         
     except Exception as e:
         db.session.rollback()
-        flash(f'Error creating bulk classes: {str(e)}', 'error')
         print(f"Bulk create error: {e}")  # For debugging
+        if wants_json:
+            return jsonify({'success': False, 'error': str(e)}), 500
+        flash(f'Error creating bulk classes: {str(e)}', 'error')
     
     return redirect(url_for('admin.classes'))
 
@@ -3026,14 +3009,24 @@ def api_smart_tutor_search():
         availability_day = request.args.get('availability_day', '').strip().lower()
         availability_time = request.args.get('availability_time', '').strip()
         
-        # Get base query
-        tutors = Tutor.query.filter_by(status='active').all()
+        from app.utils.tutor_index import tutor_index
         
         # Get student context if provided
         student = None
         if student_id:
             student = Student.query.get(student_id)
         
+        # Narrow candidates with the capability index before loading and scoring tutors.
+        # Tutors with no grades/boards listed are not excluded by the student checks below.
+        candidate_ids = set(tutor_index.active_ids())
+        if student:
+            candidate_ids &= tutor_index.grade_ids(student.grade, include_unrestricted=True)
+            candidate_ids &= tutor_index.board_ids(student.board, include_unrestricted=True)
+        if subject:
+            candidate_ids &= tutor_index.subject_ids(subject, partial=True)
+        
+        tutors = Tutor.query.filter(Tutor.id.in_(candidate_ids)).all() if candidate_ids else []
+        
         compatible_tutors = []
         
         for tutor in tutors:
@@ -3713,19 +3706,21 @@ def api_batch_availability_check():
         
         results = []
         
+        # One tutors query and one classes query for the whole batch
+        tutors = {t.id: t for t in Tutor.query.filter(Tutor.id.in_(tutor_ids)).all()}
+        availability_by_tutor = AvailabilityChecker.check_many(
+            list(tutors.keys()), target_date, target_time, duration
+        )
+        
         for tutor_id in tutor_ids:
-            tutor = Tutor.query.get(tutor_id)
+            tutor = tutors.get(tutor_id)
             if not tutor:
                 continue
-                
-            availability_result = AvailabilityChecker.check_tutor_availability(
-                tutor_id, target_date, target_time, duration
-            )
             
             results.append({
                 'tutor_id': tutor_id,
                 'tutor_name': tutor.user.full_name if tutor.user else 'Unknown',
-                'availability': availability_result,
+                'availability': availability_by_tutor[tutor_id],
                 'tutor_summary': {
                     'rating': tutor.rating or 0,
                     'test_score': tutor.test_score or 0,
@@ -3992,242 +3987,148 @@ def course_batches():
     from collections import defaultdict
     from datetime import datetime, timedelta, date
     import time
-    import json
-    import urllib.parse
-    from sqlalchemy.orm import selectinload
+    from sqlalchemy import case, distinct
+    from sqlalchemy.orm import joinedload
+    from app.utils.aggregates import count_where
 
     t0 = time.perf_counter()
 
-    query = (
-        Class.query
-        .options(selectinload(Class.tutor))   
-        .order_by(Class.scheduled_date.desc())
-    )
-
     tutor_filter  = request.args.get('tutor', type=int)
     status_filter = request.args.get('status', type=str)
     month_filter  = request.args.get('month', type=str)
 
+    # Batch summaries are aggregated in SQL; only the tutors on the page are loaded as objects
+    filters = [Class.tutor_id.isnot(None), Class.scheduled_date.isnot(None)]
     if tutor_filter:
-        query = query.filter(Class.tutor_id == tutor_filter)
+        filters.append(Class.tutor_id == tutor_filter)
     if status_filter:
-        query = query.filter(Class.status == status_filter)
+        filters.append(Class.status == status_filter)
     if month_filter:
         try:
             month_year = datetime.strptime(month_filter, '%Y-%m')
             start = month_year.replace(day=1)
             next_month = (start + timedelta(days=32)).replace(day=1)
-            query = query.filter(
-                Class.scheduled_date >= start,
-                Class.scheduled_date < next_month
-            )
+            filters.extend([Class.scheduled_date >= start.date(), Class.scheduled_date < next_month.date()])
         except ValueError:
             pass
 
-    classes = query.all()
+    batch_rows = db.session.query(
+        Class.tutor_id, Class.subject,
+        func.count().label('total_classes'),
+        count_where(Class.status == 'completed').label('completed_classes'),
+        count_where(Class.status == 'scheduled').label('scheduled_classes'),
+        count_where(Class.status == 'cancelled').label('cancelled_classes'),
+        func.min(Class.scheduled_date).label('first_date'),
+        func.max(Class.scheduled_date).label('last_date')
+    ).join(Tutor, Tutor.id == Class.tutor_id).filter(*filters)\
+        .group_by(Class.tutor_id, Class.subject).all()
+
+    # Distinct students per batch and per tutor; "active" mirrors Student.is_course_active(class date)
+    course_active = and_(
+        Student.course_start_date.isnot(None),
+        Student.course_start_date <= Class.scheduled_date,
+        or_(Student.course_end_date.is_(None), Student.course_end_date >= Class.scheduled_date),
+        Student.enrollment_status == 'active'
+    )
 
-    # Get all students efficiently
-    student_ids = set()
-    for cls in classes:
-        try:
-            ids = cls.get_students() or []
-            student_ids.update(ids)
-        except Exception as e:
-            print(f"Error getting students for class {cls.id}: {str(e)}")
-            continue
+    def student_counts(*group_by):
+        return db.session.query(
+            *group_by,
+            func.count(distinct(ClassStudent.student_id)).label('total_students'),
+            func.count(distinct(case((course_active, ClassStudent.student_id)))).label('active_students'),
+            func.count(distinct(case((Student.enrollment_status == 'completed', ClassStudent.student_id)))).label('completed_students')
+        ).select_from(ClassStudent).join(Class, Class.id == ClassStudent.class_id)\
+            .join(Student, Student.id == ClassStudent.student_id)\
+            .filter(*filters).group_by(*group_by).all()
 
-    students_by_id = {}
-    if student_ids:
-        try:
-            students = Student.query.filter(Student.id.in_(student_ids)).all()
-            students_by_id = {s.id: s for s in students}
-        except Exception as e:
-            print(f"Error fetching students: {str(e)}")
+    batch_students = {(row.tutor_id, row.subject): row for row in student_counts(Class.tutor_id, Class.subject)}
+    tutor_students = {row.tutor_id: row for row in student_counts(Class.tutor_id)}
+
+    tutor_names = dict(db.session.query(Tutor.id, User.full_name).outerjoin(User, User.id == Tutor.user_id)
+                       .filter(Tutor.id.in_({row.tutor_id for row in batch_rows})).all()) if batch_rows else {}
+
+    def progress(completed, total):
+        return round((completed / total) * 100, 1) if total > 0 else 0
 
-    # Group by tutor first, then create individual batches within tutor
     tutors_data = defaultdict(lambda: {
-        'tutor': None,
-        'batches': defaultdict(lambda: {
-            'classes': [],
-            'students': set(),
-            'tutor': None,
-            'subject': '',
-            'date_range': {'start': None, 'end': None},
-            'total_classes': 0,
-            'completed_classes': 0,
-            'scheduled_classes': 0,
-            'cancelled_classes': 0,
-            'active_students': set(),
-            'completed_students': set()
-        }),
+        'batches': [],
         'total_classes': 0,
         'completed_classes': 0,
         'scheduled_classes': 0,
         'cancelled_classes': 0,
-        'all_students': set(),
-        'active_students': set(),
-        'completed_students': set(),
         'subjects': set(),
         'date_range': {'start': None, 'end': None}
     })
 
-    for cls in classes:
-        if not cls.tutor or not cls.scheduled_date:
-            continue
-        
-        # FIXED: Better subject encoding for batch key
+    for row in batch_rows:
         try:
             # Create a safe batch key
-            safe_subject = cls.subject.replace(' ', '_').replace('/', '_').replace('&', 'and')
-            batch_key = f"{safe_subject}_{cls.tutor_id}"
+            safe_subject = row.subject.replace(' ', '_').replace('/', '_').replace('&', 'and')
+            batch_key = f"{safe_subject}_{row.tutor_id}"
         except Exception:
-            batch_key = f"Unknown_Subject_{cls.tutor_id}"
-        
-        tutor_data = tutors_data[cls.tutor_id]
-        tutor_data['tutor'] = cls.tutor
-        tutor_data['subjects'].add(cls.subject)
-        tutor_data['total_classes'] += 1
-        
-        # Update tutor date range
-        dr = tutor_data['date_range']
-        dr['start'] = min(dr['start'], cls.scheduled_date) if dr['start'] else cls.scheduled_date
-        dr['end'] = max(dr['end'], cls.scheduled_date) if dr['end'] else cls.scheduled_date
-
-        # Count by status
-        if cls.status == 'completed':
-            tutor_data['completed_classes'] += 1
-        elif cls.status == 'scheduled':
-            tutor_data['scheduled_classes'] += 1
-        elif cls.status == 'cancelled':
-            tutor_data['cancelled_classes'] += 1
-
-        # Individual batch data
-        batch = tutor_data['batches'][batch_key]
-        batch['classes'].append(cls)
-        batch['tutor'] = cls.tutor
-        batch['subject'] = cls.subject
-        batch['total_classes'] += 1
-
-        if cls.status == 'completed':
-            batch['completed_classes'] += 1
-        elif cls.status == 'scheduled':
-            batch['scheduled_classes'] += 1
-        elif cls.status == 'cancelled':
-            batch['cancelled_classes'] += 1
-
-        batch_dr = batch['date_range']
-        batch_dr['start'] = min(batch_dr['start'], cls.scheduled_date) if batch_dr['start'] else cls.scheduled_date
-        batch_dr['end'] = max(batch_dr['end'], cls.scheduled_date) if batch_dr['end'] else cls.scheduled_date
+            batch_key = f"Unknown_Subject_{row.tutor_id}"
+
+        students = batch_students.get((row.tutor_id, row.subject))
+        batch = {
+            'batch_id': batch_key,
+            'subject': row.subject,
+            'total_classes': row.total_classes,
+            'completed_classes': int(row.completed_classes),
+            'scheduled_classes': int(row.scheduled_classes),
+            'cancelled_classes': int(row.cancelled_classes),
+            'date_range': {'start': row.first_date, 'end': row.last_date},
+            'student_count': students.total_students if students else 0,
+            'active_student_count': students.active_students if students else 0,
+            'completed_student_count': students.completed_students if students else 0,
+            'progress_percentage': progress(int(row.completed_classes), row.total_classes)
+        }
 
-        # FIXED: Better student handling
-        try:
-            ids = cls.get_students() or []
-            for sid in ids:
-                if not isinstance(sid, int):
-                    continue
-                    
-                tutor_data['all_students'].add(sid)
-                batch['students'].add(sid)
-                
-                st = students_by_id.get(sid)
-                if st:
-                    try:
-                        if hasattr(st, "is_course_active") and callable(st.is_course_active):
-                            if st.is_course_active(cls.scheduled_date):
-                                tutor_data['active_students'].add(sid)
-                                batch['active_students'].add(sid)
-                        elif getattr(st, 'enrollment_status', None) == 'active':
-                            tutor_data['active_students'].add(sid)
-                            batch['active_students'].add(sid)
-                            
-                        if getattr(st, 'enrollment_status', None) == 'completed':
-                            tutor_data['completed_students'].add(sid)
-                            batch['completed_students'].add(sid)
-                    except Exception as e:
-                        print(f"Error checking student {sid} status: {str(e)}")
-        except Exception as e:
-            print(f"Error processing students for class {cls.id}: {str(e)}")
+        tutor_data = tutors_data[row.tutor_id]
+        tutor_data['batches'].append(batch)
+        tutor_data['subjects'].add(row.subject)
+        for counter in ('total_classes', 'completed_classes', 'scheduled_classes', 'cancelled_classes'):
+            tutor_data[counter] += batch[counter]
+        dr = tutor_data['date_range']
+        dr['start'] = min(dr['start'], row.first_date) if dr['start'] else row.first_date
+        dr['end'] = max(dr['end'], row.last_date) if dr['end'] else row.last_date
 
-    # Convert to list for tutors
     tutor_list = []
     for tutor_id, tutor_data in tutors_data.items():
-        # Process individual batches
-        batch_list = []
-        for key, b in tutor_data['batches'].items():
-            b['batch_id'] = key
-            b['student_count'] = len(b['students'])
-            b['active_student_count'] = len(b['active_students'])
-            b['completed_student_count'] = len(b['completed_students'])
-            
-            # FIXED: Safe progress calculation
-            if b['total_classes'] > 0:
-                b['progress_percentage'] = round((b['completed_classes'] / b['total_classes']) * 100, 1)
-            else:
-                b['progress_percentage'] = 0
-
-            # Get sample student objects
-            ids_slice = list(b['students'])[:5]
-            b['student_objects'] = []
-            for sid in ids_slice:
-                if sid in students_by_id:
-                    b['student_objects'].append(students_by_id[sid])
-            
-            batch_list.append(b)
-        
         # Sort batches by date (most recent first)
-        batch_list.sort(key=lambda x: x['date_range']['start'] or date.min, reverse=True)
-        
-        # Tutor summary
-        tutor_summary = {
+        batch_list = sorted(tutor_data['batches'], key=lambda x: x['date_range']['start'] or date.min, reverse=True)
+        students = tutor_students.get(tutor_id)
+
+        tutor_list.append({
             'tutor_id': tutor_id,
-            'tutor': tutor_data['tutor'],
+            'tutor': None,
+            'tutor_name': tutor_names.get(tutor_id),
             'total_batches': len(batch_list),
             'total_classes': tutor_data['total_classes'],
             'completed_classes': tutor_data['completed_classes'],
             'scheduled_classes': tutor_data['scheduled_classes'],
             'cancelled_classes': tutor_data['cancelled_classes'],
-            'total_students': len(tutor_data['all_students']),
-            'active_students': len(tutor_data['active_students']),
-            'completed_students': len(tutor_data['completed_students']),
+            'total_students': students.total_students if students else 0,
+            'active_students': students.active_students if students else 0,
+            'completed_students': students.completed_students if students else 0,
             'subjects': list(tutor_data['subjects']),
             'date_range': tutor_data['date_range'],
-            'batches': batch_list
-        }
-        
-        # FIXED: Safe progress calculation
-        if tutor_summary['total_classes'] > 0:
-            tutor_summary['progress_percentage'] = round(
-                (tutor_summary['completed_classes'] / tutor_summary['total_classes']) * 100, 1
-            )
-        else:
-            tutor_summary['progress_percentage'] = 0
-        
-        # Get student objects for preview
-        ids_slice = list(tutor_data['active_students'])[:5]
-        tutor_summary['student_objects'] = []
-        for sid in ids_slice:
-            if sid in students_by_id:
-                tutor_summary['student_objects'].append(students_by_id[sid])
-        
-        tutor_list.append(tutor_summary)
+            'batches': batch_list,
+            'progress_percentage': progress(tutor_data['completed_classes'], tutor_data['total_classes']),
+            'student_objects': []
+        })
 
     # Sort tutors by name
-    tutor_list.sort(key=lambda x: x['tutor'].user.full_name if x['tutor'] and x['tutor'].user else 'ZZZ')
+    tutor_list.sort(key=lambda x: x['tutor_name'] or 'ZZZ')
 
     # Apply activity filter
     activate_param = request.args.get('activate')  
     if activate_param in ('0', '1'):
         want_active = (activate_param == '1')
-        filtered = []
-        for tutor in tutor_list:
-            has_any = tutor['active_students'] > 0
-            if has_any is want_active:
-                filtered.append(tutor)
-        tutor_list = filtered
+        tutor_list = [tutor for tutor in tutor_list if (tutor['active_students'] > 0) is want_active]
 
     # Get filter options
     months = sorted(
-        {cls.scheduled_date.strftime('%Y-%m') for cls in classes if cls.scheduled_date},
+        {d.strftime('%Y-%m') for (d,) in db.session.query(Class.scheduled_date).filter(*filters).distinct()},
         reverse=True
     )
     tutors = Tutor.query.filter_by(status='active').all()
@@ -4262,6 +4163,28 @@ def course_batches():
     end = start + per_page
     page_items = tutor_list[start:end]
 
+    # Tutor objects and active-student previews only for the tutors shown
+    page_ids = [tutor['tutor_id'] for tutor in page_items]
+    if page_ids:
+        tutor_objects = {t.id: t for t in Tutor.query.options(joinedload(Tutor.user)).filter(Tutor.id.in_(page_ids))}
+
+        preview_ids = defaultdict(list)
+        for tutor_id, sid in db.session.query(Class.tutor_id, ClassStudent.student_id)\
+                .select_from(ClassStudent).join(Class, Class.id == ClassStudent.class_id)\
+                .join(Student, Student.id == ClassStudent.student_id)\
+                .filter(*filters, course_active, Class.tutor_id.in_(page_ids))\
+                .distinct().order_by(Class.tutor_id, ClassStudent.student_id):
+            if len(preview_ids[tutor_id]) < 5:
+                preview_ids[tutor_id].append(sid)
+        wanted = {sid for ids in preview_ids.values() for sid in ids}
+        students_by_id = {s.id: s for s in Student.query.filter(Student.id.in_(wanted))} if wanted else {}
+
+        for tutor in page_items:
+            tutor['tutor'] = tutor_objects.get(tutor['tutor_id'])
+            tutor['student_objects'] = [students_by_id[sid] for sid in preview_ids[tutor['tutor_id']] if sid in students_by_id]
+            for batch in tutor['batches']:
+                batch['tutor'] = tutor['tutor']
+
     filtered_args = request.args.to_dict()
     filtered_args.pop('page', None)
 
@@ -5842,8 +5765,9 @@ def delete_class(class_id):
                     'error': 'Access denied'
                 }), 403
         
-        # Delete related attendance records first
-        Attendance.query.filter_by(class_id=class_id).delete()
+        # Delete related attendance records first, through the session so the daily rollups follow
+        for attendance in Attendance.query.filter_by(class_id=class_id).all():
+            db.session.delete(attendance)
         
         # Delete the class
         db.session.delete(class_obj)
@@ -6078,10 +6002,7 @@ def api_quick_assign():
         
         # Check if student is already allocated
         existing_class = Class.query.filter(
-            or_(
-                Class.primary_student_id == student_id,
-                json.loads(cls.students)
-            ),
+            Class.student_filter(student.id),
             Class.status.in_(['scheduled', 'ongoing'])
         ).first()
         
@@ -6228,70 +6149,102 @@ def live_monitoring():
 @login_required
 @require_permission('tutor_management')
 def live_monitoring_data_api():
-    """API endpoint for live monitoring data"""
+    """API endpoint for live monitoring data (polling fallback for the SSE stream)"""
     try:
-        current_time = datetime.now()
-        today = current_time.date()
-        
-        # Get live stats
-        live_stats = get_live_monitoring_stats()
-        
-        # Get live classes with detailed info
-        live_classes = []
-        ongoing_classes = Class.query.filter(
-            Class.status == 'ongoing',
-            Class.scheduled_date == today
-        ).order_by(Class.scheduled_time).all()
-        
-        for cls in ongoing_classes:
-            # Get attendance info
-            attendance_records = Attendance.query.filter_by(class_id=cls.id).all()
-            present_count = sum(1 for a in attendance_records if a.student_present)
-            
-            # Calculate duration
-            duration_minutes = 0
-            if cls.actual_start_time:
-                duration_minutes = int((current_time - cls.actual_start_time).total_seconds() / 60)
-            
-            live_classes.append({
-                'id': cls.id,
-                'subject': cls.subject,
-                'scheduled_time': cls.scheduled_time.strftime('%H:%M'),
-                'tutor_name': cls.tutor.user.full_name if cls.tutor and cls.tutor.user else 'Unknown',
-                'tutor_rating': cls.tutor.rating if cls.tutor else 0,
-                'student_count': len(cls.get_students()),
-                'present_count': present_count,
-                'duration_minutes': duration_minutes,
-                'scheduled_duration': cls.duration,
-                'meeting_link': cls.meeting_link,
-                'status': cls.status
-            })
-        
-        # Get system alerts
-        system_alerts = []
-        alerts = get_system_alerts()
-        for alert in alerts:
-            system_alerts.append({
-                'title': alert['title'],
-                'message': alert['message'],
-                'severity': alert['severity'],
-                'icon': alert['icon'],
-                'timestamp': alert['timestamp'].strftime('%H:%M'),
-                'action_url': alert.get('action_url')
-            })
-        
-        return jsonify({
-            'success': True,
-            'live_stats': live_stats,
-            'live_classes': live_classes,
-            'system_alerts': system_alerts,
-            'timestamp': current_time.isoformat()
-        })
+        data = build_live_monitoring_payload()
+        data['success'] = True
+        return jsonify(data)
         
     except Exception as e:
         return jsonify({'success': False, 'error': str(e)}), 500
 
 
+@bp.route('/api/live-monitoring-stream')
+@login_required
+@require_permission('tutor_management')
+def live_monitoring_stream():
+    """Server-Sent Events: a snapshot, then diffs computed once per process for all viewers"""
+    from flask import Response
+    from app.utils.live_feed import live_feed
+    
+    live_feed.register_producer(build_live_monitoring_payload)
+    return Response(live_feed.stream(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'  # Let nginx pass events through unbuffered
+    })
+
+
+def build_live_monitoring_payload():
+    """Live stats, ongoing classes and alerts as sent to the monitoring page"""
+    from sqlalchemy.orm import joinedload
+    
+    current_time = datetime.now()
+    today = current_time.date()
+    
+    # Get live stats
+    live_stats = get_live_monitoring_stats()
+    
+    # Get live classes with detailed info
+    live_classes = []
+    ongoing_classes = Class.query.options(
+        joinedload(Class.tutor).joinedload(Tutor.user)
+    ).filter(
+        Class.status == 'ongoing',
+        Class.scheduled_date == today
+    ).order_by(Class.scheduled_time).all()
+    
+    # Present counts for all live classes in one grouped query
+    present_counts = {}
+    if ongoing_classes:
+        present_counts = dict(db.session.query(
+            Attendance.class_id,
+            func.count(Attendance.id)
+        ).filter(
+            Attendance.class_id.in_([cls.id for cls in ongoing_classes]),
+            Attendance.student_present.is_(True)
+        ).group_by(Attendance.class_id).all())
+    
+    for cls in ongoing_classes:
+        # Calculate duration
+        duration_minutes = 0
+        if cls.actual_start_time:
+            duration_minutes = int((current_time - cls.actual_start_time).total_seconds() / 60)
+        
+        live_classes.append({
+            'id': cls.id,
+            'subject': cls.subject,
+            'scheduled_time': cls.scheduled_time.strftime('%H:%M'),
+            'tutor_name': cls.tutor.user.full_name if cls.tutor and cls.tutor.user else 'Unknown',
+            'tutor_rating': cls.tutor.rating if cls.tutor else 0,
+            'student_count': len(cls.get_students()),
+            'present_count': present_counts.get(cls.id, 0),
+            'duration_minutes': duration_minutes,
+            'scheduled_duration': cls.duration,
+            'meeting_link': cls.meeting_link,
+            'status': cls.status
+        })
+    
+    # Get system alerts
+    system_alerts = []
+    alerts = get_system_alerts()
+    for alert in alerts:
+        system_alerts.append({
+            'title': alert['title'],
+            'message': alert['message'],
+            'severity': alert['severity'],
+            'icon': alert['icon'],
+            'timestamp': alert['timestamp'].strftime('%H:%M'),
+            'action_url': alert.get('action_url')
+        })
+    
+    return {
+        'live_stats': live_stats,
+        'live_classes': live_classes,
+        'system_alerts': system_alerts,
+        'timestamp': current_time.isoformat()
+    }
+
+
 @bp.route('/api/send-video-reminder/<int:class_id>', methods=['POST'])
 @login_required
 @require_permission('tutor_management')
@@ -6426,88 +6379,53 @@ def export_monitoring_report():
 
 def get_live_monitoring_stats():
     """Get real-time monitoring statistics"""
+    from app.utils.aggregates import aggregate_counts
+    
     today = date.today()
     current_time = datetime.now()
     
-    # Ongoing classes
-    ongoing_classes = Class.query.filter(
-        Class.status == 'ongoing',
-        Class.scheduled_date == today
-    ).count()
-    
-    # Pending videos (completed classes without videos)
-    pending_videos = Class.query.filter(
-        Class.status == 'completed',
-        Class.video_link.is_(None),
-        Class.scheduled_date >= today - timedelta(days=1)
-    ).count()
-    
-    # Overdue videos
-    overdue_videos = Class.query.filter(
-        Class.status == 'completed',
-        Class.video_link.is_(None),
-        Class.video_upload_deadline < current_time
-    ).count()
-    
-    # Auto-attendance usage today
-    auto_attendance_today = Class.query.filter(
-        Class.scheduled_date == today,
-        Class.auto_attendance_marked == True
-    ).count()
-    
-    # Total classes today
-    total_classes_today = Class.query.filter(
-        Class.scheduled_date == today
-    ).count()
+    missing_video = (Class.status == 'completed') & Class.video_link.is_(None)
+    is_today = Class.scheduled_date == today
+    overdue = missing_video & (Class.video_upload_deadline < current_time)
+    
+    counts = aggregate_counts(Class, {
+        # Ongoing classes
+        'ongoing_classes': is_today & (Class.status == 'ongoing'),
+        # Pending videos (completed classes without videos)
+        'pending_videos': missing_video & (Class.scheduled_date >= today - timedelta(days=1)),
+        # Overdue videos
+        'overdue_videos': overdue,
+        # Auto-attendance usage today
+        'auto_attendance_today': is_today & Class.auto_attendance_marked.is_(True),
+        # Total classes today
+        'total_classes_today': is_today
+    }, where=or_(Class.scheduled_date >= today - timedelta(days=1), overdue))
     
     # Active alerts
     alerts = get_system_alerts()
     active_alerts = len(alerts)
     critical_alerts = len([a for a in alerts if a['severity'] == 'critical'])
     
-    return {
-        'ongoing_classes': ongoing_classes,
-        'pending_videos': pending_videos,
-        'overdue_videos': overdue_videos,
-        'auto_attendance_today': auto_attendance_today,
-        'total_classes_today': total_classes_today,
+    counts.update({
         'active_alerts': active_alerts,
         'critical_alerts': critical_alerts
-    }
+    })
+    return counts
 
 
 def get_today_summary():
     """Get today's summary statistics"""
-    today = date.today()
-    
-    # Total classes today
-    total_classes = Class.query.filter(Class.scheduled_date == today).count()
-    
-    # Completed classes
-    completed_classes = Class.query.filter(
-        Class.scheduled_date == today,
-        Class.status == 'completed'
-    ).count()
-    
-    # Auto-attendance usage
-    auto_attendance = Class.query.filter(
-        Class.scheduled_date == today,
-        Class.auto_attendance_marked == True
-    ).count()
+    from app.utils.aggregates import aggregate_counts
     
-    # Videos uploaded
-    videos_uploaded = Class.query.filter(
-        Class.scheduled_date == today,
-        Class.status == 'completed',
-        Class.video_link.isnot(None)
-    ).count()
-    
-    return {
-        'total_classes': total_classes,
-        'completed_classes': completed_classes,
-        'auto_attendance': auto_attendance,
-        'videos_uploaded': videos_uploaded
-    }
+    completed = Class.status == 'completed'
+    return aggregate_counts(Class, {
+        'total_classes': None,
+        'completed_classes': completed,
+        # Auto-attendance usage
+        'auto_attendance': Class.auto_attendance_marked.is_(True),
+        # Videos uploaded
+        'videos_uploaded': completed & Class.video_link.isnot(None)
+    }, where=Class.scheduled_date == date.today())
 
 
 def get_system_alerts():
@@ -7009,10 +6927,7 @@ def api_student_schedule_analysis(student_id):
         
         # Get all future scheduled classes for this student
         future_classes = Class.query.filter(
-            or_(
-                Class.primary_student_id == student_id,
-                Class.students.like(f'%{student_id}%')
-            ),
+            Class.student_filter(student_id),
             Class.scheduled_date >= datetime.now().date(),
             Class.status == 'scheduled'
         ).order_by(Class.scheduled_date, Class.scheduled_time).all()
@@ -7144,10 +7059,7 @@ def api_enhanced_tutor_change(student_id):
             
             # Find classes matching this day and time
             matching_classes = Class.query.filter(
-                or_(
-                    Class.primary_student_id == student_id,
-                    Class.students.like(f'%{student_id}%')
-                ),
+                Class.student_filter(student_id),
                 Class.tutor_id == current_tutor_id,
                 Class.subject.ilike(subject),
                 Class.scheduled_date >= datetime.now().date(),
@@ -7219,10 +7131,7 @@ def api_enhanced_tutor_change(student_id):
             'successful_changes': successful_changes,
             'conflicts': conflicts,
             'total_requested': sum(len(Class.query.filter(
-                or_(
-                    Class.primary_student_id == student_id,
-                    Class.students.like(f'%{student_id}%')
-                ),
+                Class.student_filter(student_id),
                 Class.tutor_id == current_tutor_id,
                 Class.subject.ilike(subject),
                 Class.scheduled_date >= datetime.now().date(),
@@ -7248,10 +7157,7 @@ def api_student_tutor_change_history(student_id):
         
         # Get classes with admin notes (containing change history)
         classes_with_changes = Class.query.filter(
-            or_(
-                Class.primary_student_id == student_id,
-                Class.students.like(f'%{student_id}%')
-            ),
+            Class.student_filter(student_id),
             Class.admin_notes.isnot(None),
             Class.admin_notes.like('%Tutor changed%')
         ).order_by(Class.updated_at.desc()).all()
@@ -127,6 +127,25 @@ def performance_report():
         logger.error(f"Error processing performance report: {str(e)}")
         return jsonify({'error': 'Failed to process performance report'}), 500
 
+@bp.route('/metrics')
+def metrics():
+    """Request metrics of all workers in Prometheus text format.
+
+    Scrapers authenticate with ``Authorization: Bearer <METRICS_TOKEN>``;
+    logged-in admins can open it without a token.
+    """
+    import hmac
+    from flask import Response
+    from app.utils.request_metrics import request_metrics
+
+    token = current_app.config.get('METRICS_TOKEN')
+    supplied = request.headers.get('Authorization', '').removeprefix('Bearer ').strip()
+    token_ok = bool(token) and hmac.compare_digest(supplied, token)
+    if not token_ok and not (current_user.is_authenticated and current_user.role in ['superadmin', 'admin']):
+        return jsonify({'error': 'Unauthorized'}), 401
+
+    return Response(request_metrics.render_prometheus(), mimetype='text/plain; version=0.0.4')
+
 @bp.route('/health-check')
 @login_required
 def health_check():
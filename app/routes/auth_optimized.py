@@ -229,17 +229,17 @@ def api_login_performance():
 
 # Utility functions for authentication optimization
 
-@cached(expiry=3600, key_prefix='user:by_id')
+@cached(expiry=3600, key_prefix='user:by_id', tags=['users'])
 def get_user_by_id(user_id):
     """Cached user lookup by ID"""
     return User.query.get(user_id)
 
-@cached(expiry=1800, key_prefix='user:by_email') 
+@cached(expiry=1800, key_prefix='user:by_email', tags=['users']) 
 def get_user_by_email(email):
     """Cached user lookup by email"""
     return User.query.filter_by(email=email.lower(), is_active=True).first()
 
-@cached(expiry=1800, key_prefix='user:by_username')
+@cached(expiry=1800, key_prefix='user:by_username', tags=['users'])
 def get_user_by_username(username):
     """Cached user lookup by username"""
     return User.query.filter_by(username=username.lower(), is_active=True).first()
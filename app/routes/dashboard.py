@@ -221,7 +221,7 @@ def get_instant_dashboard_data():
         }
         
         # Cache for 2 minutes
-        cache.set('dashboard:instant_data', data, 120)
+        cache.set('dashboard:instant_data', data, 120, tags=['dashboard'])
         logger.info("💾 Dashboard data cached")
         
         return data
@@ -230,7 +230,7 @@ def get_instant_dashboard_data():
         logger.error(f"Failed to load dashboard data: {e}")
         return get_emergency_fallback_data()
 
-@cached(expiry=180, key_prefix='stats:lightning')
+@cached(expiry=180, key_prefix='stats:lightning', tags=['dashboard', 'stats'])
 def get_lightning_fast_stats():
     """Get core statistics with maximum speed optimization"""
     try:
@@ -249,7 +249,7 @@ def get_lightning_fast_stats():
             'week_attendance': {'total': 0, 'present': 0, 'completion_rate': 0}
         }
 
-@cached(expiry=300, key_prefix='classes:today')
+@cached(expiry=300, key_prefix='classes:today', tags=['dashboard', 'classes'])
 def get_todays_classes_optimized():
     """Get today's classes with minimal queries"""
     try:
@@ -377,7 +377,7 @@ def api_dashboard_stats():
 
 @bp.route('/api/v2/recent-activity')
 @login_required
-@cached(expiry=180, key_prefix='recent:activity')
+@cached(expiry=180, key_prefix='recent:activity', tags=['dashboard', 'students', 'tutors'])
 @measure_performance('Recent Activity API')
 def api_recent_activity():
     """Load recent activity data progressively"""
@@ -430,7 +430,7 @@ def api_recent_activity():
 
 @bp.route('/api/v2/attendance-summary')
 @login_required
-@cached(expiry=300, key_prefix='attendance:summary')
+@cached(expiry=300, key_prefix='attendance:summary', tags=['dashboard', 'attendance'])
 @measure_performance('Attendance Summary API')
 def api_attendance_summary():
     """Get attendance summary for charts"""
@@ -520,10 +520,10 @@ def warm_dashboard_cache():
         tutor_count = db.session.execute(text("SELECT COUNT(*) FROM tutors WHERE status = 'active'")).scalar()
         todays_classes_count = db.session.execute(text("SELECT COUNT(*) FROM classes WHERE scheduled_date = CURRENT_DATE")).scalar()
         
-        cache.set('count:users', user_count, 300)
-        cache.set('count:students', student_count, 300)
-        cache.set('count:tutors', tutor_count, 300)
-        cache.set('count:todays_classes', todays_classes_count, 300)
+        cache.set('count:users', user_count, 300, tags=['users'])
+        cache.set('count:students', student_count, 300, tags=['students'])
+        cache.set('count:tutors', tutor_count, 300, tags=['tutors'])
+        cache.set('count:todays_classes', todays_classes_count, 300, tags=['classes'])
         
         logger.info("✅ Dashboard cache warmed successfully")
         
@@ -539,10 +539,7 @@ def clear_dashboard_cache():
         return jsonify({'error': 'Unauthorized'}), 403
     
     try:
-        cache.clear_pattern('dashboard')
-        cache.clear_pattern('stats')
-        cache.clear_pattern('classes')
-        cache.clear_pattern('attendance')
+        cache.invalidate_tags('dashboard', 'stats', 'classes', 'attendance')
         
         return jsonify({
             'success': True,
@@ -3,7 +3,7 @@
 from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify, current_app, send_file
 from flask_login import login_required, current_user
 from datetime import datetime
-from app import db
+from app import db, get_s3_client
 from app.models.notice import Notice, NoticeAttachment, NoticeDistribution
 from app.models.user import User
 from app.models.department import Department
@@ -11,8 +11,6 @@ from app.forms.notice_forms import NoticeForm, NoticeSearchForm, UserNoticeSearc
 from app.services.notice_service import NoticeService
 from app.routes.admin import admin_required
 from functools import wraps
-import boto3
-from botocore.exceptions import ClientError
 from app.utils.advanced_permissions import require_permission
 
 bp = Blueprint('notice', __name__)
@@ -367,15 +365,15 @@ def download_attachment(attachment_id):
         flash('Access denied.', 'error')
         return redirect(url_for('notice.user_notices'))
     
+    s3_client = get_s3_client()
+    if s3_client is None:
+        current_app.logger.error("Error generating download URL: S3 is not configured")
+        flash('Error downloading file.', 'error')
+        return redirect(url_for('notice.view_user_notice', notice_id=notice.id))
+    
+    from botocore.exceptions import ClientError
     try:
         # Generate S3 presigned URL for download
-        s3_client = boto3.client(
-            's3',
-            aws_access_key_id=current_app.config['AWS_ACCESS_KEY_ID'],
-            aws_secret_access_key=current_app.config['AWS_SECRET_ACCESS_KEY'],
-            region_name=current_app.config.get('AWS_DEFAULT_REGION', 'us-east-1')
-        )
-        
         download_url = s3_client.generate_presigned_url(
             'get_object',
             Params={
@@ -517,36 +517,61 @@ def api_bulk_approve_reschedule_requests():
         if not request_ids:
             return jsonify({'success': False, 'error': 'No requests selected'}), 400
         
+        from sqlalchemy.orm import joinedload
+        from app.utils.reschedule_conflicts import RescheduleConflictEngine
+        
         approved_count = 0
         failed_count = 0
         conflicts = []
         
+        loaded = RescheduleRequest.query.options(
+            joinedload(RescheduleRequest.class_item).joinedload(Class.tutor).joinedload(Tutor.user)
+        ).filter(RescheduleRequest.id.in_(request_ids)).all()
+        by_id = {req.id: req for req in loaded}
+        
+        # Keep the caller's order: earlier requests win batch-internal conflicts
+        candidates = []
         for request_id in request_ids:
-            reschedule_request = RescheduleRequest.query.get(request_id)
-            if not reschedule_request:
+            reschedule_request = by_id.get(request_id)
+            if not reschedule_request or reschedule_request.status != 'pending':
                 failed_count += 1
                 continue
             
             # Check department access for coordinators
             if current_user.role == 'coordinator':
-                if reschedule_request.class_item.tutor.user.department_id != current_user.department_id:
+                tutor = reschedule_request.class_item.tutor if reschedule_request.class_item else None
+                if not tutor or tutor.user.department_id != current_user.department_id:
                     failed_count += 1
                     continue
             
-            # Check conflicts unless force approve
-            if reschedule_request.has_conflicts and not force_approve:
-                conflicts.append({
-                    'request_id': request_id,
-                    'conflicts': reschedule_request.get_conflicts()
-                })
-                failed_count += 1
-                continue
-            
+            candidates.append(reschedule_request)
+        
+        # Validate the whole batch against current schedules unless force approve
+        if force_approve:
+            approvable = candidates
+        else:
+            approvable = []
+            for reschedule_request, request_conflicts in RescheduleConflictEngine(candidates).validate_batch():
+                if request_conflicts:
+                    conflicts.append({
+                        'request_id': reschedule_request.id,
+                        'conflicts': request_conflicts
+                    })
+                    failed_count += 1
+                else:
+                    approvable.append(reschedule_request)
+        
+        for reschedule_request in approvable:
+            reschedule_request.apply_approval(current_user, notes)
+        db.session.commit()
+        approved_count = len(approvable)
+        
+        from app.services.reschedule_notifications import RescheduleNotificationService
+        for reschedule_request in approvable:
             try:
-                reschedule_request.approve(current_user, notes)
-                approved_count += 1
+                RescheduleNotificationService.send_reschedule_approved_notification(reschedule_request)
             except Exception as e:
-                failed_count += 1
+                current_app.logger.error(f"Error notifying reschedule request {reschedule_request.id}: {str(e)}")
         
         return jsonify({
             'success': True,
@@ -54,10 +54,7 @@ def student_profile(student_id):
     
     # Optimized query for student's classes - direct SQL search instead of loading all classes
     student_classes = Class.query.filter(
-        or_(
-            Class.primary_student_id == student_id,
-            Class.students.like(f'%{student_id}%')
-        )
+        Class.student_filter(student_id)
     ).options(
         joinedload(Class.tutor).joinedload(Tutor.user)
     ).order_by(Class.scheduled_date.desc()).limit(20).all()
@@ -66,15 +63,10 @@ def student_profile(student_id):
     attendance_summary = Attendance.get_attendance_summary(student_id=student.id)
     
     # Get upcoming classes
-    upcoming_classes = []
-    for cls in Class.query.filter(
-        Class.scheduled_date >= date.today(),
+    upcoming_classes = Class.query.filter(
+        Class.student_filter(student.id, start_date=date.today()),
         Class.status == 'scheduled'
-    ).order_by(Class.scheduled_date, Class.scheduled_time).all():
-        if student.id in cls.get_students():
-            upcoming_classes.append(cls)
-    
-    upcoming_classes = upcoming_classes[:5]  # Next 5 classes
+    ).order_by(Class.scheduled_date, Class.scheduled_time).limit(5).all()  # Next 5 classes
     
     return render_template('student/profile.html',
                          student=student,
@@ -172,40 +164,14 @@ def student_classes(student_id):
     page = request.args.get('page', 1, type=int)
     status_filter = request.args.get('status', '')
     
-    # Get all classes for this student
-    student_classes = []
-    query = Class.query.order_by(Class.scheduled_date.desc(), Class.scheduled_time.desc())
+    # Classes for this student via the class_students index
+    query = Class.query.filter(Class.student_filter(student.id))\
+        .order_by(Class.scheduled_date.desc(), Class.scheduled_time.desc())
     
     if status_filter:
         query = query.filter_by(status=status_filter)
     
-    all_classes = query.all()
-    
-    for cls in all_classes:
-        if student.id in cls.get_students():
-            student_classes.append(cls)
-    
-    # Manual pagination
-    per_page = 20
-    total = len(student_classes)
-    start = (page - 1) * per_page
-    end = start + per_page
-    paginated_classes = student_classes[start:end]
-    
-    # Create pagination object
-    class Pagination:
-        def __init__(self, page, per_page, total, items):
-            self.page = page
-            self.per_page = per_page
-            self.total = total
-            self.items = items
-            self.pages = (total + per_page - 1) // per_page
-            self.has_prev = page > 1
-            self.has_next = page < self.pages
-            self.prev_num = page - 1 if self.has_prev else None
-            self.next_num = page + 1 if self.has_next else None
-    
-    pagination = Pagination(page, per_page, total, paginated_classes)
+    pagination = query.paginate(page=page, per_page=20, error_out=False)
     
     return render_template('student/classes.html', 
                          student=student, 
@@ -205,29 +205,18 @@ def api_tutor_available_slots(tutor_id):
             return jsonify({'success': False, 'error': 'Date parameter required'})
         
         date_obj = datetime.strptime(date_str, '%Y-%m-%d').date()
-        day_name = date_obj.strftime('%A').lower()
+        duration = request.args.get('duration', 60, type=int)
         
         # Get tutor
         tutor = Tutor.query.filter_by(id=tutor_id).first()
         if not tutor:
             return jsonify({'success': False, 'error': 'Tutor not found'})
         
-        # Mock availability data (should come from actual availability table)
-        if day_name in ['monday', 'tuesday', 'wednesday', 'thursday', 'friday']:
-            available_slots = [
-                {'start': '09:00', 'end': '10:00'},
-                {'start': '10:00', 'end': '11:00'},
-                {'start': '11:00', 'end': '12:00'},
-                {'start': '14:00', 'end': '15:00'},
-                {'start': '15:00', 'end': '16:00'},
-                {'start': '16:00', 'end': '17:00'},
-                {'start': '17:00', 'end': '18:00'}
-            ]
-        else:
-            available_slots = [
-                {'start': '10:00', 'end': '11:00'},
-                {'start': '11:00', 'end': '12:00'}
-            ]
+        # Free windows from the tutor's compiled availability minus booked classes
+        available_slots = [
+            {'start': slot['start_time'], 'end': slot['end_time']}
+            for slot in tutor.get_free_slots(date_obj, duration)
+        ]
         
         return jsonify({
             'success': True,
@@ -304,44 +293,35 @@ def validate_and_convert_filters(request_args):
     return filters
 
 
-def apply_precise_student_filter(classes_list, student_id):
-    """UTILITY: Apply precise student filtering to a list of classes"""
+def apply_precise_student_filter(query, student_id, start_date=None, end_date=None):
+    """UTILITY: Restrict a Class query to one student's classes.
+
+    Joins the indexed class_students enrollment table instead of loading every
+    class in range and decoding the JSON students column in Python.
+    """
     if not student_id:
-        return classes_list
-    
-    valid_classes = []
+        return query
     
-    for cls in classes_list:
-        student_is_in_class = False
-        
-        # Check primary student
-        if cls.primary_student_id == student_id:
-            student_is_in_class = True
-        
-        # Check demo student
-        elif cls.demo_student_id == student_id:
-            student_is_in_class = True
-        
-        # Check group students
-        elif cls.students:
-            try:
-                student_ids_in_class = json.loads(cls.students)
-                if isinstance(student_ids_in_class, list) and student_id in student_ids_in_class:
-                    student_is_in_class = True
-            except (json.JSONDecodeError, TypeError):
-                # Fallback string search
-                students_str = str(cls.students)
-                if (f'"{student_id}"' in students_str or 
-                    f'[{student_id}]' in students_str or 
-                    f'{student_id},' in students_str or
-                    f'[{student_id},' in students_str or
-                    f',{student_id}]' in students_str):
-                    student_is_in_class = True
-        
-        if student_is_in_class:
-            valid_classes.append(cls)
-    
-    return valid_classes
+    return Class.join_student(query, student_id, start_date, end_date)
+
+
+def paginate_timetable_classes(query, default_limit=500, max_limit=2000):
+    """UTILITY: One keyset page of a filtered Class query for the listing APIs.
+
+    Clients pass ``limit`` and the returned ``next_cursor`` as ``cursor`` to
+    stream a long range page by page instead of materialising it at once.
+    """
+    from app.utils.keyset import keyset_paginate
+
+    limit = min(max(request.args.get('limit', default_limit, type=int), 1), max_limit)
+    query = query.options(joinedload(Class.tutor).joinedload(Tutor.user).joinedload(User.department))
+    page = keyset_paginate(query, [Class.scheduled_date, Class.scheduled_time, Class.id],
+                           cursor=request.args.get('cursor'), per_page=limit)
+
+    # Warm the identity map so per-class student lookups do not hit the database
+    student_ids = {cls.primary_student_id for cls in page.items if cls.primary_student_id}
+    page.students = Student.query.filter(Student.id.in_(student_ids)).all() if student_ids else []
+    return page
 
 
 def format_class_for_api(cls, include_details=True):
@@ -509,29 +489,10 @@ def api_timetable_today():
             )
             print(f"✅ Applied search filter: {search}")
         
-        # COMPLETELY FIXED STUDENT FILTERING
+        # STUDENT FILTERING - indexed join on class_students
         if student_id:
-            print(f"🎯 Applying PRECISE student filter for ID: {student_id}")
-            
-            # Get all classes in the date range first (after other filters)
-            all_classes_in_range = query.all()
-            print(f"📅 Total classes on {target_date} before student filter: {len(all_classes_in_range)}")
-            
-            # Use utility function for precise filtering
-            filtered_classes = apply_precise_student_filter(all_classes_in_range, student_id)
-            print(f"🎯 Found {len(filtered_classes)} classes for student {student_id}")
-            
-            # Apply the precise filter
-            if filtered_classes:
-                valid_class_ids = [cls.id for cls in filtered_classes]
-                query = Class.query.filter(
-                    Class.id.in_(valid_class_ids),
-                    Class.scheduled_date == target_date
-                )
-            else:
-                # No classes found for this student
-                query = Class.query.filter(Class.id == -1)  # Returns empty result
-                print(f"⚠️ No classes found for student {student_id}")
+            query = apply_precise_student_filter(query, student_id, target_date, target_date)
+            print(f"🎯 Applied student filter: {student_id}")
         
         # Get FINAL filtered classes
         classes = query.order_by(Class.scheduled_time).all()
@@ -599,51 +560,67 @@ def api_timetable_monthly_stats():
         monthly_stats = {}
         month_keys = ['jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec']
         
-        for month in range(1, 13):
-            # Get date range for month
-            start_date = date(year, month, 1)
-            if month == 12:
-                end_date = date(year + 1, 1, 1) - timedelta(days=1)
-            else:
-                end_date = date(year, month + 1, 1) - timedelta(days=1)
+        # Tutor/department filters are rollup keys: read one row per day instead of scanning classes
+        if not search and not student_id:
+            from app.models.daily_stats import DailyClassStats
             
-            # Base query for the month
-            query = Class.query.filter(
-                Class.scheduled_date >= start_date,
-                Class.scheduled_date <= end_date
+            query = db.session.query(
+                DailyClassStats.stat_date,
+                db.func.sum(DailyClassStats.class_count)
+            ).filter(
+                DailyClassStats.stat_date >= date(year, 1, 1),
+                DailyClassStats.stat_date <= date(year, 12, 31)
             )
-            
-            # Apply non-student filters first
             if tutor_id:
-                query = query.filter(Class.tutor_id == tutor_id)
-            
+                query = query.filter(DailyClassStats.tutor_id == tutor_id)
             if department_id:
-                query = query.join(Tutor, Class.tutor_id == Tutor.id)\
-                             .join(User, Tutor.user_id == User.id)\
-                             .filter(User.department_id == department_id)
+                query = query.filter(DailyClassStats.department_id == department_id)
             
-            if search:
-                if not tutor_id and not department_id:  # Avoid duplicate joins
-                    query = query.join(Tutor, Class.tutor_id == Tutor.id, isouter=True)\
-                                 .join(User, Tutor.user_id == User.id, isouter=True)
-                query = query.filter(
-                    db.or_(
-                        Class.subject.ilike(f'%{search}%'),
-                        User.full_name.ilike(f'%{search}%'),
-                        Class.grade.ilike(f'%{search}%')
-                    )
+            monthly_stats = dict.fromkeys(month_keys, 0)
+            for stat_date, count in query.group_by(DailyClassStats.stat_date).all():
+                monthly_stats[month_keys[stat_date.month - 1]] += int(count or 0)
+        else:
+            for month in range(1, 13):
+                # Get date range for month
+                start_date = date(year, month, 1)
+                if month == 12:
+                    end_date = date(year + 1, 1, 1) - timedelta(days=1)
+                else:
+                    end_date = date(year, month + 1, 1) - timedelta(days=1)
+            
+                # Base query for the month
+                query = Class.query.filter(
+                    Class.scheduled_date >= start_date,
+                    Class.scheduled_date <= end_date
                 )
             
-            # FIXED STUDENT FILTERING for monthly stats
-            if student_id:
-                all_classes_in_month = query.all()
-                filtered_classes = apply_precise_student_filter(all_classes_in_month, student_id)
-                month_classes = len(filtered_classes)
-            else:
-                # No student filter - count all classes
+                # Apply non-student filters first
+                if tutor_id:
+                    query = query.filter(Class.tutor_id == tutor_id)
+            
+                if department_id:
+                    query = query.join(Tutor, Class.tutor_id == Tutor.id)\
+                                 .join(User, Tutor.user_id == User.id)\
+                                 .filter(User.department_id == department_id)
+            
+                if search:
+                    if not tutor_id and not department_id:  # Avoid duplicate joins
+                        query = query.join(Tutor, Class.tutor_id == Tutor.id, isouter=True)\
+                                     .join(User, Tutor.user_id == User.id, isouter=True)
+                    query = query.filter(
+                        db.or_(
+                            Class.subject.ilike(f'%{search}%'),
+                            User.full_name.ilike(f'%{search}%'),
+                            Class.grade.ilike(f'%{search}%')
+                        )
+                    )
+            
+                # Student filter is an indexed join, so counting stays in SQL
+                if student_id:
+                    query = apply_precise_student_filter(query, student_id, start_date, end_date)
                 month_classes = query.count()
             
-            monthly_stats[month_keys[month-1]] = month_classes
+                monthly_stats[month_keys[month-1]] = month_classes
         
         print(f"📊 Monthly stats calculated: {monthly_stats}")
         
@@ -717,19 +694,11 @@ def api_month_details(month):
                 )
             )
         
-        # FIXED STUDENT FILTERING
+        # STUDENT FILTERING - indexed join on class_students
         if student_id:
-            print(f"🎯 Applying precise student filter for month {month}")
-            all_classes_in_month = query.all()
-            print(f"📅 Total classes in month before student filter: {len(all_classes_in_month)}")
-            
-            filtered_classes = apply_precise_student_filter(all_classes_in_month, student_id)
-            print(f"🎯 Found {len(filtered_classes)} classes for student in month")
-            
-            classes = filtered_classes
-        else:
-            # No student filter
-            classes = query.order_by(Class.scheduled_date, Class.scheduled_time).all()
+            query = apply_precise_student_filter(query, student_id, start_date, end_date)
+        
+        classes = query.order_by(Class.scheduled_date, Class.scheduled_time).all()
         
         print(f"📊 FINAL: Found {len(classes)} classes for month {month}")
         
@@ -823,20 +792,15 @@ def api_timetable_week():
                 )
             )
         
-        # FIXED STUDENT FILTERING
+        # STUDENT FILTERING - indexed join on class_students
         if student_id:
-            print(f"🎯 Applying PRECISE student filter for weekly view")
-            all_classes_in_range = query.all()
-            print(f"📅 Total classes in week before student filter: {len(all_classes_in_range)}")
-            
-            filtered_classes = apply_precise_student_filter(all_classes_in_range, student_id)
-            print(f"🎯 Found {len(filtered_classes)} classes for student in week")
-            
-            classes = filtered_classes
-        else:
-            classes = query.order_by(Class.scheduled_date, Class.scheduled_time).all()
+            query = apply_precise_student_filter(query, student_id, start_of_week, end_of_week)
         
-        print(f"📊 FINAL: Found {len(classes)} classes for week after filtering")
+        total_classes = query.order_by(None).count()
+        page = paginate_timetable_classes(query)
+        classes = page.items
+        
+        print(f"📊 FINAL: Found {total_classes} classes for week after filtering")
         
         # Group by date for week view
         week_data = {}
@@ -864,7 +828,9 @@ def api_timetable_week():
             'week_data': week_data,
             'start_date': start_of_week.strftime('%Y-%m-%d'),
             'end_date': end_of_week.strftime('%Y-%m-%d'),
-            'total_classes': len(classes)
+            'total_classes': total_classes,
+            'has_more': page.has_next,
+            'next_cursor': page.next_cursor
         })
         
     except Exception as e:
@@ -925,25 +891,14 @@ def api_timetable_year():
                 )
             )
         
-        # FIXED STUDENT FILTERING
+        # STUDENT FILTERING - indexed join on class_students
         if student_id:
-            print(f"🎯 Applying PRECISE student filter for year view")
-            all_classes_in_year = query.all()
-            print(f"📅 Total classes in year before student filter: {len(all_classes_in_year)}")
-            
-            filtered_classes = apply_precise_student_filter(all_classes_in_year, student_id)
-            print(f"🎯 Found {len(filtered_classes)} classes for student in year")
-            
-            classes = filtered_classes
-        else:
-            # Get all classes
-            classes = query.order_by(Class.scheduled_date, Class.scheduled_time).all()
-        
-        print(f"📊 FINAL: Found {len(classes)} classes for year")
+            query = apply_precise_student_filter(query, student_id, start_date, end_date)
         
         # Group classes by month and date
         year_data = {}
         monthly_stats = {}
+        status_counts = {}
         
         # Initialize 12 months
         month_keys = ['jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'oct', 'nov', 'dec']
@@ -951,6 +906,19 @@ def api_timetable_year():
             year_data[i] = {}
             monthly_stats[month_key] = 0
         
+        # Counts for the whole year come from one grouped query (at most days x statuses rows)
+        for day, status, count in query.with_entities(Class.scheduled_date, Class.status, func.count())\
+                .group_by(Class.scheduled_date, Class.status).order_by(None):
+            monthly_stats[month_keys[day.month - 1]] += count
+            status_counts[status] = status_counts.get(status, 0) + count
+        total_classes = sum(status_counts.values())
+        
+        # Class details are paged; follow next_cursor for the rest of the year
+        page = paginate_timetable_classes(query)
+        classes = page.items
+        
+        print(f"📊 FINAL: Found {total_classes} classes for year")
+        
         # Process each class using utility function
         for cls in classes:
             try:
@@ -967,20 +935,15 @@ def api_timetable_year():
                 # Add to year data
                 year_data[month][date_key].append(class_data)
                 
-                # Update monthly stats
-                month_key = month_keys[month - 1]
-                monthly_stats[month_key] = monthly_stats.get(month_key, 0) + 1
-                
             except Exception as e:
                 print(f"Error processing class {cls.id}: {str(e)}")
                 continue
         
         # Calculate total statistics
-        total_classes = len(classes)
-        scheduled_count = len([c for c in classes if c.status == 'scheduled'])
-        completed_count = len([c for c in classes if c.status == 'completed'])
-        cancelled_count = len([c for c in classes if c.status == 'cancelled'])
-        ongoing_count = len([c for c in classes if c.status == 'ongoing'])
+        scheduled_count = status_counts.get('scheduled', 0)
+        completed_count = status_counts.get('completed', 0)
+        cancelled_count = status_counts.get('cancelled', 0)
+        ongoing_count = status_counts.get('ongoing', 0)
         
         # Create month details for calendar rendering
         months_detail = []
@@ -1009,6 +972,8 @@ def api_timetable_year():
             'months_detail': months_detail,
             'monthly_stats': monthly_stats,
             'year_classes_by_month': year_data,
+            'has_more': page.has_next,
+            'next_cursor': page.next_cursor,
             'stats': {
                 'total_classes': total_classes,
                 'scheduled': scheduled_count,
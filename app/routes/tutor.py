@@ -364,11 +364,7 @@ def my_students():
     tutor = Tutor.query.filter_by(user_id=current_user.id).first_or_404()
     
     # Get students from classes taught by this tutor
-    student_ids = set()
-    classes = Class.query.filter_by(tutor_id=tutor.id).all()
-    
-    for cls in classes:
-        student_ids.update(cls.get_students())
+    student_ids = Class.enrolled_student_ids(Class.query.filter_by(tutor_id=tutor.id))
     
     students = Student.query.filter(Student.id.in_(student_ids)).all() if student_ids else []
     
@@ -381,14 +377,11 @@ def my_students():
     # Get upcoming classes for each student
     student_upcoming_classes = {}
     for student in students:
-        upcoming = Class.query.filter(
+        student_upcoming_classes[student.id] = Class.query.filter(
             Class.tutor_id == tutor.id,
-            Class.scheduled_date >= date.today(),
+            Class.student_filter(student.id, start_date=date.today()),
             Class.status == 'scheduled'
-        ).order_by(Class.scheduled_date, Class.scheduled_time).all()
-        
-        student_classes = [cls for cls in upcoming if student.id in cls.get_students()]
-        student_upcoming_classes[student.id] = student_classes[:5]  # Next 5 classes
+        ).order_by(Class.scheduled_date, Class.scheduled_time).limit(5).all()  # Next 5 classes
     
     # Get unique grades
     grades = sorted(list(set(s.grade for s in students if s.grade)))
@@ -656,16 +649,12 @@ def student_classes(student_id):
     student = Student.query.get_or_404(student_id)
     
     # Get classes taught by this tutor for this student
-    student_classes = []
-    all_classes = Class.query.filter_by(tutor_id=tutor.id).order_by(Class.scheduled_date.desc()).all()
-    
-    has_access = False
-    for cls in all_classes:
-        if student.id in cls.get_students():
-            student_classes.append(cls)
-            has_access = True
+    student_classes = Class.query.filter(
+        Class.tutor_id == tutor.id,
+        Class.student_filter(student.id)
+    ).order_by(Class.scheduled_date.desc()).all()
     
-    if not has_access:
+    if not student_classes:
         flash('You do not have access to view this student.', 'error')
         return redirect(url_for('tutor.my_students'))
     
@@ -691,8 +680,9 @@ def student_attendance(student_id):
     student = Student.query.get_or_404(student_id)
     
     # Verify tutor has access to this student
-    student_classes = Class.query.filter_by(tutor_id=tutor.id).all()
-    has_access = any(student.id in cls.get_students() for cls in student_classes)
+    has_access = db.session.query(
+        Class.query.filter(Class.tutor_id == tutor.id, Class.student_filter(student.id)).exists()
+    ).scalar()
     
     if not has_access:
         flash('You do not have access to view this student.', 'error')
@@ -38,6 +38,7 @@ class EmailType:
     REMINDER = "reminder"
     REPORT = "report"
     SYSTEM = "system"
+    AUTOMATED = "automated"
 
 class ComprehensiveEmailService:
     """Centralized email service for all LMS notifications"""
@@ -562,10 +563,7 @@ class ComprehensiveEmailService:
     def _get_student_tutor_emails(self, student_id: int) -> List[str]:
         """Get email addresses of tutors teaching this student"""
         classes = Class.query.filter(
-            or_(
-                Class.primary_student_id == student_id,
-                Class.students.like(f'%{student_id}%')
-            )
+            Class.student_filter(student_id)
         ).all()
         
         tutor_emails = []
@@ -110,10 +110,7 @@ class CoordinatorEmailService(ComprehensiveEmailService):
         
         # Get recent attendance pattern
         recent_classes = Class.query.filter(
-            or_(
-                Class.primary_student_id == student_id,
-                Class.students.like(f'%{student_id}%')
-            ),
+            Class.student_filter(student_id),
             Class.scheduled_date >= datetime.now().date() - timedelta(days=30)
         ).order_by(Class.scheduled_date.desc()).limit(10).all()
         
@@ -196,10 +196,7 @@ class CriticalAlertService(ComprehensiveEmailService):
         
         # Recent attendance pattern (last 2 weeks)
         recent_classes = Class.query.filter(
-            or_(
-                Class.primary_student_id == student_id,
-                Class.students.like(f'%{student_id}%')
-            ),
+            Class.student_filter(student_id),
             Class.scheduled_date >= datetime.now().date() - timedelta(days=14),
             Class.status.in_(['completed', 'missed'])
         ).count()
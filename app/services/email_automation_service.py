@@ -11,6 +11,7 @@ from app.models.student import Student
 from app.models.class_model import Class
 from app.models.attendance import Attendance
 from app import db
+from app.utils.job_scheduler import job_handler, job_scheduler
 from sqlalchemy import and_, or_
 import json
 
@@ -364,10 +365,53 @@ class EmailAutomationService(ComprehensiveEmailService):
         if send_time <= datetime.now():
             return self._send_sequence_email(email_def, instance)
         else:
-            # Schedule for later (in a real implementation, this would use a task queue)
+            # Persist the step; the job scheduler resumes the sequence at send_time
+            job_scheduler.schedule('email_sequence.step', send_time, {
+                'sequence_name': instance['sequence_name'],
+                'trigger_data': instance['trigger_data'],
+                'started_at': instance['started_at'].isoformat(),
+                'emails_sent': instance['emails_sent'],
+                'next_email_index': next_index
+            }, key=self._sequence_job_key(instance['sequence_name'], instance['trigger_data']))
+            db.session.commit()
             self.logger.info(f"Email '{email_def['name']}' scheduled for {send_time}")
             return True
     
+    @staticmethod
+    def _sequence_job_key(sequence_name: str, trigger_data: Dict[str, Any]) -> str:
+        return f"email_sequence:{sequence_name}:{json.dumps(trigger_data, sort_keys=True)}"[:200]
+    
+    def resume_sequence(self, payload: Dict[str, Any]) -> bool:
+        """Continue a sequence from a scheduled step"""
+        sequence = self.sequences.get(payload['sequence_name'])
+        if not sequence:
+            self.logger.error(f"Unknown sequence: {payload['sequence_name']}")
+            return False
+        
+        instance = {
+            'sequence_name': payload['sequence_name'],
+            'trigger_data': payload['trigger_data'],
+            'started_at': datetime.fromisoformat(payload['started_at']),
+            'status': 'active',
+            'emails_sent': payload.get('emails_sent', 0),
+            'next_email_index': payload['next_email_index']
+        }
+        if instance['next_email_index'] >= len(sequence.emails):
+            return True
+        
+        # The job firing means the step is due: send it unless its condition no longer holds
+        email_def = sequence.emails[instance['next_email_index']]
+        if not self._check_email_condition(email_def['condition'], instance['trigger_data']):
+            instance['next_email_index'] += 1
+            return self._schedule_next_email(sequence, instance)
+        return self._send_sequence_email(email_def, instance)
+    
+    def cancel_sequence(self, sequence_name: str, trigger_data: Dict[str, Any]) -> int:
+        """Revoke the pending step of a running sequence"""
+        cancelled = job_scheduler.cancel(key=self._sequence_job_key(sequence_name, trigger_data))
+        db.session.commit()
+        return cancelled
+    
     def _send_sequence_email(self, email_def: Dict[str, Any], instance: Dict[str, Any]) -> bool:
         """Send an email from a sequence"""
         trigger_data = instance['trigger_data']
@@ -536,10 +580,7 @@ class EmailAutomationService(ComprehensiveEmailService):
             return False
         
         classes = Class.query.filter(
-            or_(
-                Class.primary_student_id == trigger_data['student_id'],
-                Class.students.like(f"%{trigger_data['student_id']}%")
-            )
+            Class.student_filter(trigger_data['student_id'])
         ).first()
         
         return classes is not None
@@ -551,10 +592,7 @@ class EmailAutomationService(ComprehensiveEmailService):
         
         today_class = Class.query.filter(
             and_(
-                or_(
-                    Class.primary_student_id == trigger_data['student_id'],
-                    Class.students.like(f"%{trigger_data['student_id']}%")
-                ),
+                Class.student_filter(trigger_data['student_id']),
                 Class.scheduled_date == datetime.now().date(),
                 Class.status == 'scheduled'
             )
@@ -569,10 +607,7 @@ class EmailAutomationService(ComprehensiveEmailService):
         
         completed_class = Class.query.filter(
             and_(
-                or_(
-                    Class.primary_student_id == trigger_data['student_id'],
-                    Class.students.like(f"%{trigger_data['student_id']}%")
-                ),
+                Class.student_filter(trigger_data['student_id']),
                 Class.status == 'completed'
             )
         ).first()
@@ -646,4 +681,10 @@ class EmailAutomationService(ComprehensiveEmailService):
         return self.trigger_sequence('performance_monitoring', trigger_data)
 
 # Global instance
-email_automation_service = EmailAutomationService()
\ No newline at end of file
+email_automation_service = EmailAutomationService()
+
+@job_handler('email_sequence.step')
+def _run_sequence_step(payload):
+    # Raising lets the job scheduler retry the step with backoff
+    if not email_automation_service.resume_sequence(payload):
+        raise RuntimeError(f"Sequence step {payload.get('sequence_name')}#{payload.get('next_email_index')} failed")
\ No newline at end of file
@@ -6,13 +6,15 @@ Handles system-wide notifications including holidays, emergencies, and announcem
 import logging
 from datetime import datetime, timedelta
 from typing import List, Dict, Any, Optional
-from flask import render_template, current_app
+from flask import current_app
 from app import db
 from app.models.system_notification import SystemNotification, UserSystemNotification
 from app.models.user import User
 from app.models.student import Student
 from app.models.department import Department
-from app.utils.email import send_email
+from app.utils.email import send_bulk_email
+from app.utils.fanout import fan_out, mark_users
+from app.utils.email_rendering import SegmentedRenderer, iter_query_batches
 import json
 
 class NotificationType:
@@ -179,140 +181,132 @@ class InstitutionalNotificationService:
                 self.logger.warning(f"Notification {notification_id} cannot be sent (inactive or expired)")
                 return False
             
-            # Get target users
-            target_user_ids = notification.get_target_user_ids()
-            if not target_user_ids:
+            # Get target users (resolved in SQL, never loaded as a list)
+            target_count = notification.count_target_users()
+            if not target_count:
                 self.logger.warning(f"No target users found for notification {notification_id}")
                 return False
             
             # Create user notification records
-            self._create_user_notification_records(notification, target_user_ids)
+            self._create_user_notification_records(notification)
             
             # Send emails if enabled
             email_count = 0
             if notification.email_enabled:
-                email_count = self._send_notification_emails(notification, target_user_ids)
+                email_count = self._send_notification_emails(notification)
             
             # Update delivery counts
             notification.update_delivery_count(email_sent=email_count)
             notification.mark_as_sent()
             
-            self.logger.info(f"Notification {notification_id} sent to {len(target_user_ids)} users")
+            self.logger.info(f"Notification {notification_id} sent to {target_count} users")
             return True
             
         except Exception as e:
             self.logger.error(f"Error sending notification {notification_id}: {str(e)}")
             return False
     
-    def _create_user_notification_records(self, notification: SystemNotification, user_ids: List[int]):
-        """Create UserSystemNotification records for tracking"""
+    def _create_user_notification_records(self, notification: SystemNotification):
+        """Create UserSystemNotification records for tracking (one INSERT ... SELECT)"""
         try:
-            for user_id in user_ids:
-                # Check if record already exists
-                existing = UserSystemNotification.query.filter_by(
-                    system_notification_id=notification.id,
-                    user_id=user_id
-                ).first()
-                
-                if not existing:
-                    user_notification = UserSystemNotification(
-                        system_notification_id=notification.id,
-                        user_id=user_id
-                    )
-                    db.session.add(user_notification)
+            now = datetime.utcnow()
+            created = fan_out(
+                UserSystemNotification.__table__, 'system_notification_id', notification.id,
+                notification.target_user_ids_select(),
+                {'delivered_at': now, 'email_sent': False, 'popup_shown': False,
+                 'is_read': False, 'is_dismissed': False}
+            )
             
             db.session.commit()
-            self.logger.info(f"Created {len(user_ids)} user notification records")
+            self.logger.info(f"Created {created} user notification records")
             
         except Exception as e:
             db.session.rollback()
             self.logger.error(f"Error creating user notification records: {str(e)}")
     
-    def _send_notification_emails(self, notification: SystemNotification, user_ids: List[int]) -> int:
-        """Send notification emails to users"""
+    def _send_notification_emails(self, notification: SystemNotification) -> int:
+        """Queue notification emails for all targeted users and mark them sent in bulk"""
         email_count = 0
         
         try:
-            users = User.query.filter(User.id.in_(user_ids)).all()
-            
-            for user in users:
-                if user.email:
-                    # Prepare email recipients
-                    recipients = [user.email]
-                    
-                    # Add parent emails for students if enabled
-                    if notification.include_parents and user.role == 'student':
-                        parent_emails = self._get_parent_emails(user.id)
-                        recipients.extend(parent_emails)
+            app_name = current_app.config.get('APP_NAME', 'LMS')
+            subject = f"[{app_name}] {notification.title}"
+            
+            # Template compiled and shared context prepared once; rendered once per role/department
+            renderer = SegmentedRenderer(self._get_email_template(notification.type), {
+                'notification': notification,
+                'app_name': app_name,
+                'company_name': current_app.config.get('COMPANY_NAME', 'Institution'),
+                'base_url': current_app.config.get('BASE_URL', 'http://localhost:5000')
+            })
+            users = User.query.filter(User.id.in_(notification.target_user_ids_select()))
+            
+            def messages():
+                for batch in iter_query_batches(users, User.id):
+                    parent_emails = {}
+                    if notification.include_parents:
+                        parent_emails = self._get_parent_emails_bulk([u for u in batch if u.role == 'student'])
                     
-                    # Prepare email context
-                    context = {
-                        'user': user,
-                        'notification': notification,
-                        'app_name': current_app.config.get('APP_NAME', 'LMS'),
-                        'company_name': current_app.config.get('COMPANY_NAME', 'Institution'),
-                        'base_url': current_app.config.get('BASE_URL', 'http://localhost:5000')
-                    }
-                    
-                    # Determine email template based on notification type
-                    template = self._get_email_template(notification.type)
-                    
-                    # Send email
-                    try:
-                        result = send_email(
-                            subject=f"[{context['app_name']}] {notification.title}",
-                            recipients=recipients,
-                            html_body=render_template(template, **context),
-                            text_body=self._generate_text_body(notification, user),
-                            sync=False  # Send asynchronously
-                        )
+                    for user in batch:
+                        if not user.email:
+                            continue
                         
-                        if result:
-                            email_count += 1
-                            # Mark email as sent in user notification record
-                            user_notification = UserSystemNotification.query.filter_by(
-                                system_notification_id=notification.id,
-                                user_id=user.id
-                            ).first()
-                            if user_notification:
-                                user_notification.email_sent = True
-                                db.session.commit()
-                    
-                    except Exception as email_error:
-                        self.logger.error(f"Failed to send email to {user.email}: {str(email_error)}")
+                        # Prepare email recipients, adding parent emails for students if enabled
+                        recipients = [user.email]
+                        recipients.extend(parent_emails.get(user.id, []))
+                        
+                        try:
+                            message = {
+                                'subject': subject,
+                                'recipients': recipients,
+                                'html_body': renderer.render(user),
+                                'text_body': self._generate_text_body(notification, user),
+                                'user_id': user.id
+                            }
+                        except Exception as email_error:
+                            self.logger.error(f"Failed to prepare email to {user.email}: {str(email_error)}")
+                            continue
+                        
+                        yield message
+            
+            def mark_chunk_sent(chunk):
+                # Committed per outbox chunk so a failure later on does not re-email these users on retry
+                mark_users(UserSystemNotification.__table__, 'system_notification_id', notification.id,
+                           [message['user_id'] for message in chunk], {'email_sent': True})
+                db.session.commit()
             
-            self.logger.info(f"Sent {email_count} notification emails")
+            # Streamed into the outbox chunk by chunk, marking each chunk's users as it lands
+            email_count = send_bulk_email(messages(), email_type=notification.type, on_chunk=mark_chunk_sent)
+            
+            self.logger.info(f"Queued {email_count} notification emails "
+                             f"({renderer.stats['jinja_renders']} template renders)")
             return email_count
             
         except Exception as e:
             self.logger.error(f"Error sending notification emails: {str(e)}")
             return email_count
     
-    def _get_parent_emails(self, user_id: int) -> List[str]:
-        """Get parent email addresses for a student"""
-        try:
-            student = Student.query.filter_by(user_id=user_id).first()
-            if not student:
-                return []
-            
-            parent_details = student.get_parent_details()
-            if not parent_details:
-                return []
-            
-            emails = []
-            father_email = parent_details.get('father', {}).get('email')
-            mother_email = parent_details.get('mother', {}).get('email')
-            
-            if father_email:
-                emails.append(father_email)
-            if mother_email:
-                emails.append(mother_email)
-            
+    def _get_parent_emails_bulk(self, users: List[User]) -> Dict[int, List[str]]:
+        """Parent email addresses for many student users in one query: {user_id: [emails]}
+        
+        Student records are matched to user accounts by email address.
+        """
+        emails = {}
+        user_ids_by_email = {user.email.lower(): user.id for user in users if user.email}
+        if not user_ids_by_email:
             return emails
-            
-        except Exception as e:
-            self.logger.error(f"Error getting parent emails for user {user_id}: {str(e)}")
-            return []
+        
+        students = Student.query.filter(db.func.lower(Student.email).in_(list(user_ids_by_email))).all()
+        for student in students:
+            user_id = user_ids_by_email.get(student.email.lower())
+            try:
+                parent_details = student.get_parent_details() or {}
+                found = [(parent_details.get(parent) or {}).get('email') for parent in ('father', 'mother')]
+                emails.setdefault(user_id, []).extend(email for email in found if email)
+            except Exception as e:
+                self.logger.error(f"Error getting parent emails for user {user_id}: {str(e)}")
+        
+        return emails
     
     def _get_email_template(self, notification_type: str) -> str:
         """Get appropriate email template based on notification type"""
@@ -1,13 +1,15 @@
 # app/services/notice_service.py
 
 from datetime import datetime
-from flask import current_app, render_template
+from flask import current_app
 from app import db
 from app.models.notice import Notice, NoticeAttachment, NoticeDistribution
 from app.models.user import User
 from app.models.department import Department
 from app.utils.helper import upload_file_to_s3
-from app.utils.email import send_email
+from app.utils.email import send_bulk_email
+from app.utils.email_rendering import SegmentedRenderer, iter_query_batches
+from app.utils.fanout import fan_out
 import os
 import secrets
 from werkzeug.utils import secure_filename
@@ -74,24 +76,16 @@ class NoticeService:
             if publish_immediately:
                 notice.publish_date = datetime.utcnow()
             
-            # Create distributions for target audience
-            target_users = NoticeService._get_target_users(notice)
-            
-            for user_id in target_users:
-                # Check if distribution already exists
-                existing = NoticeDistribution.query.filter_by(
-                    notice_id=notice.id, 
-                    user_id=user_id
-                ).first()
-                
-                if not existing:
-                    distribution = NoticeDistribution(
-                        notice_id=notice.id,
-                        user_id=user_id
-                    )
-                    db.session.add(distribution)
+            # Create distributions for target audience (one INSERT ... SELECT, existing rows skipped)
+            now = datetime.utcnow()
+            created = fan_out(
+                NoticeDistribution.__table__, 'notice_id', notice.id,
+                notice.target_user_ids_select(),
+                {'delivered_at': now, 'created_at': now, 'is_read': False, 'is_acknowledged': False}
+            )
             
             db.session.commit()
+            current_app.logger.info(f"Notice {notice.id} distributed to {created} new recipients")
             return notice
             
         except Exception as e:
@@ -102,35 +96,7 @@ class NoticeService:
     @staticmethod
     def _get_target_users(notice):
         """Get list of target user IDs for a notice"""
-        target_users = set()
-        
-        if notice.target_type == 'all':
-            # Get all active users
-            users = User.query.filter_by(is_active=True).all()
-            target_users.update([u.id for u in users])
-            
-        elif notice.target_type == 'department':
-            # Get users from target departments
-            target_depts = notice.get_target_departments()
-            if target_depts:
-                users = User.query.filter(
-                    User.is_active == True,
-                    User.department_id.in_(target_depts)
-                ).all()
-                target_users.update([u.id for u in users])
-                
-        elif notice.target_type == 'individual':
-            # Get specific users
-            target_user_ids = notice.get_target_users()
-            if target_user_ids:
-                # Verify users are active
-                users = User.query.filter(
-                    User.is_active == True,
-                    User.id.in_(target_user_ids)
-                ).all()
-                target_users.update([u.id for u in users])
-        
-        return list(target_users)
+        return db.session.execute(notice.target_user_ids_select()).scalars().all()
     
     @staticmethod
     def _handle_attachments(notice_id, attachments, uploaded_by):
@@ -382,23 +348,13 @@ class NoticeService:
             # Get recipients based on target type
             recipients = NoticeService._get_notice_recipients(notice)
             
-            if not recipients:
-                current_app.logger.warning(f"No recipients found for notice {notice.id}")
+            if recipients is None:
                 return
             
-            # Create email content
-            subject = f"[{current_app.config.get('APP_NAME', 'LMS')}] New Notice: {notice.title}"
-            
-            # Send emails to recipients
-            email_count = 0
-            for user in recipients:
-                try:
-                    html_body = render_template('email/notice_notification.html',
-                                              notice=notice, 
-                                              user=user,
-                                              app_name=current_app.config.get('APP_NAME', 'LMS'))
-                    
-                    text_body = f"""
+            # Create email content (identical for every recipient)
+            app_name = current_app.config.get('APP_NAME', 'LMS')
+            subject = f"[{app_name}] New Notice: {notice.title}"
+            text_body = f"""
 New Notice: {notice.title}
 
 {notice.content}
@@ -410,63 +366,57 @@ Published: {notice.created_at.strftime('%B %d, %Y at %I:%M %p')}
 View full notice at: {current_app.config.get('BASE_URL', 'http://localhost:5000')}/notices
 
 ---
-{current_app.config.get('APP_NAME', 'LMS')}
+{app_name}
                     """
-                    
-                    # Send email asynchronously
-                    send_email(
-                        subject=subject,
-                        recipients=[user.email],
-                        text_body=text_body,
-                        html_body=html_body
-                    )
-                    email_count += 1
-                    
-                except Exception as e:
-                    current_app.logger.error(f"Failed to send notice email to {user.email}: {str(e)}")
-                    continue
             
-            current_app.logger.info(f"Notice {notice.id} emails queued for {email_count} recipients")
+            # The notice template has no per-user content: one segment, one render
+            renderer = SegmentedRenderer('email/notice_notification.html',
+                                         {'notice': notice, 'app_name': app_name},
+                                         segment_key=lambda user: None)
+            
+            def messages():
+                for batch in iter_query_batches(recipients, User.id):
+                    for user in batch:
+                        if not user.email:
+                            continue
+                        try:
+                            html_body = renderer.render(user)
+                        except Exception as e:
+                            current_app.logger.error(f"Failed to prepare notice email to {user.email}: {str(e)}")
+                            continue
+                        yield {
+                            'subject': subject,
+                            'recipients': [user.email],
+                            'text_body': text_body,
+                            'html_body': html_body
+                        }
+            
+            # Streamed into the outbox chunk by chunk
+            email_count = send_bulk_email(messages(), email_type='notice')
+            if not email_count:
+                current_app.logger.warning(f"No recipients found for notice {notice.id}")
+                return
+            current_app.logger.info(f"Notice {notice.id} emails queued for {email_count} recipients "
+                                    f"({renderer.stats['jinja_renders']} template renders)")
             
         except Exception as e:
             current_app.logger.error(f"Error sending notice emails: {str(e)}")
     
     @staticmethod
     def _get_notice_recipients(notice):
-        """Get list of users who should receive the notice"""
+        """Query for the users who should receive the notice"""
         try:
-            if notice.target_type == 'all':
-                # Send to all active users
-                return User.query.filter_by(is_active=True).all()
-            
-            elif notice.target_type == 'department':
-                # Send to users in target departments
-                if notice.target_departments:
-                    dept_ids = [int(id_str) for id_str in notice.target_departments.split(',')]
-                    return User.query.filter(
-                        User.department_id.in_(dept_ids),
-                        User.is_active == True
-                    ).all()
-            
-            elif notice.target_type == 'individual':
-                # Send to specific users
-                if notice.target_users:
-                    user_ids = [int(id_str) for id_str in notice.target_users.split(',')]
-                    return User.query.filter(
-                        User.id.in_(user_ids),
-                        User.is_active == True
-                    ).all()
-            
-            elif notice.target_type == 'role':
+            if notice.target_type == 'role':
                 # Send to users with specific roles (if implemented)
                 role = getattr(notice, 'target_role', 'student')  # Default to student
-                return User.query.filter_by(role=role, is_active=True).all()
+                return User.query.filter_by(role=role, is_active=True)
             
-            return []
+            # Same audience as the distributions (target lists are stored as JSON)
+            return User.query.filter(User.id.in_(notice.target_user_ids_select()))
             
         except Exception as e:
             current_app.logger.error(f"Error getting notice recipients: {str(e)}")
-            return []
+            return None
     
     @staticmethod
     def _create_notice_notifications(notice):
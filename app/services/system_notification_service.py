@@ -12,90 +12,198 @@ from app.models.class_model import Class
 from app.models.attendance import Attendance
 from app.models.department import Department
 from app.models.escalation import Escalation
+from app.models.class_student import ClassStudent
+from app.utils.email import send_bulk_email
+from app.utils.email_rendering import TemplateRenderer
 from sqlalchemy import and_, or_, func, text
+from sqlalchemy.orm import joinedload
 from app import db
 import json
 
+REMINDER_QUEUE_PRIORITY = 2  # Outbox priority: ahead of bulk notices (0)
+
+STUDENT_PREPARATION_TIPS = [
+    "Ensure stable internet connection",
+    "Have notebooks and materials ready",
+    "Join 5 minutes before class time",
+    "Keep a quiet study environment"
+]
+
+TUTOR_PREPARATION_CHECKLIST = [
+    "Review class materials and lesson plan",
+    "Prepare teaching aids and resources",
+    "Test video/audio equipment",
+    "Arrive 10 minutes early for setup"
+]
+
 class SystemNotificationService(ComprehensiveEmailService):
     """Service for system-generated automated notifications"""
     
     # ============ DAILY AUTOMATED NOTIFICATIONS ============
     
     def send_daily_morning_class_reminders(self) -> Dict[str, Any]:
-        """Send morning class reminders for today's classes"""
+        """Send morning class reminders for today's classes
+        
+        Classes, tutors and tutor users are loaded in one query and enrolled
+        students in another; each student and each tutor then gets a single
+        reminder covering all of their classes, queued in bulk.
+        """
         today = datetime.now().date()
+        class_filters = (Class.scheduled_date == today, Class.status == 'scheduled')
         
         # Get all classes scheduled for today
-        today_classes = Class.query.filter(
-            Class.scheduled_date == today,
-            Class.status == 'scheduled'
-        ).all()
+        today_classes = Class.query.options(
+            joinedload(Class.tutor).joinedload(Tutor.user)
+        ).filter(*class_filters).order_by(Class.scheduled_time).all()
         
         results = {
             'total_classes': len(today_classes),
+            'students_notified': 0,
+            'tutors_notified': 0,
             'reminders_sent': 0,
             'failed_sends': 0,
             'errors': []
         }
+        if not today_classes:
+            return results
+        
+        students_by_class = self._get_students_by_class(*class_filters)
         
+        # One entry per recipient, whatever the number of classes
+        student_classes = {}
+        tutor_classes = {}
         for class_obj in today_classes:
-            try:
-                # Send to students
-                if class_obj.primary_student_id:
-                    self._send_class_reminder_to_student(class_obj.primary_student_id, class_obj.id, 'today')
-                
-                # Send to group students
-                if class_obj.students:
-                    student_ids = class_obj.get_students()
-                    for student_id in student_ids:
-                        self._send_class_reminder_to_student(student_id, class_obj.id, 'today')
-                
-                # Send to tutor
-                if class_obj.tutor and class_obj.tutor.user:
-                    self._send_class_reminder_to_tutor(class_obj.tutor.id, class_obj.id, 'today')
-                
-                results['reminders_sent'] += 1
-                
-            except Exception as e:
-                results['failed_sends'] += 1
-                results['errors'].append({
-                    'class_id': class_obj.id,
-                    'error': str(e)
-                })
+            for student in students_by_class.get(class_obj.id, []):
+                student_classes.setdefault(student.id, (student, []))[1].append(class_obj)
+            if class_obj.tutor and class_obj.tutor.user:
+                tutor_classes.setdefault(class_obj.tutor.id, (class_obj.tutor, []))[1].append(class_obj)
+        
+        student_template = TemplateRenderer('email/reminders/class_reminder_student.html')
+        digest_template = TemplateRenderer('email/reminders/class_digest.html')
+        
+        def messages():
+            for student, classes in student_classes.values():
+                try:
+                    message = self._build_student_class_reminder(student, classes, today,
+                                                                 student_template, digest_template)
+                except Exception as e:
+                    results['failed_sends'] += 1
+                    results['errors'].append({'student_id': student.id, 'error': str(e)})
+                    continue
+                if message:
+                    results['students_notified'] += 1
+                    yield message
+            
+            for tutor, classes in tutor_classes.values():
+                try:
+                    message = self._build_tutor_class_reminder(tutor, classes, today, students_by_class,
+                                                               digest_template)
+                except Exception as e:
+                    results['failed_sends'] += 1
+                    results['errors'].append({'tutor_id': tutor.id, 'error': str(e)})
+                    continue
+                if message:
+                    results['tutors_notified'] += 1
+                    yield message
         
+        results['reminders_sent'] = send_bulk_email(messages(), email_type=EmailType.REMINDER,
+                                                    priority=REMINDER_QUEUE_PRIORITY)
         return results
     
     def send_daily_attendance_follow_ups(self) -> Dict[str, Any]:
-        """Send attendance follow-ups for yesterday's classes"""
+        """Send attendance follow-ups for yesterday's classes
+        
+        Attendance for all of yesterday's classes comes from one query; tutors
+        get one reminder for all their unmarked classes and absent students one
+        follow-up for all the classes they missed.
+        """
         yesterday = datetime.now().date() - timedelta(days=1)
+        class_filters = (Class.scheduled_date == yesterday, Class.status == 'completed')
         
         # Get classes from yesterday that may need attendance follow-up
-        yesterday_classes = Class.query.filter(
-            Class.scheduled_date == yesterday,
-            Class.status == 'completed'
-        ).all()
+        yesterday_classes = Class.query.options(
+            joinedload(Class.tutor).joinedload(Tutor.user)
+        ).filter(*class_filters).order_by(Class.scheduled_time).all()
         
         results = {
             'classes_checked': len(yesterday_classes),
             'follow_ups_sent': 0,
-            'students_contacted': 0
+            'students_contacted': 0,
+            'emails_queued': 0
         }
-        
+        if not yesterday_classes:
+            return results
+        
+        # All of yesterday's attendance, grouped by class
+        attendance_rows = db.session.query(Attendance, Student).join(
+            Class, Class.id == Attendance.class_id
+        ).outerjoin(
+            Student, Student.id == Attendance.student_id
+        ).filter(*class_filters).all()
+        
+        attendance_by_class = {}
+        for attendance, student in attendance_rows:
+            attendance_by_class.setdefault(attendance.class_id, []).append((attendance, student))
+        
+        unmarked_by_tutor = {}
+        missed_by_student = {}
         for class_obj in yesterday_classes:
-            # Check if attendance was marked
-            attendance_records = Attendance.query.filter_by(class_id=class_obj.id).all()
-            
-            if not attendance_records:
-                # No attendance marked - send follow-up
-                self._send_attendance_marking_reminder(class_obj.tutor.id, class_obj.id)
+            records = attendance_by_class.get(class_obj.id)
+            if not records:
+                # No attendance marked - remind the tutor
                 results['follow_ups_sent'] += 1
-            else:
-                # Check for absentees and send follow-up
-                for attendance in attendance_records:
-                    if not attendance.is_present:
-                        self._send_absence_follow_up(attendance.student_id, class_obj.id)
-                        results['students_contacted'] += 1
+                if class_obj.tutor and class_obj.tutor.user:
+                    unmarked_by_tutor.setdefault(class_obj.tutor.id, (class_obj.tutor, []))[1].append(class_obj)
+                continue
+            
+            for attendance, student in records:
+                if student and not attendance.student_present:
+                    missed_by_student.setdefault(student.id, (student, []))[1].append(class_obj)
+        
+        digest_template = TemplateRenderer('email/reminders/class_digest.html')
+        
+        def messages():
+            for tutor, classes in unmarked_by_tutor.values():
+                subject = f"Attendance Not Marked - {len(classes)} Class{'es' if len(classes) > 1 else ''} from {yesterday.strftime('%d %b')}"
+                yield {
+                    'subject': subject,
+                    'recipients': [tutor.user.email],
+                    'html_body': self._render_queued(digest_template, subject, {
+                        'digest_title': 'Attendance Pending',
+                        'digest_date': yesterday,
+                        'recipient_name': tutor.user.full_name,
+                        'intro': "Attendance has not been marked for the classes below. Please mark it today so records and payments stay accurate.",
+                        'alert_level': 'warning',
+                        'classes': [{'class': class_obj} for class_obj in classes],
+                        'action_url': '/tutor/classes',
+                        'action_label': 'Mark Attendance'
+                    })
+                }
+            
+            for student, classes in missed_by_student.values():
+                recipients = self._get_student_reminder_recipients(student)
+                if not recipients:
+                    continue
+                subject = f"We Missed You in Class - {yesterday.strftime('%d %b')}"
+                results['students_contacted'] += 1
+                yield {
+                    'subject': subject,
+                    'recipients': recipients,
+                    'html_body': self._render_queued(digest_template, subject, {
+                        'digest_title': 'Class Attendance Follow-up',
+                        'digest_date': yesterday,
+                        'recipient_name': student.full_name,
+                        'intro': "You were marked absent from the classes below. If something is preventing you from attending, please let us know so we can help.",
+                        'alert_level': 'warning',
+                        'classes': [{'class': class_obj, 'tutor_user': class_obj.tutor.user if class_obj.tutor else None}
+                                    for class_obj in classes],
+                        'action_url': '/student/classes',
+                        'action_label': 'View My Classes'
+                    })
+                }
         
+        results['emails_queued'] = send_bulk_email(messages(), email_type=EmailType.REMINDER,
+                                                   priority=REMINDER_QUEUE_PRIORITY)
         return results
     
     def send_daily_payment_due_alerts(self) -> Dict[str, Any]:
@@ -674,6 +782,104 @@ class SystemNotificationService(ComprehensiveEmailService):
             email_type=EmailType.REMINDER
         )
     
+    def _get_students_by_class(self, *class_filters) -> Dict[int, List[Student]]:
+        """Enrolled students of every class matching class_filters, in one query"""
+        rows = db.session.query(ClassStudent.class_id, Student).join(
+            Student, Student.id == ClassStudent.student_id
+        ).join(
+            Class, Class.id == ClassStudent.class_id
+        ).filter(*class_filters).order_by(Student.full_name).all()
+        
+        students_by_class = {}
+        for class_id, student in rows:
+            students_by_class.setdefault(class_id, []).append(student)
+        return students_by_class
+    
+    def _get_student_reminder_recipients(self, student: Student) -> List[str]:
+        """Student plus parent email addresses, without duplicates"""
+        recipients = [student.email] if student.email else []
+        parent_details = student.get_parent_details() or {}
+        for parent in ('father', 'mother'):
+            parent_email = (parent_details.get(parent) or {}).get('email')
+            if parent_email:
+                recipients.append(parent_email)
+        return list(dict.fromkeys(recipients))
+    
+    def _render_queued(self, renderer: TemplateRenderer, subject: str, context: Dict[str, Any]) -> str:
+        """Render a queued email, falling back like send_email does"""
+        try:
+            return renderer.render(**context)
+        except Exception as e:
+            self.logger.error(f"Template rendering failed for {renderer.template.name}: {str(e)}")
+            return self._generate_fallback_email(subject, context, e)
+    
+    def _build_student_class_reminder(self, student: Student, classes: List[Class], day: date,
+                                      student_template: TemplateRenderer,
+                                      digest_template: TemplateRenderer) -> Optional[Dict[str, Any]]:
+        """One reminder message for all of a student's classes on day"""
+        recipients = self._get_student_reminder_recipients(student)
+        if not recipients:
+            return None
+        
+        if len(classes) == 1:
+            class_obj = classes[0]
+            subject = f"Class Today - {class_obj.subject} | {class_obj.scheduled_time}"
+            html_body = self._render_queued(student_template, subject, {
+                'student': student,
+                'class': class_obj,
+                'timing': 'today',
+                'tutor': class_obj.tutor,
+                'tutor_user': class_obj.tutor.user if class_obj.tutor else None,
+                'class_url': f"/student/classes/{class_obj.id}",
+                'preparation_tips': STUDENT_PREPARATION_TIPS
+            })
+        else:
+            subject = f"Your Classes Today - {len(classes)} Classes"
+            html_body = self._render_queued(digest_template, subject, {
+                'digest_title': 'Your Classes Today',
+                'digest_date': day,
+                'recipient_name': student.full_name,
+                'intro': f"You have {len(classes)} classes today. Here is your schedule.",
+                'classes': [{'class': class_obj, 'tutor_user': class_obj.tutor.user if class_obj.tutor else None}
+                            for class_obj in classes],
+                'checklist': STUDENT_PREPARATION_TIPS,
+                'action_url': '/student/classes',
+                'action_label': 'View My Classes'
+            })
+        
+        return {'subject': subject, 'recipients': recipients, 'html_body': html_body}
+    
+    def _build_tutor_class_reminder(self, tutor: Tutor, classes: List[Class], day: date,
+                                    students_by_class: Dict[int, List[Student]],
+                                    digest_template: TemplateRenderer) -> Optional[Dict[str, Any]]:
+        """One reminder message for all of a tutor's classes on day"""
+        if not tutor.user.email:
+            return None
+        
+        items = [{
+            'class': class_obj,
+            'students': [{'name': student.full_name, 'grade': student.grade}
+                         for student in students_by_class.get(class_obj.id, [])]
+        } for class_obj in classes]
+        
+        if len(classes) == 1:
+            subject = f"Class Today - {classes[0].subject} | {len(items[0]['students'])} Students"
+        else:
+            subject = f"Your Classes Today - {len(classes)} Classes"
+        
+        html_body = self._render_queued(digest_template, subject, {
+            'digest_title': 'Your Teaching Schedule',
+            'digest_date': day,
+            'recipient_name': tutor.user.full_name,
+            'intro': f"You have {len(classes)} class{'es' if len(classes) > 1 else ''} today.",
+            'classes': items,
+            'checklist': TUTOR_PREPARATION_CHECKLIST,
+            'action_url': '/tutor/classes',
+            'action_label': 'View My Classes'
+        })
+        
+        return {'subject': subject, 'recipients': [tutor.user.email], 'html_body': html_body}
+    
     def _get_tutor_pending_tasks(self, tutor_id: int) -> Dict[str, Any]:
         """Get pending tasks for a tutor"""
         tasks = {
@@ -0,0 +1,203 @@
+"""
+Buffered, batched writes of ``UserActivityLog`` rows.
+
+``UserActivityLog.log_activity`` INSERTs and commits inside the request, and
+the error tracking hooks called it for every authenticated page view, making
+the activity log the busiest table and adding a commit to every page.
+``activity_log.record`` instead appends the row to an in-memory ring buffer
+and returns; a daemon thread writes the buffer with multi-row INSERTs every
+``ACTIVITY_LOG_BATCH_SIZE`` rows or ``ACTIVITY_LOG_FLUSH_INTERVAL`` seconds,
+on its own connection.
+
+- backpressure: the buffer holds at most ``ACTIVITY_LOG_BUFFER_SIZE`` rows;
+  when the writer cannot keep up the oldest rows are dropped and counted
+  (``stats['dropped']``), requests never wait on the database
+- per-minute request, failure and error counters are written alongside each
+  batch to ``activity_minute_stats`` (high/critical ErrorLog rows are counted
+  by a commit hook), so the error rate no longer scans the raw logs
+- a batch that fails to write goes back to the front of the buffer (rows that
+  no longer fit are dropped) and is retried on the writer's next round
+- rows still buffered are written at interpreter exit
+"""
+from datetime import datetime
+import atexit
+import logging
+import threading
+from collections import deque
+from flask import current_app, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from app import db
+
+activity_logger = logging.getLogger('activity.log')
+
+DEFAULT_BUFFER_SIZE = 10000  # rows held before the oldest are dropped
+DEFAULT_BATCH_SIZE = 500  # rows per INSERT; a full batch wakes the writer early
+DEFAULT_FLUSH_INTERVAL = 2.0  # seconds between writes of a partial batch
+
+
+def _minute(moment):
+    return moment.replace(second=0, microsecond=0)
+
+
+class ActivityLogWriter:
+    """Ring buffer of activity rows plus the per-process thread that writes it"""
+
+    def __init__(self):
+        self.app = None
+        self.buffer_size = DEFAULT_BUFFER_SIZE
+        self.batch_size = DEFAULT_BATCH_SIZE
+        self.flush_interval = DEFAULT_FLUSH_INTERVAL
+        self._buffer = deque(maxlen=DEFAULT_BUFFER_SIZE)
+        self._minutes = {}  # minute -> {counter: n} not yet written
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()  # one writer at a time (thread, atexit, CLI)
+        self._wake = threading.Event()
+        self._writer = None
+        self.stats = {'recorded': 0, 'written': 0, 'dropped': 0, 'failed': 0, 'batches': 0}
+
+    def init_app(self, app):
+        self.app = app
+        self.buffer_size = app.config.get('ACTIVITY_LOG_BUFFER_SIZE', DEFAULT_BUFFER_SIZE)
+        self.batch_size = app.config.get('ACTIVITY_LOG_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+        self.flush_interval = app.config.get('ACTIVITY_LOG_FLUSH_INTERVAL', DEFAULT_FLUSH_INTERVAL)
+        with self._lock:
+            self._buffer = deque(self._buffer, maxlen=self.buffer_size)
+        app.extensions['activity_log'] = self
+        atexit.register(self.flush)
+
+    # ============ PRODUCER ============
+
+    def record(self, user_id, activity_type, **fields):
+        """Queue one UserActivityLog row (same arguments as UserActivityLog.log_activity)"""
+        if self.app is None:
+            self.app = current_app._get_current_object()
+
+        now = datetime.utcnow()
+        row = dict(fields, user_id=user_id, activity_type=activity_type, created_at=now)
+        with self._lock:
+            if len(self._buffer) == self._buffer.maxlen:
+                self.stats['dropped'] += 1  # append below evicts the oldest row
+            self._buffer.append(row)
+            self.stats['recorded'] += 1
+            self._count(now, request_count=1, failed_count=1 if fields.get('success') is False else 0)
+            full_batch = len(self._buffer) >= self.batch_size
+
+        self._ensure_writer()
+        if full_batch:
+            self._wake.set()
+
+    def count_errors(self, count, moment=None):
+        """Add high/critical errors to the per-minute counters"""
+        if self.app is None and has_app_context():
+            self.app = current_app._get_current_object()
+        with self._lock:
+            self._count(moment or datetime.utcnow(), error_count=count)
+        if self.app is not None:
+            self._ensure_writer()
+
+    def _count(self, moment, **counters):
+        totals = self._minutes.setdefault(_minute(moment), {})
+        for counter, amount in counters.items():
+            totals[counter] = totals.get(counter, 0) + amount
+
+    # ============ WRITER ============
+
+    def _ensure_writer(self):
+        if self._writer and self._writer.is_alive():
+            return
+        with self._lock:
+            if self._writer and self._writer.is_alive():
+                return
+            self._writer = threading.Thread(target=self._write_loop, name='activity-log-writer', daemon=True)
+            self._writer.start()
+
+    def _write_loop(self):
+        while True:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                activity_logger.error(f"Activity log flush failed: {e}")
+
+    def flush(self):
+        """Write everything buffered so far; returns the number of rows written"""
+        if self.app is None:
+            return 0
+
+        written = 0
+        with self._flush_lock:
+            while True:
+                with self._lock:
+                    batch = [self._buffer.popleft() for _ in range(min(self.batch_size, len(self._buffer)))]
+                    minutes, self._minutes = self._minutes, {}
+                if not batch and not minutes:
+                    break
+                if not self._write(batch, minutes):
+                    break  # database unavailable; the batch is requeued for the writer's next round
+                written += len(batch)
+        return written
+
+    def _write(self, batch, minutes):
+        from app.models.error_log import UserActivityLog, ActivityMinuteStats
+
+        # executemany needs the same keys in every row
+        columns = set().union(*batch) if batch else ()
+        batch = [{column: row.get(column) for column in columns} for row in batch]
+        try:
+            with self.app.app_context():
+                with db.engine.begin() as connection:
+                    if batch:
+                        connection.execute(UserActivityLog.__table__.insert(), batch)
+                    if minutes:
+                        ActivityMinuteStats.add_counts(connection, minutes)
+        except Exception as e:
+            activity_logger.error(f"Writing {len(batch)} activity rows failed: {e}")
+            with self._lock:
+                self.stats['failed'] += len(batch)
+                # Back to the front of the buffer as far as it has room; like record(), the oldest rows go first
+                room = self._buffer.maxlen - len(self._buffer)
+                keep = batch[-room:] if room else []
+                self.stats['dropped'] += len(batch) - len(keep)
+                self._buffer.extendleft(reversed(keep))
+                # Counters are small; keep them for the next attempt
+                for minute, counters in minutes.items():
+                    self._count(minute, **counters)
+            return False
+
+        with self._lock:
+            self.stats['written'] += len(batch)
+            self.stats['batches'] += 1
+        return True
+
+    def get_stats(self):
+        with self._lock:
+            return dict(self.stats, buffered=len(self._buffer), capacity=self._buffer.maxlen)
+
+
+activity_log = ActivityLogWriter()
+
+
+# ============ COMMIT HOOKS ============
+
+@event.listens_for(Session, 'after_flush')
+def _collect_errors(session, flush_context):
+    from app.models.error_log import ErrorLog
+
+    errors = sum(1 for obj in session.new
+                 if isinstance(obj, ErrorLog) and obj.severity in ('high', 'critical'))
+    if errors:
+        session.info['activity_errors'] = session.info.get('activity_errors', 0) + errors
+
+
+@event.listens_for(Session, 'after_commit')
+def _count_errors(session):
+    errors = session.info.pop('activity_errors', 0)
+    if errors:
+        activity_log.count_errors(errors)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_errors(session):
+    session.info.pop('activity_errors', None)
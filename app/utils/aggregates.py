@@ -0,0 +1,107 @@
+"""
+Portable conditional aggregation.
+
+Dashboard counters used to be either one ``.count()`` per number or raw SQL
+with PostgreSQL-only ``COUNT(*) FILTER``/``INTERVAL``/``DATE_TRUNC``. Here every
+counter is a ``SUM(CASE WHEN ... THEN 1 ELSE 0 END)`` built with SQLAlchemy
+expressions, so the dialect renders booleans and literals, and date boundaries
+are computed in Python and sent as bind parameters. A whole set of counters
+over one table therefore costs one round trip on SQLite, MySQL and PostgreSQL.
+
+    counts = aggregate_counts(Class, {
+        'total': None,
+        'completed': Class.status == 'completed',
+    }, where=Class.scheduled_date == today)
+
+The rollup tables that back those counters are written with ``upsert_counters``.
+"""
+from datetime import date, timedelta
+from sqlalchemy import and_, case, func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Query
+from app import db
+
+
+def count_where(condition=None):
+    """COUNT(*) when condition is None, otherwise a portable conditional count"""
+    if condition is None:
+        return func.count()
+    # COALESCE because SUM over zero rows is NULL
+    return func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+
+
+def sum_where(column, condition=None):
+    """SUM(column), optionally only over rows matching condition"""
+    if condition is None:
+        return func.coalesce(func.sum(column), 0)
+    return func.coalesce(func.sum(case((condition, column), else_=0)), 0)
+
+
+def _evaluate(source, columns, where):
+    if isinstance(source, Query):
+        query = source.with_entities(*columns)
+    else:
+        query = db.session.query(*columns).select_from(source)
+    if where is not None:
+        query = query.filter(where)
+
+    row = query.one()
+    # MySQL returns SUM() as Decimal
+    return {column.name: int(row[i] or 0) for i, column in enumerate(columns)}
+
+
+def aggregate_counts(source, counts, where=None):
+    """Evaluate {label: condition or None} in a single SELECT.
+
+    ``source`` is a mapped class or an existing ``Query`` whose joins and
+    filters scope the counts (e.g. a coordinator's department). Returns
+    {label: int}.
+    """
+    return _evaluate(source, [count_where(condition).label(label) for label, condition in counts.items()], where)
+
+
+def aggregate_sums(source, sums, where=None):
+    """Like aggregate_counts for pre-aggregated rows: {label: (column, condition or None)}"""
+    return _evaluate(source, [sum_where(column, condition).label(label)
+                              for label, (column, condition) in sums.items()], where)
+
+
+def upsert_counters(connection, table, key_columns, deltas, values=None):
+    """Add {key_tuple: {counter: delta}} to counter rows, inserting a key row the first time it is seen.
+
+    Portable upsert: UPDATE in place, then INSERT inside a SAVEPOINT, and
+    UPDATE again if a concurrent transaction inserted the row first. values
+    holds extra columns (e.g. updated_at) written on both paths.
+    """
+    values = values or {}
+    for key, counters in deltas.items():
+        counters = {column: delta for column, delta in counters.items() if delta}
+        if not counters:
+            continue
+        where = and_(*(table.c[column] == value for column, value in zip(key_columns, key)))
+        update = table.update().where(where).values(
+            **values, **{column: table.c[column] + delta for column, delta in counters.items()}
+        )
+        if connection.execute(update).rowcount:
+            continue
+        try:
+            with connection.begin_nested():
+                connection.execute(table.insert().values(**values, **dict(zip(key_columns, key)), **counters))
+        except IntegrityError:
+            # Another transaction created the row first
+            connection.execute(update)
+
+
+def period_bounds(today=None):
+    """Date boundaries shared by the dashboards: today, week/month starts and rolling windows"""
+    today = today or date.today()
+    week_start = today - timedelta(days=today.weekday())
+    return {
+        'today': today,
+        'yesterday': today - timedelta(days=1),
+        'week_start': week_start,
+        'week_end': week_start + timedelta(days=6),
+        'month_start': today.replace(day=1),
+        'last_7_days': today - timedelta(days=7),
+        'last_30_days': today - timedelta(days=30),
+    }
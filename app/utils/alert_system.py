@@ -1,11 +1,13 @@
 import json
-import requests
 from datetime import datetime, timedelta
 from flask import current_app, url_for
 from app import db
 from app.models.error_log import ErrorLog
 from app.models.user import User
 from email.mime.text import MIMEText
+from app.utils.lazy_imports import lazy_module
+
+requests = lazy_module('requests')
 
 
 # Import email modules only when needed to avoid import issues
@@ -7,10 +7,15 @@ from app import db
 from app.models.student import Student
 from app.models.tutor import Tutor
 from app.models.class_model import Class
+from app.models.class_student import ClassStudent
 from app.models.user import User
 from app.utils.tutor_matching import TutorMatchingEngine
+from app.utils.assignment_solver import solve_assignment, DEFAULT_TIME_BUDGET
+from app.utils.lazy_imports import lazy_module
 import json
 
+np = lazy_module('numpy')
+
 class AllocationHelper:
     """Smart allocation helper for managing student-tutor assignments"""
     
@@ -20,41 +25,16 @@ class AllocationHelper:
     def get_unallocated_students(self, filters: Dict = None) -> List[Dict]:
         """Get students who are not allocated to any classes"""
         
-        # Get all student IDs who are in classes (both one-on-one and group)
-        allocated_student_ids = set()
-        
-        # Get one-on-one allocated students
-        one_on_one_classes = Class.query.filter(
-            Class.primary_student_id.isnot(None),
-            Class.status.in_(['scheduled', 'ongoing'])
-        ).all()
-        
-        for cls in one_on_one_classes:
-            if cls.primary_student_id:
-                allocated_student_ids.add(cls.primary_student_id)
-        
-        # Get group class allocated students
-        group_classes = Class.query.filter(
-            Class.students.isnot(None),
-            Class.status.in_(['scheduled', 'ongoing'])
-        ).all()
-        
-        for cls in group_classes:
-            try:
-                student_ids = cls.get_students() or []
-                allocated_student_ids.update(student_ids)
-            except:
-                continue
+        # Students enrolled in any active class (one-on-one or group) via class_students
+        allocated_student_ids = self._allocated_students_subquery()
         
         # Build base query for unallocated students
         query = Student.query.filter(
             Student.is_active == True,
-            Student.enrollment_status == 'active'
+            Student.enrollment_status == 'active',
+            ~Student.id.in_(allocated_student_ids)
         )
         
-        if allocated_student_ids:
-            query = query.filter(~Student.id.in_(allocated_student_ids))
-        
         # Apply filters
         if filters:
             if filters.get('grade'):
@@ -98,21 +78,31 @@ class AllocationHelper:
     def get_available_tutors(self, filters: Dict = None) -> List[Dict]:
         """Get tutors who have availability and capacity for more students"""
         
-        # Get active tutors with availability
-        tutors = Tutor.query.filter_by(status='active').all()
+        from app.utils.tutor_index import tutor_index
+        
+        # Narrow to active tutors with availability matching subject/grade/board via the capability index
+        filters = filters or {}
+        candidate_ids = tutor_index.candidates(
+            subject=filters.get('subject'),
+            grade=filters.get('grade'),
+            board=filters.get('board'),
+            require_availability=True
+        )
+        if not candidate_ids:
+            return []
+        
+        tutors = Tutor.query.filter(Tutor.id.in_(candidate_ids)).all()
+        
+        # Current class load for all candidates in one grouped query
+        class_counts = dict(db.session.query(Class.tutor_id, func.count(Class.id)).filter(
+            Class.tutor_id.in_(candidate_ids),
+            Class.status.in_(['scheduled', 'ongoing'])
+        ).group_by(Class.tutor_id).all())
+        
         available_tutors = []
         
         for tutor in tutors:
-            # Must have availability schedule
-            availability = tutor.get_availability()
-            if not availability:
-                continue
-            
-            # Get current class load
-            current_classes = Class.query.filter(
-                Class.tutor_id == tutor.id,
-                Class.status.in_(['scheduled', 'ongoing'])
-            ).count()
+            current_classes = class_counts.get(tutor.id, 0)
             
             # Calculate capacity (assuming max 8 students per tutor)
             max_capacity = 8
@@ -123,15 +113,6 @@ class AllocationHelper:
             
             # Apply filters
             if filters:
-                if filters.get('subject'):
-                    if not tutor.can_teach_subject(filters['subject']):
-                        continue
-                if filters.get('grade'):
-                    if not tutor.can_teach_grade(filters['grade']):
-                        continue
-                if filters.get('board'):
-                    if not tutor.can_teach_board(filters['board']):
-                        continue
                 if filters.get('min_rating'):
                     if (tutor.rating or 0) < float(filters['min_rating']):
                         continue
@@ -176,30 +157,12 @@ class AllocationHelper:
         total_tutors = Tutor.query.filter_by(status='active').count()
         
         # Get allocated student count
-        allocated_student_ids = set()
-        
-        # One-on-one allocations
-        one_on_one = Class.query.filter(
-            Class.primary_student_id.isnot(None),
-            Class.status.in_(['scheduled', 'ongoing'])
-        ).with_entities(Class.primary_student_id).distinct().all()
-        
-        allocated_student_ids.update([x[0] for x in one_on_one if x[0]])
-        
-        # Group allocations
-        group_classes = Class.query.filter(
-            Class.students.isnot(None),
+        allocated_count = db.session.query(
+            func.count(func.distinct(ClassStudent.student_id))
+        ).join(Class, Class.id == ClassStudent.class_id).filter(
             Class.status.in_(['scheduled', 'ongoing'])
-        ).all()
-        
-        for cls in group_classes:
-            try:
-                student_ids = cls.get_students() or []
-                allocated_student_ids.update(student_ids)
-            except:
-                continue
+        ).scalar() or 0
         
-        allocated_count = len(allocated_student_ids)
         unallocated_count = total_students - allocated_count
         
         # Get subject-wise breakdown
@@ -236,22 +199,48 @@ class AllocationHelper:
             }
         }
     
-    def bulk_auto_assign(self, filters: Dict = None, dry_run: bool = True) -> Dict:
-        """Bulk auto-assign students to best matching tutors"""
-        
+    def bulk_auto_assign(self, filters: Dict = None, dry_run: bool = True,
+                         time_budget: float = DEFAULT_TIME_BUDGET) -> Dict:
+        """Bulk auto-assign students to best matching tutors.
+        
+        Maximizes the total match score within each tutor's free capacity
+        (see assignment_solver); falls back to the greedy top-3 pass when the
+        solver exceeds time_budget seconds. Dry runs report the objective
+        against that greedy baseline.
+        """
         unallocated_students = self.get_unallocated_students(filters)
-        available_tutors = self.get_available_tutors()
+        available_tutors = {t['id']: t for t in self.get_available_tutors()}
+        
+        # Score every unallocated student against every tutor in one pass
+        students, tutors, scores = self.matching_engine.score_matrix(
+            [s['id'] for s in unallocated_students]
+        )
+        row_by_student = {student.id: row for row, student in enumerate(students)}
+        
+        assignment = None
+        solver_report = None
+        compatible = None
+        if scores is not None:
+            # Compatibility is judged before capacity so full tutors get their own reason
+            compatible = (scores > 0).any(axis=1)
+            capacity = [
+                max(available_tutors[tutor.id]['available_slots'], 0) if tutor.id in available_tutors else 0
+                for tutor in tutors
+            ]
+            # Tutors without free capacity cannot take anyone
+            scores = scores * (np.array(capacity) > 0)[None, :]
+            assignment, solver_report = solve_assignment(
+                scores, capacity, time_budget, compare_greedy=dry_run
+            )
         
         assignments = []
         conflicts = []
         
         for student_data in unallocated_students:
             student_id = student_data['id']
+            row = row_by_student.get(student_id)
             
-            # Get best matches
-            matches = self.get_smart_matches(student_id, limit=3)
-            
-            if not matches:
+            if scores is None or row is None or not compatible[row]:
                 conflicts.append({
                     'student_id': student_id,
                     'student_name': student_data['full_name'],
@@ -259,28 +248,18 @@ class AllocationHelper:
                 })
                 continue
             
-            # Find best available tutor
-            best_match = None
-            for match in matches:
-                tutor_id = match['tutor_id']
-                
-                # Check if tutor has capacity
-                tutor_data = next((t for t in available_tutors if t['id'] == tutor_id), None)
-                if tutor_data and tutor_data['available_slots'] > 0:
-                    best_match = {
-                        'student_id': student_id,
-                        'student_name': student_data['full_name'],
-                        'tutor_id': tutor_id,
-                        'tutor_name': match['tutor_name'],
-                        'match_score': match['score_data']['total_score'],
-                        'subjects': student_data['subjects_enrolled']
-                    }
-                    # Reduce available slots for next iteration
-                    tutor_data['available_slots'] -= 1
-                    break
-            
-            if best_match:
-                assignments.append(best_match)
+            column = assignment[row]
+            if column >= 0 and scores[row, column] > 0:
+                tutor_data = available_tutors[tutors[column].id]
+                assignments.append({
+                    'student_id': student_id,
+                    'student_name': student_data['full_name'],
+                    'tutor_id': tutor_data['id'],
+                    'tutor_name': tutor_data['full_name'],
+                    'match_score': float(scores[row, column]),
+                    'subjects': student_data['subjects_enrolled']
+                })
+                tutor_data['available_slots'] -= 1
             else:
                 conflicts.append({
                     'student_id': student_id,
@@ -301,12 +280,23 @@ class AllocationHelper:
             }
         }
         
+        if solver_report:
+            result['solver'] = solver_report
+        
         if not dry_run:
             # Execute actual assignments
             result['execution_results'] = self._execute_assignments(assignments)
         
         return result
     
+    def _allocated_students_subquery(self):
+        """SELECT of student IDs enrolled in scheduled/ongoing classes"""
+        return db.select(ClassStudent.student_id).join(
+            Class, Class.id == ClassStudent.class_id
+        ).where(
+            Class.status.in_(['scheduled', 'ongoing'])
+        )
+    
     def _calculate_student_priority(self, student: Student) -> str:
         """Calculate priority level for student allocation"""
         days_waiting = (date.today() - student.created_at.date()).days if student.created_at else 0
@@ -320,24 +310,12 @@ class AllocationHelper:
     
     def _get_availability_summary(self, tutor: Tutor) -> Dict:
         """Get tutor availability summary"""
-        availability = tutor.get_availability()
-        if not availability:
+        weekly = tutor.get_weekly_availability()
+        if not weekly:
             return {'status': 'no_schedule', 'summary': 'No schedule set'}
         
-        available_days = [day.title() for day, slots in availability.items() if slots]
-        total_hours = 0
-        
-        for day, slots in availability.items():
-            for slot in slots or []:
-                try:
-                    start = datetime.strptime(slot['start'], '%H:%M').time()
-                    end = datetime.strptime(slot['end'], '%H:%M').time()
-                    start_dt = datetime.combine(date.today(), start)
-                    end_dt = datetime.combine(date.today(), end)
-                    hours = (end_dt - start_dt).total_seconds() / 3600
-                    total_hours += hours
-                except:
-                    continue
+        available_days = [day.title() for day in weekly.available_days]
+        total_hours = weekly.total_hours()
         
         return {
             'status': 'available',
@@ -361,30 +339,25 @@ class AllocationHelper:
                     subjects[subject] = {'total': 0, 'allocated': 0, 'unallocated': 0}
                 subjects[subject]['total'] += 1
         
-        # Count allocations by subject (simplified)
-        allocated_students = set()
-        classes = Class.query.filter(Class.status.in_(['scheduled', 'ongoing'])).all()
-        
-        for cls in classes:
-            try:
-                student_ids = []
-                if cls.primary_student_id:
-                    student_ids = [cls.primary_student_id]
-                else:
-                    student_ids = cls.get_students() or []
-                
-                for student_id in student_ids:
-                    allocated_students.add(student_id)
-                    
-                    # Get student and check subjects
-                    student = Student.query.get(student_id)
-                    if student:
-                        student_subjects = student.get_subjects_enrolled()
-                        for subject in student_subjects:
-                            if subject in subjects:
-                                subjects[subject]['allocated'] += 1
-            except:
-                continue
+        # Count allocations by subject (one count per active class enrollment)
+        enrolled_ids = [
+            row[0] for row in db.session.query(ClassStudent.student_id)
+            .join(Class, Class.id == ClassStudent.class_id)
+            .filter(Class.status.in_(['scheduled', 'ongoing']))
+            .all()
+        ]
+        
+        if enrolled_ids:
+            enrolled_students = {
+                s.id: s for s in Student.query.filter(Student.id.in_(set(enrolled_ids))).all()
+            }
+            for student_id in enrolled_ids:
+                student = enrolled_students.get(student_id)
+                if not student:
+                    continue
+                for subject in student.get_subjects_enrolled():
+                    if subject in subjects:
+                        subjects[subject]['allocated'] += 1
         
         # Calculate unallocated
         for subject in subjects:
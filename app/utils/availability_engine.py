@@ -0,0 +1,258 @@
+"""
+Precompiled tutor availability.
+
+``Tutor.availability`` is a JSON text column of weekday -> [{'start': 'HH:MM', 'end': 'HH:MM'}].
+Parsing it (and normalizing the time strings) on every check made slot generation
+O(steps x JSON decode x DB query). This module compiles it once per distinct
+availability payload into sorted, merged minute intervals per weekday and caches
+the result, so membership tests are a bisect and slot listing needs a single
+classes query per tutor per day.
+"""
+from bisect import bisect_right
+from datetime import datetime, time
+import json
+import threading
+
+DAY_NAMES = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+MINUTES_PER_DAY = 24 * 60
+ACTIVE_CLASS_STATUSES = ['scheduled', 'ongoing']
+
+
+def parse_minutes(value):
+    """Convert 'HH:MM', 'HH:MM:SS', 'HH', a time or a datetime into minutes after midnight.
+
+    Returns None when the value cannot be parsed.
+    """
+    if value is None or value == '':
+        return None
+
+    if isinstance(value, datetime):
+        value = value.time()
+    if isinstance(value, time):
+        return value.hour * 60 + value.minute
+
+    text = str(value).strip()
+    try:
+        if ':' in text:
+            parts = text.split(':')
+            hour, minute = int(parts[0]), int(parts[1])
+        else:
+            hour, minute = int(text), 0
+    except (ValueError, IndexError):
+        return None
+
+    if not (0 <= hour <= 24 and 0 <= minute < 60):
+        return None
+    return min(hour * 60 + minute, MINUTES_PER_DAY)
+
+
+def format_minutes(minutes):
+    """Format minutes after midnight as 'HH:MM' (wrapping past midnight like datetime arithmetic)"""
+    minutes %= MINUTES_PER_DAY
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def merge_intervals(intervals):
+    """Sort and merge overlapping or touching [start, end) intervals"""
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return [(start, end) for start, end in merged]
+
+
+class WeeklyAvailability:
+    """A tutor's weekly availability as sorted, merged minute intervals per weekday"""
+
+    __slots__ = ('_days', '_starts')
+
+    def __init__(self, availability=None):
+        self._days = {}
+        self._starts = {}
+
+        for day_name, slots in (availability or {}).items():
+            day = str(day_name).strip().lower()
+            if day not in DAY_NAMES or not isinstance(slots, list):
+                continue
+
+            intervals = []
+            for slot in slots:
+                if not isinstance(slot, dict):
+                    continue
+                start = parse_minutes(slot.get('start'))
+                end = parse_minutes(slot.get('end'))
+                if start is None or end is None or end <= start:
+                    continue
+                intervals.append((start, end))
+
+            if intervals:
+                merged = merge_intervals(intervals)
+                self._days[day] = merged
+                self._starts[day] = [start for start, _ in merged]
+
+    @classmethod
+    def from_json(cls, raw):
+        """Build from the raw JSON text stored on Tutor.availability"""
+        if not raw:
+            return cls()
+        try:
+            parsed = json.loads(raw)
+        except (ValueError, TypeError):
+            return cls()
+        return cls(parsed if isinstance(parsed, dict) else None)
+
+    def __bool__(self):
+        return bool(self._days)
+
+    @property
+    def available_days(self):
+        """Weekday names with at least one slot, in calendar order"""
+        return [day for day in DAY_NAMES if day in self._days]
+
+    def intervals(self, day):
+        """Merged (start_minute, end_minute) intervals for a weekday name"""
+        return self._days.get(day.lower(), [])
+
+    def _interval_at(self, day, minute):
+        day = day.lower()
+        starts = self._starts.get(day)
+        if not starts:
+            return None
+        index = bisect_right(starts, minute) - 1
+        if index < 0:
+            return None
+        return self._days[day][index]
+
+    def contains(self, day, minute):
+        """True if minute falls inside a slot, inclusive of both ends (legacy is_available_at semantics)"""
+        interval = self._interval_at(day, minute)
+        return interval is not None and interval[0] <= minute <= interval[1]
+
+    def covers(self, day, start_minute, duration):
+        """True if [start, start + duration) lies entirely inside one slot"""
+        interval = self._interval_at(day, start_minute)
+        return interval is not None and start_minute + duration <= interval[1]
+
+    def total_hours(self):
+        """Total available hours per week"""
+        return sum(end - start for intervals in self._days.values() for start, end in intervals) / 60
+
+    def hours_for(self, day):
+        """Available hours on a weekday"""
+        return sum(end - start for start, end in self.intervals(day)) / 60
+
+
+class AvailabilityCache:
+    """Per-process cache of compiled availability keyed by tutor id.
+
+    Entries are keyed on the raw availability text, so any change to the column
+    (set_availability, form edits, raw updates) is picked up on the next lookup
+    without explicit invalidation.
+    """
+
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.builds = 0
+        self.hits = 0
+
+    def get(self, tutor_id, raw):
+        entry = self._entries.get(tutor_id)
+        if entry is not None and entry[0] == raw:
+            self.hits += 1
+            return entry[1]
+
+        compiled = WeeklyAvailability.from_json(raw)
+        with self._lock:
+            self._entries[tutor_id] = (raw, compiled)
+            self.builds += 1
+        return compiled
+
+    def invalidate(self, tutor_id=None):
+        with self._lock:
+            if tutor_id is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(tutor_id, None)
+
+    def get_stats(self):
+        return {'entries': len(self._entries), 'builds': self.builds, 'hits': self.hits}
+
+
+availability_cache = AvailabilityCache()
+
+
+def compiled_availability(tutor):
+    """Compiled WeeklyAvailability for a Tutor instance"""
+    if tutor.id is None:
+        return WeeklyAvailability.from_json(tutor.availability)
+    return availability_cache.get(tutor.id, tutor.availability)
+
+
+# ============ BUSY TIME (EXISTING CLASSES) ============
+
+def busy_intervals(tutor_ids, date_obj, exclude_class_id=None):
+    """Busy (start, end, class_id, class_type) minute intervals per tutor on one date.
+
+    One query for all requested tutors; only the columns needed for overlap tests
+    are loaded.
+    """
+    from app.models.class_model import Class
+
+    tutor_ids = list(tutor_ids)
+    busy = {tutor_id: [] for tutor_id in tutor_ids}
+    if not tutor_ids:
+        return busy
+
+    query = Class.query.with_entities(
+        Class.tutor_id, Class.id, Class.scheduled_time, Class.duration, Class.class_type
+    ).filter(
+        Class.tutor_id.in_(tutor_ids),
+        Class.scheduled_date == date_obj,
+        Class.status.in_(ACTIVE_CLASS_STATUSES)
+    )
+    if exclude_class_id:
+        query = query.filter(Class.id != exclude_class_id)
+
+    for tutor_id, class_id, scheduled_time, duration, class_type in query.all():
+        start = parse_minutes(scheduled_time)
+        if start is None:
+            continue
+        busy[tutor_id].append((start, start + (duration or 0), class_id, class_type))
+
+    for intervals in busy.values():
+        intervals.sort()
+    return busy
+
+
+def find_overlap(intervals, start, end):
+    """First busy interval overlapping [start, end), or None. intervals must be sorted by start."""
+    for interval in intervals:
+        if interval[0] >= end:
+            break
+        if interval[1] > start:
+            return interval
+    return None
+
+
+def free_slots(weekly, date_obj, busy, duration=60, step=30):
+    """Every [start, start + duration) window on date_obj, stepped by `step` minutes
+    from each availability interval start, that fits in a slot and misses all busy intervals.
+    """
+    day_name = DAY_NAMES[date_obj.weekday()]
+    slots = []
+    for slot_start, slot_end in weekly.intervals(day_name):
+        current = slot_start
+        while current + duration <= slot_end:
+            if find_overlap(busy, current, current + duration) is None:
+                slots.append({
+                    'start_time': format_minutes(current),
+                    'end_time': format_minutes(current + duration),
+                    'duration': duration
+                })
+            current += step
+    return slots
+
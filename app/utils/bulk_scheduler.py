@@ -0,0 +1,187 @@
+"""
+Set-based bulk class scheduling.
+
+Expands a weekly recurrence in memory, loads every existing class of the tutor
+in the date range with one query, tests each candidate against those classes by
+time interval (not just identical start time) and inserts the survivors with a
+single multi-row INSERT. The result is a created/skipped report that routes can
+flash or return as JSON.
+"""
+from datetime import datetime, timedelta
+import json
+from app import db
+from app.models.class_model import Class
+from app.models.class_student import ClassStudent
+from app.models.daily_stats import DailyClassStats
+from app.utils.performance_cache import tag_session_changes
+from app.utils.availability_engine import (
+    DAY_NAMES, ACTIVE_CLASS_STATUSES, parse_minutes, format_minutes, find_overlap
+)
+
+INSERT_CHUNK_SIZE = 500
+
+
+def expand_weekly_recurrence(start_date, end_date, days_of_week):
+    """Dates between start_date and end_date (inclusive) whose weekday() is in days_of_week"""
+    weekdays = set(days_of_week)
+    dates = []
+    current_date = start_date
+    while current_date <= end_date:
+        if current_date.weekday() in weekdays:
+            dates.append(current_date)
+        current_date += timedelta(days=1)
+    return dates
+
+
+def tutor_busy_by_date(tutor_id, start_date, end_date):
+    """Busy (start, end, class_id, class_type) minute intervals per date for one tutor, in one query"""
+    rows = Class.query.with_entities(
+        Class.scheduled_date, Class.id, Class.scheduled_time, Class.duration, Class.class_type
+    ).filter(
+        Class.tutor_id == tutor_id,
+        Class.scheduled_date >= start_date,
+        Class.scheduled_date <= end_date,
+        Class.status.in_(ACTIVE_CLASS_STATUSES)
+    ).all()
+
+    busy = {}
+    for scheduled_date, class_id, scheduled_time, duration, class_type in rows:
+        start = parse_minutes(scheduled_time)
+        if start is None:
+            continue
+        busy.setdefault(scheduled_date, []).append((start, start + (duration or 0), class_id, class_type))
+
+    for intervals in busy.values():
+        intervals.sort()
+    return busy
+
+
+class BulkClassScheduler:
+    """Plan and insert a recurring series of classes for one tutor"""
+
+    def __init__(self, tutor, start_time, duration):
+        self.tutor = tutor
+        self.start_time = start_time
+        self.duration = duration
+        self.start_minute = parse_minutes(start_time)
+        self.end_time = (datetime.combine(datetime.today(), start_time) + timedelta(minutes=duration)).time()
+
+    def plan(self, dates):
+        """Split candidate dates into (dates_to_create, skipped_entries)"""
+        if not dates:
+            return [], []
+
+        weekly = self.tutor.get_weekly_availability()
+        busy = tutor_busy_by_date(self.tutor.id, min(dates), max(dates))
+        end_minute = self.start_minute + self.duration
+        time_str = format_minutes(self.start_minute)
+
+        to_create = []
+        skipped = []
+        for date_obj in dates:
+            day_name = DAY_NAMES[date_obj.weekday()]
+            # Same rule as Tutor.is_available_at: the start time must fall inside a slot
+            if not weekly.contains(day_name, self.start_minute):
+                skipped.append({
+                    'date': date_obj.isoformat(),
+                    'time': time_str,
+                    'reason': 'tutor_unavailable'
+                })
+                continue
+
+            conflict = find_overlap(busy.get(date_obj, []), self.start_minute, end_minute)
+            if conflict:
+                skipped.append({
+                    'date': date_obj.isoformat(),
+                    'time': time_str,
+                    'reason': 'tutor_conflict',
+                    'conflict_class_id': conflict[2],
+                    'conflict_time': format_minutes(conflict[0])
+                })
+                continue
+
+            to_create.append(date_obj)
+
+        return to_create, skipped
+
+    def _row(self, date_obj, fields, student_ids, now):
+        row = dict(fields)
+        row.update({
+            'scheduled_date': date_obj,
+            'scheduled_time': self.start_time,
+            'duration': self.duration,
+            'end_time': self.end_time,
+            'tutor_id': self.tutor.id,
+            'status': 'scheduled',
+            'created_at': now,
+            'updated_at': now
+        })
+
+        # Mirrors Class.set_students
+        class_type = fields.get('class_type')
+        if class_type == 'group':
+            row['students'] = json.dumps(student_ids)
+        elif class_type == 'one_on_one' and student_ids:
+            row['primary_student_id'] = student_ids[0]
+        elif class_type == 'demo' and student_ids:
+            row['demo_student_id'] = student_ids[0]
+        return row
+
+    def _insert(self, rows):
+        """Multi-row INSERT; returns the new class IDs in row order"""
+        table = Class.__table__
+        dialect = db.session.get_bind().dialect
+        class_ids = []
+
+        for offset in range(0, len(rows), INSERT_CHUNK_SIZE):
+            chunk = rows[offset:offset + INSERT_CHUNK_SIZE]
+            statement = table.insert().values(chunk)
+            if getattr(dialect, 'insert_returning', False):
+                class_ids.extend(db.session.execute(statement.returning(table.c.id)).scalars().all())
+            else:
+                db.session.execute(statement)
+
+        if len(class_ids) != len(rows):
+            # No RETURNING support: look the rows back up by (tutor, date, time, status).
+            # plan() skipped every date with a conflicting class, so the newest match is ours;
+            # created_at is not compared since DATETIME columns may round the stored value.
+            id_by_date = dict(db.session.query(Class.scheduled_date, Class.id).filter(
+                Class.tutor_id == self.tutor.id,
+                Class.scheduled_date.in_([row['scheduled_date'] for row in rows]),
+                Class.scheduled_time == self.start_time,
+                Class.status == 'scheduled'
+            ).order_by(Class.id).all())
+            class_ids = [id_by_date.get(row['scheduled_date']) for row in rows]
+
+        return class_ids
+
+    def create(self, dates, fields, student_ids):
+        """Insert classes for every plannable date. Does not commit.
+
+        fields holds the shared column values (subject, class_type, grade, ...).
+        Returns {'created': [...], 'skipped': [...], 'created_count', 'skipped_count'}.
+        """
+        to_create, skipped = self.plan(dates)
+        created = []
+
+        if to_create:
+            now = datetime.utcnow()
+            rows = [self._row(date_obj, fields, student_ids, now) for date_obj in to_create]
+            class_ids = self._insert(rows)
+            ClassStudent.sync_many([class_id for class_id in class_ids if class_id])
+            DailyClassStats.record_inserted(rows)
+            # Core INSERT bypasses the ORM flush hooks
+            tag_session_changes('classes', 'dashboard')
+
+            created = [{
+                'class_id': class_id,
+                'date': date_obj.isoformat(),
+                'time': format_minutes(self.start_minute)
+            } for class_id, date_obj in zip(class_ids, to_create)]
+
+        return {
+            'created': created,
+            'skipped': skipped,
+            'created_count': len(created),
+            'skipped_count': len(skipped)
+        }
@@ -0,0 +1,250 @@
+"""
+Binary encoding for the Redis and file cache tiers.
+
+Values are serialized with a pluggable codec (msgpack when installed, pickle
+otherwise, or JSON) and compressed with zlib/brotli once they pass a size
+threshold. Types the codec cannot represent natively (datetime, date, time,
+timedelta, Decimal, UUID, set, tuple) go through a small type registry so they
+round-trip losslessly; ``register_type`` adds more.
+
+Every frame starts with a two byte header - codec tag, compression tag - so
+entries written with another codec or compression setting stay readable, and
+pre-existing plain JSON text entries are still decoded.
+"""
+from datetime import datetime, date, time, timedelta
+from decimal import Decimal
+import json
+import pickle
+import uuid
+import zlib
+
+try:
+    import msgpack
+except ImportError:  # optional dependency
+    msgpack = None
+
+try:
+    import brotli
+except ImportError:  # optional dependency
+    brotli = None
+
+DEFAULT_COMPRESS_THRESHOLD = 1024  # bytes
+MSGPACK_EXT_TYPE = 1
+TYPE_FIELD = '__lms_type__'
+
+
+class CodecError(Exception):
+    """Raised when a cached frame cannot be decoded"""
+
+
+# ============ TYPE REGISTRY ============
+
+_types_by_name = {}
+_types_by_class = {}
+
+
+def register_type(cls, name, encode, decode):
+    """Make cls cacheable: encode(obj) -> JSON/msgpack-native value, decode(value) -> obj"""
+    _types_by_name[name] = (cls, encode, decode)
+    _types_by_class[cls] = (name, encode)
+
+
+register_type(datetime, 'datetime', lambda v: v.isoformat(), datetime.fromisoformat)
+register_type(date, 'date', lambda v: v.isoformat(), date.fromisoformat)
+register_type(time, 'time', lambda v: v.isoformat(), time.fromisoformat)
+register_type(timedelta, 'timedelta', lambda v: [v.days, v.seconds, v.microseconds],
+              lambda v: timedelta(days=v[0], seconds=v[1], microseconds=v[2]))
+register_type(Decimal, 'decimal', str, Decimal)
+register_type(uuid.UUID, 'uuid', str, uuid.UUID)
+register_type(set, 'set', list, set)
+register_type(frozenset, 'frozenset', list, frozenset)
+register_type(tuple, 'tuple', list, tuple)
+
+
+def _encode_registered(obj):
+    """(name, encoded) for a registered type, or None"""
+    entry = _types_by_class.get(type(obj))
+    if entry is None:
+        return None
+    name, encode = entry
+    return name, encode(obj)
+
+
+def _decode_registered(name, value):
+    entry = _types_by_name.get(name)
+    if entry is None:
+        raise CodecError(f"Unknown cached type: {name}")
+    return entry[2](value)
+
+
+def _to_tagged(obj):
+    """Recursively replace registered types with {TYPE_FIELD: name, 'v': value}"""
+    if isinstance(obj, dict):
+        if not all(isinstance(key, str) for key in obj):
+            raise TypeError("JSON cannot keep non-string keys")  # falls back to pickle
+        return {key: _to_tagged(value) for key, value in obj.items()}
+    if isinstance(obj, list):
+        return [_to_tagged(value) for value in obj]
+
+    registered = _encode_registered(obj)
+    if registered is not None:
+        return {TYPE_FIELD: registered[0], 'v': _to_tagged(registered[1])}
+    return obj
+
+
+def _from_tagged(obj):
+    if isinstance(obj, dict):
+        if TYPE_FIELD in obj and len(obj) == 2 and 'v' in obj:
+            return _decode_registered(obj[TYPE_FIELD], _from_tagged(obj['v']))
+        return {key: _from_tagged(value) for key, value in obj.items()}
+    if isinstance(obj, list):
+        return [_from_tagged(value) for value in obj]
+    return obj
+
+
+# ============ CODECS ============
+
+class JsonCodec:
+    tag = b'J'
+    name = 'json'
+
+    def dumps(self, value):
+        return json.dumps(_to_tagged(value), separators=(',', ':')).encode('utf-8')
+
+    def loads(self, payload):
+        return _from_tagged(json.loads(payload))
+
+
+class PickleCodec:
+    """Handles anything picklable (ORM rows, custom classes); only use with a trusted Redis"""
+    tag = b'P'
+    name = 'pickle'
+
+    def dumps(self, value):
+        return pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+
+    def loads(self, payload):
+        return pickle.loads(payload)
+
+
+class MsgpackCodec:
+    tag = b'M'
+    name = 'msgpack'
+
+    def _default(self, obj):
+        registered = _encode_registered(obj)
+        if registered is None:
+            if isinstance(obj, dict):
+                return dict(obj)
+            if isinstance(obj, list):
+                return list(obj)
+            raise TypeError(f"Cannot cache object of type {type(obj).__name__}")
+        return msgpack.ExtType(MSGPACK_EXT_TYPE, msgpack.packb(list(registered), default=self._default,
+                                                                use_bin_type=True, strict_types=True))
+
+    def _ext_hook(self, code, data):
+        if code != MSGPACK_EXT_TYPE:
+            return msgpack.ExtType(code, data)
+        name, value = msgpack.unpackb(data, ext_hook=self._ext_hook, raw=False, strict_map_key=False)
+        return _decode_registered(name, value)
+
+    def dumps(self, value):
+        # Tuples are registered explicitly so they do not come back as lists
+        return msgpack.packb(value, default=self._default, use_bin_type=True, strict_types=True)
+
+    def loads(self, payload):
+        return msgpack.unpackb(payload, ext_hook=self._ext_hook, raw=False, strict_map_key=False)
+
+
+CODECS = {'json': JsonCodec, 'pickle': PickleCodec}
+if msgpack is not None:
+    CODECS['msgpack'] = MsgpackCodec
+
+_CODECS_BY_TAG = {codec.tag: codec() for codec in CODECS.values()}
+
+# ============ COMPRESSION ============
+
+_COMPRESSORS = {
+    b'-': (None, None),
+    b'z': (lambda data: zlib.compress(data, 6), zlib.decompress),
+}
+if brotli is not None:
+    _COMPRESSORS[b'b'] = (lambda data: brotli.compress(data, quality=5), brotli.decompress)
+
+_COMPRESSION_TAGS = {'none': b'-', 'zlib': b'z', 'brotli': b'b'}
+
+
+class CacheSerializer:
+    """Encode values to framed bytes and back"""
+
+    def __init__(self, codec='auto', compression='zlib', compress_threshold=DEFAULT_COMPRESS_THRESHOLD):
+        self.configure(codec, compression, compress_threshold)
+        self.stats = {'encoded': 0, 'compressed': 0, 'pickle_fallbacks': 0, 'bytes_raw': 0, 'bytes_stored': 0}
+
+    def configure(self, codec='auto', compression='zlib', compress_threshold=DEFAULT_COMPRESS_THRESHOLD):
+        if codec == 'auto':
+            codec = 'msgpack' if 'msgpack' in CODECS else 'pickle'
+        if codec not in CODECS:
+            print(f"⚠️  Cache codec '{codec}' not available, using pickle")
+            codec = 'pickle'
+        self.codec = _CODECS_BY_TAG[CODECS[codec].tag]
+
+        compression_tag = _COMPRESSION_TAGS.get(compression or 'none', b'-')
+        if compression_tag not in _COMPRESSORS:
+            print(f"⚠️  Cache compression '{compression}' not available, using zlib")
+            compression_tag = b'z'
+        self.compression_tag = compression_tag
+        self.compress_threshold = compress_threshold
+
+    def dumps(self, value):
+        codec = self.codec
+        try:
+            payload = codec.dumps(value)
+        except (TypeError, ValueError, OverflowError):
+            # Types outside the registry (ORM objects, custom classes)
+            codec = _CODECS_BY_TAG[PickleCodec.tag]
+            payload = codec.dumps(value)
+            self.stats['pickle_fallbacks'] += 1
+        self.stats['encoded'] += 1
+        self.stats['bytes_raw'] += len(payload)
+
+        compression_tag = b'-'
+        if self.compression_tag != b'-' and len(payload) >= self.compress_threshold:
+            compressed = _COMPRESSORS[self.compression_tag][0](payload)
+            if len(compressed) < len(payload):
+                payload = compressed
+                compression_tag = self.compression_tag
+                self.stats['compressed'] += 1
+
+        self.stats['bytes_stored'] += len(payload) + 2
+        return codec.tag + compression_tag + payload
+
+    def loads(self, frame):
+        if isinstance(frame, str):
+            frame = frame.encode('utf-8')
+        if not frame:
+            raise CodecError("Empty cache frame")
+
+        codec = _CODECS_BY_TAG.get(frame[:1])
+        compressor = _COMPRESSORS.get(frame[1:2])
+        if codec is None or compressor is None:
+            # Entries written before the codec layer were plain JSON text
+            try:
+                return json.loads(frame)
+            except ValueError as e:
+                raise CodecError(f"Unrecognized cache frame: {e}")
+
+        payload = frame[2:]
+        if compressor[1] is not None:
+            payload = compressor[1](payload)
+        try:
+            return codec.loads(payload)
+        except Exception as e:
+            raise CodecError(f"{codec.name} decode failed: {e}")
+
+    def get_stats(self):
+        raw = self.stats['bytes_raw']
+        return dict(self.stats, codec=self.codec.name,
+                    compression=next(name for name, tag in _COMPRESSION_TAGS.items() if tag == self.compression_tag),
+                    compress_threshold=self.compress_threshold,
+                    compression_ratio=round(self.stats['bytes_stored'] / raw, 3) if raw else None)
@@ -64,6 +64,7 @@ class DatabaseOptimizer:
             "CREATE INDEX IF NOT EXISTS idx_classes_tutor ON classes(tutor_id);",
             "CREATE INDEX IF NOT EXISTS idx_classes_status ON classes(status);",
             "CREATE INDEX IF NOT EXISTS idx_classes_date_status ON classes(scheduled_date, status);",
+            "CREATE INDEX IF NOT EXISTS idx_classes_date_time_id ON classes(scheduled_date, scheduled_time, id);",
             
             # Attendance table indexes
             "CREATE INDEX IF NOT EXISTS idx_attendance_date ON attendance(class_date);",
@@ -156,90 +157,76 @@ class DatabaseOptimizer:
                 self.query_stats['fast'] += 1
     
     def get_optimized_dashboard_stats(self):
-        """Get dashboard statistics with single optimized query"""
+        """Get dashboard statistics with one conditional-aggregate query per table"""
+        from sqlalchemy import or_
+        from app.models.user import User
+        from app.models.student import Student
+        from app.models.daily_stats import DailyClassStats, DailyAttendanceStats
+        from app.utils.aggregates import aggregate_counts, aggregate_sums, period_bounds
+        
+        bounds = period_bounds()
+        today = bounds['today']
+        
         with self.fast_query("Dashboard statistics"):
-            # Single complex query instead of multiple queries
-            query = text("""
-                WITH user_stats AS (
-                    SELECT 
-                        COUNT(*) FILTER (WHERE is_active = true) as total_users,
-                        COUNT(*) FILTER (WHERE role IN ('superadmin', 'admin', 'coordinator') AND is_active = true) as total_admins,
-                        COUNT(*) FILTER (WHERE role = 'tutor' AND is_active = true) as total_tutors
-                    FROM users
-                ),
-                student_stats AS (
-                    SELECT 
-                        COUNT(*) FILTER (WHERE is_active = true) as total_students,
-                        COUNT(*) FILTER (WHERE is_active = true AND created_at >= CURRENT_DATE - INTERVAL '1 month') as new_students_month,
-                        COUNT(*) FILTER (WHERE is_active = true AND created_at >= CURRENT_DATE - INTERVAL '1 week') as new_students_week
-                    FROM students
-                ),
-                class_stats AS (
-                    SELECT 
-                        COUNT(*) FILTER (WHERE scheduled_date = CURRENT_DATE) as todays_classes,
-                        COUNT(*) FILTER (WHERE scheduled_date >= DATE_TRUNC('month', CURRENT_DATE) AND scheduled_date <= CURRENT_DATE) as total_classes_month,
-                        COUNT(*) FILTER (WHERE scheduled_date >= DATE_TRUNC('month', CURRENT_DATE) AND scheduled_date <= CURRENT_DATE AND status = 'completed') as completed_classes_month,
-                        COUNT(*) FILTER (WHERE scheduled_date > CURRENT_DATE AND status = 'scheduled') as upcoming_classes
-                    FROM classes
-                ),
-                attendance_today AS (
-                    SELECT 
-                        COUNT(*) as total,
-                        COUNT(*) FILTER (WHERE tutor_present = true AND student_present = true) as present,
-                        COUNT(*) FILTER (WHERE tutor_present = false OR student_present = false) as absent,
-                        COUNT(*) FILTER (WHERE tutor_late_minutes > 5 OR student_late_minutes > 5) as late
-                    FROM attendance 
-                    WHERE class_date = CURRENT_DATE
-                ),
-                attendance_week AS (
-                    SELECT 
-                        COUNT(*) as total,
-                        COUNT(*) FILTER (WHERE tutor_present = true AND student_present = true) as present
-                    FROM attendance 
-                    WHERE class_date >= CURRENT_DATE - INTERVAL '1 week'
-                )
-                SELECT 
-                    u.total_users, u.total_admins, u.total_tutors,
-                    s.total_students, s.new_students_month, s.new_students_week,
-                    c.todays_classes, c.total_classes_month, c.completed_classes_month, c.upcoming_classes,
-                    at.total as attendance_total, at.present as attendance_present, 
-                    at.absent as attendance_absent, at.late as attendance_late,
-                    aw.total as week_total, aw.present as week_present
-                FROM user_stats u, student_stats s, class_stats c, attendance_today at, attendance_week aw;
-            """)
+            users = aggregate_counts(User, {
+                'total_users': None,
+                'total_admins': User.role.in_(['superadmin', 'admin', 'coordinator']),
+                'total_tutors': User.role == 'tutor'
+            }, where=User.is_active.is_(True))
             
-            result = db.session.execute(query).fetchone()
+            students = aggregate_counts(Student, {
+                'total_students': None,
+                'new_students_month': Student.created_at >= bounds['last_30_days'],
+                'new_students_week': Student.created_at >= bounds['last_7_days']
+            }, where=Student.is_active.is_(True))
             
-            if result:
-                return {
-                    'total_users': int(result.total_users or 0),
-                    'total_admins': int(result.total_admins or 0),
-                    'total_tutors': int(result.total_tutors or 0),
-                    'total_students': int(result.total_students or 0),
-                    'new_students_this_month': int(result.new_students_month or 0),
-                    'new_students_this_week': int(result.new_students_week or 0),
-                    'todays_classes': int(result.todays_classes or 0),
-                    'total_classes_this_month': int(result.total_classes_month or 0),
-                    'completed_classes_this_month': int(result.completed_classes_month or 0),
-                    'upcoming_classes': int(result.upcoming_classes or 0),
-                    'todays_attendance': {
-                        'total': int(result.attendance_total or 0),
-                        'present': int(result.attendance_present or 0),
-                        'absent': int(result.attendance_absent or 0),
-                        'late': int(result.attendance_late or 0)
-                    },
-                    'week_attendance': {
-                        'total': int(result.week_total or 0),
-                        'present': int(result.week_present or 0),
-                        'completion_rate': round((result.week_present / result.week_total * 100) if result.week_total > 0 else 0, 1)
-                    },
-                    'departments': [],  # Can be loaded separately if needed
-                    'performance': {},
-                    'finance': {},
-                    'system_health': {}
-                }
+            # Classes and attendance come from the daily rollups: O(days) rows
+            classes = DailyClassStats.class_count
+            is_this_month = (DailyClassStats.stat_date >= bounds['month_start']) & (DailyClassStats.stat_date <= today)
+            class_counts = aggregate_sums(DailyClassStats, {
+                'todays_classes': (classes, DailyClassStats.stat_date == today),
+                'total_classes_month': (classes, is_this_month),
+                'completed_classes_month': (classes, is_this_month & (DailyClassStats.status == 'completed')),
+                'upcoming_classes': (classes, (DailyClassStats.stat_date > today) & (DailyClassStats.status == 'scheduled'))
+            }, where=or_(DailyClassStats.stat_date >= bounds['month_start'], DailyClassStats.status == 'scheduled'))
             
-            return self._get_fallback_stats()
+            is_today = DailyAttendanceStats.stat_date == today
+            attendance = aggregate_sums(DailyAttendanceStats, {
+                'attendance_total': (DailyAttendanceStats.record_count, is_today),
+                'attendance_present': (DailyAttendanceStats.present_count, is_today),
+                'attendance_absent': (DailyAttendanceStats.absent_count, is_today),
+                'attendance_late': (DailyAttendanceStats.late_count, is_today),
+                'week_total': (DailyAttendanceStats.record_count, None),
+                'week_present': (DailyAttendanceStats.present_count, None)
+            }, where=DailyAttendanceStats.stat_date >= bounds['last_7_days'])
+        
+        return {
+            'total_users': users['total_users'],
+            'total_admins': users['total_admins'],
+            'total_tutors': users['total_tutors'],
+            'total_students': students['total_students'],
+            'new_students_this_month': students['new_students_month'],
+            'new_students_this_week': students['new_students_week'],
+            'todays_classes': class_counts['todays_classes'],
+            'total_classes_this_month': class_counts['total_classes_month'],
+            'completed_classes_this_month': class_counts['completed_classes_month'],
+            'upcoming_classes': class_counts['upcoming_classes'],
+            'todays_attendance': {
+                'total': attendance['attendance_total'],
+                'present': attendance['attendance_present'],
+                'absent': attendance['attendance_absent'],
+                'late': attendance['attendance_late']
+            },
+            'week_attendance': {
+                'total': attendance['week_total'],
+                'present': attendance['week_present'],
+                'completion_rate': round((attendance['week_present'] / attendance['week_total'] * 100) if attendance['week_total'] > 0 else 0, 1)
+            },
+            'departments': [],  # Can be loaded separately if needed
+            'performance': {},
+            'finance': {},
+            'system_health': {}
+        }
     
     def _get_fallback_stats(self):
         """Fallback statistics with minimal data"""
@@ -1,7 +1,7 @@
 from flask import current_app, render_template
 from flask_mail import Message
 from app import mail
-import threading
+from app.utils.email_queue import email_queue
 import logging
 
 # Set up logging for email operations
@@ -22,7 +22,7 @@ def send_async_email(app, msg):
         email_logger.error(traceback.format_exc())
         return False
 
-def send_email(subject, recipients, text_body, html_body, sender=None, sync=False):
+def send_email(subject, recipients, text_body, html_body, sender=None, sync=False, email_type=None, priority=0):
     """
     Send email function with optional synchronous sending
     
@@ -33,9 +33,13 @@ def send_email(subject, recipients, text_body, html_body, sender=None, sync=Fals
         html_body (str): HTML email body
         sender (str, optional): Sender email address
         sync (bool): If True, send synchronously and return result
+        email_type (str, optional): Category recorded on the outbox row
+        priority (int): Queue priority, higher is sent first (async only)
     
     Returns:
-        bool: True if sent successfully (only when sync=True)
+        bool when sync=True; otherwise the email_outbox id of the queued
+        message (see email_queue.get_status), or None if it could not be queued
+        (the message is then sent directly; failures are logged with traceback)
     """
     try:
         if not sender:
@@ -61,20 +65,50 @@ def send_email(subject, recipients, text_body, html_body, sender=None, sync=Fals
                 email_logger.error(f"Failed to send email (sync) to {recipients}: {str(e)}")
                 return False
         else:
-            # Send email in background thread (original behavior)
-            thread = threading.Thread(
-                target=send_async_email, 
-                args=(current_app._get_current_object(), msg)
-            )
-            thread.daemon = True  # Allow main thread to exit even if email thread is running
-            thread.start()
-            email_logger.info(f"Email queued for async sending to {recipients}")
+            # Durable outbox drained by the pooled SMTP workers
+            try:
+                outbox_id = email_queue.enqueue(
+                    subject, recipients, text_body=text_body, html_body=html_body,
+                    sender=sender, email_type=email_type, priority=priority
+                )
+            except Exception as e:
+                # Not queued: deliver directly rather than lose the message
+                email_logger.exception(f"Failed to queue email to {recipients}, sending directly: {str(e)}")
+                mail.send(msg)
+                email_logger.info(f"Email sent directly to {recipients} after queue failure")
+                return None
+            email_logger.info(f"Email {outbox_id} queued for async sending to {recipients}")
+            return outbox_id
             
     except Exception as e:
-        email_logger.error(f"Error preparing email: {str(e)}")
+        email_logger.exception(f"Error preparing email: {str(e)}")
         if sync:
             return False
 
+def send_bulk_email(messages, email_type=None, priority=0, on_chunk=None):
+    """
+    Queue many emails at once (one INSERT per chunk instead of one per message)
+    
+    Args:
+        messages (iterable): dicts with subject, recipients, text_body, html_body;
+            a generator is consumed lazily and queued chunk by chunk
+        email_type (str, optional): Category recorded on the outbox rows
+        priority (int): Queue priority, higher is sent first
+        on_chunk (callable, optional): called with each chunk of message dicts
+            once it is in the outbox (see EmailQueue.enqueue_many)
+    
+    Returns:
+        int: Number of messages queued
+    """
+    try:
+        queued = email_queue.enqueue_many(messages, email_type=email_type, priority=priority,
+                                          on_chunk=on_chunk)
+        email_logger.info(f"Queued {queued} emails for async sending")
+        return queued
+    except Exception as e:
+        email_logger.error(f"Error queueing bulk email: {str(e)}")
+        return 0
+
 def send_password_reset_email(user, token):
     """Send password reset email"""
     subject = f'[{current_app.config["APP_NAME"]}] Password Reset Request'
@@ -0,0 +1,484 @@
+"""
+Durable outbound email queue.
+
+``enqueue`` inserts a row into ``email_outbox`` and wakes the worker pool. When
+the caller's session already has writes in flight the row joins that
+transaction (a second connection would wait on the caller's write lock on
+SQLite) and workers are woken after it commits; the mail is then sent only if
+the caller's changes are committed. Otherwise the row is written in its own
+short transaction. A fixed number of worker threads per process claim
+pending rows in batches with an atomic UPDATE, so several processes can drain
+the same table, and send each batch over a single SMTP connection:
+
+- per-provider token-bucket rate limiting (``EMAIL_RATE_LIMITS``)
+- exponential backoff with jitter on failure, up to ``max_attempts``
+- rows left in 'sending' by a crashed worker are reclaimed after ``EMAIL_LOCK_TIMEOUT``
+
+Delivery status is recorded on the row; ``get_status(outbox_id)`` returns it.
+"""
+from datetime import datetime, timedelta
+import json
+import logging
+import random
+import smtplib
+import threading
+import time
+import uuid
+import click
+from flask import current_app
+from flask_mail import Message
+from sqlalchemy import and_, event, func, or_
+from sqlalchemy.orm import Session
+from app import db, mail
+from app.models.email_outbox import EmailOutbox
+
+queue_logger = logging.getLogger('email.queue')
+
+DEFAULT_WORKERS = 2
+DEFAULT_BATCH_SIZE = 50
+DEFAULT_POLL_INTERVAL = 5.0  # seconds an idle worker sleeps before polling again
+DEFAULT_LOCK_TIMEOUT = 600  # seconds before a 'sending' row is considered abandoned
+DEFAULT_MAX_ATTEMPTS = 5
+DEFAULT_RETRY_BASE = 30  # seconds, doubled per attempt
+DEFAULT_RETRY_MAX = 3600
+DEFAULT_RATE_LIMIT = 5.0  # messages per second per provider
+ENQUEUE_CHUNK_SIZE = 500
+
+# Failures that will not succeed on retry
+PERMANENT_ERRORS = (smtplib.SMTPRecipientsRefused, smtplib.SMTPSenderRefused, smtplib.SMTPNotSupportedError)
+# Failures that poison the connection: the rest of the batch is released untouched.
+# smtplib.SMTPException subclasses OSError, so plain socket errors are matched separately
+# after per-message SMTP rejections (SMTPDataError, SMTPResponseException...) are handled.
+CONNECTION_ERRORS = (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError,
+                     smtplib.SMTPAuthenticationError)
+
+
+class ProviderRateLimiter:
+    """Token bucket per SMTP provider, shared by all workers in the process"""
+
+    def __init__(self, default_rate=DEFAULT_RATE_LIMIT, rates=None):
+        self.default_rate = default_rate
+        self.rates = dict(rates or {})
+        self._buckets = {}  # provider -> [tokens, last_refill]
+        self._lock = threading.Lock()
+
+    def rate_for(self, provider):
+        return float(self.rates.get(provider, self.default_rate))
+
+    def acquire(self, provider):
+        """Block until provider has a send token"""
+        rate = self.rate_for(provider)
+        if rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                bucket = self._buckets.setdefault(provider, [rate, now])
+                bucket[0] = min(rate, bucket[0] + (now - bucket[1]) * rate)
+                bucket[1] = now
+                if bucket[0] >= 1:
+                    bucket[0] -= 1
+                    return
+                wait = (1 - bucket[0]) / rate
+            time.sleep(wait)
+
+
+class EmailQueue:
+    """Outbox writer plus the per-process worker pool that drains it"""
+
+    def __init__(self):
+        self.app = None
+        self.worker_count = DEFAULT_WORKERS
+        self.batch_size = DEFAULT_BATCH_SIZE
+        self.poll_interval = DEFAULT_POLL_INTERVAL
+        self.lock_timeout = DEFAULT_LOCK_TIMEOUT
+        self.max_attempts = DEFAULT_MAX_ATTEMPTS
+        self.retry_base = DEFAULT_RETRY_BASE
+        self.retry_max = DEFAULT_RETRY_MAX
+        self.limiter = ProviderRateLimiter()
+        self._workers = []
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._start_lock = threading.Lock()
+        self.stats = {'enqueued': 0, 'sent': 0, 'retried': 0, 'failed': 0, 'batches': 0}
+
+    def init_app(self, app):
+        self.app = app
+        self.worker_count = app.config.get('EMAIL_QUEUE_WORKERS', DEFAULT_WORKERS)
+        self.batch_size = app.config.get('EMAIL_QUEUE_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+        self.poll_interval = app.config.get('EMAIL_QUEUE_POLL_INTERVAL', DEFAULT_POLL_INTERVAL)
+        self.lock_timeout = app.config.get('EMAIL_LOCK_TIMEOUT', DEFAULT_LOCK_TIMEOUT)
+        self.max_attempts = app.config.get('EMAIL_MAX_ATTEMPTS', DEFAULT_MAX_ATTEMPTS)
+        self.retry_base = app.config.get('EMAIL_RETRY_BASE', DEFAULT_RETRY_BASE)
+        self.retry_max = app.config.get('EMAIL_RETRY_MAX', DEFAULT_RETRY_MAX)
+        self.limiter = ProviderRateLimiter(
+            app.config.get('EMAIL_RATE_LIMIT_DEFAULT', DEFAULT_RATE_LIMIT),
+            app.config.get('EMAIL_RATE_LIMITS')
+        )
+        app.extensions['email_queue'] = self
+        register_email_queue_commands(app)
+
+        if app.config.get('EMAIL_QUEUE_AUTOSTART', True):
+            # Resume mail left pending by a previous process once the app serves traffic
+            @app.before_request
+            def _start_email_workers():
+                if not self._workers:
+                    self.start()
+
+    # ============ PRODUCER ============
+
+    def enqueue(self, subject, recipients, text_body=None, html_body=None, sender=None, cc=None, bcc=None,
+                email_type=None, priority=0, max_attempts=None):
+        """Persist a message for delivery and return its outbox id"""
+        now = datetime.utcnow()
+        row = {
+            'subject': subject,
+            'sender': sender,
+            'recipients': json.dumps(list(recipients)),
+            'cc': json.dumps(list(cc)) if cc else None,
+            'bcc': json.dumps(list(bcc)) if bcc else None,
+            'text_body': text_body,
+            'html_body': html_body,
+            'email_type': email_type,
+            'status': EmailOutbox.STATUS_PENDING,
+            'priority': priority,
+            'attempts': 0,
+            'max_attempts': max_attempts or self.max_attempts,
+            'next_attempt_at': now,
+            'created_at': now
+        }
+
+        statement = EmailOutbox.__table__.insert().values(row)
+        if _has_pending_writes(db.session):
+            outbox_id = db.session.execute(statement).inserted_primary_key[0]
+            db.session.info['email_queue_wake'] = True
+        else:
+            # Own transaction: the message is durable even if the caller never commits
+            with db.engine.begin() as connection:
+                outbox_id = connection.execute(statement).inserted_primary_key[0]
+            self._wake_workers()
+
+        self.stats['enqueued'] += 1
+        return outbox_id
+
+    def enqueue_many(self, messages, email_type=None, priority=0, on_chunk=None):
+        """Persist many messages with chunked multi-row INSERTs; returns how many were queued.
+
+        messages: any iterable (a generator is consumed lazily) of dicts with
+        subject, recipients and optional text_body, html_body, sender, cc, bcc,
+        email_type. Each chunk is committed on its own and the workers are woken
+        straight away, so delivery starts while the rest is still being rendered.
+        Inside a caller transaction with pending writes the chunks join it instead
+        (see ``enqueue``). on_chunk(messages) is called after each chunk is
+        written, so callers can record progress that survives a later failure;
+        extra keys on the message dicts are passed through to it.
+        """
+        queued = 0
+        chunk = []
+        for message in messages:
+            if not message.get('recipients'):
+                continue
+            chunk.append(message)
+            if len(chunk) >= ENQUEUE_CHUNK_SIZE:
+                queued += self._insert_chunk(chunk, email_type, priority, on_chunk)
+                chunk = []
+        if chunk:
+            queued += self._insert_chunk(chunk, email_type, priority, on_chunk)
+        return queued
+
+    def _outbox_row(self, message, email_type, priority):
+        now = datetime.utcnow()
+        return {
+            'subject': message['subject'],
+            'sender': message.get('sender'),
+            'recipients': json.dumps(list(message['recipients'])),
+            'cc': json.dumps(list(message['cc'])) if message.get('cc') else None,
+            'bcc': json.dumps(list(message['bcc'])) if message.get('bcc') else None,
+            'text_body': message.get('text_body'),
+            'html_body': message.get('html_body'),
+            'email_type': message.get('email_type', email_type),
+            'status': EmailOutbox.STATUS_PENDING,
+            'priority': priority,
+            'attempts': 0,
+            'max_attempts': self.max_attempts,
+            'next_attempt_at': now,
+            'created_at': now
+        }
+
+    def _insert_chunk(self, messages, email_type, priority, on_chunk=None):
+        rows = [self._outbox_row(message, email_type, priority) for message in messages]
+        if _has_pending_writes(db.session):
+            db.session.execute(EmailOutbox.__table__.insert(), rows)
+            db.session.info['email_queue_wake'] = True
+        else:
+            with db.engine.begin() as connection:
+                connection.execute(EmailOutbox.__table__.insert(), rows)
+            self._wake_workers()
+
+        self.stats['enqueued'] += len(rows)
+        if on_chunk is not None:
+            on_chunk(messages)
+        return len(rows)
+
+    def _wake_workers(self):
+        self.start()
+        self._wake.set()
+
+    # ============ WORKERS ============
+
+    def start(self, app=None):
+        """Start the worker pool for this process (no-op if already running)"""
+        app = app or self.app or current_app._get_current_object()
+        with self._start_lock:
+            self._workers = [worker for worker in self._workers if worker.is_alive()]
+            if self._workers:
+                return
+            self._stop.clear()
+            for index in range(self.worker_count):
+                worker = threading.Thread(target=self._worker_loop, args=(app,),
+                                          name=f'email-worker-{index}', daemon=True)
+                worker.start()
+                self._workers.append(worker)
+        queue_logger.info(f"Started {self.worker_count} email queue workers")
+
+    def stop(self, timeout=10):
+        self._stop.set()
+        self._wake.set()
+        for worker in self._workers:
+            worker.join(timeout)
+        self._workers = []
+
+    def _worker_loop(self, app):
+        with app.app_context():
+            while not self._stop.is_set():
+                try:
+                    processed = self.process_batch()
+                except Exception as e:
+                    queue_logger.error(f"Email worker error: {str(e)}")
+                    db.session.rollback()
+                    processed = 0
+                finally:
+                    db.session.remove()
+
+                if not processed:
+                    self._wake.wait(self.poll_interval)
+                    self._wake.clear()
+
+    def claim_batch(self, limit=None):
+        """Atomically mark up to `limit` due rows as 'sending'; returns (token, rows)"""
+        table = EmailOutbox.__table__
+        now = datetime.utcnow()
+        token = uuid.uuid4().hex
+        due = or_(
+            and_(table.c.status == EmailOutbox.STATUS_PENDING, table.c.next_attempt_at <= now),
+            and_(table.c.status == EmailOutbox.STATUS_SENDING,
+                 table.c.locked_at < now - timedelta(seconds=self.lock_timeout))
+        )
+
+        candidate_ids = db.session.execute(
+            db.select(table.c.id).where(due)
+            .order_by(table.c.priority.desc(), table.c.next_attempt_at, table.c.id)
+            .limit(limit or self.batch_size)
+        ).scalars().all()
+        if not candidate_ids:
+            db.session.rollback()
+            return token, []
+
+        # Re-checking `due` makes the claim safe against other workers and processes
+        db.session.execute(
+            table.update().where(table.c.id.in_(candidate_ids), due)
+            .values(status=EmailOutbox.STATUS_SENDING, locked_by=token, locked_at=now)
+        )
+        db.session.commit()
+
+        rows = EmailOutbox.query.filter_by(locked_by=token, status=EmailOutbox.STATUS_SENDING)\
+            .order_by(EmailOutbox.priority.desc(), EmailOutbox.id).all()
+        return token, rows
+
+    def process_batch(self, limit=None):
+        """Claim and deliver one batch; returns the number of rows handled"""
+        token, rows = self.claim_batch(limit)
+        if not rows:
+            return 0
+
+        provider = current_app.config.get('MAIL_SERVER') or 'default'
+        default_sender = current_app.config.get('MAIL_DEFAULT_SENDER') or current_app.config.get('MAIL_USERNAME')
+        self.stats['batches'] += 1
+        handled = 0
+
+        try:
+            # One SMTP connection for the whole batch
+            with mail.connect() as connection:
+                for row in rows:
+                    self.limiter.acquire(provider)
+                    try:
+                        connection.send(self._build_message(row, default_sender))
+                    except PERMANENT_ERRORS as e:
+                        self._record_failure(row, e, provider, permanent=True)
+                    except CONNECTION_ERRORS:
+                        raise
+                    except smtplib.SMTPException as e:
+                        # Rejected by the server for this message only: retry the row later
+                        self._record_failure(row, e, provider)
+                    except OSError:
+                        raise
+                    except Exception as e:
+                        self._record_failure(row, e, provider)
+                    else:
+                        self._record_sent(row, provider)
+                    handled += 1
+        except Exception as e:
+            # Connection-level failure: the current row counts as an attempt, the rest go back untouched
+            queue_logger.error(f"SMTP connection failed for batch {token}: {str(e)}")
+            if handled < len(rows):
+                self._record_failure(rows[handled], e, provider)
+                handled += 1
+            self._release(rows[handled:])
+
+        db.session.commit()
+        return handled
+
+    def _build_message(self, row, default_sender):
+        msg = Message(row.subject, sender=row.sender or default_sender, recipients=row.get_recipients(),
+                      cc=row.get_cc() or None, bcc=row.get_bcc() or None)
+        msg.body = row.text_body
+        msg.html = row.html_body
+        return msg
+
+    def _record_sent(self, row, provider):
+        row.status = EmailOutbox.STATUS_SENT
+        row.attempts += 1
+        row.provider = provider
+        row.sent_at = datetime.utcnow()
+        row.last_error = None
+        row.locked_by = None
+        row.locked_at = None
+        self.stats['sent'] += 1
+        queue_logger.info(f"Email {row.id} sent to {row.get_recipients()}")
+
+    def _record_failure(self, row, error, provider, permanent=False):
+        row.attempts += 1
+        row.provider = provider
+        row.last_error = f"{type(error).__name__}: {str(error)}"[:2000]
+        row.locked_by = None
+        row.locked_at = None
+
+        if permanent or row.attempts >= row.max_attempts:
+            row.status = EmailOutbox.STATUS_FAILED
+            self.stats['failed'] += 1
+            queue_logger.error(f"Email {row.id} failed permanently after {row.attempts} attempts: {row.last_error}")
+        else:
+            delay = min(self.retry_base * 2 ** (row.attempts - 1), self.retry_max)
+            row.status = EmailOutbox.STATUS_PENDING
+            row.next_attempt_at = datetime.utcnow() + timedelta(seconds=delay * random.uniform(0.8, 1.2))
+            self.stats['retried'] += 1
+            queue_logger.warning(f"Email {row.id} attempt {row.attempts} failed, retrying in ~{delay}s: {row.last_error}")
+
+    def _release(self, rows):
+        for row in rows:
+            row.status = EmailOutbox.STATUS_PENDING
+            row.locked_by = None
+            row.locked_at = None
+
+    # ============ STATUS ============
+
+    def get_status(self, outbox_id):
+        """Delivery status dict for an outbox id, or None"""
+        row = db.session.get(EmailOutbox, outbox_id)
+        return row.to_dict() if row else None
+
+    def retry_failed(self, since=None):
+        """Put failed messages back in the queue; returns how many"""
+        table = EmailOutbox.__table__
+        query = table.update().where(table.c.status == EmailOutbox.STATUS_FAILED)
+        if since:
+            query = query.where(table.c.created_at >= since)
+        result = db.session.execute(query.values(
+            status=EmailOutbox.STATUS_PENDING, attempts=0, next_attempt_at=datetime.utcnow()
+        ))
+        db.session.commit()
+        self._wake.set()
+        return result.rowcount
+
+    def get_stats(self):
+        counts = dict(db.session.query(EmailOutbox.status, func.count(EmailOutbox.id))
+                      .group_by(EmailOutbox.status).all())
+        return {
+            'outbox': {status: counts.get(status, 0) for status in (
+                EmailOutbox.STATUS_PENDING, EmailOutbox.STATUS_SENDING,
+                EmailOutbox.STATUS_SENT, EmailOutbox.STATUS_FAILED)},
+            'workers_alive': sum(1 for worker in self._workers if worker.is_alive()),
+            'process': dict(self.stats)
+        }
+
+
+email_queue = EmailQueue()
+
+
+# ============ SESSION HOOKS ============
+
+def _has_pending_writes(session):
+    """True when the session holds (or is about to take) a write lock in an open transaction"""
+    return bool(session.new or session.dirty or session.deleted or session.info.get('email_queue_flushed'))
+
+
+@event.listens_for(Session, 'after_flush')
+def _email_queue_after_flush(session, flush_context):
+    session.info['email_queue_flushed'] = True
+
+
+@event.listens_for(Session, 'after_commit')
+def _email_queue_after_commit(session):
+    session.info.pop('email_queue_flushed', None)
+    if session.info.pop('email_queue_wake', False):
+        email_queue._wake_workers()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _email_queue_after_rollback(session):
+    session.info.pop('email_queue_flushed', None)
+    if session.info.pop('email_queue_wake', False):
+        queue_logger.warning("Queued email discarded: the enclosing transaction was rolled back")
+
+
+# ============ CLI ============
+
+def register_email_queue_commands(app):
+    """Register `flask email-queue ...` commands"""
+
+    @app.cli.group('email-queue')
+    def email_queue_cli():
+        """Outbound email queue"""
+
+    @email_queue_cli.command('run')
+    def run_workers():
+        """Run the worker pool in the foreground (dedicated mail process)"""
+        email_queue.start(app)
+        click.echo(f"📧 Email queue running with {email_queue.worker_count} workers (Ctrl+C to stop)")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            email_queue.stop()
+
+    @email_queue_cli.command('drain')
+    def drain():
+        """Deliver everything currently due, then exit"""
+        total = 0
+        while True:
+            handled = email_queue.process_batch()
+            if not handled:
+                break
+            total += handled
+        click.echo(f"✅ Processed {total} queued emails")
+
+    @email_queue_cli.command('status')
+    def status():
+        """Show outbox counts"""
+        for name, count in email_queue.get_stats()['outbox'].items():
+            click.echo(f"{name:>8}: {count}")
+
+    @email_queue_cli.command('retry-failed')
+    def retry_failed():
+        """Requeue failed messages"""
+        click.echo(f"🔁 Requeued {email_queue.retry_failed()} failed emails")
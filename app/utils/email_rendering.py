@@ -0,0 +1,132 @@
+"""
+Segmented rendering for mass emails.
+
+Mass notification emails render the same template for every recipient and
+differ only in a few personal fields (name, email) plus branches on coarse
+attributes such as role or department. ``SegmentedRenderer`` looks the template
+up once per send, renders it once per *segment* (by default role + department)
+with placeholder tokens in place of the personal fields, and produces each
+recipient's copy by substituting the escaped field values into that skeleton.
+
+The first skeleton of every segment is checked against a full render; if the
+template transforms a personal field (``user.full_name|upper``, slicing, ...)
+the substitution would be wrong, so the renderer falls back to a full render per
+recipient for the rest of the send.
+
+``TemplateRenderer`` is the plain variant for messages whose whole context is
+per recipient (daily class reminders): lookup and context processors still run
+once per send.
+"""
+import re
+from flask import current_app
+from markupsafe import escape
+
+PERSONAL_FIELDS = ('full_name', 'email', 'username')
+BATCH_SIZE = 500
+
+_TOKEN_OPEN = '\ue000'  # Private-use characters: never in real data, untouched by escaping
+_TOKEN_CLOSE = '\ue001'
+_TOKEN_PATTERN = re.compile(f'{_TOKEN_OPEN}([a-z_]+){_TOKEN_CLOSE}')
+
+
+def default_segment_key(user):
+    """Attributes the notification templates branch on"""
+    return (getattr(user, 'role', None), getattr(user, 'department_id', None))
+
+
+class _TokenizedUser:
+    """Proxy that answers personal fields with placeholder tokens and everything else from the user"""
+
+    def __init__(self, user, personal_fields):
+        self._user = user
+        self._personal_fields = personal_fields
+
+    def __getattr__(self, name):
+        if name in self._personal_fields:
+            return f'{_TOKEN_OPEN}{name}{_TOKEN_CLOSE}'
+        return getattr(self._user, name)
+
+
+class TemplateRenderer:
+    """One template looked up and context-processed once, rendered with per-message context"""
+
+    def __init__(self, template_name, context=None):
+        self.template = current_app.jinja_env.get_template(template_name)
+        self.context = dict(context or {})
+        current_app.update_template_context(self.context)
+
+    def render(self, **context):
+        return self.template.render(**dict(self.context, **context))
+
+
+class SegmentedRenderer:
+    """Render one template for many users with one Jinja render per segment"""
+
+    def __init__(self, template_name, context, user_key='user', segment_key=default_segment_key,
+                 personal_fields=PERSONAL_FIELDS):
+        env = current_app.jinja_env
+        self.template = env.get_template(template_name)
+        self.autoescape = env.autoescape(template_name) if callable(env.autoescape) else env.autoescape
+
+        # Context processors run once per send instead of once per recipient
+        self.context = dict(context)
+        current_app.update_template_context(self.context)
+
+        self.user_key = user_key
+        self.segment_key = segment_key
+        self.personal_fields = tuple(personal_fields)
+        self.segmentable = True
+        self._skeletons = {}
+        self.stats = {'jinja_renders': 0, 'substituted': 0, 'segments': 0}
+
+    def _render(self, user):
+        self.stats['jinja_renders'] += 1
+        return self.template.render(**dict(self.context, **{self.user_key: user}))
+
+    def _fill(self, skeleton, user):
+        def value(match):
+            field_value = getattr(user, match.group(1))
+            return str(escape(field_value)) if self.autoescape else str(field_value)
+        return _TOKEN_PATTERN.sub(value, skeleton)
+
+    def render(self, user):
+        """HTML for one user"""
+        if not self.segmentable:
+            return self._render(user)
+
+        key = self.segment_key(user)
+        skeleton = self._skeletons.get(key)
+        if skeleton is not None:
+            self.stats['substituted'] += 1
+            return self._fill(skeleton, user)
+
+        # New segment: build the skeleton and verify it once against a full render
+        full = self._render(user)
+        skeleton = self._render(_TokenizedUser(user, self.personal_fields))
+        if self._fill(skeleton, user) != full:
+            current_app.logger.info(
+                f"Template {self.template.name} transforms personal fields; rendering per recipient"
+            )
+            self.segmentable = False
+            self._skeletons.clear()
+            return full
+
+        self._skeletons[key] = skeleton
+        self.stats['segments'] += 1
+        return full
+
+
+def iter_query_batches(query, id_column, batch_size=BATCH_SIZE):
+    """Yield the rows of an ORM query as lists of up to batch_size (keyset on id_column).
+
+    Each batch is fully fetched, so no cursor stays open while callers write
+    elsewhere (SQLite would otherwise block the outbox inserts).
+    """
+    last_id = None
+    while True:
+        batch_query = query if last_id is None else query.filter(id_column > last_id)
+        batch = batch_query.order_by(id_column).limit(batch_size).all()
+        if not batch:
+            return
+        yield batch
+        last_id = getattr(batch[-1], id_column.key)
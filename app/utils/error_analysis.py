@@ -1,11 +1,13 @@
-import pandas as pd
-import numpy as np
 from datetime import datetime, timedelta
 from collections import Counter, defaultdict
 from sqlalchemy import func, desc, and_, or_
 from app import db
 from app.models.error_log import ErrorLog, UserActivityLog, SystemHealthLog
 from app.models.user import User
+from app.utils.lazy_imports import lazy_module
+
+pd = lazy_module('pandas')
+np = lazy_module('numpy')
 
 
 class ErrorAnalyzer:
@@ -1,14 +1,16 @@
 import sys
 import traceback
-import psutil
 import time
 from datetime import datetime
 from functools import wraps
 from flask import request, session, current_app, g
 from flask_login import current_user
-from user_agents import parse
 from app import db
-from app.models.error_log import ErrorLog, UserActivityLog, SystemHealthLog
+from app.models.error_log import ErrorLog, UserActivityLog, SystemHealthLog, ActivityMinuteStats
+from app.utils.lazy_imports import lazy_module
+from app.utils.activity_log import activity_log
+
+psutil = lazy_module('psutil')
 
 
 class ErrorTracker:
@@ -124,6 +126,7 @@ class ErrorTracker:
             
             # Parse user agent for device info
             if request and request.headers.get('User-Agent'):
+                from user_agents import parse
                 user_agent = parse(request.headers.get('User-Agent'))
                 user_info.update({
                     'browser': f"{user_agent.browser.family} {user_agent.browser.version_string}",
@@ -233,7 +236,7 @@ def track_errors(error_type=None, capture_args=True):
                 
                 # Log successful activity
                 if current_user and current_user.is_authenticated:
-                    UserActivityLog.log_activity(
+                    activity_log.record(
                         user_id=current_user.id,
                         activity_type='action',
                         page_url=request.url if request else '',
@@ -264,7 +267,7 @@ def track_errors(error_type=None, capture_args=True):
                 
                 # Log failed activity
                 if current_user and current_user.is_authenticated:
-                    UserActivityLog.log_activity(
+                    activity_log.record(
                         user_id=current_user.id,
                         activity_type='error',
                         page_url=request.url if request else '',
@@ -371,17 +374,11 @@ class SystemHealthMonitor:
             from datetime import datetime, timedelta
             from sqlalchemy import func
             
-            # Get errors from last hour
+            # Per-minute counters for the last hour (maintained by the activity log writer)
             one_hour_ago = datetime.utcnow() - timedelta(hours=1)
-            
-            error_count = ErrorLog.query.filter(
-                ErrorLog.created_at >= one_hour_ago,
-                ErrorLog.severity.in_(['high', 'critical'])
-            ).count()
-            
-            total_requests = UserActivityLog.query.filter(
-                UserActivityLog.created_at >= one_hour_ago
-            ).count()
+            totals = ActivityMinuteStats.totals(one_hour_ago.replace(second=0, microsecond=0))
+            error_count = totals['error_count']
+            total_requests = totals['request_count']
             
             if total_requests > 0:
                 return (error_count / total_requests) * 100
@@ -434,6 +431,8 @@ class SystemHealthMonitor:
 
 def init_error_tracking(app):
     """Initialize error tracking for the Flask app"""
+    # Page views are buffered and written in batches off the request path
+    activity_log.init_app(app)
     
     @app.before_request
     def before_request():
@@ -447,7 +446,7 @@ def init_error_tracking(app):
             if current_user and current_user.is_authenticated:
                 response_time = time.time() - g.request_start_time
                 
-                UserActivityLog.log_activity(
+                activity_log.record(
                     user_id=current_user.id,
                     activity_type='page_view',
                     page_url=request.url,
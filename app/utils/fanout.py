@@ -0,0 +1,54 @@
+"""
+Set-based per-user fan-out.
+
+Notices and system notifications keep one row per (parent, user). Creating them
+used to cost an existence query plus an INSERT per user; ``fan_out`` does it as
+a single ``INSERT ... SELECT`` from the target-user query that skips users who
+already have a row, and ``mark_users`` updates a flag for many users in chunked
+UPDATEs. Neither commits.
+"""
+from app import db
+
+UPDATE_CHUNK_SIZE = 1000
+
+
+def fan_out(table, parent_column, parent_id, user_ids_select, values=None):
+    """Insert a (parent_id, user_id, **values) row for every user selected that has none yet.
+
+    user_ids_select is a SELECT whose first column is the user id. Returns the
+    number of rows inserted.
+    """
+    values = values or {}
+    targets = user_ids_select.subquery()
+    user_id = list(targets.c)[0]
+
+    already = db.select(table.c.user_id).where(
+        table.c[parent_column] == parent_id,
+        table.c.user_id == user_id
+    ).exists()
+
+    rows = db.select(
+        db.literal(parent_id, table.c[parent_column].type),
+        user_id,
+        *[db.literal(value, table.c[name].type) for name, value in values.items()]
+    ).where(~already).distinct()
+
+    result = db.session.execute(
+        table.insert().from_select([parent_column, 'user_id', *values], rows)
+    )
+    return result.rowcount
+
+
+def mark_users(table, parent_column, parent_id, user_ids, values):
+    """UPDATE the rows of parent_id for the given users, in chunks. Returns rows updated."""
+    user_ids = list(user_ids)
+    updated = 0
+    for offset in range(0, len(user_ids), UPDATE_CHUNK_SIZE):
+        result = db.session.execute(
+            table.update()
+            .where(table.c[parent_column] == parent_id,
+                   table.c.user_id.in_(user_ids[offset:offset + UPDATE_CHUNK_SIZE]))
+            .values(**values)
+        )
+        updated += result.rowcount
+    return updated
@@ -1,7 +1,7 @@
-import boto3
 import uuid
 from werkzeug.utils import secure_filename
 from flask import current_app
+from app import get_s3_client
 
 def allowed_file(filename):
     return '.' in filename and \
@@ -85,13 +85,6 @@ def upload_file_to_s3(file, folder='uploads', filename=None):
             # Reset pointer again after reading
             file.seek(0)
             
-            s3 = boto3.client(
-                "s3",
-                region_name=current_app.config['S3_REGION'],
-                aws_access_key_id=current_app.config['AWS_ACCESS_KEY_ID'],
-                aws_secret_access_key=current_app.config['AWS_SECRET_ACCESS_KEY']
-            )
-            
             s3_key = f"{folder}/{final_filename}"
             
             # Upload with content type detection for videos
@@ -99,22 +92,11 @@ def upload_file_to_s3(file, folder='uploads', filename=None):
             if file.filename.lower().endswith(('.mp4', '.avi', '.mov', '.wmv', '.mkv', '.webm')):
                 extra_args['ContentType'] = 'video/mp4'
             
-            # Configure upload with timeout and retry settings
-            from botocore.config import Config
-            config = Config(
-                retries={"max_attempts": 3, "mode": "adaptive"},
-                read_timeout=3600,  # 1 hour
-                connect_timeout=300  # 5 minutes
-            )
-            
-            # Recreate client with config
-            s3 = boto3.client(
-                "s3",
-                region_name=current_app.config['S3_REGION'],
-                aws_access_key_id=current_app.config['AWS_ACCESS_KEY_ID'],
-                aws_secret_access_key=current_app.config['AWS_SECRET_ACCESS_KEY'],
-                config=config
-            )
+            # Shared client configured with upload timeouts and retries
+            s3 = get_s3_client(transfer=True)
+            if s3 is None:
+                current_app.logger.error("S3 Upload Failed: S3 is not configured")
+                return None
             
             # Add server-side encryption and storage class for videos
             if file.filename.lower().endswith(('.mp4', '.avi', '.mov', '.wmv', '.mkv', '.webm')):
@@ -186,13 +168,10 @@ def generate_signed_video_url(video_url, expiration=3600):
         
         print(f"Generating signed URL for bucket: {bucket}, key: {s3_key}")
         
-        # Create S3 client
-        s3_client = boto3.client(
-            's3',
-            region_name=current_app.config['S3_REGION'],
-            aws_access_key_id=current_app.config['AWS_ACCESS_KEY_ID'],
-            aws_secret_access_key=current_app.config['AWS_SECRET_ACCESS_KEY']
-        )
+        # Shared S3 client
+        s3_client = get_s3_client()
+        if s3_client is None:
+            raise RuntimeError("S3 is not configured")
         
         # Generate signed URL
         signed_url = s3_client.generate_presigned_url(
@@ -248,13 +227,10 @@ def generate_signed_document_url(document_url, expiration=3600):
         
         print(f"Generating signed document URL for bucket: {bucket}, key: {s3_key}")
         
-        # Create S3 client using your config variables
-        s3_client = boto3.client(
-            's3',
-            region_name=current_app.config.get('S3_REGION', 'ap-south-1'),
-            aws_access_key_id=current_app.config.get('AWS_ACCESS_KEY_ID'),
-            aws_secret_access_key=current_app.config.get('AWS_SECRET_ACCESS_KEY')
-        )
+        # Shared S3 client
+        s3_client = get_s3_client()
+        if s3_client is None:
+            raise RuntimeError("S3 is not configured")
         
         # Generate presigned URL
         signed_url = s3_client.generate_presigned_url(
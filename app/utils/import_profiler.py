@@ -0,0 +1,116 @@
+"""
+Import cost and memory baseline of a fresh worker.
+
+Runs ``create_app()`` in a child interpreter under ``python -X importtime`` so
+the numbers are those of a cold worker, not of the already-warm CLI process.
+CPython writes one stderr line per imported module:
+
+    import time: self [us] | cumulative | imported package
+    import time:       412 |       9876 |   app.utils.helper
+
+Cumulative time is reported per module, self time is summed per top-level
+package, and the child's resident set size after startup (VmRSS) is the
+memory-per-worker baseline. ``flask perf imports --save``/``--compare`` keep a
+baseline file so regressions show up in review.
+"""
+import json
+import os
+import subprocess
+import sys
+
+REGRESSION_THRESHOLD = 0.10  # relative growth that fails --compare
+
+_CHILD_SCRIPT = """
+import json, time
+started = time.perf_counter()
+from app import create_app
+app = create_app()
+elapsed = time.perf_counter() - started
+rss_kb = None
+try:
+    with open('/proc/self/status') as f:
+        for line in f:
+            if line.startswith('VmRSS:'):
+                rss_kb = int(line.split()[1])
+except OSError:
+    pass
+if rss_kb is None:
+    import resource
+    rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print('IMPORT_PROFILE ' + json.dumps({'startup_ms': round(elapsed * 1000, 1), 'rss_kb': rss_kb}))
+"""
+
+
+def parse_importtime(stderr):
+    """{module: (self_us, cumulative_us)} from ``-X importtime`` output"""
+    modules = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        parts = line[len('import time:'):].split('|')
+        if len(parts) != 3:
+            continue
+        try:
+            self_us, cumulative_us = int(parts[0]), int(parts[1])
+        except ValueError:
+            continue  # header line
+        modules[parts[2].strip()] = (self_us, cumulative_us)
+    return modules
+
+
+def package_totals(modules):
+    """Self time summed per top-level package (us)"""
+    totals = {}
+    for name, (self_us, _) in modules.items():
+        package = name.split('.')[0]
+        totals[package] = totals.get(package, 0) + self_us
+    return totals
+
+
+def profile_startup(project_root=None, timeout=120):
+    """Import profile of create_app in a fresh interpreter"""
+    project_root = project_root or os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', _CHILD_SCRIPT],
+        cwd=project_root, capture_output=True, text=True, timeout=timeout
+    )
+    summary = None
+    for line in result.stdout.splitlines():
+        if line.startswith('IMPORT_PROFILE '):
+            summary = json.loads(line[len('IMPORT_PROFILE '):])
+    if summary is None:
+        tail = '\n'.join(line for line in result.stderr.splitlines() if not line.startswith('import time:'))[-2000:]
+        raise RuntimeError(f"create_app failed in the profiling process:\n{tail}")
+
+    modules = parse_importtime(result.stderr)
+    return {
+        'python': sys.version.split()[0],
+        'startup_ms': summary['startup_ms'],
+        'rss_kb': summary['rss_kb'],
+        'module_count': len(modules),
+        'import_ms': round(sum(self_us for self_us, _ in modules.values()) / 1000, 1),
+        'modules': {name: cumulative_us for name, (_, cumulative_us) in modules.items()},
+        'packages': package_totals(modules),
+    }
+
+
+def compare_profiles(baseline, current, threshold=REGRESSION_THRESHOLD):
+    """[(metric, before, after, change)] and whether any headline metric regressed"""
+    rows = []
+    regressed = False
+    for metric in ('startup_ms', 'import_ms', 'rss_kb', 'module_count'):
+        before, after = baseline.get(metric), current.get(metric)
+        if not before or after is None:
+            continue
+        change = (after - before) / before
+        rows.append((metric, before, after, change))
+        if change > threshold:
+            regressed = True
+    return rows, regressed
+
+
+def new_packages(baseline, current, limit=10):
+    """Packages imported at startup now that were not in the baseline, costliest first"""
+    added = [(package, us) for package, us in current['packages'].items()
+             if package not in baseline.get('packages', {})]
+    return sorted(added, key=lambda item: item[1], reverse=True)[:limit]
@@ -0,0 +1,547 @@
+"""
+Persistent in-app job scheduler.
+
+Delayed work (email sequence steps, video upload reminders and deadlines) is
+stored in ``scheduled_jobs`` by ``job_scheduler.schedule`` inside the caller's
+transaction, so a job exists exactly when the change that needs it commits.
+
+One process is the scheduler *leader* (PostgreSQL advisory lock, or a file lock
+shared by the gunicorn workers of a host); only it runs jobs:
+
+- pending jobs due within the lookahead window are kept in a min-heap by
+  ``run_at`` and the leader sleeps exactly until the next one, re-reading the
+  table every ``JOB_SCHEDULER_MAX_SLEEP`` seconds for jobs written elsewhere
+- due jobs are claimed with an atomic UPDATE and coalesced per handler, so a
+  ``batch=True`` handler gets every due payload in one call
+- failures are retried with exponential backoff up to ``max_attempts``; jobs left
+  'running' by a crashed leader are reclaimed after ``JOB_LOCK_TIMEOUT``
+
+``cancel`` and ``reschedule`` act on pending rows by id, key or handler name.
+``periodic_job`` handlers (cache warming, health checks) keep a single row that
+the leader re-arms after every run, so they run once per deployment rather than
+once per worker.
+Times are naive local server time, like the class schedule they are derived from.
+"""
+from datetime import datetime, timedelta
+import heapq
+import importlib
+import json
+import logging
+import os
+import random
+import tempfile
+import threading
+import time
+import uuid
+import click
+from flask import current_app
+from sqlalchemy import event, func, text
+from sqlalchemy.orm import Session
+from app import db
+from app.models.scheduled_job import ScheduledJob
+
+try:
+    import fcntl
+except ImportError:  # No flock (Windows): every process acts as leader, claims stay atomic
+    fcntl = None
+
+scheduler_logger = logging.getLogger('jobs.scheduler')
+
+DEFAULT_BATCH_SIZE = 100  # jobs claimed per UPDATE
+DEFAULT_MAX_SLEEP = 30.0  # seconds between table refreshes when idle
+DEFAULT_LOOKAHEAD = 300  # seconds of upcoming jobs kept in the heap
+DEFAULT_HEAP_LIMIT = 5000
+DEFAULT_LOCK_TIMEOUT = 900  # seconds before a 'running' job is considered abandoned
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_RETRY_BASE = 60  # seconds, doubled per attempt
+ADVISORY_LOCK_KEY = 74130001  # pg_try_advisory_lock key of the scheduler leader
+
+# Modules that register job handlers; imported before the leader runs anything
+JOB_MODULES = (
+    'app.utils.video_upload_scheduler',
+    'app.services.email_automation_service',
+    'app.utils.performance_init',
+)
+
+_handlers = {}  # name -> (func, batch)
+_periodic = {}  # name -> interval in seconds
+
+
+def job_handler(name, batch=False):
+    """Register the function that runs jobs called `name`.
+
+    The function gets the job's payload dict, or with batch=True the list of
+    payloads of every job of that name that came due together.
+    """
+    def decorator(func):
+        _handlers[name] = (func, batch)
+        return func
+    return decorator
+
+
+def periodic_job(name, interval):
+    """Register a handler the leader runs every `interval` seconds (payload is {})"""
+    def decorator(func):
+        _handlers[name] = (func, False)
+        _periodic[name] = interval
+        return func
+    return decorator
+
+
+class LeaderLock:
+    """Non-blocking leader election: PostgreSQL advisory lock, otherwise a file lock"""
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(tempfile.gettempdir(), 'lms-job-scheduler.lock')
+        self._file = None
+        self._connection = None
+        self._unlocked = False
+
+    @property
+    def held(self):
+        return self._unlocked or self._file is not None or self._connection is not None
+
+    def acquire(self):
+        """True if this process is (still) the leader"""
+        if self._connection is not None:
+            try:
+                self._connection.execute(text('SELECT 1'))
+                return True
+            except Exception:
+                self.release()  # Connection lost, and the lock with it
+        if self.held:
+            return True
+
+        if db.engine.dialect.name == 'postgresql':
+            connection = db.engine.connect().execution_options(isolation_level='AUTOCOMMIT')
+            if connection.execute(text('SELECT pg_try_advisory_lock(:key)'), {'key': ADVISORY_LOCK_KEY}).scalar():
+                self._connection = connection
+                return True
+            connection.close()
+            return False
+
+        if fcntl is None:
+            self._unlocked = True
+            return True
+
+        handle = open(self.path, 'a')
+        try:
+            fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            handle.close()
+            return False
+        self._file = handle
+        return True
+
+    def release(self):
+        if self._connection is not None:
+            try:
+                self._connection.execute(text('SELECT pg_advisory_unlock(:key)'), {'key': ADVISORY_LOCK_KEY})
+            except Exception:
+                pass
+            try:
+                self._connection.close()
+            except Exception:
+                pass
+            self._connection = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        self._unlocked = False
+
+
+class JobScheduler:
+    """Producer API for delayed jobs plus the leader loop that runs them"""
+
+    def __init__(self):
+        self.app = None
+        self.batch_size = DEFAULT_BATCH_SIZE
+        self.max_sleep = DEFAULT_MAX_SLEEP
+        self.lookahead = DEFAULT_LOOKAHEAD
+        self.heap_limit = DEFAULT_HEAP_LIMIT
+        self.lock_timeout = DEFAULT_LOCK_TIMEOUT
+        self.max_attempts = DEFAULT_MAX_ATTEMPTS
+        self.retry_base = DEFAULT_RETRY_BASE
+        self.leader = LeaderLock()
+        self._heap = []  # (run_at, job_id)
+        self._heap_truncated = False
+        self._next_refresh = 0.0
+        self._dirty = False
+        self._handlers_loaded = False
+        self._thread = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._start_lock = threading.Lock()
+        self.stats = {'scheduled': 0, 'run': 0, 'retried': 0, 'failed': 0, 'batches': 0, 'refreshes': 0}
+
+    def init_app(self, app):
+        self.app = app
+        self.batch_size = app.config.get('JOB_SCHEDULER_BATCH_SIZE', DEFAULT_BATCH_SIZE)
+        self.max_sleep = app.config.get('JOB_SCHEDULER_MAX_SLEEP', DEFAULT_MAX_SLEEP)
+        self.lookahead = app.config.get('JOB_SCHEDULER_LOOKAHEAD', DEFAULT_LOOKAHEAD)
+        self.lock_timeout = app.config.get('JOB_LOCK_TIMEOUT', DEFAULT_LOCK_TIMEOUT)
+        self.max_attempts = app.config.get('JOB_MAX_ATTEMPTS', DEFAULT_MAX_ATTEMPTS)
+        self.retry_base = app.config.get('JOB_RETRY_BASE', DEFAULT_RETRY_BASE)
+        self.leader = LeaderLock(app.config.get('JOB_SCHEDULER_LOCK_FILE'))
+        app.extensions['job_scheduler'] = self
+        register_job_scheduler_commands(app)
+
+        if app.config.get('JOB_SCHEDULER_AUTOSTART', True):
+            # Every process competes for leadership once it serves traffic
+            @app.before_request
+            def _start_job_scheduler():
+                if self._thread is None:
+                    self.start()
+
+    # ============ PRODUCER ============
+
+    def schedule(self, name, run_at, payload=None, key=None, max_attempts=None):
+        """Add a job to the caller's session (it exists once the caller commits); returns it"""
+        job = ScheduledJob(
+            name=name,
+            key=key,
+            payload=json.dumps(payload or {}),
+            run_at=run_at,
+            status=ScheduledJob.STATUS_PENDING,
+            attempts=0,
+            max_attempts=max_attempts or self.max_attempts
+        )
+        db.session.add(job)
+        db.session.info['jobs_changed'] = True
+        self.stats['scheduled'] += 1
+        return job
+
+    def cancel(self, job_id=None, key=None, name=None):
+        """Revoke pending jobs matching id/key/name (in the caller's session); returns how many"""
+        query = self._pending_update(job_id, key, name)
+        result = db.session.execute(query.values(status=ScheduledJob.STATUS_CANCELLED, finished_at=datetime.now()))
+        db.session.info['jobs_changed'] = True
+        return result.rowcount
+
+    def reschedule(self, run_at, job_id=None, key=None, name=None):
+        """Move pending jobs matching id/key/name to run_at; returns how many"""
+        query = self._pending_update(job_id, key, name)
+        result = db.session.execute(query.values(run_at=run_at))
+        db.session.info['jobs_changed'] = True
+        return result.rowcount
+
+    def _pending_update(self, job_id, key, name):
+        if job_id is None and key is None and name is None:
+            raise ValueError("cancel/reschedule needs a job_id, key or name")
+        table = ScheduledJob.__table__
+        query = table.update().where(table.c.status == ScheduledJob.STATUS_PENDING)
+        if job_id is not None:
+            query = query.where(table.c.id == job_id)
+        if key is not None:
+            query = query.where(table.c.key == key)
+        if name is not None:
+            query = query.where(table.c.name == name)
+        return query
+
+    def notify(self):
+        """Called after a commit that changed jobs: re-read the table on the next tick"""
+        self._dirty = True
+        self._wake.set()
+
+    # ============ LEADER ============
+
+    def start(self, app=None):
+        """Start the scheduler thread for this process (no-op if already running)"""
+        app = app or self.app or current_app._get_current_object()
+        with self._start_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run_loop, args=(app,), name='job-scheduler', daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=10):
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self._thread = None
+
+    def _run_loop(self, app):
+        with app.app_context():
+            self.load_handlers()
+            was_leader = False
+            while not self._stop.is_set():
+                delay = self.max_sleep
+                try:
+                    if self.leader.acquire():
+                        if not was_leader:
+                            scheduler_logger.info(f"Process {os.getpid()} is the job scheduler leader")
+                            was_leader = True
+                            self._dirty = True
+                            self.seed_periodic()
+                        self.run_due()
+                        delay = self._next_delay()
+                    else:
+                        was_leader = False
+                except Exception as e:
+                    scheduler_logger.error(f"Job scheduler tick failed: {str(e)}")
+                    db.session.rollback()
+                finally:
+                    db.session.remove()
+
+                self._wake.wait(delay)
+                self._wake.clear()
+            self.leader.release()
+
+    def load_handlers(self):
+        if self._handlers_loaded:
+            return
+        for module in JOB_MODULES:
+            try:
+                importlib.import_module(module)
+            except Exception as e:
+                scheduler_logger.error(f"Could not load job handlers from {module}: {str(e)}")
+        self._handlers_loaded = True
+
+    def seed_periodic(self):
+        """Create the row of every periodic job that has none yet"""
+        existing = {name for (name,) in db.session.query(ScheduledJob.name).filter(
+            ScheduledJob.name.in_(_periodic),
+            ScheduledJob.status.in_([ScheduledJob.STATUS_PENDING, ScheduledJob.STATUS_RUNNING])
+        ).distinct()}
+        now = datetime.now()
+        for name in _periodic:
+            if name not in existing:
+                # Due straight away: a fresh deployment warms caches once, from the leader
+                self.schedule(name, now, key=f"periodic:{name}", max_attempts=1)
+        db.session.commit()
+
+    def refresh(self):
+        """Reclaim abandoned jobs and reload the heap with those due within the lookahead"""
+        table = ScheduledJob.__table__
+        now = datetime.now()
+        db.session.execute(
+            table.update().where(table.c.status == ScheduledJob.STATUS_RUNNING,
+                                 table.c.locked_at < now - timedelta(seconds=self.lock_timeout))
+            .values(status=ScheduledJob.STATUS_PENDING, locked_by=None, locked_at=None)
+        )
+        rows = db.session.execute(
+            db.select(table.c.run_at, table.c.id)
+            .where(table.c.status == ScheduledJob.STATUS_PENDING,
+                   table.c.run_at <= now + timedelta(seconds=self.lookahead))
+            .order_by(table.c.run_at).limit(self.heap_limit)
+        ).all()
+        db.session.commit()
+
+        self._heap = [(row.run_at, row.id) for row in rows]
+        heapq.heapify(self._heap)
+        self._heap_truncated = len(rows) >= self.heap_limit
+        self._next_refresh = time.monotonic() + self.max_sleep
+        self._dirty = False
+        self.stats['refreshes'] += 1
+
+    def run_due(self, force_refresh=False):
+        """Run every job whose time has come; returns how many ran"""
+        if force_refresh or self._dirty or time.monotonic() >= self._next_refresh:
+            self.refresh()
+
+        now = datetime.now()
+        due_ids = []
+        while self._heap and self._heap[0][0] <= now:
+            due_ids.append(heapq.heappop(self._heap)[1])
+
+        ran = 0
+        for offset in range(0, len(due_ids), self.batch_size):
+            ran += self._run_batch(due_ids[offset:offset + self.batch_size])
+        return ran
+
+    def _next_delay(self):
+        if self._heap_truncated and not self._heap:
+            self._next_refresh = 0.0
+            return 0
+        until_refresh = max(0.0, self._next_refresh - time.monotonic())
+        if not self._heap:
+            return until_refresh
+        until_due = (self._heap[0][0] - datetime.now()).total_seconds()
+        return max(0.0, min(until_due, until_refresh))
+
+    def _run_batch(self, job_ids):
+        """Claim the given jobs (skipping cancelled or moved ones) and run them grouped by handler"""
+        table = ScheduledJob.__table__
+        now = datetime.now()
+        token = uuid.uuid4().hex
+        db.session.execute(
+            table.update().where(table.c.id.in_(job_ids),
+                                 table.c.status == ScheduledJob.STATUS_PENDING,
+                                 table.c.run_at <= now)
+            .values(status=ScheduledJob.STATUS_RUNNING, locked_by=token, locked_at=now)
+        )
+        db.session.commit()
+
+        jobs = ScheduledJob.query.filter_by(locked_by=token, status=ScheduledJob.STATUS_RUNNING)\
+            .order_by(ScheduledJob.run_at, ScheduledJob.id).all()
+        if not jobs:
+            return 0
+
+        groups = {}
+        for job in jobs:
+            groups.setdefault(job.name, []).append(job)
+        for name, group in groups.items():
+            self._run_group(name, group)
+
+        self.stats['batches'] += 1
+        return len(jobs)
+
+    def _run_group(self, name, jobs):
+        handler = _handlers.get(name)
+        if handler is None:
+            for job in jobs:
+                self._record_failure(job, LookupError(f"No handler registered for job '{name}'"), permanent=True)
+            db.session.commit()
+            return
+
+        func, batch = handler
+        if batch:
+            payloads = [job.get_payload() for job in jobs]
+            try:
+                func(payloads)
+            except Exception as e:
+                db.session.rollback()
+                for job in jobs:
+                    self._record_failure(job, e)
+            else:
+                for job in jobs:
+                    self._record_done(job)
+            db.session.commit()
+            return
+
+        for job in jobs:
+            try:
+                func(job.get_payload())
+            except Exception as e:
+                db.session.rollback()
+                if name in _periodic:
+                    self._rearm(job, e)
+                else:
+                    self._record_failure(job, e)
+            else:
+                if name in _periodic:
+                    self._rearm(job)
+                else:
+                    self._record_done(job)
+            db.session.commit()
+
+    def _record_done(self, job):
+        job.status = ScheduledJob.STATUS_DONE
+        job.attempts += 1
+        job.finished_at = datetime.now()
+        job.locked_by = None
+        job.locked_at = None
+        self.stats['run'] += 1
+
+    def _rearm(self, job, error=None):
+        """Put a periodic job back in the queue for its next run"""
+        job.attempts += 1
+        job.last_error = f"{type(error).__name__}: {str(error)}"[:2000] if error else None
+        job.status = ScheduledJob.STATUS_PENDING
+        job.run_at = datetime.now() + timedelta(seconds=_periodic[job.name])
+        job.locked_by = None
+        job.locked_at = None
+        db.session.info['jobs_changed'] = True
+        if error:
+            self.stats['failed'] += 1
+            scheduler_logger.error(f"Periodic job {job.name} failed: {job.last_error}")
+        else:
+            self.stats['run'] += 1
+
+    def _record_failure(self, job, error, permanent=False):
+        job.attempts += 1
+        job.last_error = f"{type(error).__name__}: {str(error)}"[:2000]
+        job.locked_by = None
+        job.locked_at = None
+
+        if permanent or job.attempts >= job.max_attempts:
+            job.status = ScheduledJob.STATUS_FAILED
+            job.finished_at = datetime.now()
+            self.stats['failed'] += 1
+            scheduler_logger.error(f"Job {job.id} ({job.name}) failed after {job.attempts} attempts: {job.last_error}")
+        else:
+            delay = self.retry_base * 2 ** (job.attempts - 1)
+            job.status = ScheduledJob.STATUS_PENDING
+            job.run_at = datetime.now() + timedelta(seconds=delay * random.uniform(0.8, 1.2))
+            self.stats['retried'] += 1
+            scheduler_logger.warning(f"Job {job.id} ({job.name}) attempt {job.attempts} failed, retrying in ~{delay}s: {job.last_error}")
+
+    # ============ STATUS ============
+
+    def get_stats(self):
+        counts = dict(db.session.query(ScheduledJob.status, func.count(ScheduledJob.id))
+                      .group_by(ScheduledJob.status).all())
+        return {
+            'jobs': {status: counts.get(status, 0) for status in (
+                ScheduledJob.STATUS_PENDING, ScheduledJob.STATUS_RUNNING, ScheduledJob.STATUS_DONE,
+                ScheduledJob.STATUS_FAILED, ScheduledJob.STATUS_CANCELLED)},
+            'leader': self.leader.held,
+            'heap_size': len(self._heap),
+            'handlers': sorted(_handlers),
+            'process': dict(self.stats)
+        }
+
+
+job_scheduler = JobScheduler()
+
+
+@event.listens_for(Session, 'after_commit')
+def _notify_scheduler(session):
+    if session.info.pop('jobs_changed', False):
+        job_scheduler.notify()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_job_changes(session):
+    session.info.pop('jobs_changed', None)
+
+
+# ============ CLI ============
+
+def register_job_scheduler_commands(app):
+    """Register `flask jobs ...` commands"""
+
+    @app.cli.group('jobs')
+    def jobs_cli():
+        """Scheduled background jobs"""
+
+    @jobs_cli.command('run')
+    def run_scheduler():
+        """Run the scheduler in the foreground (dedicated scheduler process)"""
+        job_scheduler.start(app)
+        click.echo("⏰ Job scheduler running (Ctrl+C to stop)")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            job_scheduler.stop()
+
+    @jobs_cli.command('run-due')
+    def run_due():
+        """Run everything currently due once, then exit"""
+        job_scheduler.load_handlers()
+        total = 0
+        while True:
+            ran = job_scheduler.run_due(force_refresh=True)
+            if not ran:
+                break
+            total += ran
+        click.echo(f"✅ Ran {total} due jobs")
+
+    @jobs_cli.command('status')
+    def status():
+        """Show job counts"""
+        for name, count in job_scheduler.get_stats()['jobs'].items():
+            click.echo(f"{name:>9}: {count}")
+
+    @jobs_cli.command('cancel')
+    @click.option('--key', default=None, help='Job key, e.g. video_upload:42')
+    @click.option('--name', default=None, help='Handler name')
+    @click.option('--id', 'job_id', type=int, default=None)
+    def cancel(key, name, job_id):
+        """Cancel pending jobs"""
+        cancelled = job_scheduler.cancel(job_id=job_id, key=key, name=name)
+        db.session.commit()
+        click.echo(f"🛑 Cancelled {cancelled} jobs")
@@ -0,0 +1,117 @@
+"""
+Keyset (seek) pagination.
+
+OFFSET pagination and ``.all()`` listings read every row before the one shown.
+Here a page continues from the sort key of the last row it returned:
+
+    WHERE (scheduled_date, scheduled_time, id) > (:d, :t, :id)
+    ORDER BY scheduled_date, scheduled_time, id LIMIT :per_page + 1
+
+so each page touches only the rows it shows, via the index on the leading sort
+column. The comparison is expanded into AND/OR form because row-value
+comparisons are not available on every supported database. The last sort
+column must be unique (the primary key) so the order is total.
+"""
+import base64
+import json
+from datetime import date, datetime, time
+from sqlalchemy import and_, or_
+
+DEFAULT_PER_PAGE = 20
+
+
+def encode_cursor(values):
+    """Opaque URL-safe token for a row's sort key"""
+    raw = json.dumps([value.isoformat() if hasattr(value, 'isoformat') else value for value in values])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token, columns):
+    """Sort key values from a token, typed like the columns; None if the token is invalid"""
+    if not token:
+        return None
+    try:
+        raw = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)).decode())
+        if not isinstance(raw, list) or len(raw) != len(columns):
+            return None
+        values = []
+        for column, value in zip(columns, raw):
+            python_type = column.type.python_type
+            if value is None:
+                values.append(None)
+            elif python_type is date:
+                values.append(date.fromisoformat(value))
+            elif python_type is time:
+                values.append(time.fromisoformat(value))
+            elif python_type is datetime:
+                values.append(datetime.fromisoformat(value))
+            else:
+                values.append(python_type(value))
+        return values
+    except (ValueError, TypeError, NotImplementedError):
+        return None
+
+
+def seek_condition(columns, values, descending=False):
+    """Rows strictly after values in the (columns) order, without row-value syntax"""
+    condition = None
+    # Build from the last column outwards: c1 > v1 OR (c1 = v1 AND (c2 > v2 OR ...))
+    for column, value in reversed(list(zip(columns, values))):
+        after = column < value if descending else column > value
+        condition = after if condition is None else or_(after, and_(column == value, condition))
+    return condition
+
+
+class KeysetPage:
+    """One page of a keyset listing; exposes the parts of Flask-SQLAlchemy's Pagination templates use"""
+
+    def __init__(self, items, per_page, next_cursor=None, prev_cursor=None, total=None):
+        self.items = items
+        self.per_page = per_page
+        self.next_cursor = next_cursor
+        self.prev_cursor = prev_cursor
+        self.total = total if total is not None else len(items)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def has_prev(self):
+        return self.prev_cursor is not None
+
+
+def keyset_paginate(query, columns, cursor=None, before=None, per_page=DEFAULT_PER_PAGE, total=None,
+                    key=None, descending=False):
+    """Fetch the page after ``cursor`` (or before ``before``) of query ordered by columns.
+
+    ``key(row)`` returns a row's sort values; by default the column attributes
+    are read off the row. Returns a KeysetPage whose cursors link both ways.
+    """
+    key = key or (lambda row: [getattr(row, column.key) for column in columns])
+    backwards = before is not None
+    anchor = decode_cursor(before if backwards else cursor, columns)
+
+    # Walking backwards = forwards over the reversed order, then flip the page
+    reverse = descending != backwards
+    if anchor is not None:
+        query = query.filter(seek_condition(columns, anchor, descending=reverse))
+    order = [column.desc() if reverse else column.asc() for column in columns]
+    rows = query.order_by(None).order_by(*order).limit(per_page + 1).all()
+
+    more = len(rows) > per_page
+    rows = rows[:per_page]
+    if backwards:
+        rows.reverse()
+
+    next_cursor = prev_cursor = None
+    if rows:
+        first, last = encode_cursor(key(rows[0])), encode_cursor(key(rows[-1]))
+        if backwards:
+            next_cursor = last
+            prev_cursor = first if more else None
+        else:
+            next_cursor = last if more else None
+            prev_cursor = first if anchor is not None else None
+
+    return KeysetPage(rows, per_page, next_cursor, prev_cursor, total)
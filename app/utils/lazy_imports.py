@@ -0,0 +1,56 @@
+"""
+Deferred imports for heavy optional dependencies.
+
+numpy, pandas, boto3 and similar packages add hundreds of milliseconds and
+several MB of RSS to every worker that imports them, although most requests
+never touch them. ``lazy_module`` returns a stand-in that imports the real
+module on first attribute access, so module-level aliases keep working:
+
+    np = lazy_module('numpy')
+
+    def scores(...):
+        return np.zeros(...)   # numpy is imported here, once
+
+Only use the alias inside functions; touching it at module level (constants,
+annotations, decorators) imports the module straight away.
+"""
+import importlib
+import sys
+import threading
+
+
+class LazyModule:
+    """Module proxy that imports the target on first attribute access"""
+
+    def __init__(self, name):
+        self.__dict__['_lazy_name'] = name
+        self.__dict__['_lazy_module'] = None
+        self.__dict__['_lazy_lock'] = threading.Lock()
+
+    def _load(self):
+        module = self.__dict__['_lazy_module']
+        if module is None:
+            with self.__dict__['_lazy_lock']:
+                module = self.__dict__['_lazy_module']
+                if module is None:
+                    module = importlib.import_module(self.__dict__['_lazy_name'])
+                    self.__dict__['_lazy_module'] = module
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._load(), attr, value)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        state = 'loaded' if self.__dict__['_lazy_module'] is not None else 'not loaded'
+        return f"<lazy module '{self.__dict__['_lazy_name']}' ({state})>"
+
+
+def lazy_module(name):
+    """The module itself if already imported, otherwise a LazyModule for it"""
+    return sys.modules.get(name) or LazyModule(name)
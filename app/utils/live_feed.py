@@ -0,0 +1,260 @@
+"""
+Server-push feed for the admin live monitoring page.
+
+Instead of every open dashboard polling ``/api/live-monitoring-data`` (about ten
+COUNT queries per poll), one background thread per process computes the
+payload and fans it out to all Server-Sent Events subscribers:
+
+- the payload is recomputed every ``LIVE_FEED_INTERVAL`` seconds while anyone
+  is subscribed, and straight away (debounced by ``LIVE_FEED_MIN_INTERVAL``)
+  after a commit that starts or completes a class or sets its video link
+- a new subscriber gets the latest payload as a ``snapshot`` event; after that
+  only ``diff`` events with the changed parts are sent
+- nothing runs while nobody is watching
+
+Database load therefore depends on the number of worker processes, not on the
+number of viewers. Commits made by other processes are picked up on the next
+interval.
+"""
+from datetime import datetime
+import json
+import logging
+import queue
+import threading
+import time
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+
+feed_logger = logging.getLogger('live.feed')
+
+DEFAULT_INTERVAL = 30.0  # seconds between recomputes while subscribed
+DEFAULT_MIN_INTERVAL = 2.0  # debounce for commit-triggered recomputes
+DEFAULT_HEARTBEAT = 15.0  # keep-alive comment so proxies do not drop idle streams
+DEFAULT_MAX_STREAM = 300.0  # seconds before a stream is closed and the browser reconnects
+SUBSCRIBER_BUFFER = 20  # events buffered per slow client before it is resynced
+
+# Class changes that move the live numbers
+TRIGGER_FIELDS = ('status', 'video_link')
+
+
+def _by_id(value):
+    """{id: item} for a list of dicts that all carry an 'id', otherwise None"""
+    if not isinstance(value, list) or not all(isinstance(item, dict) and 'id' in item for item in value):
+        return None
+    return {item['id']: item for item in value}
+
+
+def diff_payload(previous, current):
+    """Changed parts of current relative to previous.
+
+    Dicts are diffed one level deep, lists of dicts with an 'id' become
+    {'upsert': [...], 'remove': [ids], 'order': [ids]}, anything else is
+    replaced whole.
+    """
+    diff = {}
+    for key, value in current.items():
+        old = previous.get(key)
+        if value == old:
+            continue
+
+        old_items, new_items = _by_id(old), _by_id(value)
+        if isinstance(value, dict) and isinstance(old, dict):
+            diff[key] = {k: v for k, v in value.items() if old.get(k) != v}
+        elif old_items is not None and new_items is not None:
+            diff[key] = {
+                'upsert': [item for item_id, item in new_items.items() if old_items.get(item_id) != item],
+                'remove': [item_id for item_id in old_items if item_id not in new_items],
+                'order': list(new_items)
+            }
+        else:
+            diff[key] = value
+    return diff
+
+
+def format_event(name, data, event_id=None):
+    """One SSE frame"""
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {name}")
+    lines.append(f"data: {json.dumps(data, default=str)}")
+    return '\n'.join(lines) + '\n\n'
+
+
+class LiveFeed:
+    """Per-process producer thread plus its SSE subscribers"""
+
+    def __init__(self):
+        self.app = None
+        self.producer = None
+        self.interval = DEFAULT_INTERVAL
+        self.min_interval = DEFAULT_MIN_INTERVAL
+        self.heartbeat = DEFAULT_HEARTBEAT
+        self.max_stream = DEFAULT_MAX_STREAM
+        self.payload = None
+        self.version = 0
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self.stats = {'computes': 0, 'events': 0, 'resyncs': 0}
+
+    def init_app(self, app):
+        self.app = app
+        self.interval = app.config.get('LIVE_FEED_INTERVAL', DEFAULT_INTERVAL)
+        self.min_interval = app.config.get('LIVE_FEED_MIN_INTERVAL', DEFAULT_MIN_INTERVAL)
+        self.heartbeat = app.config.get('LIVE_FEED_HEARTBEAT', DEFAULT_HEARTBEAT)
+        self.max_stream = app.config.get('LIVE_FEED_MAX_STREAM', DEFAULT_MAX_STREAM)
+        app.extensions['live_feed'] = self
+
+    def register_producer(self, producer):
+        """producer() -> JSON-serialisable dict; called inside an app context"""
+        self.producer = producer
+
+    def notify(self):
+        """Recompute soon (called after commits that touch live classes)"""
+        if self._subscribers:
+            self._wake.set()
+
+    # ============ PRODUCER THREAD ============
+
+    def _ensure_running(self):
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._run, name='live-feed', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            with self._lock:
+                if not self._subscribers:
+                    # Idle until the next subscriber starts a fresh thread
+                    self._thread = None
+                    self.payload = None
+                    return
+
+            started = time.monotonic()
+            self.refresh()
+            self._wake.clear()
+            self._wake.wait(max(self.interval - (time.monotonic() - started), 0))
+            # Coalesce bursts of commits into one recompute
+            time.sleep(max(self.min_interval - (time.monotonic() - started), 0))
+
+    def refresh(self):
+        """Recompute the payload and push the diff to every subscriber"""
+        if not self.producer:
+            return
+        try:
+            with self.app.app_context():
+                from app import db
+                try:
+                    current = self.producer()
+                finally:
+                    db.session.remove()
+        except Exception as e:
+            feed_logger.error(f"Live feed refresh failed: {e}")
+            return
+        # Round-trip through JSON so comparisons see what clients see
+        current = json.loads(json.dumps(current, default=str))
+        self.stats['computes'] += 1
+
+        with self._lock:
+            previous, self.payload = self.payload, current
+            if previous is None:
+                self.version += 1
+                frame = format_event('snapshot', current, self.version)
+            else:
+                diff = diff_payload(previous, current)
+                diff.pop('timestamp', None)
+                if not diff:
+                    return
+                diff['timestamp'] = current.get('timestamp')
+                self.version += 1
+                frame = format_event('diff', diff, self.version)
+            subscribers = list(self._subscribers)
+
+        for subscriber in subscribers:
+            self._deliver(subscriber, frame)
+
+    def _deliver(self, subscriber, frame):
+        try:
+            subscriber.put_nowait(frame)
+            self.stats['events'] += 1
+        except queue.Full:
+            # Too far behind for diffs to apply: replace the backlog with a fresh snapshot
+            while True:
+                try:
+                    subscriber.get_nowait()
+                except queue.Empty:
+                    break
+            with self._lock:
+                snapshot = format_event('snapshot', self.payload, self.version)
+            subscriber.put_nowait(snapshot)
+            self.stats['resyncs'] += 1
+
+    # ============ SUBSCRIBERS ============
+
+    def stream(self):
+        """Generator of SSE frames for one client; use as a streaming response body.
+
+        Each stream occupies a worker thread, so it ends after ``max_stream``
+        seconds; EventSource reconnects on its own and gets a fresh snapshot.
+        """
+        subscriber = queue.Queue(maxsize=SUBSCRIBER_BUFFER)
+        with self._lock:
+            self._subscribers.add(subscriber)
+            if self.payload is not None:
+                subscriber.put_nowait(format_event('snapshot', self.payload, self.version))
+        self._ensure_running()
+
+        try:
+            yield f"retry: {int(self.interval * 1000)}\n\n"
+            deadline = time.monotonic() + self.max_stream
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return
+                try:
+                    yield subscriber.get(timeout=min(self.heartbeat, remaining))
+                except queue.Empty:
+                    yield f": keep-alive {datetime.now().strftime('%H:%M:%S')}\n\n"
+        finally:
+            with self._lock:
+                self._subscribers.discard(subscriber)
+
+    def get_stats(self):
+        return {
+            'subscribers': len(self._subscribers),
+            'running': bool(self._thread and self._thread.is_alive()),
+            'version': self.version,
+            'process': dict(self.stats)
+        }
+
+
+live_feed = LiveFeed()
+
+
+# ============ COMMIT HOOKS ============
+
+@event.listens_for(Session, 'after_flush')
+def _collect_live_changes(session, flush_context):
+    from app.models.class_model import Class
+
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, Class):
+            state = inspect(obj)
+            if obj in session.new or any(state.attrs[field].history.has_changes() for field in TRIGGER_FIELDS):
+                session.info['live_feed_changed'] = True
+                return
+
+
+@event.listens_for(Session, 'after_commit')
+def _notify_live_feed(session):
+    if session.info.pop('live_feed_changed', False):
+        live_feed.notify()
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_live_changes(session):
+    session.info.pop('live_feed_changed', None)
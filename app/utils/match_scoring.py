@@ -0,0 +1,215 @@
+"""
+Vectorized tutor-student compatibility scoring.
+
+Tutors and students are encoded once into NumPy feature matrices (grade/board
+one-hots, subject bitmasks over a shared vocabulary, test score, rating,
+completion rate, qualification tier) and a whole students x tutors score matrix
+is computed in one pass. The formulas mirror the per-pair scorers exactly:
+
+- ``compatibility_scores``  ->  Tutor.get_compatibility_score
+- ``match_scores``          ->  TutorMatchingEngine._calculate_match_score (total_score)
+
+Only the totals are vectorized; callers rank with them and build the textual
+breakdown (match reasons) with the scalar scorer for the few tutors they return.
+"""
+from app.utils.lazy_imports import lazy_module
+
+np = lazy_module('numpy')
+
+ADVANCED_QUALIFICATIONS = ('master', 'phd', 'doctorate', 'ph.d')
+SPECIALIST_QUALIFICATIONS = ('expert', 'specialist', 'senior')
+
+
+def _vocabulary(value_lists):
+    vocab = {}
+    for values in value_lists:
+        for value in values:
+            vocab.setdefault(value, len(vocab))
+    return vocab
+
+
+def _bitmask(value_lists, vocab):
+    mask = np.zeros((len(value_lists), len(vocab)), dtype=bool)
+    for row, values in enumerate(value_lists):
+        for value in values:
+            column = vocab.get(value)
+            if column is not None:
+                mask[row, column] = True
+    return mask
+
+
+def _lookup_one_hot(one_hot, indices):
+    """students x tutors bool: tutor one_hot[:, index] for each student's vocabulary index (-1 = no match)"""
+    result = np.zeros((len(indices), one_hot.shape[0]), dtype=bool)
+    valid = indices >= 0
+    if valid.any():
+        result[valid] = one_hot[:, indices[valid]].T
+    return result
+
+
+def _any_overlap(left, right):
+    """rows of left x rows of right: True where the two bitmasks share a set bit"""
+    if left.shape[1] == 0:
+        return np.zeros((left.shape[0], right.shape[0]), dtype=bool)
+    return (left.astype(np.int32) @ right.T.astype(np.int32)) > 0
+
+
+class MatchFeatures:
+    """Feature matrices for a list of tutors and a list of students"""
+
+    def __init__(self, tutors, students):
+        self.tutors = list(tutors)
+        self.students = list(students)
+
+        # Same normalization as the scalar scorers
+        tutor_grades = [[str(g) for g in tutor.get_grades()] for tutor in self.tutors]
+        tutor_boards = [[b.lower() for b in tutor.get_boards()] for tutor in self.tutors]
+        tutor_subjects = [[s.lower() for s in tutor.get_subjects()] for tutor in self.tutors]
+        student_subjects = [[s.lower() for s in student.get_subjects_enrolled()] for student in self.students]
+
+        grade_vocab = _vocabulary(tutor_grades)
+        board_vocab = _vocabulary(tutor_boards)
+        self.subject_vocab = _vocabulary(tutor_subjects + student_subjects)
+        subject_names = list(self.subject_vocab)
+
+        self.tutor_grade = _bitmask(tutor_grades, grade_vocab)
+        self.tutor_board = _bitmask(tutor_boards, board_vocab)
+        self.tutor_subject = _bitmask(tutor_subjects, self.subject_vocab)
+        self.student_subject = _bitmask(student_subjects, self.subject_vocab)
+
+        self.student_grade = np.array(
+            [grade_vocab.get(str(student.grade), -1) for student in self.students], dtype=np.int64
+        )
+        self.student_board = np.array(
+            [board_vocab.get(student.board.lower(), -1) if student.board else -1 for student in self.students],
+            dtype=np.int64
+        )
+
+        # related[i, j]: subject i contains or is contained in subject j (the scorers' partial match)
+        self.related = np.array(
+            [[a in b or b in a for b in subject_names] for a in subject_names], dtype=bool
+        ).reshape(len(subject_names), len(subject_names))
+
+        total = np.array([tutor.total_classes or 0 for tutor in self.tutors], dtype=float)
+        completed = np.array([tutor.completed_classes or 0 for tutor in self.tutors], dtype=float)
+        self.total_classes = total
+        self.completion_rate = np.divide(completed * 100, total, out=np.zeros_like(total), where=total > 0)
+        self.test_score = np.array([tutor.test_score or 0 for tutor in self.tutors], dtype=float)
+        self.rating = np.array([tutor.rating or 0 for tutor in self.tutors], dtype=float)
+
+        qualifications = [(tutor.qualification or '').lower() for tutor in self.tutors]
+        self.advanced_qualification = np.array(
+            [any(term in q for term in ADVANCED_QUALIFICATIONS) for q in qualifications], dtype=bool
+        )
+        self.specialist_qualification = np.array(
+            [any(term in q for term in SPECIALIST_QUALIFICATIONS) for q in qualifications], dtype=bool
+        )
+
+    # ============ PAIRWISE MASKS (students x tutors) ============
+
+    def grade_and_board_match(self):
+        return (_lookup_one_hot(self.tutor_grade, self.student_grade) &
+                _lookup_one_hot(self.tutor_board, self.student_board))
+
+    def subjects_present(self):
+        return self.student_subject.any(axis=1)[:, None] & self.tutor_subject.any(axis=1)[None, :]
+
+    def exact_subject_match(self):
+        return _any_overlap(self.student_subject, self.tutor_subject)
+
+    def partial_subject_match(self):
+        if not self.subject_vocab:
+            return np.zeros((len(self.students), len(self.tutors)), dtype=bool)
+        student_related = (self.student_subject.astype(np.int32) @ self.related.astype(np.int32)) > 0
+        return _any_overlap(student_related, self.tutor_subject)
+
+    def requested_subject_match(self, subject):
+        """Per tutor: the requested subject partially matches one of their subjects"""
+        subject_lower = subject.lower()
+        related = np.array(
+            [subject_lower in name or name in subject_lower for name in self.subject_vocab], dtype=bool
+        )
+        return (self.tutor_subject & related[None, :]).any(axis=1)
+
+
+def compatibility_scores(features, subject=None):
+    """students x tutors totals of Tutor.get_compatibility_score"""
+    exact = features.exact_subject_match()
+    partial = features.partial_subject_match()
+    subjects_present = features.subjects_present()
+
+    score = np.full(exact.shape, 20 + 15, dtype=float)
+    score += np.where(subjects_present & exact, 25, np.where(subjects_present & partial, 15, 0))
+
+    if subject:
+        score += np.where(features.requested_subject_match(subject), 20, 0)[None, :]
+
+    rate = features.completion_rate
+    completion_bonus = np.where(
+        features.total_classes > 10,
+        np.select([rate >= 95, rate >= 90, rate >= 85], [8, 5, 3], default=0),
+        0
+    )
+    qualification_bonus = np.where(
+        features.advanced_qualification, 8, np.where(features.specialist_qualification, 5, 0)
+    )
+    score += (completion_bonus + qualification_bonus)[None, :]
+
+    # Grade and board are mandatory
+    return np.where(features.grade_and_board_match(), score, 0)
+
+
+def match_scores(features, weights, subject=None):
+    """students x tutors total_score of TutorMatchingEngine._calculate_match_score"""
+    subject_weight = weights['subject_match']
+    exact = features.exact_subject_match()
+    partial = features.partial_subject_match()
+    subjects_present = features.subjects_present()
+
+    subject_score = np.where(
+        subjects_present & exact, subject_weight,
+        np.where(subjects_present & partial, int(subject_weight * 0.7), 0)
+    )
+    if subject:
+        subject_score = np.where(features.requested_subject_match(subject)[None, :], subject_weight, subject_score)
+
+    test = features.test_score
+    test_bonus = np.select(
+        [test >= 90, test >= 85, test >= 80, test >= 70],
+        [weights['test_score'], int(weights['test_score'] * 0.8),
+         int(weights['test_score'] * 0.6), int(weights['test_score'] * 0.4)],
+        default=0
+    )
+
+    rating = features.rating
+    rating_bonus = np.select(
+        [rating >= 4.5, rating >= 4.0, rating >= 3.5],
+        [weights['rating'], int(weights['rating'] * 0.7), int(weights['rating'] * 0.5)],
+        default=0
+    )
+
+    rate = features.completion_rate
+    completion_bonus = np.where(
+        features.total_classes >= 5,
+        np.select(
+            [rate >= 95, rate >= 90, rate >= 85],
+            [weights['completion_rate'], int(weights['completion_rate'] * 0.8),
+             int(weights['completion_rate'] * 0.6)],
+            default=0
+        ),
+        0
+    )
+
+    total = (weights['grade_match'] + weights['board_match'] + subject_score +
+             (test_bonus + rating_bonus + completion_bonus)[None, :])
+    total = np.minimum(total, 100).astype(float)
+
+    # Grade and board are mandatory
+    return np.where(features.grade_and_board_match(), total, 0)
+
+
+def top_indices(scores, limit):
+    """Indices of the highest positive scores in a row, ties kept in input order"""
+    order = np.argsort(-scores, kind='stable')
+    order = order[scores[order] > 0]
+    return order[:limit] if limit else order
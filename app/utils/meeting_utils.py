@@ -2,9 +2,11 @@
 
 import uuid
 from datetime import datetime, timedelta
-import requests
 import json
 from flask import current_app
+from app.utils.lazy_imports import lazy_module
+
+requests = lazy_module('requests')
 
 def generate_meeting_link(platform='zoom'):
     """Generate meeting link for demo classes"""
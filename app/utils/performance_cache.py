@@ -1,14 +1,353 @@
 # Enterprise-Grade Performance Cache System
-import json
 import time
 import hashlib
 import os
 from datetime import datetime, timedelta
 from functools import wraps
-from flask import current_app, request, g
+from flask import current_app, has_app_context, request, g
+from sqlalchemy import event
+from sqlalchemy.orm import Session
 from app import db
+from app.utils.cache_codec import CacheSerializer, CodecError, DEFAULT_COMPRESS_THRESHOLD
 import threading
-import pickle
+import atexit
+import struct
+import sys
+from collections import OrderedDict
+
+# Memory tier defaults (overridable through app config)
+DEFAULT_MEMORY_MAX_ENTRIES = 5000
+DEFAULT_MEMORY_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_MEMORY_SWEEP_INTERVAL = 60
+
+# Tagged entries are stored as {TAGS_FIELD: {tag: version}, 'data': value}
+TAGS_FIELD = '__lms_tags__'
+TAG_VERSION_TTL = 1.0  # seconds a worker trusts its local copy of a tag version
+
+# Stale-while-revalidate entries are stored as {FRESH_FIELD: fresh_until, 'data': value}
+FRESH_FIELD = '__lms_fresh_until__'
+LOCK_TIMEOUT = 30  # seconds a refresh lock is held at most (crashed workers release it)
+LOCK_WAIT = 10  # seconds a caller with nothing to serve waits for another refresh
+LOCK_POLL_INTERVAL = 0.05
+
+REDIS_RETRY_INTERVAL = 30  # seconds to stay on the file fallback after a Redis error
+DEFAULT_FILE_FLUSH_INTERVAL = 1.0  # seconds between write-behind flushes of the file tier
+
+
+def _estimate_size(value, _depth=0):
+    """Rough in-memory size of a cached value in bytes (containers walked a few levels deep)"""
+    size = sys.getsizeof(value)
+    if _depth >= 4:
+        return size
+    if isinstance(value, dict):
+        size += sum(_estimate_size(k, _depth + 1) + _estimate_size(v, _depth + 1) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(_estimate_size(item, _depth + 1) for item in value)
+    return size
+
+
+class MemoryTier:
+    """Bounded, thread-safe LRU/TTL memory cache.
+
+    Bounded by entry count and estimated bytes, with optional per-namespace
+    entry quotas (namespace = first key segment, e.g. 'dashboard' in
+    'lms:dashboard:...'). Expired entries are dropped on read and by a
+    background sweeper thread.
+    """
+
+    def __init__(self, max_entries=DEFAULT_MEMORY_MAX_ENTRIES, max_bytes=DEFAULT_MEMORY_MAX_BYTES,
+                 namespace_quotas=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.namespace_quotas = dict(namespace_quotas or {})
+        self._entries = OrderedDict()  # key -> (value, expires_at, size, namespace)
+        self._namespaces = {}  # namespace -> OrderedDict of keys in LRU order
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self._sweeper = None
+        self.stats = {
+            'evictions_lru': 0,
+            'evictions_bytes': 0,
+            'evictions_namespace': 0,
+            'expirations': 0,
+            'rejected_oversize': 0
+        }
+
+    def configure(self, max_entries=None, max_bytes=None, namespace_quotas=None):
+        with self._lock:
+            if max_entries is not None:
+                self.max_entries = max_entries
+            if max_bytes is not None:
+                self.max_bytes = max_bytes
+            if namespace_quotas is not None:
+                self.namespace_quotas = dict(namespace_quotas)
+            self._enforce_limits()
+
+    @staticmethod
+    def namespace_of(cache_key):
+        parts = cache_key.split(':')
+        return parts[1] if len(parts) > 2 else ''
+
+    def get(self, cache_key):
+        """Return (found, value); expired entries are removed"""
+        with self._lock:
+            entry = self._entries.get(cache_key)
+            if entry is None:
+                return False, None
+            if entry[1] <= time.time():
+                self._remove(cache_key)
+                self.stats['expirations'] += 1
+                return False, None
+            self._entries.move_to_end(cache_key)
+            self._namespaces[entry[3]].move_to_end(cache_key)
+            return True, entry[0]
+
+    def set(self, cache_key, value, ttl):
+        size = _estimate_size(value)
+        namespace = self.namespace_of(cache_key)
+        with self._lock:
+            if cache_key in self._entries:
+                self._remove(cache_key)
+            if size > self.max_bytes:
+                self.stats['rejected_oversize'] += 1
+                return False
+            self._entries[cache_key] = (value, time.time() + ttl, size, namespace)
+            self._namespaces.setdefault(namespace, OrderedDict())[cache_key] = None
+            self._bytes += size
+            self._enforce_limits(namespace)
+            return True
+
+    def delete(self, cache_key):
+        with self._lock:
+            return self._remove(cache_key)
+
+    def keys(self):
+        with self._lock:
+            return list(self._entries.keys())
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._namespaces.clear()
+            self._bytes = 0
+
+    def __contains__(self, cache_key):
+        return self.get(cache_key)[0]
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _remove(self, cache_key):
+        entry = self._entries.pop(cache_key, None)
+        if entry is None:
+            return False
+        self._bytes -= entry[2]
+        keys = self._namespaces.get(entry[3])
+        if keys is not None:
+            keys.pop(cache_key, None)
+            if not keys:
+                del self._namespaces[entry[3]]
+        return True
+
+    def _enforce_limits(self, namespace=None):
+        namespaces = [namespace] if namespace is not None else list(self._namespaces)
+        for name in namespaces:
+            quota = self.namespace_quotas.get(name)
+            keys = self._namespaces.get(name)
+            while quota is not None and keys and len(keys) > quota:
+                self._remove(next(iter(keys)))
+                self.stats['evictions_namespace'] += 1
+
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+            self.stats['evictions_lru'] += 1
+
+        while self._bytes > self.max_bytes and self._entries:
+            self._remove(next(iter(self._entries)))
+            self.stats['evictions_bytes'] += 1
+
+    def sweep(self):
+        """Drop every expired entry; returns how many were removed"""
+        now = time.time()
+        with self._lock:
+            expired = [key for key, entry in self._entries.items() if entry[1] <= now]
+            for key in expired:
+                self._remove(key)
+            self.stats['expirations'] += len(expired)
+        return len(expired)
+
+    def start_sweeper(self, interval=DEFAULT_MEMORY_SWEEP_INTERVAL):
+        """Start the background expiry sweeper (once per process)"""
+        if self._sweeper is not None and self._sweeper.is_alive():
+            return
+
+        def sweep_loop():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.sweep()
+                except Exception as e:
+                    print(f"Memory cache sweep error: {e}")
+
+        self._sweeper = threading.Thread(target=sweep_loop, daemon=True)
+        self._sweeper.start()
+
+    def get_stats(self):
+        with self._lock:
+            return dict(self.stats, **{
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'namespaces': {name: len(keys) for name, keys in self._namespaces.items()}
+            })
+
+
+class KeyLocks:
+    """Per-key in-process locks, dropped once nobody holds or waits on them"""
+    
+    def __init__(self):
+        self._guard = threading.Lock()
+        self._locks = {}  # key -> [lock, users]
+    
+    def acquire(self, key, blocking=True, timeout=-1):
+        with self._guard:
+            entry = self._locks.setdefault(key, [threading.Lock(), 0])
+            entry[1] += 1
+        
+        if entry[0].acquire(blocking, timeout if blocking else -1):
+            return True
+        self._release_user(key, entry)
+        return False
+    
+    def release(self, key):
+        entry = self._locks[key]
+        entry[0].release()
+        self._release_user(key, entry)
+    
+    def _release_user(self, key, entry):
+        with self._guard:
+            entry[1] -= 1
+            if entry[1] == 0:
+                self._locks.pop(key, None)
+    
+    def __len__(self):
+        return len(self._locks)
+
+class FileTier:
+    """Write-behind file storage, only used while Redis is unreachable.
+    
+    Writes are queued (the latest frame per key wins) and flushed to disk by a
+    background thread; reads check the queue before the file. Each file holds an
+    8-byte expiry timestamp followed by the encoded frame.
+    """
+    
+    HEADER = struct.Struct('>d')
+    SUFFIX = '.cache'
+    
+    def __init__(self):
+        self.cache_dir = None
+        self._pending = {}  # cache_key -> (frame, expires_at)
+        self._lock = threading.Lock()
+        self._writer = None
+        self.stats = {'queued': 0, 'flushed': 0, 'reads': 0, 'write_errors': 0}
+    
+    def configure(self, cache_dir):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.cache_dir = cache_dir
+    
+    def _path(self, cache_key):
+        return os.path.join(self.cache_dir, cache_key.replace(os.sep, '_') + self.SUFFIX)
+    
+    def write(self, cache_key, frame, expires_at):
+        if not self.cache_dir:
+            return
+        with self._lock:
+            self._pending[cache_key] = (frame, expires_at)
+        self.stats['queued'] += 1
+    
+    def read(self, cache_key):
+        """(frame, expires_at) or None"""
+        if not self.cache_dir:
+            return None
+        
+        entry = self._pending.get(cache_key)
+        if entry is None:
+            try:
+                with open(self._path(cache_key), 'rb') as f:
+                    raw = f.read()
+                entry = (raw[self.HEADER.size:], self.HEADER.unpack_from(raw)[0])
+            except (OSError, IOError, struct.error):
+                return None
+        
+        if entry[1] <= time.time():
+            self.delete(cache_key)
+            return None
+        self.stats['reads'] += 1
+        return entry
+    
+    def delete(self, cache_key):
+        if not self.cache_dir:
+            return
+        with self._lock:
+            self._pending.pop(cache_key, None)
+            try:
+                os.remove(self._path(cache_key))
+            except (OSError, IOError):
+                pass
+    
+    def flush(self):
+        """Write queued entries to disk (atomic rename per file)"""
+        if not self.cache_dir:
+            return
+        # Held for the whole batch so a concurrent delete cannot be overwritten
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            for cache_key, (frame, expires_at) in pending.items():
+                path = self._path(cache_key)
+                try:
+                    with open(path + '.tmp', 'wb') as f:
+                        f.write(self.HEADER.pack(expires_at))
+                        f.write(frame)
+                    os.replace(path + '.tmp', path)
+                    self.stats['flushed'] += 1
+                except (OSError, IOError) as e:
+                    self.stats['write_errors'] += 1
+                    print(f"File cache write error: {e}")
+    
+    def clear(self, pattern=None):
+        """Remove entries (and tag files) whose file name contains pattern; None clears everything"""
+        if not self.cache_dir:
+            return
+        with self._lock:
+            for cache_key in [k for k in self._pending if pattern is None or pattern in k]:
+                del self._pending[cache_key]
+            try:
+                for filename in os.listdir(self.cache_dir):
+                    if pattern is None or pattern in filename:
+                        os.remove(os.path.join(self.cache_dir, filename))
+            except (OSError, IOError):
+                pass
+    
+    def start_writer(self, interval=DEFAULT_FILE_FLUSH_INTERVAL):
+        """Start the background flush thread (once per process)"""
+        if self._writer and self._writer.is_alive():
+            return
+        
+        def flush_loop():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.flush()
+                except Exception as e:
+                    print(f"File cache flush error: {e}")
+        
+        self._writer = threading.Thread(target=flush_loop, name='cache-file-writer', daemon=True)
+        self._writer.start()
+        atexit.register(self.flush)
+    
+    def get_stats(self):
+        return dict(self.stats, pending=len(self._pending))
 
 class PerformanceCache:
     """High-performance caching system with multiple backend support"""
@@ -16,31 +355,70 @@ class PerformanceCache:
     def __init__(self):
         self.cache_dir = None
         self.redis_client = None
-        self.memory_cache = {}
-        self.cache_stats = {'hits': 0, 'misses': 0, 'sets': 0}
+        self.redis_down_until = 0
+        self.memory_cache = MemoryTier()
+        self.file_tier = FileTier()
+        self.serializer = CacheSerializer()
+        self.cache_stats = {'hits': 0, 'misses': 0, 'sets': 0, 'tag_invalidations': 0, 'stale_tagged': 0,
+                            'stale_served': 0, 'refreshes': 0, 'coalesced': 0}
+        self.key_locks = KeyLocks()
+        self.tag_versions = {}  # tag -> (version, fetched_at)
+        self._tag_lock = threading.Lock()
+        self._init_lock = threading.Lock()
+        self.app = None
         self.initialized = False
     
+    def init_app(self, app):
+        """Remember the app; backends (Redis ping, file tier, sweeper) start on first use"""
+        self.app = app
+    
     def init_cache(self):
         """Initialize cache backends"""
         if self.initialized:
             return
-            
+        
+        with self._init_lock:
+            if self.initialized:
+                return
+            if not has_app_context() and self.app is not None:
+                with self.app.app_context():
+                    self._init_backends()
+            else:
+                self._init_backends()
+    
+    def _init_backends(self):
         try:
             # Check if we have app context
-            try:
-                app_context_available = current_app is not None
-            except RuntimeError:
-                app_context_available = False
+            app_context_available = has_app_context()
             
             if not app_context_available:
                 # Use default cache directory if no app context
                 import tempfile
                 self.cache_dir = os.path.join(tempfile.gettempdir(), 'lms_cache')
-                os.makedirs(self.cache_dir, exist_ok=True)
+                self.file_tier.configure(self.cache_dir)
                 print(f"⚠️  No app context, using temp cache at {self.cache_dir}")
+                self.memory_cache.start_sweeper()
+                self.file_tier.start_writer()
                 self.initialized = True
                 return
             
+            # Bounded memory tier
+            self.memory_cache.configure(
+                max_entries=current_app.config.get('CACHE_MEMORY_MAX_ENTRIES', DEFAULT_MEMORY_MAX_ENTRIES),
+                max_bytes=current_app.config.get('CACHE_MEMORY_MAX_BYTES', DEFAULT_MEMORY_MAX_BYTES),
+                namespace_quotas=current_app.config.get('CACHE_MEMORY_NAMESPACE_QUOTAS')
+            )
+            self.memory_cache.start_sweeper(
+                current_app.config.get('CACHE_MEMORY_SWEEP_INTERVAL', DEFAULT_MEMORY_SWEEP_INTERVAL)
+            )
+            
+            # Encoding for the Redis and file tiers
+            self.serializer.configure(
+                codec=current_app.config.get('CACHE_CODEC', 'auto'),
+                compression=current_app.config.get('CACHE_COMPRESSION', 'zlib'),
+                compress_threshold=current_app.config.get('CACHE_COMPRESS_THRESHOLD', DEFAULT_COMPRESS_THRESHOLD)
+            )
+            
             # Try Redis first (best performance)
             try:
                 import redis
@@ -48,7 +426,7 @@ class PerformanceCache:
                     host=current_app.config.get('REDIS_HOST', 'localhost'),
                     port=current_app.config.get('REDIS_PORT', 6379),
                     db=current_app.config.get('REDIS_DB', 1),
-                    decode_responses=True,
+                    decode_responses=False,
                     socket_connect_timeout=1,
                     socket_timeout=1
                 )
@@ -59,10 +437,13 @@ class PerformanceCache:
                 self.redis_client = None
                 print("⚠️  Redis not available, using file cache")
             
-            # File cache fallback
+            # File cache fallback (only written while Redis is unreachable)
+            self.cache_dir = os.path.join(current_app.instance_path, 'cache')
+            self.file_tier.configure(self.cache_dir)
+            self.file_tier.start_writer(
+                current_app.config.get('CACHE_FILE_FLUSH_INTERVAL', DEFAULT_FILE_FLUSH_INTERVAL)
+            )
             if not self.redis_client:
-                self.cache_dir = os.path.join(current_app.instance_path, 'cache')
-                os.makedirs(self.cache_dir, exist_ok=True)
                 print(f"✅ File cache initialized at {self.cache_dir}")
                 
             self.initialized = True
@@ -84,47 +465,20 @@ class PerformanceCache:
         cache_key = self._generate_key(key)
         
         try:
-            # Level 1: Memory cache (fastest)
-            if cache_key in self.memory_cache:
-                cached_data = self.memory_cache[cache_key]
-                if cached_data['expires'] > time.time():
-                    self.cache_stats['hits'] += 1
-                    return cached_data['data']
-                else:
-                    del self.memory_cache[cache_key]
+            found, data = self._lookup(cache_key)
             
-            # Level 2: Redis cache (very fast)
-            if self.redis_client:
-                try:
-                    cached = self.redis_client.get(cache_key)
-                    if cached:
-                        data = json.loads(cached)
-                        # Store in memory for next time
-                        self.memory_cache[cache_key] = {
-                            'data': data,
-                            'expires': time.time() + 60  # 1 minute in memory
-                        }
-                        self.cache_stats['hits'] += 1
-                        return data
-                except Exception as e:
-                    print(f"Redis get error: {e}")
+            # Tagged entries are only valid while every tag is at the version recorded at set time
+            if found and isinstance(data, dict) and TAGS_FIELD in data:
+                if self._tags_current(data[TAGS_FIELD]):
+                    data = data['data']
+                else:
+                    self.delete(key)
+                    self.cache_stats['stale_tagged'] += 1
+                    found = False
             
-            # Level 3: File cache (slower but reliable)
-            if self.cache_dir:
-                try:
-                    cache_file = os.path.join(self.cache_dir, f"{cache_key}.json")
-                    if os.path.exists(cache_file):
-                        with open(cache_file, 'r') as f:
-                            cached_data = json.load(f)
-                            if cached_data['expires'] > time.time():
-                                # Store in higher levels for next time
-                                self._store_in_higher_levels(cache_key, cached_data['data'], cached_data['expires'] - time.time())
-                                self.cache_stats['hits'] += 1
-                                return cached_data['data']
-                            else:
-                                os.remove(cache_file)
-                except Exception as e:
-                    print(f"File cache get error: {e}")
+            if found:
+                self.cache_stats['hits'] += 1
+                return data
             
             self.cache_stats['misses'] += 1
             return default
@@ -134,11 +488,59 @@ class PerformanceCache:
             self.cache_stats['misses'] += 1
             return default
     
-    def set(self, key, value, expiry=300):
-        """Set value in cache with multi-level storage"""
+    def _lookup(self, cache_key):
+        """Raw (found, stored_value) lookup through memory, Redis and file levels"""
+        # Level 1: Memory cache (fastest)
+        found, data = self.memory_cache.get(cache_key)
+        if found:
+            return True, data
+        
+        # Level 2: Redis cache (very fast)
+        redis_client = self._redis()
+        if redis_client:
+            try:
+                frame = redis_client.get(cache_key)
+                if frame:
+                    data = self.serializer.loads(frame)
+                    # Store in memory for next time
+                    self.memory_cache.set(cache_key, data, 60)  # 1 minute in memory
+                    return True, data
+                return False, None
+            except CodecError as e:
+                print(f"Cache decode error for {cache_key}: {e}")
+                self._redis_call('delete', cache_key)
+                return False, None
+            except Exception as e:
+                self._redis_failed(e)
+        
+        # Level 3: File cache (only while Redis is down)
+        try:
+            entry = self.file_tier.read(cache_key)
+            if entry:
+                data = self.serializer.loads(entry[0])
+                self.memory_cache.set(cache_key, data, min(entry[1] - time.time(), 300))
+                return True, data
+        except CodecError as e:
+            print(f"Cache decode error for {cache_key}: {e}")
+            self.file_tier.delete(cache_key)
+        except Exception as e:
+            print(f"File cache get error: {e}")
+        
+        return False, None
+    
+    def set(self, key, value, expiry=300, tags=None, tag_versions=None):
+        """Set value in cache with multi-level storage.
+        
+        tags: invalidation tags for the entry (see invalidate_tags). Pass
+        tag_versions captured with get_tag_versions() *before* computing the
+        value so an invalidation that lands mid-computation is not lost.
+        """
         self.init_cache()
         cache_key = self._generate_key(key)
-        expires_at = time.time() + expiry
+        
+        if tags:
+            versions = tag_versions or self.get_tag_versions(tags)
+            value = {TAGS_FIELD: {tag: versions.get(tag) for tag in tags}, 'data': value}
         
         try:
             # Store in all available levels
@@ -151,33 +553,23 @@ class PerformanceCache:
             return False
     
     def _store_in_higher_levels(self, cache_key, value, expiry):
-        """Store data in all available cache levels"""
+        """Store data in memory and in Redis, or in the file tier while Redis is down"""
         # Memory cache
-        self.memory_cache[cache_key] = {
-            'data': value,
-            'expires': time.time() + min(expiry, 300)  # Max 5 minutes in memory
-        }
+        self.memory_cache.set(cache_key, value, min(expiry, 300))  # Max 5 minutes in memory
+        
+        frame = self.serializer.dumps(value)
         
         # Redis cache
-        if self.redis_client:
+        redis_client = self._redis()
+        if redis_client:
             try:
-                self.redis_client.setex(cache_key, int(expiry), json.dumps(value))
+                redis_client.setex(cache_key, max(1, int(expiry)), frame)
+                return
             except Exception as e:
-                print(f"Redis set error: {e}")
+                self._redis_failed(e)
         
-        # File cache
-        if self.cache_dir:
-            try:
-                cache_file = os.path.join(self.cache_dir, f"{cache_key}.json")
-                cache_data = {
-                    'data': value,
-                    'expires': time.time() + expiry,
-                    'created': time.time()
-                }
-                with open(cache_file, 'w') as f:
-                    json.dump(cache_data, f)
-            except Exception as e:
-                print(f"File cache set error: {e}")
+        # File cache (write-behind)
+        self.file_tier.write(cache_key, frame, time.time() + expiry)
     
     def delete(self, key):
         """Delete from all cache levels"""
@@ -185,51 +577,234 @@ class PerformanceCache:
         cache_key = self._generate_key(key)
         
         # Memory
-        if cache_key in self.memory_cache:
-            del self.memory_cache[cache_key]
+        self.memory_cache.delete(cache_key)
         
         # Redis
-        if self.redis_client:
+        self._redis_call('delete', cache_key)
+        
+        # File (may hold a copy written during a Redis outage)
+        self.file_tier.delete(cache_key)
+    
+    # ============ REDIS HEALTH ============
+    
+    def _redis(self):
+        """The Redis client, or None while it is missing or backing off after an error"""
+        self.init_cache()
+        if self.redis_client is None or time.time() < self.redis_down_until:
+            return None
+        return self.redis_client
+    
+    def _redis_failed(self, error):
+        if time.time() >= self.redis_down_until:
+            print(f"⚠️  Redis error, using file cache for {REDIS_RETRY_INTERVAL}s: {error}")
+        self.redis_down_until = time.time() + REDIS_RETRY_INTERVAL
+    
+    def _redis_call(self, method, *args):
+        redis_client = self._redis()
+        if redis_client is None:
+            return None
+        try:
+            return getattr(redis_client, method)(*args)
+        except Exception as e:
+            self._redis_failed(e)
+            return None
+    
+    # ============ SINGLE-FLIGHT REFRESH ============
+    
+    def get_or_compute(self, key, compute, expiry=300, stale_ttl=None, tags=None):
+        """Return the cached value for key, computing it with compute() at most once at a time.
+        
+        The entry is fresh for `expiry` seconds and then kept for `stale_ttl` more
+        (default: expiry). While stale, the first caller refreshes it and everyone
+        else is served the previous value. On a miss, callers in this process wait
+        on a per-key lock and other workers on a Redis lock, then re-read the cache
+        instead of recomputing.
+        """
+        self.init_cache()
+        stale_ttl = expiry if stale_ttl is None else stale_ttl
+        cache_key = self._generate_key(key)
+        
+        entry = self.get(key)
+        if self._is_envelope(entry):
+            if entry[FRESH_FIELD] > time.time():
+                return entry['data']
+            
+            # Stale: one caller refreshes, the rest keep serving the old value
+            remote = self._acquire_refresh_lock(cache_key, blocking=False)
+            if remote is None:
+                self.cache_stats['stale_served'] += 1
+                return entry['data']
             try:
-                self.redis_client.delete(cache_key)
-            except:
-                pass
+                return self._refresh(key, compute, expiry, stale_ttl, tags)
+            finally:
+                self._release_refresh_lock(cache_key, remote)
         
-        # File
-        if self.cache_dir:
+        # Miss: wait for whoever is already computing it
+        remote = self._acquire_refresh_lock(cache_key, blocking=True)
+        try:
+            entry = self.get(key)
+            if self._is_envelope(entry):
+                self.cache_stats['coalesced'] += 1
+                return entry['data']
+            return self._refresh(key, compute, expiry, stale_ttl, tags)
+        finally:
+            if remote is not None:
+                self._release_refresh_lock(cache_key, remote)
+    
+    def _is_envelope(self, entry):
+        return isinstance(entry, dict) and FRESH_FIELD in entry
+    
+    def _refresh(self, key, compute, expiry, stale_ttl, tags):
+        tag_versions = self.get_tag_versions(tags) if tags else None
+        result = compute()
+        self.set(key, {FRESH_FIELD: time.time() + expiry, 'data': result}, expiry + stale_ttl,
+                 tags=tags, tag_versions=tag_versions)
+        self.cache_stats['refreshes'] += 1
+        return result
+    
+    def _acquire_refresh_lock(self, cache_key, blocking):
+        """Per-key process lock plus Redis lock; returns a handle or None if not acquired.
+        
+        A blocking acquire gives up after LOCK_WAIT and proceeds unlocked
+        (returning a handle anyway) rather than failing the request.
+        """
+        if not self.key_locks.acquire(cache_key, blocking, LOCK_WAIT):
+            if not blocking:
+                return None
+            return {'local': False, 'redis': None}
+        
+        handle = {'local': True, 'redis': None}
+        redis_client = self._redis()
+        if redis_client:
             try:
-                cache_file = os.path.join(self.cache_dir, f"{cache_key}.json")
-                if os.path.exists(cache_file):
-                    os.remove(cache_file)
-            except:
-                pass
+                lock = redis_client.lock(f"lms:lock:{cache_key}", timeout=LOCK_TIMEOUT,
+                                              sleep=LOCK_POLL_INTERVAL)
+                if lock.acquire(blocking=blocking, blocking_timeout=LOCK_WAIT if blocking else None):
+                    handle['redis'] = lock
+                elif not blocking:
+                    self.key_locks.release(cache_key)
+                    return None
+            except Exception as e:
+                print(f"Redis lock error: {e}")
+        return handle
+    
+    def _release_refresh_lock(self, cache_key, handle):
+        if handle['redis'] is not None:
+            try:
+                handle['redis'].release()
+            except Exception:
+                pass  # expired after LOCK_TIMEOUT; another worker may already hold it
+        if handle['local']:
+            self.key_locks.release(cache_key)
+    
+    # ============ TAG INVALIDATION ============
+    
+    def _tag_key(self, tag):
+        return f"lms:tag:{tag}"
+    
+    def get_tag_versions(self, tags):
+        """Current version of each tag (None for a tag that was never invalidated)"""
+        self.init_cache()
+        now = time.time()
+        versions = {}
+        missing = []
+        
+        for tag in tags:
+            local = self.tag_versions.get(tag)
+            if local and now - local[1] < TAG_VERSION_TTL:
+                versions[tag] = local[0]
+            else:
+                missing.append(tag)
+        
+        if missing:
+            for tag, version in zip(missing, self._read_tag_versions(missing)):
+                versions[tag] = version
+                self.tag_versions[tag] = (version, now)
+        
+        return versions
+    
+    def _read_tag_versions(self, tags):
+        redis_client = self._redis()
+        if redis_client:
+            try:
+                return [version.decode() if version is not None else None
+                        for version in redis_client.mget([self._tag_key(tag) for tag in tags])]
+            except Exception as e:
+                self._redis_failed(e)
+        
+        if self.cache_dir:
+            versions = []
+            for tag in tags:
+                try:
+                    with open(os.path.join(self.cache_dir, f"{self._tag_key(tag)}.tag"), 'r') as f:
+                        versions.append(f.read() or None)
+                except (OSError, IOError):
+                    versions.append(None)
+            return versions
+        
+        return [self.tag_versions.get(tag, (None, 0))[0] for tag in tags]
+    
+    def _tags_current(self, recorded):
+        current = self.get_tag_versions(list(recorded))
+        return all(current.get(tag) == version for tag, version in recorded.items())
+    
+    def invalidate_tags(self, *tags):
+        """Invalidate every entry set with any of these tags: O(1) per tag, no key scans"""
+        self.init_cache()
+        now = time.time()
+        
+        for tag in tags:
+            version = self._redis_call('incr', self._tag_key(tag))
+            if version is not None:
+                version = str(version)
+            
+            if version is None:
+                version = f"{time.time_ns()}-{os.getpid()}"
+                if self.cache_dir:
+                    try:
+                        with open(os.path.join(self.cache_dir, f"{self._tag_key(tag)}.tag"), 'w') as f:
+                            f.write(version)
+                    except (OSError, IOError) as e:
+                        print(f"File tag invalidation error: {e}")
+            
+            with self._tag_lock:
+                self.tag_versions[tag] = (version, now)
+            self.cache_stats['tag_invalidations'] += 1
     
     def clear_pattern(self, pattern):
-        """Clear cache entries matching pattern"""
-        pattern_key = self._generate_key(pattern)
+        """Clear cache entries whose key contains pattern ('*' clears everything).
+        
+        Prefer invalidate_tags: this walks every key (SCAN on Redis, a directory
+        listing for the file tier) and cannot see entries stored under hashed keys.
+        """
+        match_all = pattern == '*'
         
         # Clear memory cache
-        keys_to_delete = [k for k in self.memory_cache.keys() if pattern in k]
+        keys_to_delete = [k for k in self.memory_cache.keys() if match_all or pattern in k]
         for key in keys_to_delete:
-            del self.memory_cache[key]
+            self.memory_cache.delete(key)
         
-        # Clear Redis
-        if self.redis_client:
+        # Clear Redis (SCAN so a large keyspace does not block the server)
+        redis_client = self._redis()
+        if redis_client:
             try:
-                keys = self.redis_client.keys(f"*{pattern}*")
-                if keys:
-                    self.redis_client.delete(*keys)
-            except:
-                pass
+                batch = []
+                for key in redis_client.scan_iter(match='lms:*' if match_all else f"*{pattern}*", count=1000):
+                    batch.append(key)
+                    if len(batch) >= 500:
+                        redis_client.delete(*batch)
+                        batch = []
+                if batch:
+                    redis_client.delete(*batch)
+            except Exception as e:
+                self._redis_failed(e)
         
         # Clear file cache
-        if self.cache_dir:
-            try:
-                for filename in os.listdir(self.cache_dir):
-                    if pattern in filename:
-                        os.remove(os.path.join(self.cache_dir, filename))
-            except:
-                pass
+        self.file_tier.clear(None if match_all else pattern)
+        
+        if match_all:
+            with self._tag_lock:
+                self.tag_versions.clear()
     
     def get_stats(self):
         """Get cache performance statistics"""
@@ -241,9 +816,18 @@ class PerformanceCache:
             'misses': self.cache_stats['misses'],
             'sets': self.cache_stats['sets'],
             'hit_rate': round(hit_rate, 2),
+            'tag_invalidations': self.cache_stats['tag_invalidations'],
+            'stale_tagged': self.cache_stats['stale_tagged'],
+            'stale_served': self.cache_stats['stale_served'],
+            'refreshes': self.cache_stats['refreshes'],
+            'coalesced': self.cache_stats['coalesced'],
+            'refresh_locks': len(self.key_locks),
             'memory_entries': len(self.memory_cache),
+            'memory': self.memory_cache.get_stats(),
+            'serializer': self.serializer.get_stats(),
+            'file': self.file_tier.get_stats(),
             'backends': {
-                'redis': self.redis_client is not None,
+                'redis': self._redis() is not None,
                 'file': self.cache_dir is not None,
                 'memory': True
             }
@@ -252,13 +836,21 @@ class PerformanceCache:
 # Global cache instance
 cache = PerformanceCache()
 
-def cached(expiry=300, key_prefix='', invalidate_on_user=False):
-    """Decorator for caching function results"""
+def cached(expiry=300, key_prefix='', invalidate_on_user=False, tags=None, stale_ttl=None):
+    """Decorator for caching function results.
+    
+    tags: invalidation tags (see PerformanceCache.invalidate_tags). With
+    invalidate_on_user the entry is also tagged 'user:<id>' so
+    clear_user_cache(user_id) drops it. Concurrent misses are coalesced and
+    expired results are served for stale_ttl seconds while one caller
+    refreshes them (see PerformanceCache.get_or_compute).
+    """
     def decorator(func):
         @wraps(func)
         def wrapper(*args, **kwargs):
             # Generate cache key
             key_parts = [key_prefix or func.__name__]
+            entry_tags = list(tags or [])
             
             # Add user context if needed
             if invalidate_on_user:
@@ -266,6 +858,7 @@ def cached(expiry=300, key_prefix='', invalidate_on_user=False):
                     from flask_login import current_user
                     if current_user and current_user.is_authenticated:
                         key_parts.append(f"user:{current_user.id}")
+                        entry_tags.append(f"user:{current_user.id}")
                 except:
                     pass
             
@@ -275,17 +868,10 @@ def cached(expiry=300, key_prefix='', invalidate_on_user=False):
             if kwargs:
                 key_parts.extend([f"{k}:{v}" for k, v in sorted(kwargs.items())])
             
-            cache_key = key_parts
-            
-            # Try to get from cache
-            cached_result = cache.get(cache_key)
-            if cached_result is not None:
-                return cached_result
-            
-            # Execute function and cache result
-            result = func(*args, **kwargs)
-            cache.set(cache_key, result, expiry)
-            return result
+            return cache.get_or_compute(
+                key_parts, lambda: func(*args, **kwargs), expiry,
+                stale_ttl=stale_ttl, tags=entry_tags
+            )
         
         return wrapper
     return decorator
@@ -294,18 +880,17 @@ def cache_dashboard_data(func):
     """Special decorator for dashboard data with smart invalidation"""
     @wraps(func)
     def wrapper(*args, **kwargs):
-        # Cache key based on current hour for automatic refresh
-        current_hour = datetime.now().strftime('%Y-%m-%d-%H')
-        cache_key = f"dashboard:{func.__name__}:{current_hour}"
+        # Stable key, refreshed at the top of each hour (30 minutes max). The previous
+        # hour's value keeps being served while a single caller recomputes it.
+        cache_key = f"dashboard:{func.__name__}"
+        now = datetime.now()
+        next_hour = now.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+        fresh_for = max(1, min(1800, int((next_hour - now).total_seconds())))
         
-        cached_result = cache.get(cache_key)
-        if cached_result is not None:
-            return cached_result
-        
-        result = func(*args, **kwargs)
-        # Cache for 30 minutes max
-        cache.set(cache_key, result, 1800)
-        return result
+        return cache.get_or_compute(
+            cache_key, lambda: func(*args, **kwargs), fresh_for,
+            stale_ttl=1800, tags=['dashboard']
+        )
     
     return wrapper
 
@@ -321,14 +906,14 @@ def warm_cache():
         
         # Pre-cache dashboard statistics
         stats = get_dashboard_statistics()
-        cache.set('dashboard:stats', stats, 600)  # 10 minutes
+        cache.set('dashboard:stats', stats, 600, tags=['dashboard'])  # 10 minutes
         
         # Pre-cache user counts
         user_count = User.query.filter_by(is_active=True).count()
-        cache.set('users:active_count', user_count, 300)  # 5 minutes
+        cache.set('users:active_count', user_count, 300, tags=['users'])  # 5 minutes
         
         student_count = Student.query.filter_by(is_active=True).count()
-        cache.set('students:active_count', student_count, 300)
+        cache.set('students:active_count', student_count, 300, tags=['students'])
         
         print("✅ Cache warmed successfully")
         
@@ -337,36 +922,48 @@ def warm_cache():
 
 def clear_user_cache(user_id):
     """Clear cache entries for specific user"""
-    cache.clear_pattern(f"user:{user_id}")
+    cache.invalidate_tags(f"user:{user_id}")
 
 def clear_dashboard_cache():
     """Clear all dashboard-related cache"""
-    cache.clear_pattern("dashboard")
-    cache.clear_pattern("stats")
-
-# Background cache warming
-def setup_cache_warming(app):
-    """Setup background cache warming"""
-    def warm_cache_background():
-        with app.app_context():
-            warm_cache()
-    
-    # Warm cache every 10 minutes
-    import threading
-    import time
-    
-    def cache_warmer():
-        while True:
-            try:
-                time.sleep(600)  # 10 minutes
-                warm_cache_background()
-            except Exception as e:
-                print(f"Cache warmer error: {e}")
-                time.sleep(60)  # Wait 1 minute on error
-    
-    # Start background thread
-    warming_thread = threading.Thread(target=cache_warmer, daemon=True)
-    warming_thread.start()
-    
-    # Initial warm
-    warm_cache_background()
\ No newline at end of file
+    cache.invalidate_tags('dashboard', 'stats')
+
+# ============ MODEL COMMIT HOOKS ============
+
+# Model class name -> tags invalidated when a row of it is committed
+MODEL_CACHE_TAGS = {
+    'Student': ('students', 'dashboard'),
+    'Class': ('classes', 'dashboard'),
+    'Tutor': ('tutors', 'dashboard'),
+    'Attendance': ('attendance', 'dashboard'),
+    'User': ('users', 'dashboard'),
+}
+
+def tag_session_changes(*tags, session=None):
+    """Queue tags to invalidate when the session commits (for Core/bulk writes the ORM hooks cannot see)"""
+    session = session or db.session()
+    session.info.setdefault('cache_tags', set()).update(tags)
+
+@event.listens_for(Session, 'after_flush')
+def _collect_cache_tags(session, flush_context):
+    pending = session.info.setdefault('cache_tags', set())
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        name = type(obj).__name__
+        pending.update(MODEL_CACHE_TAGS.get(name, ()))
+        if name == 'User' and getattr(obj, 'id', None):
+            pending.add(f"user:{obj.id}")
+        elif name == 'Department' and getattr(obj, 'id', None):
+            pending.add(f"department:{obj.id}")
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_cache_tags(session):
+    tags = session.info.pop('cache_tags', None)
+    if tags:
+        try:
+            cache.invalidate_tags(*tags)
+        except Exception as e:
+            print(f"Cache tag invalidation error: {e}")
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_cache_tags(session):
+    session.info.pop('cache_tags', None)
@@ -1,12 +1,15 @@
 # Performance System Initialization
 from flask import Flask, current_app
 import os
-import threading
+import click
 import time
 import logging
-from .performance_cache import cache, setup_cache_warming
-from .db_optimizer import setup_database_optimization, db_optimizer
+from sqlalchemy import text
+from .performance_cache import cache
+from .db_optimizer import db_optimizer
+from .job_scheduler import periodic_job
 from .auth_optimized import warm_auth_cache
+from .request_metrics import request_metrics
 
 logger = logging.getLogger(__name__)
 
@@ -15,7 +18,6 @@ class PerformanceManager:
     
     def __init__(self):
         self.initialized = False
-        self.background_tasks = []
         self.performance_stats = {
             'cache_enabled': False,
             'db_optimized': False,
@@ -24,7 +26,13 @@ class PerformanceManager:
         }
     
     def initialize(self, app: Flask):
-        """Initialize all performance optimizations"""
+        """Initialize all performance optimizations.
+
+        Only per-process setup runs here, so worker boot does no I/O. Schema,
+        index and cache warm-up work is done once per deployment by
+        `flask perf init` (or here when PERF_INIT_ON_STARTUP is set), and the
+        periodic tasks run on the job scheduler leader.
+        """
         if self.initialized:
             return
         
@@ -33,19 +41,17 @@ class PerformanceManager:
             print("=" * 60)
             
             with app.app_context():
-                # Step 1: Initialize Cache System
+                # Step 1: Cache System (backends connect on first use)
                 self._init_cache_system(app)
                 
-                # Step 2: Optimize Database
-                self._init_database_optimization(app)
-                
-                # Step 3: Setup Authentication Cache
-                self._init_auth_optimization(app)
+                # Step 2: One-time work, only when asked to run at startup
+                if app.config.get('PERF_INIT_ON_STARTUP', False):
+                    self.run_one_time_init(app)
                 
-                # Step 4: Start Background Tasks
+                # Step 3: Periodic tasks on the job scheduler leader
                 self._init_background_tasks(app)
                 
-                # Step 5: Setup Performance Monitoring
+                # Step 4: Setup Performance Monitoring
                 self._init_performance_monitoring(app)
                 
             self.initialized = True
@@ -58,144 +64,93 @@ class PerformanceManager:
     def _init_cache_system(self, app):
         """Initialize caching system"""
         try:
-            # Cache is already initialized in performance_cache.py
-            cache.init_cache()
-            
-            # Setup cache warming
-            setup_cache_warming(app)
+            cache.init_app(app)
             
             self.performance_stats['cache_enabled'] = True
-            print("✅ Cache System: Multi-level caching active (Redis + File + Memory)")
+            print("✅ Cache System: Multi-level caching active (Redis + File + Memory, connected on first use)")
             
         except Exception as e:
             print(f"⚠️  Cache System: Fallback mode ({e})")
     
-    def _init_database_optimization(self, app):
-        """Initialize database optimizations"""
-        try:
-            success = setup_database_optimization(app)
-            
-            if success:
-                self.performance_stats['db_optimized'] = True
-                print("✅ Database: Optimized with connection pooling and indexes")
-            else:
-                print("⚠️  Database: Partial optimization applied")
-                
-        except Exception as e:
-            print(f"⚠️  Database: Optimization failed ({e})")
-    
-    def _init_auth_optimization(self, app):
-        """Initialize authentication optimizations"""
-        try:
-            # Warm auth cache in background
-            def warm_auth_background():
-                with app.app_context():
-                    warm_auth_cache()
-            
-            # Start warming thread
-            auth_thread = threading.Thread(target=warm_auth_background, daemon=True)
-            auth_thread.start()
-            
-            self.performance_stats['auth_cached'] = True
-            print("✅ Authentication: Cache-optimized login system active")
-            
-        except Exception as e:
-            print(f"⚠️  Authentication: Cache warming failed ({e})")
+    def run_one_time_init(self, app):
+        """Schema, indexes, cache warm-up and S3 check; returns {step: (ok, seconds)}"""
+        from app import db, initialize_s3
+        from .performance_cache import warm_cache
+
+        def create_schema():
+            db.create_all()
+            return True
+
+        def warm_caches():
+            warm_cache()
+            warm_auth_cache()
+            return True
+
+        steps = [
+            ('schema', create_schema),
+            ('indexes', db_optimizer.create_essential_indexes),
+            ('cache warm-up', warm_caches),
+            ('s3', lambda: initialize_s3(app)),
+        ]
+        results = {}
+        for name, step in steps:
+            started = time.perf_counter()
+            try:
+                ok = bool(step())
+            except Exception as e:
+                logger.error(f"Performance init step '{name}' failed: {e}")
+                db.session.rollback()
+                ok = False
+            results[name] = (ok, time.perf_counter() - started)
+
+        self.performance_stats['db_optimized'] = results['indexes'][0]
+        self.performance_stats['auth_cached'] = results['cache warm-up'][0]
+        return results
     
     def _init_background_tasks(self, app):
-        """Initialize background performance tasks"""
-        try:
-            # Task 1: Cache Statistics Updater
-            def update_cache_stats():
-                while True:
-                    try:
-                        time.sleep(300)  # Every 5 minutes
-                        with app.app_context():
-                            stats = cache.get_stats()
-                            cache.set('system:cache_stats', stats, 300)
-                    except Exception as e:
-                        logger.error(f"Cache stats update failed: {e}")
-                        time.sleep(60)  # Wait 1 minute on error
-            
-            # Task 2: Database Performance Monitor
-            def monitor_db_performance():
-                while True:
-                    try:
-                        time.sleep(180)  # Every 3 minutes
-                        with app.app_context():
-                            perf_stats = db_optimizer.get_performance_stats()
-                            cache.set('system:db_performance', perf_stats, 180)
-                    except Exception as e:
-                        logger.error(f"DB performance monitoring failed: {e}")
-                        time.sleep(60)
-            
-            # Task 3: System Health Check
-            def system_health_check():
-                while True:
-                    try:
-                        time.sleep(600)  # Every 10 minutes
-                        with app.app_context():
-                            health = self._check_system_health()
-                            cache.set('system:health', health, 600)
-                    except Exception as e:
-                        logger.error(f"System health check failed: {e}")
-                        time.sleep(60)
-            
-            # Start background threads
-            threads = [
-                threading.Thread(target=update_cache_stats, daemon=True),
-                threading.Thread(target=monitor_db_performance, daemon=True),
-                threading.Thread(target=system_health_check, daemon=True)
-            ]
-            
-            for thread in threads:
-                thread.start()
-                self.background_tasks.append(thread)
-            
-            self.performance_stats['background_tasks_running'] = True
-            print("✅ Background Tasks: Performance monitoring active")
-            
-        except Exception as e:
-            print(f"⚠️  Background Tasks: Failed to start ({e})")
+        """Periodic tasks are the perf.* jobs below; only the scheduler leader runs them"""
+        self.performance_stats['background_tasks_running'] = app.config.get('JOB_SCHEDULER_AUTOSTART', True)
+        if self.performance_stats['background_tasks_running']:
+            print(f"✅ Background Tasks: {len(PERIODIC_TASKS)} periodic tasks on the job scheduler leader")
+        else:
+            print("⚠️  Background Tasks: Job scheduler autostart is off (run `flask jobs run`)")
     
     def _init_performance_monitoring(self, app):
         """Initialize performance monitoring hooks"""
         try:
+            request_metrics.init_app(app)
+
             @app.before_request
             def before_request():
-                from flask import g
+                from flask import g, request
                 g.request_start_time = time.time()
+                g.metrics_endpoint = request.endpoint or 'unmatched'
+                g.metrics_started = request_metrics.start(g.metrics_endpoint)
             
             @app.after_request
             def after_request(response):
+                from flask import g
+                g.metrics_status = response.status_code
+                return response
+
+            @app.teardown_request
+            def teardown_request(exc):
+                # Teardown also runs for unhandled errors, so in-flight gauges never leak
                 try:
-                    from flask import g, request
-                    if hasattr(g, 'request_start_time'):
-                        duration = time.time() - g.request_start_time
-                        
-                        # Log slow requests
-                        if duration > 1.0:  # > 1 second
-                            logger.warning(f"Slow request: {request.endpoint} took {duration:.3f}s")
-                        
-                        # Cache request performance data
-                        perf_data = cache.get('system:request_times', [])
-                        perf_data.append({
-                            'endpoint': request.endpoint,
-                            'duration': round(duration * 1000, 2),  # milliseconds
-                            'timestamp': time.time()
-                        })
-                        
-                        # Keep only last 100 requests
-                        if len(perf_data) > 100:
-                            perf_data = perf_data[-100:]
-                        
-                        cache.set('system:request_times', perf_data, 3600)
+                    from flask import g
+                    started = g.pop('metrics_started', None)
+                    if started is None:
+                        return
+                    endpoint = g.metrics_endpoint
+                    duration = request_metrics.finish(endpoint, started, g.get('metrics_status', 500))
+                    
+                    # Log slow requests
+                    if duration > 1.0:  # > 1 second
+                        logger.warning(f"Slow request: {endpoint} took {duration:.3f}s")
                 
                 except Exception as e:
                     # Don't fail requests due to monitoring errors
                     logger.error(f"Performance monitoring error: {e}")
-                
-                return response
             
             print("✅ Performance Monitoring: Request timing and health checks active")
             
@@ -227,7 +182,7 @@ class PerformanceManager:
         try:
             # Check database
             from app import db
-            db.session.execute('SELECT 1').scalar()
+            db.session.execute(text('SELECT 1')).scalar()
             health['database'] = 'healthy'
         except:
             health['database'] = 'failed'
@@ -281,7 +236,10 @@ class PerformanceManager:
             'cache_stats': cache.get_stats() if self.performance_stats['cache_enabled'] else None,
             'db_stats': db_optimizer.get_performance_stats() if self.performance_stats['db_optimized'] else None,
             'system_health': cache.get('system:health', {}),
-            'background_tasks': len(self.background_tasks)
+            'request_metrics': request_metrics.get_stats(),
+            'activity_log': current_app.extensions['activity_log'].get_stats() if 'activity_log' in current_app.extensions else None,
+            'background_tasks': len(PERIODIC_TASKS),
+            'startup': current_app.extensions.get('startup_timings')
         }
     
     def restart_performance_systems(self):
@@ -302,6 +260,29 @@ class PerformanceManager:
 # Global performance manager instance
 performance_manager = PerformanceManager()
 
+# ============ PERIODIC TASKS ============
+# Registered with the job scheduler: one run per interval across all workers
+
+PERIODIC_TASKS = ('perf.warm_cache', 'perf.cache_stats', 'perf.db_stats', 'perf.health')
+
+@periodic_job('perf.warm_cache', 600)
+def warm_caches_job(payload):
+    from .performance_cache import warm_cache
+    warm_cache()
+    warm_auth_cache()
+
+@periodic_job('perf.cache_stats', 300)
+def publish_cache_stats_job(payload):
+    cache.set('system:cache_stats', cache.get_stats(), 300)
+
+@periodic_job('perf.db_stats', 180)
+def publish_db_stats_job(payload):
+    cache.set('system:db_performance', db_optimizer.get_performance_stats(), 180)
+
+@periodic_job('perf.health', 600)
+def publish_health_job(payload):
+    cache.set('system:health', performance_manager._check_system_health(), 600)
+
 def init_ultra_performance(app):
     """Initialize ultra-performance system"""
     performance_manager.initialize(app)
@@ -356,6 +337,106 @@ def register_performance_commands(app):
             db_optimizer.create_essential_indexes()
             print("✅ Database indexes created")
 
+    @app.cli.command('rebuild-class-students')
+    def rebuild_class_students_command():
+        """Backfill the class_students enrollment table from classes"""
+        with app.app_context():
+            from app.models.class_student import ClassStudent
+
+            print("📊 Rebuilding class_students from classes...")
+            total = ClassStudent.rebuild()
+            print(f"✅ {total} enrollment rows written")
+
+    @app.cli.command('rebuild-daily-stats')
+    @click.option('--start', 'start_date', type=click.DateTime(formats=['%Y-%m-%d']), default=None,
+                  help='First date to recompute (default: all)')
+    @click.option('--end', 'end_date', type=click.DateTime(formats=['%Y-%m-%d']), default=None,
+                  help='Last date to recompute (default: all)')
+    def rebuild_daily_stats_command(start_date, end_date):
+        """Backfill the daily class/attendance rollup tables"""
+        with app.app_context():
+            from app.models.daily_stats import DailyClassStats, DailyAttendanceStats
+
+            start_date = start_date.date() if start_date else None
+            end_date = end_date.date() if end_date else None
+            print("📊 Rebuilding daily rollups...")
+            class_rows = DailyClassStats.rebuild(start_date, end_date)
+            attendance_rows = DailyAttendanceStats.rebuild(start_date, end_date)
+            print(f"✅ {class_rows} class rows, {attendance_rows} attendance rows written")
+
+    @app.cli.group('perf')
+    def perf_cli():
+        """One-time performance setup and startup diagnostics"""
+
+    @perf_cli.command('init')
+    def perf_init_command():
+        """Create missing tables and indexes, warm caches and check S3 (once per deployment)"""
+        with app.app_context():
+            print("🚀 Running one-time performance setup...")
+            results = performance_manager.run_one_time_init(app)
+            for name, (ok, seconds) in results.items():
+                print(f"{'✅' if ok else '⚠️ '} {name:<14} {seconds * 1000:8.0f}ms")
+
+    @perf_cli.command('startup')
+    def perf_startup_command():
+        """Show how long create_app took, by phase"""
+        timings = app.extensions.get('startup_timings')
+        if not timings:
+            print("❌ No startup timings recorded")
+            return
+        print(f"⏱️  create_app: {timings['total_ms']:.0f}ms")
+        for phase in timings['phases']:
+            print(f"   {phase['phase']:<12} {phase['ms']:8.1f}ms")
+
+    @perf_cli.command('imports')
+    @click.option('--top', default=25, show_default=True, help='Modules and packages to list')
+    @click.option('--save', 'save_path', type=click.Path(dir_okay=False), default=None,
+                  help='Write the profile as JSON (baseline for --compare)')
+    @click.option('--compare', 'compare_path', type=click.Path(exists=True, dir_okay=False), default=None,
+                  help='Baseline JSON; exits 1 if startup, import time or RSS grew by more than 10%')
+    def perf_imports_command(top, save_path, compare_path):
+        """Import cost per module and RSS of a freshly started worker"""
+        import json
+        from app.utils.import_profiler import profile_startup, compare_profiles, new_packages
+
+        print("🔬 Profiling create_app in a fresh interpreter...")
+        try:
+            profile = profile_startup(project_root=os.path.dirname(app.root_path))
+        except Exception as e:
+            print(f"❌ {e}")
+            raise SystemExit(1)
+
+        print(f"⏱️  create_app {profile['startup_ms']:.0f}ms, imports {profile['import_ms']:.0f}ms "
+              f"({profile['module_count']} modules)")
+        print(f"🧠 RSS per worker: {profile['rss_kb'] / 1024:.1f} MB")
+
+        print("\n📦 Slowest modules (cumulative):")
+        for name, us in sorted(profile['modules'].items(), key=lambda item: item[1], reverse=True)[:top]:
+            print(f"   {us / 1000:9.1f}ms  {name}")
+
+        print("\n📚 Packages (self time):")
+        for package, us in sorted(profile['packages'].items(), key=lambda item: item[1], reverse=True)[:top]:
+            print(f"   {us / 1000:9.1f}ms  {package}")
+
+        if save_path:
+            with open(save_path, 'w') as f:
+                json.dump(profile, f, indent=2, sort_keys=True)
+            print(f"\n💾 Baseline written to {save_path}")
+
+        if compare_path:
+            with open(compare_path) as f:
+                baseline = json.load(f)
+            rows, regressed = compare_profiles(baseline, profile)
+            print(f"\n📈 Against {compare_path}:")
+            for metric, before, after, change in rows:
+                print(f"   {metric:<13} {before:>10} -> {after:<10} {change:+.1%}")
+            for package, us in new_packages(baseline, profile):
+                print(f"   ➕ {package} ({us / 1000:.1f}ms) is now imported at startup")
+            if regressed:
+                print("❌ Startup regressed by more than 10%")
+                raise SystemExit(1)
+            print("✅ No regression")
+
 # Application factory integration
 def setup_ultra_performance_app(app):
     """Setup ultra-performance for Flask app"""
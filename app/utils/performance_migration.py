@@ -33,6 +33,7 @@ class PerformanceMigration:
                 "CREATE INDEX IF NOT EXISTS idx_classes_primary_student_id ON classes(primary_student_id)",
                 "CREATE INDEX IF NOT EXISTS idx_classes_tutor_date ON classes(tutor_id, scheduled_date)",
                 "CREATE INDEX IF NOT EXISTS idx_classes_date_status ON classes(scheduled_date, status)",
+                "CREATE INDEX IF NOT EXISTS idx_classes_date_time_id ON classes(scheduled_date, scheduled_time, id)",
                 
                 # User table indexes
                 "CREATE INDEX IF NOT EXISTS idx_users_email ON users(email)",
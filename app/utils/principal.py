@@ -0,0 +1,193 @@
+"""
+Cached principal (logged-in user and permission snapshot).
+
+Every authenticated request used to load the user row in ``load_user``, and
+every ``has_permission`` call (decorators, ``base.html`` menus, templates)
+re-derived the user's permissions - for coordinators through
+``self.department`` and ``Department.get_permissions()``, which parses the
+permissions JSON each time.
+
+Here:
+
+- ``load_cached_user`` keeps the user's column values in the shared cache and
+  attaches a ``User`` built from them to the session without a query; lazy
+  relationships and writes work as usual, ``password_hash`` is left out and
+  loads on first access
+- ``get_principal`` returns a ``Principal``: the permission frozenset,
+  accessible department IDs and permission level, computed once per request
+  (memoized on ``g``) and cached across requests
+
+Both entries are tagged ``user:<id>`` (and ``department:<id>``), which the
+commit hooks in performance_cache invalidate whenever a User or Department
+row is committed, e.g. after ``Department.set_permissions`` or
+``update_permissions_bulk``. ``PRINCIPAL_CACHE_TTL`` bounds staleness for
+writes that bypass the ORM.
+"""
+from flask import current_app, g, has_app_context
+from sqlalchemy import event
+from sqlalchemy.orm import Session, make_transient_to_detached
+from app import db
+from .performance_cache import cache
+
+DEFAULT_TTL = 60  # seconds
+
+# What has_permission grants per role (admins and superadmins get everything)
+ROLE_GRANTED_PERMISSIONS = {
+    'tutor': (
+        'class_management', 'attendance_management',
+        'profile_management', 'communication', 'schedule_management',
+        'student_management',  # Can manage their own students
+        'report_generation'   # Can generate their reports
+    ),
+    'student': ('profile_management', 'communication'),
+}
+
+# What get_all_permissions lists per role (menus, permission summaries)
+ROLE_LISTED_PERMISSIONS = {
+    'tutor': (
+        'class_management', 'attendance_management', 'profile_management',
+        'communication', 'schedule_management'
+    ),
+    'student': ('profile_management', 'communication'),
+}
+
+UNCACHED_USER_COLUMNS = ('password_hash',)
+
+
+class Principal:
+    """Immutable permission snapshot of one user"""
+    __slots__ = ('user_id', 'role', 'department_id', 'unrestricted', 'granted',
+                 'listed', 'department_ids', 'permission_level')
+
+    def __init__(self, user_id, role, department_id, unrestricted, granted, listed,
+                 department_ids, permission_level):
+        self.user_id = user_id
+        self.role = role
+        self.department_id = department_id
+        self.unrestricted = unrestricted  # every permission, including unregistered ones
+        self.granted = frozenset(granted)
+        self.listed = tuple(listed)
+        self.department_ids = frozenset(department_ids) if department_ids is not None else None  # None: all
+        self.permission_level = permission_level
+
+    @classmethod
+    def for_user(cls, user):
+        """Derive the snapshot from the user (and department) rows"""
+        role = user.role
+        if role in ('superadmin', 'admin'):
+            from app.utils.advanced_permissions import PermissionRegistry
+            listed = list(PermissionRegistry.PERMISSION_STRUCTURE.keys())
+            return cls(user.id, role, user.department_id, True, listed, listed, None, 'high')
+
+        if role == 'coordinator':
+            department = user.department
+            if department is None:
+                return cls(user.id, role, user.department_id, False, (), (), {user.department_id}, 'medium')
+            permissions = department.get_permissions()
+            return cls(user.id, role, user.department_id, False, permissions, permissions,
+                       {user.department_id}, department.permission_level)
+
+        department_ids = {user.department_id} if role in ('tutor', 'student') else ()
+        return cls(user.id, role, user.department_id, False, ROLE_GRANTED_PERMISSIONS.get(role, ()),
+                   ROLE_LISTED_PERMISSIONS.get(role, ()), department_ids, 'low')
+
+    def has_permission(self, permission):
+        return self.unrestricted or permission in self.granted
+
+    def can_access_department(self, department_id):
+        return self.department_ids is None or department_id in self.department_ids
+
+    def to_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+
+def _ttl():
+    return current_app.config.get('PRINCIPAL_CACHE_TTL', DEFAULT_TTL)
+
+
+def _tags(user_id, department_id=None):
+    tags = [f"user:{user_id}"]
+    if department_id:
+        tags.append(f"department:{department_id}")
+    return tags
+
+
+def get_principal(user):
+    """Permission snapshot for user: memoized per request, cached across requests"""
+    if user.id is None or not has_app_context():
+        return Principal.for_user(user)
+
+    memo = g.setdefault('_principals', {})
+    principal = memo.get(user.id)
+    if principal is None:
+        ttl = _ttl()
+        if ttl:
+            data = cache.get_or_compute(f"principal:{user.id}", lambda: Principal.for_user(user).to_dict(),
+                                        ttl, stale_ttl=0, tags=_tags(user.id, user.department_id))
+            principal = Principal.from_dict(data)
+        else:
+            principal = Principal.for_user(user)
+        memo[user.id] = principal
+    return principal
+
+
+def load_cached_user(user_id):
+    """User for Flask-Login, attached to the session from cached column values"""
+    from app.models.user import User
+
+    ttl = _ttl()
+    if not ttl:
+        return User.query.get(user_id)
+
+    session = db.session()
+    identity = User.__mapper__.identity_key_from_primary_key((user_id,))
+    user = session.identity_map.get(identity)
+    if user is not None:
+        return user
+
+    def load_columns():
+        row = User.query.get(user_id)
+        if row is None:
+            return None
+        return {attr.key: getattr(row, attr.key) for attr in User.__mapper__.column_attrs
+                if attr.key not in UNCACHED_USER_COLUMNS}
+
+    columns = cache.get_or_compute(f"user:row:{user_id}", load_columns, ttl, stale_ttl=0, tags=_tags(user_id))
+    if columns is None:
+        return None
+
+    user = session.identity_map.get(identity)  # loaded by load_columns on a miss
+    if user is None:
+        user = User(**columns)
+        make_transient_to_detached(user)  # clean, persistent-to-be; uncached columns load on access
+        session.add(user)
+    return user
+
+
+# ============ COMMIT HOOKS ============
+
+@event.listens_for(Session, 'after_flush')
+def _collect_principal_changes(session, flush_context):
+    from app.models.user import User
+    from app.models.department import Department
+
+    for obj in list(session.dirty) + list(session.deleted):
+        if isinstance(obj, (User, Department)):
+            session.info['principals_changed'] = True
+            return
+
+
+@event.listens_for(Session, 'after_commit')
+def _forget_principals(session):
+    # The cached copies are invalidated by tag; drop this request's memo too
+    if session.info.pop('principals_changed', False) and has_app_context():
+        g.pop('_principals', None)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _forget_principal_changes(session):
+    session.info.pop('principals_changed', None)
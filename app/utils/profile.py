@@ -3,11 +3,13 @@ Profile utility functions for the LMS system
 """
 import os
 import secrets
-from PIL import Image
 from flask import current_app
 from werkzeug.utils import secure_filename
 from datetime import datetime
 import json
+from app.utils.lazy_imports import lazy_module
+
+Image = lazy_module('PIL.Image')
 
 def allowed_file(filename, allowed_extensions=None):
     """Check if file extension is allowed"""
@@ -0,0 +1,318 @@
+"""
+In-process request metrics with cross-worker aggregation.
+
+The request hooks used to read the ``system:request_times`` list from the
+cache, append to it and write it back on every request (memory, Redis and the
+file tier), losing updates whenever two requests finished together. Here the
+hot path only touches memory owned by the current thread:
+
+- every thread records into its own shard (per-endpoint fixed-size latency
+  histogram, status-class counters and an in-flight gauge), so recording takes
+  no lock and does no I/O
+- a daemon thread merges the shards every ``REQUEST_METRICS_FLUSH_INTERVAL``
+  seconds and publishes this worker's cumulative totals to Redis (one
+  pipeline) or, without Redis, to a per-worker file under the instance folder
+- the exporter sums the snapshots of all live workers into Prometheus text
+
+Latency buckets grow by a factor of sqrt(2) from 1ms to about 65s, so a
+percentile read from the histogram is within ~20% of the true value.
+"""
+from bisect import bisect_left
+import json
+import logging
+import os
+import socket
+import threading
+import time
+
+metrics_logger = logging.getLogger('performance.metrics')
+
+DEFAULT_FLUSH_INTERVAL = 5.0  # seconds between publishes of this worker's totals
+SNAPSHOT_KEY_PREFIX = 'lms:metrics:worker:'
+SNAPSHOT_INDEX_KEY = 'lms:metrics:workers'
+
+# Upper bounds in seconds: 0.001 * sqrt(2)**i
+BUCKET_BOUNDS = tuple(round(0.001 * 2 ** (i / 2), 6) for i in range(33))
+STATUS_CLASSES = ('1xx', '2xx', '3xx', '4xx', '5xx')
+
+
+class EndpointStats:
+    """Fixed-size counters for one endpoint in one thread"""
+    __slots__ = ('buckets', 'statuses', 'total', 'count', 'in_flight')
+
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKET_BOUNDS) + 1)  # last slot is +Inf
+        self.statuses = [0] * len(STATUS_CLASSES)
+        self.total = 0.0
+        self.count = 0
+        self.in_flight = 0
+
+
+def _empty_totals():
+    return {'buckets': [0] * (len(BUCKET_BOUNDS) + 1), 'statuses': [0] * len(STATUS_CLASSES),
+            'sum': 0.0, 'count': 0, 'in_flight': 0}
+
+
+def merge_totals(target, endpoints):
+    """Add {endpoint: totals} into target in place"""
+    for endpoint, totals in endpoints.items():
+        merged = target.setdefault(endpoint, _empty_totals())
+        merged['buckets'] = [a + b for a, b in zip(merged['buckets'], totals['buckets'])]
+        merged['statuses'] = [a + b for a, b in zip(merged['statuses'], totals['statuses'])]
+        merged['sum'] += totals['sum']
+        merged['count'] += totals['count']
+        merged['in_flight'] += totals['in_flight']
+    return target
+
+
+def percentile(buckets, fraction):
+    """Upper bound of the bucket holding the given fraction of observations"""
+    count = sum(buckets)
+    if not count:
+        return None
+    rank = fraction * count
+    seen = 0
+    for index, observed in enumerate(buckets):
+        seen += observed
+        if seen >= rank:
+            return BUCKET_BOUNDS[index] if index < len(BUCKET_BOUNDS) else float('inf')
+    return float('inf')
+
+
+class RequestMetrics:
+    """Per-worker metrics registry; hot path is lock-free via per-thread shards"""
+
+    def __init__(self):
+        self.app = None
+        self.flush_interval = DEFAULT_FLUSH_INTERVAL
+        self.started_at = time.time()
+        self._local = threading.local()
+        self._shards = []  # one {endpoint: EndpointStats} per thread
+        self._shards_lock = threading.Lock()  # taken once per thread, on its first request
+        self._flusher = None
+        self._snapshot_dir = None
+
+    def init_app(self, app):
+        self.app = app
+        self.flush_interval = app.config.get('REQUEST_METRICS_FLUSH_INTERVAL', DEFAULT_FLUSH_INTERVAL)
+        self._snapshot_dir = app.config.get('REQUEST_METRICS_DIR') or os.path.join(app.instance_path, 'metrics')
+        app.extensions['request_metrics'] = self
+
+    @property
+    def worker_id(self):
+        # Read per call: workers forked from a preloaded master get their own id
+        return f"{socket.gethostname()}:{os.getpid()}"
+
+    # ============ HOT PATH ============
+
+    def _shard(self):
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._shards_lock:
+                self._shards.append(shard)
+        return shard
+
+    def _stats(self, endpoint):
+        shard = self._shard()
+        stats = shard.get(endpoint)
+        if stats is None:
+            stats = shard[endpoint] = EndpointStats()
+        return stats
+
+    def start(self, endpoint):
+        """Mark a request in flight; returns the start time to pass to finish()"""
+        self._stats(endpoint).in_flight += 1
+        return time.perf_counter()
+
+    def finish(self, endpoint, started, status_code):
+        """Record one finished request; returns its duration in seconds"""
+        duration = time.perf_counter() - started
+        stats = self._stats(endpoint)
+        stats.in_flight -= 1
+        stats.buckets[bisect_left(BUCKET_BOUNDS, duration)] += 1
+        stats.statuses[min(max(status_code // 100, 1), 5) - 1] += 1
+        stats.total += duration
+        stats.count += 1
+        self._ensure_flusher()
+        return duration
+
+    # ============ AGGREGATION ============
+
+    def local_totals(self):
+        """Totals of every thread in this worker"""
+        with self._shards_lock:
+            shards = list(self._shards)
+        totals = {}
+        for shard in shards:
+            for endpoint, stats in list(shard.items()):
+                merge_totals(totals, {endpoint: {
+                    'buckets': list(stats.buckets), 'statuses': list(stats.statuses),
+                    'sum': stats.total, 'count': stats.count, 'in_flight': stats.in_flight
+                }})
+        return totals
+
+    def _ensure_flusher(self):
+        if self._flusher and self._flusher.is_alive():
+            return
+        with self._shards_lock:
+            if self._flusher and self._flusher.is_alive():
+                return
+            self._flusher = threading.Thread(target=self._flush_loop, name='request-metrics', daemon=True)
+            self._flusher.start()
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception as e:
+                metrics_logger.error(f"Metrics flush failed: {e}")
+
+    def _redis(self):
+        from .performance_cache import cache
+        return cache._redis()
+
+    def flush(self):
+        """Publish this worker's cumulative totals for the exporter"""
+        snapshot = json.dumps({'worker': self.worker_id, 'published_at': time.time(),
+                               'endpoints': self.local_totals()})
+        expiry = max(int(self.flush_interval * 3), 10)
+
+        redis_client = self._redis()
+        if redis_client:
+            key = SNAPSHOT_KEY_PREFIX + self.worker_id
+            try:
+                pipe = redis_client.pipeline(transaction=False)
+                pipe.setex(key, expiry, snapshot)
+                pipe.sadd(SNAPSHOT_INDEX_KEY, key)
+                pipe.execute()
+                return
+            except Exception as e:
+                # Same back-off as the cache; publish to the snapshot file meanwhile
+                from .performance_cache import cache
+                cache._redis_failed(e)
+
+        os.makedirs(self._snapshot_dir, exist_ok=True)
+        path = os.path.join(self._snapshot_dir, f"{self.worker_id.replace(':', '_')}.json")
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(snapshot)
+        os.replace(tmp_path, path)
+
+    def _worker_snapshots(self):
+        """Latest snapshot of every live worker, this one taken fresh"""
+        snapshots = {}
+        max_age = max(self.flush_interval * 3, 10)
+
+        redis_client = self._redis()
+        if redis_client:
+            try:
+                keys = [key.decode() if isinstance(key, bytes) else key
+                        for key in redis_client.smembers(SNAPSHOT_INDEX_KEY)]
+                if keys:
+                    pipe = redis_client.pipeline(transaction=False)
+                    for key in keys:
+                        pipe.get(key)
+                    expired = []
+                    for key, raw in zip(keys, pipe.execute()):
+                        if raw:
+                            snapshot = json.loads(raw)
+                            snapshots[snapshot['worker']] = snapshot['endpoints']
+                        else:
+                            expired.append(key)
+                    if expired:
+                        redis_client.srem(SNAPSHOT_INDEX_KEY, *expired)
+            except Exception as e:
+                # Export this worker's numbers rather than nothing
+                metrics_logger.error(f"Reading worker metrics from Redis failed: {e}")
+        elif self._snapshot_dir and os.path.isdir(self._snapshot_dir):
+            now = time.time()
+            for name in os.listdir(self._snapshot_dir):
+                path = os.path.join(self._snapshot_dir, name)
+                if not name.endswith('.json'):
+                    continue
+                try:
+                    if now - os.path.getmtime(path) > max_age:
+                        os.remove(path)
+                        continue
+                    with open(path) as f:
+                        snapshot = json.load(f)
+                    snapshots[snapshot['worker']] = snapshot['endpoints']
+                except (OSError, ValueError, KeyError):
+                    continue
+
+        snapshots[self.worker_id] = self.local_totals()
+        return snapshots
+
+    def cluster_totals(self):
+        """(totals summed over live workers, worker count)"""
+        snapshots = self._worker_snapshots()
+        totals = {}
+        for endpoints in snapshots.values():
+            merge_totals(totals, endpoints)
+        return totals, len(snapshots)
+
+    # ============ EXPORT ============
+
+    def render_prometheus(self):
+        """Prometheus text exposition format (0.0.4)"""
+        totals, workers = self.cluster_totals()
+        lines = [
+            '# HELP lms_http_request_duration_seconds Request latency by endpoint.',
+            '# TYPE lms_http_request_duration_seconds histogram',
+        ]
+        for endpoint in sorted(totals):
+            data = totals[endpoint]
+            label = _escape(endpoint)
+            cumulative = 0
+            for bound, observed in zip(BUCKET_BOUNDS, data['buckets']):
+                cumulative += observed
+                lines.append(f'lms_http_request_duration_seconds_bucket{{endpoint="{label}",le="{bound}"}} {cumulative}')
+            # Totals from the buckets: finish() bumps a bucket before the count, so count can lag
+            total = sum(data['buckets'])
+            lines.append(f'lms_http_request_duration_seconds_bucket{{endpoint="{label}",le="+Inf"}} {total}')
+            lines.append(f'lms_http_request_duration_seconds_sum{{endpoint="{label}"}} {data["sum"]:.6f}')
+            lines.append(f'lms_http_request_duration_seconds_count{{endpoint="{label}"}} {total}')
+
+        lines += ['# HELP lms_http_requests_total Finished requests by endpoint and status class.',
+                  '# TYPE lms_http_requests_total counter']
+        for endpoint in sorted(totals):
+            for status, observed in zip(STATUS_CLASSES, totals[endpoint]['statuses']):
+                if observed:
+                    lines.append(f'lms_http_requests_total{{endpoint="{_escape(endpoint)}",status="{status}"}} {observed}')
+
+        lines += ['# HELP lms_http_requests_in_flight Requests currently being handled.',
+                  '# TYPE lms_http_requests_in_flight gauge']
+        for endpoint in sorted(totals):
+            lines.append(f'lms_http_requests_in_flight{{endpoint="{_escape(endpoint)}"}} {totals[endpoint]["in_flight"]}')
+
+        lines += ['# HELP lms_metrics_workers Workers whose metrics are included.',
+                  '# TYPE lms_metrics_workers gauge',
+                  f'lms_metrics_workers {workers}']
+        return '\n'.join(lines) + '\n'
+
+    def get_stats(self):
+        """Per-endpoint count and p50/p95/p99 (ms) for this worker"""
+        summary = {}
+        for endpoint, data in self.local_totals().items():
+            summary[endpoint] = {
+                'count': data['count'],
+                'in_flight': data['in_flight'],
+                'avg_ms': round(data['sum'] / data['count'] * 1000, 2) if data['count'] else None,
+                **{f'p{int(q * 100)}_ms': _ms(percentile(data['buckets'], q)) for q in (0.5, 0.95, 0.99)}
+            }
+        return {'worker': self.worker_id, 'uptime': round(time.time() - self.started_at), 'endpoints': summary}
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _ms(seconds):
+    if seconds is None:
+        return None
+    return round(seconds * 1000, 2) if seconds != float('inf') else None
+
+
+request_metrics = RequestMetrics()
@@ -0,0 +1,188 @@
+"""
+Batch conflict detection for reschedule requests.
+
+``RescheduleConflictEngine`` checks any number of requests with a fixed number
+of queries: the moved classes, their enrolled students, every class of the
+affected tutors on the requested dates and every class of the affected students
+on those dates. Each (tutor or student, date) pair becomes a timeline of minute
+intervals sorted by start; a requested slot is swept against the timeline and
+every overlap is reported, not just the first class of the day.
+
+``validate_batch`` accepts requests in order and moves each accepted class on
+the timelines (off its original slot, onto the requested one), so two requests
+in the same batch that would collide with each other are caught too. Once a
+class has been accepted, later requests in the batch for the same class are
+rejected as duplicates.
+"""
+from bisect import insort
+from sqlalchemy.orm import joinedload
+from app import db
+from app.models.class_model import Class
+from app.models.class_student import ClassStudent
+from app.utils.availability_engine import ACTIVE_CLASS_STATUSES, DAY_NAMES, parse_minutes, format_minutes
+
+
+def overlapping(timeline, start, end, ignore_class_id=None):
+    """Every (start, end, class_id, request) entry of a start-sorted timeline overlapping [start, end)"""
+    found = []
+    for entry in timeline:
+        if entry[0] >= end:
+            break
+        if entry[1] > start and entry[2] != ignore_class_id:
+            found.append(entry)
+    return found
+
+
+class RescheduleConflictEngine:
+    """Conflict checks for a set of RescheduleRequest objects (saved or not)"""
+
+    def __init__(self, reschedule_requests):
+        self.requests = list(reschedule_requests)
+        self.classes = {}  # class_id -> Class being moved
+        self.students = {}  # class_id -> [student_id]
+        self.tutor_timelines = {}  # (tutor_id, date) -> [(start, end, class_id, request)]
+        self.student_timelines = {}  # (student_id, date) -> [...]
+        self._load()
+
+    # ============ LOADING ============
+
+    def _load(self):
+        class_ids = {r.class_id for r in self.requests if r.class_id}
+        if not class_ids:
+            return
+
+        for class_obj in Class.query.options(joinedload(Class.tutor)).filter(Class.id.in_(class_ids)).all():
+            self.classes[class_obj.id] = class_obj
+
+        rows = db.session.query(ClassStudent.class_id, ClassStudent.student_id)\
+            .filter(ClassStudent.class_id.in_(class_ids)).all()
+        for class_id, student_id in rows:
+            self.students.setdefault(class_id, []).append(student_id)
+
+        dates = {r.requested_date for r in self.requests if r.requested_date}
+        # Accepted moves free the original slot, so those dates are needed as well
+        dates.update(class_obj.scheduled_date for class_obj in self.classes.values())
+        tutor_ids = {class_obj.tutor_id for class_obj in self.classes.values() if class_obj.tutor_id}
+        student_ids = {student_id for ids in self.students.values() for student_id in ids}
+
+        if tutor_ids:
+            rows = db.session.query(
+                Class.tutor_id, Class.scheduled_date, Class.id, Class.scheduled_time, Class.duration
+            ).filter(
+                Class.tutor_id.in_(tutor_ids),
+                Class.scheduled_date.in_(dates),
+                Class.status.in_(ACTIVE_CLASS_STATUSES)
+            ).all()
+            for tutor_id, scheduled_date, class_id, scheduled_time, duration in rows:
+                self._add(self.tutor_timelines, (tutor_id, scheduled_date), scheduled_time, duration, class_id)
+
+        if student_ids:
+            rows = db.session.query(
+                ClassStudent.student_id, Class.scheduled_date, Class.id, Class.scheduled_time, Class.duration
+            ).join(Class, Class.id == ClassStudent.class_id).filter(
+                ClassStudent.student_id.in_(student_ids),
+                ClassStudent.scheduled_date.in_(dates),
+                Class.status.in_(ACTIVE_CLASS_STATUSES)
+            ).all()
+            for student_id, scheduled_date, class_id, scheduled_time, duration in rows:
+                self._add(self.student_timelines, (student_id, scheduled_date), scheduled_time, duration, class_id)
+
+    @staticmethod
+    def _add(timelines, key, scheduled_time, duration, class_id, request=None):
+        start = parse_minutes(scheduled_time)
+        if start is None:
+            return
+        insort(timelines.setdefault(key, []), (start, start + (duration or 0), class_id, request),
+               key=lambda entry: (entry[0], entry[1], entry[2]))
+
+    @staticmethod
+    def _remove(timelines, key, class_id):
+        timeline = timelines.get(key)
+        if timeline:
+            timelines[key] = [entry for entry in timeline if entry[2] != class_id]
+
+    # ============ CHECKING ============
+
+    def _resources(self, class_obj):
+        keys = [('tutor', self.tutor_timelines, class_obj.tutor_id)]
+        keys.extend(('student', self.student_timelines, student_id)
+                    for student_id in self.students.get(class_obj.id, []))
+        return keys
+
+    def conflicts_for(self, reschedule_request):
+        """Conflict dicts for one request against the current timelines"""
+        class_obj = self.classes.get(reschedule_request.class_id)
+        if not class_obj:
+            return [{'type': 'invalid_class', 'message': 'Class not found or invalid'}]
+        if not class_obj.tutor_id:
+            return [{'type': 'no_tutor', 'message': 'Class has no tutor assigned'}]
+
+        conflicts = []
+        start = parse_minutes(reschedule_request.requested_time)
+        end = start + (class_obj.duration or 0)
+        date_obj = reschedule_request.requested_date
+
+        for kind, timelines, resource_id in self._resources(class_obj):
+            for entry in overlapping(timelines.get((resource_id, date_obj), []), start, end,
+                                     ignore_class_id=class_obj.id):
+                conflict = {'type': f'{kind}_conflict'}
+                if kind == 'student':
+                    conflict['student_id'] = resource_id
+                who = 'Tutor already has' if kind == 'tutor' else 'Student has another'
+                if entry[3] is not None:
+                    conflict['message'] = (f"{who} class from {format_minutes(entry[0])} to {format_minutes(entry[1])} "
+                                           f"(approved earlier in this batch)")
+                    conflict['conflicting_request_id'] = entry[3].id
+                else:
+                    conflict['message'] = f"{who} class from {format_minutes(entry[0])} to {format_minutes(entry[1])}"
+                conflict['conflicting_class_id'] = entry[2]
+                conflicts.append(conflict)
+
+        # Check tutor availability
+        tutor = class_obj.tutor
+        if tutor and hasattr(tutor, 'is_available_at'):
+            day_of_week = DAY_NAMES[date_obj.weekday()]
+            time_str = reschedule_request.requested_time.strftime('%H:%M')
+            if not tutor.is_available_at(day_of_week, time_str):
+                conflicts.append({
+                    'type': 'tutor_unavailable',
+                    'message': f'Tutor is not available on {day_of_week} at {time_str}'
+                })
+
+        return conflicts
+
+    def _move(self, reschedule_request):
+        """Put an accepted request's class on its new slot in every timeline"""
+        class_obj = self.classes[reschedule_request.class_id]
+        for _, timelines, resource_id in self._resources(class_obj):
+            self._remove(timelines, (resource_id, class_obj.scheduled_date), class_obj.id)
+            self._add(timelines, (resource_id, reschedule_request.requested_date),
+                      reschedule_request.requested_time, class_obj.duration, class_obj.id, reschedule_request)
+
+    def check_all(self):
+        """Conflicts of every request against existing classes only: [(request, conflicts)]"""
+        return [(r, self.conflicts_for(r)) for r in self.requests]
+
+    def validate_batch(self):
+        """Accept requests in order, placing each accepted one before checking the next.
+
+        Returns [(request, conflicts)]; a request is approvable when its list is empty.
+        """
+        results = []
+        accepted = {}  # class_id -> request accepted earlier in this batch
+        for reschedule_request in self.requests:
+            earlier = accepted.get(reschedule_request.class_id)
+            if earlier is not None:
+                conflicts = [{
+                    'type': 'duplicate_class',
+                    'message': 'Class is already rescheduled by another request in this batch',
+                    'conflicting_request_id': earlier.id,
+                    'conflicting_class_id': reschedule_request.class_id
+                }]
+            else:
+                conflicts = self.conflicts_for(reschedule_request)
+            if not conflicts:
+                self._move(reschedule_request)
+                accepted[reschedule_request.class_id] = reschedule_request
+            results.append((reschedule_request, conflicts))
+        return results
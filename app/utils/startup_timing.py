@@ -0,0 +1,44 @@
+"""
+Startup timing report for ``create_app``.
+
+Each phase of application startup is closed with ``mark(name)``; the report is
+logged once when startup finishes, kept in ``app.extensions['startup_timings']``
+and printed by ``flask perf startup``.
+"""
+import logging
+import time
+
+startup_logger = logging.getLogger('startup')
+
+
+class StartupTimer:
+    """Wall time between consecutive marks"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self._last = self.started
+        self.phases = []  # (name, seconds)
+
+    def mark(self, name):
+        now = time.perf_counter()
+        self.phases.append((name, now - self._last))
+        self._last = now
+
+    @property
+    def total(self):
+        return self._last - self.started
+
+    def report(self):
+        return {
+            'total_ms': round(self.total * 1000, 1),
+            'phases': [{'phase': name, 'ms': round(seconds * 1000, 1)} for name, seconds in self.phases]
+        }
+
+    def summary(self):
+        slowest = sorted(self.phases, key=lambda phase: phase[1], reverse=True)
+        parts = ', '.join(f"{name} {seconds * 1000:.0f}ms" for name, seconds in slowest)
+        return f"create_app finished in {self.total * 1000:.0f}ms ({parts})"
+
+    def finish(self, app):
+        app.extensions['startup_timings'] = self.report()
+        startup_logger.info(self.summary())
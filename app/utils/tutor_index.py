@@ -0,0 +1,233 @@
+"""
+In-process inverted index of tutor capabilities.
+
+Matching used to load every active tutor and ``json.loads`` + lowercase their
+subjects/grades/boards on every request. The index keeps, per worker, the
+normalized capabilities of active tutors plus subject/grade/board -> tutor-id
+sets, so candidate sets are narrowed by set intersection before any ORM object
+is loaded or scored.
+
+The index is versioned: Tutor inserts/updates/deletes that touch a capability
+column bump the version (and so does rolling back such a change); the next
+lookup rebuilds with a single column-only query. ``MAX_AGE`` bounds how long a
+worker can miss a change made by another process.
+"""
+from collections import namedtuple
+import json
+import threading
+import time
+from sqlalchemy import event, inspect
+from sqlalchemy.orm import Session
+from app.models.tutor import Tutor
+from app.utils.availability_engine import availability_cache
+
+MAX_AGE = 300  # seconds
+
+_INDEXED_FIELDS = ('status', 'subjects', 'grades', 'boards', 'availability')
+
+TutorCapabilities = namedtuple('TutorCapabilities', ['subjects', 'grades', 'boards', 'has_availability'])
+
+
+def normalize_subject(subject):
+    return str(subject).strip().lower() if subject is not None else ''
+
+
+def normalize_grade(grade):
+    return str(grade).strip() if grade is not None else ''
+
+
+def normalize_board(board):
+    return str(board).strip().lower() if board is not None else ''
+
+
+def _load_list(raw):
+    if not raw:
+        return []
+    try:
+        parsed = json.loads(raw)
+    except (ValueError, TypeError):
+        return []
+    return parsed if isinstance(parsed, list) else []
+
+
+class TutorCapabilityIndex:
+    """subject/grade/board -> set of active tutor IDs, rebuilt lazily on version change"""
+
+    def __init__(self, max_age=MAX_AGE):
+        self.max_age = max_age
+        self.version = 0
+        self.builds = 0
+        self._lock = threading.Lock()
+        self._built_version = None
+        self._built_at = 0
+        self._profiles = {}
+        self._by_subject = {}
+        self._by_grade = {}
+        self._by_board = {}
+        self._active_ids = frozenset()
+        self._available_ids = frozenset()
+
+    def bump(self):
+        """Mark the index stale; it is rebuilt on the next lookup"""
+        self.version += 1
+
+    def _ensure_fresh(self):
+        if self._built_version == self.version and time.time() - self._built_at < self.max_age:
+            return
+        with self._lock:
+            if self._built_version == self.version and time.time() - self._built_at < self.max_age:
+                return
+            self._rebuild()
+
+    def _rebuild(self):
+        version = self.version
+        rows = Tutor.query.with_entities(
+            Tutor.id, Tutor.subjects, Tutor.grades, Tutor.boards, Tutor.availability
+        ).filter(Tutor.status == 'active').all()
+
+        profiles = {}
+        by_subject, by_grade, by_board = {}, {}, {}
+        for tutor_id, subjects, grades, boards, availability in rows:
+            profile = TutorCapabilities(
+                subjects=tuple(dict.fromkeys(s for s in map(normalize_subject, _load_list(subjects)) if s)),
+                grades=frozenset(g for g in map(normalize_grade, _load_list(grades)) if g),
+                boards=frozenset(b for b in map(normalize_board, _load_list(boards)) if b),
+                has_availability=bool(availability_cache.get(tutor_id, availability))
+            )
+            profiles[tutor_id] = profile
+            for subject in profile.subjects:
+                by_subject.setdefault(subject, set()).add(tutor_id)
+            for grade in profile.grades:
+                by_grade.setdefault(grade, set()).add(tutor_id)
+            for board in profile.boards:
+                by_board.setdefault(board, set()).add(tutor_id)
+
+        self._profiles = profiles
+        self._by_subject = {key: frozenset(ids) for key, ids in by_subject.items()}
+        self._by_grade = {key: frozenset(ids) for key, ids in by_grade.items()}
+        self._by_board = {key: frozenset(ids) for key, ids in by_board.items()}
+        self._active_ids = frozenset(profiles)
+        self._available_ids = frozenset(tid for tid, p in profiles.items() if p.has_availability)
+        self._built_version = version
+        self._built_at = time.time()
+        self.builds += 1
+
+    # ============ LOOKUPS ============
+
+    def active_ids(self):
+        self._ensure_fresh()
+        return self._active_ids
+
+    def available_ids(self):
+        """Active tutors that have set some weekly availability"""
+        self._ensure_fresh()
+        return self._available_ids
+
+    def capabilities(self, tutor_id):
+        """Normalized TutorCapabilities of an active tutor, or None"""
+        self._ensure_fresh()
+        return self._profiles.get(tutor_id)
+
+    def subject_ids(self, subject, partial=False):
+        """Tutors teaching a subject; partial also matches either-way substrings like the scorers do"""
+        self._ensure_fresh()
+        key = normalize_subject(subject)
+        if not partial:
+            return self._by_subject.get(key, frozenset())
+
+        matched = set()
+        for indexed, ids in self._by_subject.items():
+            if key in indexed or indexed in key:
+                matched |= ids
+        return frozenset(matched)
+
+    def grade_ids(self, grade, include_unrestricted=False):
+        """Tutors teaching a grade; include_unrestricted adds tutors with no grades listed"""
+        self._ensure_fresh()
+        ids = self._by_grade.get(normalize_grade(grade), frozenset())
+        if include_unrestricted:
+            ids = ids | {tid for tid, p in self._profiles.items() if not p.grades}
+        return ids
+
+    def board_ids(self, board, include_unrestricted=False):
+        """Tutors familiar with a board; include_unrestricted adds tutors with no boards listed"""
+        self._ensure_fresh()
+        ids = self._by_board.get(normalize_board(board), frozenset())
+        if include_unrestricted:
+            ids = ids | {tid for tid, p in self._profiles.items() if not p.boards}
+        return ids
+
+    def candidates(self, subject=None, grade=None, board=None, partial_subject=False,
+                   require_availability=False):
+        """Intersect the requested criteria, smallest set first; returns a set of tutor IDs"""
+        sets = [self.available_ids() if require_availability else self.active_ids()]
+        if grade:
+            sets.append(self.grade_ids(grade))
+        if board:
+            sets.append(self.board_ids(board))
+        if subject:
+            sets.append(self.subject_ids(subject, partial=partial_subject))
+
+        sets.sort(key=len)
+        result = set(sets[0])
+        for ids in sets[1:]:
+            result &= ids
+            if not result:
+                break
+        return result
+
+    def get_stats(self):
+        return {
+            'version': self.version,
+            'built_version': self._built_version,
+            'builds': self.builds,
+            'active_tutors': len(self._active_ids),
+            'subjects': len(self._by_subject),
+            'grades': len(self._by_grade),
+            'boards': len(self._by_board)
+        }
+
+
+tutor_index = TutorCapabilityIndex()
+
+
+# ============ INVALIDATION ============
+
+def _mark_changed(target):
+    # Bumped only after commit: a rebuild between flush and commit would cache
+    # pre-commit rows under the new version
+    session = inspect(target).session
+    if session is not None:
+        session.info['tutor_index_dirty'] = True
+    else:
+        tutor_index.bump()
+
+
+@event.listens_for(Tutor, 'after_insert')
+def _tutor_index_after_insert(mapper, connection, target):
+    _mark_changed(target)
+
+
+@event.listens_for(Tutor, 'after_update')
+def _tutor_index_after_update(mapper, connection, target):
+    state = inspect(target)
+    if any(state.attrs[field].history.has_changes() for field in _INDEXED_FIELDS):
+        _mark_changed(target)
+
+
+@event.listens_for(Tutor, 'after_delete')
+def _tutor_index_after_delete(mapper, connection, target):
+    _mark_changed(target)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _tutor_index_after_rollback(session):
+    # The index may have been rebuilt from flushed-but-uncommitted rows
+    if session.info.pop('tutor_index_dirty', False):
+        tutor_index.bump()
+
+
+@event.listens_for(Session, 'after_commit')
+def _tutor_index_after_commit(session):
+    if session.info.pop('tutor_index_dirty', False):
+        tutor_index.bump()
@@ -6,6 +6,11 @@ import re
 from app.models.tutor import Tutor
 from app.models.student import Student
 from app.models.class_model import Class
+from app.utils.availability_engine import (
+    DAY_NAMES, parse_minutes, format_minutes, busy_intervals, find_overlap
+)
+from app.utils.tutor_index import tutor_index
+from app.utils.match_scoring import MatchFeatures, match_scores, top_indices
 
 class TutorMatchingEngine:
     """Advanced tutor matching engine with ML-like capabilities"""
@@ -27,29 +32,78 @@ class TutorMatchingEngine:
         if not student:
             return []
         
-        # Get all available tutors
+        # Get available tutors already matching the student's grade and board
+        available_tutors = self._get_available_tutors(filters, student)
+        if not available_tutors:
+            return []
+        
+        # Score all tutors in one vectorized pass, then build breakdowns for the top ones
+        features = MatchFeatures(available_tutors, [student])
+        totals = match_scores(features, self.weights, subject)[0]
+        
+        return [
+            self._build_match(available_tutors[index], student, subject)
+            for index in top_indices(totals, limit)
+        ]
+    
+    def find_best_matches_bulk(self, student_ids: List[int], subject: str = None,
+                               filters: Dict = None, limit: int = 10) -> Dict[int, List[Dict]]:
+        """find_best_matches for many students: one students x tutors score matrix"""
+        students, available_tutors, totals = self.score_matrix(student_ids, subject, filters)
+        if not students or not available_tutors:
+            return {student_id: [] for student_id in student_ids}
+        
+        summaries = {}
+        matches = {student_id: [] for student_id in student_ids}
+        for row, student in enumerate(students):
+            matches[student.id] = [
+                self._build_match(available_tutors[index], student, subject, summaries)
+                for index in top_indices(totals[row], limit)
+            ]
+        return matches
+    
+    def score_matrix(self, student_ids: List[int], subject: str = None,
+                     filters: Dict = None) -> Tuple:
+        """(students, tutors, totals) where totals[i, j] is the total_score of students[i] with tutors[j]"""
+        students = Student.query.filter(Student.id.in_(student_ids)).all() if student_ids else []
         available_tutors = self._get_available_tutors(filters)
+        if not students or not available_tutors:
+            return students, available_tutors, None
+        
+        features = MatchFeatures(available_tutors, students)
+        return students, available_tutors, match_scores(features, self.weights, subject)
+    
+    def _build_match(self, tutor: Tutor, student: Student, subject: str = None,
+                     summaries: Dict = None) -> Dict:
+        """Match entry with the full score breakdown; tutor summaries are reused when a dict is given"""
+        if summaries is None:
+            tutor_info = self._get_tutor_summary(tutor)
+        else:
+            if tutor.id not in summaries:
+                summaries[tutor.id] = self._get_tutor_summary(tutor)
+            tutor_info = summaries[tutor.id]
         
-        # Score each tutor
-        scored_tutors = []
-        for tutor in available_tutors:
-            score_data = self._calculate_match_score(tutor, student, subject)
-            if score_data['total_score'] > 0:
-                scored_tutors.append({
-                    'tutor_id': tutor.id,
-                    'tutor_name': tutor.user.full_name if tutor.user else 'Unknown',
-                    'score_data': score_data,
-                    'tutor_info': self._get_tutor_summary(tutor)
-                })
-        
-        # Sort by total score
-        scored_tutors.sort(key=lambda x: x['score_data']['total_score'], reverse=True)
-        
-        return scored_tutors[:limit]
+        return {
+            'tutor_id': tutor.id,
+            'tutor_name': tutor.user.full_name if tutor.user else 'Unknown',
+            'score_data': self._calculate_match_score(tutor, student, subject),
+            'tutor_info': tutor_info
+        }
     
-    def _get_available_tutors(self, filters: Dict = None) -> List[Tutor]:
-        """Get tutors that meet basic availability requirements"""
-        query = Tutor.query.filter_by(status='active')
+    def _get_available_tutors(self, filters: Dict = None, student: Student = None) -> List[Tutor]:
+        """Get tutors that meet basic availability requirements.
+        
+        With a student, candidates are narrowed to the student's grade and board
+        (both mandatory in _calculate_match_score) using the capability index.
+        """
+        candidate_ids = tutor_index.candidates(
+            grade=student.grade if student else None,
+            board=student.board if student else None,
+            require_availability=True
+        )
+        if not candidate_ids:
+            return []
+        query = Tutor.query.filter(Tutor.id.in_(candidate_ids))
         
         if filters:
             if filters.get('min_test_score'):
@@ -59,9 +113,7 @@ class TutorMatchingEngine:
             if filters.get('experience_level'):
                 query = self._apply_experience_filter(query, filters['experience_level'])
         
-        tutors = query.all()
-        # Filter for those with availability
-        return [t for t in tutors if t.get_availability()]
+        return query.all()
     
     def _apply_experience_filter(self, query, experience_level: str):
         """Apply experience level filter to query"""
@@ -264,24 +316,12 @@ class TutorMatchingEngine:
     
     def _get_availability_summary(self, tutor: Tutor) -> Dict:
         """Get availability summary"""
-        availability = tutor.get_availability()
-        if not availability:
+        weekly = tutor.get_weekly_availability()
+        if not weekly:
             return {'status': 'no_schedule', 'days': 0, 'hours': 0}
         
-        available_days = [day for day, slots in availability.items() if slots]
-        total_hours = 0
-        
-        for day, slots in availability.items():
-            for slot in slots or []:
-                try:
-                    start = datetime.strptime(slot['start'], '%H:%M').time()
-                    end = datetime.strptime(slot['end'], '%H:%M').time()
-                    start_dt = datetime.combine(date.today(), start)
-                    end_dt = datetime.combine(date.today(), end)
-                    hours = (end_dt - start_dt).total_seconds() / 3600
-                    total_hours += hours
-                except:
-                    continue
+        available_days = weekly.available_days
+        total_hours = weekly.total_hours()
         
         return {
             'status': 'available',
@@ -352,131 +392,100 @@ class SearchQueryProcessor:
         return grade_map.get(grade_lower, grade_input)
 
 class AvailabilityChecker:
-    """Check tutor availability and conflicts"""
+    """Check tutor availability and conflicts.
+
+    Backed by the compiled weekly availability in app.utils.availability_engine:
+    the availability JSON is parsed once per change, and each (tutor, date) pair
+    costs one classes query no matter how many slots are tested.
+    """
     
     @staticmethod
     def check_tutor_availability(tutor_id: int, date_obj: date, 
-                               time_obj: datetime.time, duration: int = 60) -> Dict:
-        """Check if tutor is available at specific time"""
-        tutor = Tutor.query.get(tutor_id)
+                               time_obj: datetime.time, duration: int = 60,
+                               tutor: Tutor = None, busy: List[tuple] = None) -> Dict:
+        """Check if tutor is available at specific time.
+
+        ``tutor`` and ``busy`` (sorted busy intervals for the date) may be passed
+        in by callers that already loaded them.
+        """
+        if tutor is None:
+            tutor = Tutor.query.get(tutor_id)
         if not tutor:
             return {'available': False, 'reason': 'Tutor not found'}
         
         # Check if tutor has availability schedule
-        availability = tutor.get_availability()
-        if not availability:
+        weekly = tutor.get_weekly_availability()
+        if not weekly:
             return {'available': False, 'reason': 'No availability schedule set'}
         
         # Check day of week availability
-        day_name = date_obj.strftime('%A').lower()
-        day_schedule = availability.get(day_name, [])
-        
-        if not day_schedule:
+        day_name = DAY_NAMES[date_obj.weekday()]
+        if not weekly.intervals(day_name):
             return {'available': False, 'reason': f'Not available on {day_name.title()}'}
         
         # Check time slot availability
-        time_str = time_obj.strftime('%H:%M')
-        end_time = (datetime.combine(date_obj, time_obj) + 
-                   timedelta(minutes=duration)).time()
-        end_time_str = end_time.strftime('%H:%M')
-        
-        available_in_slot = False
-        for slot in day_schedule:
-            if slot['start'] <= time_str and slot['end'] >= end_time_str:
-                available_in_slot = True
-                break
-        
-        if not available_in_slot:
+        start = parse_minutes(time_obj)
+        if not weekly.covers(day_name, start, duration):
             return {
                 'available': False, 
-                'reason': f'Not available at {time_str} on {day_name.title()}'
+                'reason': f'Not available at {format_minutes(start)} on {day_name.title()}'
             }
         
         # Check for existing class conflicts
-        conflict = AvailabilityChecker.check_scheduling_conflicts(
-            tutor_id, date_obj, time_obj, duration
-        )
+        if busy is None:
+            busy = busy_intervals([tutor.id], date_obj)[tutor.id]
+        conflict = find_overlap(busy, start, start + duration)
         
-        if conflict['has_conflict']:
+        if conflict:
             return {
                 'available': False,
-                'reason': f'Already has a {conflict["conflict_type"]} at this time'
+                'reason': f'Already has a {conflict[3] or "class"} at this time'
             }
         
         return {'available': True, 'reason': 'Available'}
     
+    @staticmethod
+    def check_many(tutor_ids: List[int], date_obj: date,
+                   time_obj: datetime.time, duration: int = 60) -> Dict[int, Dict]:
+        """check_tutor_availability for several tutors with two queries in total"""
+        tutors = {t.id: t for t in Tutor.query.filter(Tutor.id.in_(tutor_ids)).all()}
+        busy = busy_intervals(tutors.keys(), date_obj)
+        return {
+            tutor_id: AvailabilityChecker.check_tutor_availability(
+                tutor_id, date_obj, time_obj, duration,
+                tutor=tutors.get(tutor_id), busy=busy.get(tutor_id, [])
+            ) if tutor_id in tutors else {'available': False, 'reason': 'Tutor not found'}
+            for tutor_id in tutor_ids
+        }
+    
     @staticmethod
     def check_scheduling_conflicts(tutor_id: int, date_obj: date, 
                                  time_obj: datetime.time, duration: int) -> Dict:
         """Check for scheduling conflicts with existing classes"""
-        end_time = (datetime.combine(date_obj, time_obj) + 
-                   timedelta(minutes=duration)).time()
-        
-        existing_classes = Class.query.filter(
-            Class.tutor_id == tutor_id,
-            Class.scheduled_date == date_obj,
-            Class.status.in_(['scheduled', 'ongoing'])
-        ).all()
-        
-        for existing_class in existing_classes:
-            existing_start = existing_class.scheduled_time
-            existing_end = (datetime.combine(date_obj, existing_start) + 
-                          timedelta(minutes=existing_class.duration)).time()
-            
-            # Check for time overlap
-            if (time_obj < existing_end and end_time > existing_start):
-                return {
-                    'has_conflict': True,
-                    'conflict_type': existing_class.class_type or 'class',
-                    'conflict_class_id': existing_class.id,
-                    'conflict_time': existing_start.strftime('%H:%M')
-                }
+        start = parse_minutes(time_obj)
+        busy = busy_intervals([tutor_id], date_obj)[tutor_id]
+        conflict = find_overlap(busy, start, start + duration)
+        
+        if conflict:
+            return {
+                'has_conflict': True,
+                'conflict_type': conflict[3] or 'class',
+                'conflict_class_id': conflict[2],
+                'conflict_time': format_minutes(conflict[0])
+            }
         
         return {'has_conflict': False}
     
     @staticmethod
     def get_available_slots(tutor_id: int, date_obj: date, 
-                          duration: int = 60) -> List[Dict]:
+                          duration: int = 60, tutor: Tutor = None) -> List[Dict]:
         """Get all available time slots for a tutor on a specific date"""
-        tutor = Tutor.query.get(tutor_id)
+        if tutor is None:
+            tutor = Tutor.query.get(tutor_id)
         if not tutor:
             return []
         
-        availability = tutor.get_availability()
-        if not availability:
-            return []
-        
-        day_name = date_obj.strftime('%A').lower()
-        day_schedule = availability.get(day_name, [])
-        
-        if not day_schedule:
-            return []
-        
-        available_slots = []
-        
-        for slot in day_schedule:
-            slot_start = datetime.strptime(slot['start'], '%H:%M').time()
-            slot_end = datetime.strptime(slot['end'], '%H:%M').time()
-            
-            # Generate 30-minute intervals within the slot
-            current_time = datetime.combine(date_obj, slot_start)
-            slot_end_dt = datetime.combine(date_obj, slot_end)
-            
-            while current_time + timedelta(minutes=duration) <= slot_end_dt:
-                check_result = AvailabilityChecker.check_tutor_availability(
-                    tutor_id, date_obj, current_time.time(), duration
-                )
-                
-                if check_result['available']:
-                    available_slots.append({
-                        'start_time': current_time.time().strftime('%H:%M'),
-                        'end_time': (current_time + timedelta(minutes=duration)).time().strftime('%H:%M'),
-                        'duration': duration
-                    })
-                
-                current_time += timedelta(minutes=30)  # 30-minute intervals
-        
-        return available_slots
+        return tutor.get_free_slots(date_obj, duration)
 
 # Performance monitoring decorator
 def monitor_search_performance(func):
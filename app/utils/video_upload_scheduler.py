@@ -1,18 +1,24 @@
 # CREATE: app/utils/video_upload_scheduler.py
 
 from datetime import datetime, timedelta
+from flask import current_app
 from app import db
 from app.models.user import User
 from app.models.class_model import Class
 from app.utils.email import send_email
+from app.utils.job_scheduler import job_handler, job_scheduler
 import json
 
+def _video_upload_job_key(class_id):
+    return f'video_upload:{class_id}'
+
 def schedule_video_upload_reminders(class_id, tutor_id):
-    """Schedule reminder emails for video upload"""
+    """Schedule reminder emails and the deadline check for video upload
+    
+    Jobs are added to the current session and run by the job scheduler once
+    the caller commits.
+    """
     try:
-        # This would integrate with Celery for background jobs
-        # For now, we'll store the reminder schedule in a simple way
-        
         class_obj = Class.query.get(class_id)
         if not class_obj or not class_obj.actual_end_time:
             return False
@@ -23,21 +29,14 @@ def schedule_video_upload_reminders(class_id, tutor_id):
         final_warning = completion_time + timedelta(hours=23)     # 1 hour before deadline
         deadline = completion_time + timedelta(hours=24)
         
-        # Store reminder schedule (in a real implementation, this would be in Celery/Redis)
-        reminder_data = {
-            'class_id': class_id,
-            'tutor_id': tutor_id,
-            'completion_time': completion_time.isoformat(),
-            'one_hour_reminder': one_hour_reminder.isoformat(),
-            'final_warning': final_warning.isoformat(),
-            'deadline': deadline.isoformat(),
-            'status': 'scheduled'
-        }
+        # Completing the class again restarts the timer
+        key = _video_upload_job_key(class_id)
+        job_scheduler.cancel(key=key)
         
-        # In production, schedule these as Celery tasks:
-        # send_one_hour_reminder.apply_async(args=[class_id], eta=one_hour_reminder)
-        # send_final_warning.apply_async(args=[class_id], eta=final_warning)
-        # mark_class_incomplete.apply_async(args=[class_id], eta=deadline)
+        payload = {'class_id': class_id, 'tutor_id': tutor_id}
+        job_scheduler.schedule('video_upload.reminder', one_hour_reminder, payload, key=key)
+        job_scheduler.schedule('video_upload.final_warning', final_warning, payload, key=key)
+        job_scheduler.schedule('video_upload.deadline', deadline, payload, key=key)
         
         return True
         
@@ -48,14 +47,24 @@ def schedule_video_upload_reminders(class_id, tutor_id):
 def cancel_video_upload_reminders(class_id):
     """Cancel pending upload reminders when video is uploaded"""
     try:
-        # In production, this would revoke Celery tasks
-        # revoke_reminder_tasks(class_id)
-        
+        job_scheduler.cancel(key=_video_upload_job_key(class_id))
         return True
     except Exception as e:
         print(f"Error canceling reminders: {e}")
         return False
 
+@job_handler('video_upload.reminder')
+def _run_upload_reminder(payload):
+    send_one_hour_reminder(payload['class_id'])
+
+@job_handler('video_upload.final_warning')
+def _run_final_warning(payload):
+    send_final_warning(payload['class_id'])
+
+@job_handler('video_upload.deadline')
+def _run_upload_deadline(payload):
+    mark_class_incomplete_for_no_video(payload['class_id'])
+
 def send_one_hour_reminder(class_id):
     """Send 1-hour reminder email"""
     try:
@@ -68,6 +77,7 @@ def send_one_hour_reminder(class_id):
             return
         
         deadline = class_obj.actual_end_time + timedelta(hours=24)
+        base_url = current_app.config.get('BASE_URL', 'http://localhost:5000').rstrip('/')
         
         subject = f"⏰ Video Upload Reminder - {class_obj.subject} Class"
         
@@ -95,7 +105,7 @@ def send_one_hour_reminder(class_id):
                 </div>
                 
                 <p style="text-align: center; margin: 20px 0;">
-                    <a href="{request.url_root}tutor/class/{class_id}/upload-video" 
+                    <a href="{base_url}/tutor/class/{class_id}/upload-video" 
                        style="background: #fd7e14; color: white; padding: 12px 24px; text-decoration: none; border-radius: 6px; display: inline-block;">
                         Upload Video Now
                     </a>
@@ -113,12 +123,14 @@ def send_one_hour_reminder(class_id):
         
         send_email(
             subject=subject,
-            recipient=tutor.user.email,
+            recipients=[tutor.user.email],
+            text_body=None,
             html_body=html_body
         )
         
     except Exception as e:
         print(f"Error sending 1-hour reminder: {e}")
+        raise  # Job scheduler retries with backoff
 
 def send_final_warning(class_id):
     """Send final warning email (15 minutes before deadline)"""
@@ -132,6 +144,7 @@ def send_final_warning(class_id):
             return
         
         deadline = class_obj.actual_end_time + timedelta(hours=24)
+        base_url = current_app.config.get('BASE_URL', 'http://localhost:5000').rstrip('/')
         
         subject = f"🚨 URGENT: Final Video Upload Warning - {class_obj.subject}"
         
@@ -167,7 +180,7 @@ def send_final_warning(class_id):
                 </div>
                 
                 <p style="text-align: center; margin: 20px 0;">
-                    <a href="{request.url_root}tutor/class/{class_id}/upload-video" 
+                    <a href="{base_url}/tutor/class/{class_id}/upload-video" 
                        style="background: #dc3545; color: white; padding: 15px 30px; text-decoration: none; border-radius: 6px; display: inline-block; font-size: 16px; font-weight: bold;">
                         🚨 UPLOAD NOW 🚨
                     </a>
@@ -180,12 +193,14 @@ def send_final_warning(class_id):
         
         send_email(
             subject=subject,
-            recipient=tutor.user.email,
+            recipients=[tutor.user.email],
+            text_body=None,
             html_body=html_body
         )
         
     except Exception as e:
         print(f"Error sending final warning: {e}")
+        raise  # Job scheduler retries with backoff
 
 def mark_class_incomplete_for_no_video(class_id):
     """Mark class as incomplete if video not uploaded by deadline"""
@@ -241,7 +256,8 @@ def mark_class_incomplete_for_no_video(class_id):
             
             send_email(
                 subject=subject,
-                recipient=tutor.user.email,
+                recipients=[tutor.user.email],
+                text_body=None,
                 html_body=html_body
             )
         
@@ -249,7 +265,8 @@ def mark_class_incomplete_for_no_video(class_id):
         
     except Exception as e:
         print(f"Error marking class incomplete: {e}")
-        return False
+        db.session.rollback()
+        raise  # Job scheduler retries with backoff
 
 
 # CREATE: app/utils/rating_calculator.py
@@ -41,6 +41,44 @@ class Config:
     MAIL_USE_TLS = os.environ.get('MAIL_USE_TLS', 'true').lower() in ['true', 'on', '1']
     MAIL_USERNAME = os.environ.get('MAIL_USERNAME')
     MAIL_PASSWORD = os.environ.get('MAIL_PASSWORD')
+    
+    # Outbound email queue (app/utils/email_queue.py)
+    EMAIL_QUEUE_WORKERS = int(os.environ.get('EMAIL_QUEUE_WORKERS', 2))  # per process
+    EMAIL_QUEUE_BATCH_SIZE = int(os.environ.get('EMAIL_QUEUE_BATCH_SIZE', 50))  # messages per SMTP connection
+    EMAIL_QUEUE_AUTOSTART = os.environ.get('EMAIL_QUEUE_AUTOSTART', 'true').lower() in ['true', 'on', '1']
+    EMAIL_MAX_ATTEMPTS = int(os.environ.get('EMAIL_MAX_ATTEMPTS', 5))
+    EMAIL_RATE_LIMIT_DEFAULT = float(os.environ.get('EMAIL_RATE_LIMIT_DEFAULT', 5))  # messages/second per provider
+    EMAIL_RATE_LIMITS = {
+        'smtp.gmail.com': 2,
+    }
+    
+    # Delayed job scheduler (app/utils/job_scheduler.py)
+    JOB_SCHEDULER_AUTOSTART = os.environ.get('JOB_SCHEDULER_AUTOSTART', 'true').lower() in ['true', 'on', '1']
+    JOB_SCHEDULER_MAX_SLEEP = float(os.environ.get('JOB_SCHEDULER_MAX_SLEEP', 30))  # seconds between table refreshes
+    JOB_SCHEDULER_LOCK_FILE = os.environ.get('JOB_SCHEDULER_LOCK_FILE')  # leader file lock (non-PostgreSQL)
+    JOB_MAX_ATTEMPTS = int(os.environ.get('JOB_MAX_ATTEMPTS', 3))
+    
+    # Live monitoring SSE feed (app/utils/live_feed.py)
+    LIVE_FEED_INTERVAL = float(os.environ.get('LIVE_FEED_INTERVAL', 30))  # seconds between recomputes while watched
+    LIVE_FEED_MIN_INTERVAL = float(os.environ.get('LIVE_FEED_MIN_INTERVAL', 2))  # debounce for class change events
+    LIVE_FEED_HEARTBEAT = float(os.environ.get('LIVE_FEED_HEARTBEAT', 15))
+    LIVE_FEED_MAX_STREAM = float(os.environ.get('LIVE_FEED_MAX_STREAM', 300))  # seconds a single SSE stream stays open
+    
+    # Startup: schema/index/cache warm-up runs in `flask perf init`; set to run it in create_app instead (dev)
+    PERF_INIT_ON_STARTUP = os.environ.get('PERF_INIT_ON_STARTUP', 'false').lower() in ['true', 'on', '1']
+    
+    # Request metrics (app/utils/request_metrics.py)
+    REQUEST_METRICS_FLUSH_INTERVAL = float(os.environ.get('REQUEST_METRICS_FLUSH_INTERVAL', 5))  # seconds between worker publishes
+    REQUEST_METRICS_DIR = os.environ.get('REQUEST_METRICS_DIR')  # shared snapshot dir when Redis is unavailable
+    METRICS_TOKEN = os.environ.get('METRICS_TOKEN')  # bearer token for /api/metrics scrapers
+    
+    # Logged-in user and permission snapshot cache (app/utils/principal.py); 0 disables
+    PRINCIPAL_CACHE_TTL = int(os.environ.get('PRINCIPAL_CACHE_TTL', 60))  # seconds
+    
+    # Activity log writer (app/utils/activity_log.py)
+    ACTIVITY_LOG_BUFFER_SIZE = int(os.environ.get('ACTIVITY_LOG_BUFFER_SIZE', 10000))  # rows buffered before the oldest are dropped
+    ACTIVITY_LOG_BATCH_SIZE = int(os.environ.get('ACTIVITY_LOG_BATCH_SIZE', 500))  # rows per bulk INSERT
+    ACTIVITY_LOG_FLUSH_INTERVAL = float(os.environ.get('ACTIVITY_LOG_FLUSH_INTERVAL', 2))  # seconds between writes
     ADMINS = ['care@i2global.co.in']
 
     # Pagination & Session
@@ -56,6 +94,21 @@ class Config:
     COMPANY_PHONE = os.environ.get('COMPANY_PHONE')
     COMPANY_EMAIL = os.environ.get('COMPANY_EMAIL')
     
+    # In-process memory cache tier (app/utils/performance_cache.py)
+    CACHE_MEMORY_MAX_ENTRIES = int(os.environ.get('CACHE_MEMORY_MAX_ENTRIES', 5000))
+    CACHE_MEMORY_MAX_BYTES = int(os.environ.get('CACHE_MEMORY_MAX_BYTES', 64 * 1024 * 1024))  # 64MB
+    CACHE_MEMORY_SWEEP_INTERVAL = int(os.environ.get('CACHE_MEMORY_SWEEP_INTERVAL', 60))  # seconds
+    CACHE_MEMORY_NAMESPACE_QUOTAS = {
+        'dashboard': 200,
+        'user': 2000,
+    }
+    
+    # Redis/file cache tier encoding (app/utils/cache_codec.py)
+    CACHE_CODEC = os.environ.get('CACHE_CODEC', 'auto')  # auto (msgpack if installed, else pickle), msgpack, pickle, json
+    CACHE_COMPRESSION = os.environ.get('CACHE_COMPRESSION', 'zlib')  # zlib, brotli, none
+    CACHE_COMPRESS_THRESHOLD = int(os.environ.get('CACHE_COMPRESS_THRESHOLD', 1024))  # bytes
+    CACHE_FILE_FLUSH_INTERVAL = float(os.environ.get('CACHE_FILE_FLUSH_INTERVAL', 1.0))  # seconds
+    
     # Timezone Configuration
     TIMEZONE = os.environ.get('TIMEZONE', 'Asia/Kolkata')  # Default to India timezone
 
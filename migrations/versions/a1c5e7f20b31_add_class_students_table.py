@@ -0,0 +1,96 @@
+"""Add class_students enrollment table
+
+Revision ID: a1c5e7f20b31
+Revises: system_notifications_001
+Create Date: 2026-10-16 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+import json
+
+
+# revision identifiers, used by Alembic.
+revision = 'a1c5e7f20b31'
+down_revision = 'system_notifications_001'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+
+def _student_ids(class_type, primary_student_id, students_json):
+    if class_type == 'demo':
+        return set()
+
+    student_ids = set()
+    if primary_student_id:
+        student_ids.add(primary_student_id)
+
+    if students_json:
+        try:
+            parsed = json.loads(students_json)
+        except (ValueError, TypeError):
+            parsed = []
+        if isinstance(parsed, list):
+            for sid in parsed:
+                try:
+                    student_ids.add(int(sid))
+                except (ValueError, TypeError):
+                    continue
+
+    return student_ids
+
+
+def upgrade():
+    class_students = op.create_table('class_students',
+    sa.Column('class_id', sa.Integer(), nullable=False),
+    sa.Column('student_id', sa.Integer(), nullable=False),
+    sa.Column('scheduled_date', sa.Date(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['class_id'], ['classes.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['student_id'], ['students.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('class_id', 'student_id')
+    )
+    op.create_index('ix_class_students_student_date', 'class_students', ['student_id', 'scheduled_date'], unique=False)
+
+    # Backfill from classes.primary_student_id and the JSON classes.students column
+    conn = op.get_bind()
+    classes = sa.table('classes',
+        sa.column('id', sa.Integer),
+        sa.column('class_type', sa.String),
+        sa.column('primary_student_id', sa.Integer),
+        sa.column('students', sa.Text),
+        sa.column('scheduled_date', sa.Date),
+    )
+    students = sa.table('students', sa.column('id', sa.Integer))
+    known_students = {row[0] for row in conn.execute(sa.select(students.c.id))}
+
+    last_id = 0
+    now = sa.func.now()
+    while True:
+        batch = conn.execute(
+            sa.select(classes.c.id, classes.c.class_type, classes.c.primary_student_id,
+                      classes.c.students, classes.c.scheduled_date)
+            .where(classes.c.id > last_id)
+            .order_by(classes.c.id)
+            .limit(BATCH_SIZE)
+        ).fetchall()
+        if not batch:
+            break
+
+        rows = []
+        for class_id, class_type, primary_student_id, students_json, scheduled_date in batch:
+            if not scheduled_date:
+                continue
+            for sid in _student_ids(class_type, primary_student_id, students_json):
+                if sid in known_students:
+                    rows.append({'class_id': class_id, 'student_id': sid, 'scheduled_date': scheduled_date})
+        if rows:
+            conn.execute(class_students.insert().values(created_at=now), rows)
+        last_id = batch[-1][0]
+
+
+def downgrade():
+    op.drop_index('ix_class_students_student_date', table_name='class_students')
+    op.drop_table('class_students')
@@ -0,0 +1,43 @@
+"""Add scheduled_jobs table
+
+Revision ID: c3f8a1d25e47
+Revises: b7d2e9c41f06
+Create Date: 2026-10-16 13:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3f8a1d25e47'
+down_revision = 'b7d2e9c41f06'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('scheduled_jobs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('name', sa.String(length=100), nullable=False),
+    sa.Column('key', sa.String(length=200), nullable=True),
+    sa.Column('payload', sa.Text(), nullable=True),
+    sa.Column('run_at', sa.DateTime(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('max_attempts', sa.Integer(), nullable=False),
+    sa.Column('last_error', sa.Text(), nullable=True),
+    sa.Column('locked_by', sa.String(length=100), nullable=True),
+    sa.Column('locked_at', sa.DateTime(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_scheduled_jobs_status_run_at', 'scheduled_jobs', ['status', 'run_at'], unique=False)
+    op.create_index(op.f('ix_scheduled_jobs_key'), 'scheduled_jobs', ['key'], unique=False)
+
+
+def downgrade():
+    op.drop_index(op.f('ix_scheduled_jobs_key'), table_name='scheduled_jobs')
+    op.drop_index('ix_scheduled_jobs_status_run_at', table_name='scheduled_jobs')
+    op.drop_table('scheduled_jobs')
@@ -0,0 +1,126 @@
+"""Add daily_class_stats and daily_attendance_stats rollup tables
+
+Revision ID: d5b3f7a90c12
+Revises: c3f8a1d25e47
+Create Date: 2026-10-16 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd5b3f7a90c12'
+down_revision = 'c3f8a1d25e47'
+branch_labels = None
+depends_on = None
+
+
+def _count_where(condition):
+    return sa.func.coalesce(sa.func.sum(sa.case((condition, 1), else_=0)), 0)
+
+
+def upgrade():
+    daily_class_stats = op.create_table('daily_class_stats',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('stat_date', sa.Date(), nullable=False),
+    sa.Column('tutor_id', sa.Integer(), nullable=False),
+    sa.Column('department_id', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('class_count', sa.Integer(), nullable=False),
+    sa.Column('total_minutes', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('stat_date', 'tutor_id', 'department_id', 'status', name='uq_daily_class_stats_key')
+    )
+    op.create_index('ix_daily_class_stats_department_date', 'daily_class_stats', ['department_id', 'stat_date'], unique=False)
+    op.create_index('ix_daily_class_stats_tutor_date', 'daily_class_stats', ['tutor_id', 'stat_date'], unique=False)
+
+    daily_attendance_stats = op.create_table('daily_attendance_stats',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('stat_date', sa.Date(), nullable=False),
+    sa.Column('tutor_id', sa.Integer(), nullable=False),
+    sa.Column('department_id', sa.Integer(), nullable=False),
+    sa.Column('record_count', sa.Integer(), nullable=False),
+    sa.Column('present_count', sa.Integer(), nullable=False),
+    sa.Column('absent_count', sa.Integer(), nullable=False),
+    sa.Column('late_count', sa.Integer(), nullable=False),
+    sa.Column('tutor_present_count', sa.Integer(), nullable=False),
+    sa.Column('student_present_count', sa.Integer(), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('stat_date', 'tutor_id', 'department_id', name='uq_daily_attendance_stats_key')
+    )
+    op.create_index('ix_daily_attendance_stats_department_date', 'daily_attendance_stats', ['department_id', 'stat_date'], unique=False)
+    op.create_index('ix_daily_attendance_stats_tutor_date', 'daily_attendance_stats', ['tutor_id', 'stat_date'], unique=False)
+
+    # Backfill both rollups with one grouped INSERT ... SELECT each
+    classes = sa.table('classes',
+        sa.column('scheduled_date', sa.Date),
+        sa.column('tutor_id', sa.Integer),
+        sa.column('status', sa.String),
+        sa.column('duration', sa.Integer),
+    )
+    attendance = sa.table('attendance',
+        sa.column('class_date', sa.Date),
+        sa.column('tutor_id', sa.Integer),
+        sa.column('tutor_present', sa.Boolean),
+        sa.column('student_present', sa.Boolean),
+        sa.column('tutor_late_minutes', sa.Integer),
+        sa.column('student_late_minutes', sa.Integer),
+    )
+    tutors = sa.table('tutors', sa.column('id', sa.Integer), sa.column('user_id', sa.Integer))
+    users = sa.table('users', sa.column('id', sa.Integer), sa.column('department_id', sa.Integer))
+    now = sa.func.now()
+
+    op.execute(daily_class_stats.insert().from_select(
+        ['stat_date', 'tutor_id', 'department_id', 'status', 'class_count', 'total_minutes', 'updated_at'],
+        sa.select(
+            classes.c.scheduled_date,
+            sa.func.coalesce(classes.c.tutor_id, 0),
+            sa.func.coalesce(users.c.department_id, 0),
+            classes.c.status,
+            sa.func.count(),
+            sa.func.coalesce(sa.func.sum(classes.c.duration), 0),
+            now,
+        ).select_from(
+            classes.outerjoin(tutors, tutors.c.id == classes.c.tutor_id)
+                   .outerjoin(users, users.c.id == tutors.c.user_id)
+        ).where(
+            classes.c.scheduled_date.isnot(None), classes.c.status.isnot(None)
+        ).group_by(classes.c.scheduled_date, classes.c.tutor_id, users.c.department_id, classes.c.status)
+    ))
+
+    both_present = attendance.c.tutor_present.is_(True) & attendance.c.student_present.is_(True)
+    either_absent = attendance.c.tutor_present.is_(False) | attendance.c.student_present.is_(False)
+    late = (attendance.c.tutor_late_minutes > 5) | (attendance.c.student_late_minutes > 5)
+    op.execute(daily_attendance_stats.insert().from_select(
+        ['stat_date', 'tutor_id', 'department_id', 'record_count', 'present_count', 'absent_count',
+         'late_count', 'tutor_present_count', 'student_present_count', 'updated_at'],
+        sa.select(
+            attendance.c.class_date,
+            sa.func.coalesce(attendance.c.tutor_id, 0),
+            sa.func.coalesce(users.c.department_id, 0),
+            sa.func.count(),
+            _count_where(both_present),
+            _count_where(either_absent),
+            _count_where(late),
+            _count_where(attendance.c.tutor_present.is_(True)),
+            _count_where(attendance.c.student_present.is_(True)),
+            now,
+        ).select_from(
+            attendance.outerjoin(tutors, tutors.c.id == attendance.c.tutor_id)
+                      .outerjoin(users, users.c.id == tutors.c.user_id)
+        ).where(
+            attendance.c.class_date.isnot(None)
+        ).group_by(attendance.c.class_date, attendance.c.tutor_id, users.c.department_id)
+    ))
+
+
+def downgrade():
+    op.drop_index('ix_daily_attendance_stats_tutor_date', table_name='daily_attendance_stats')
+    op.drop_index('ix_daily_attendance_stats_department_date', table_name='daily_attendance_stats')
+    op.drop_table('daily_attendance_stats')
+    op.drop_index('ix_daily_class_stats_tutor_date', table_name='daily_class_stats')
+    op.drop_index('ix_daily_class_stats_department_date', table_name='daily_class_stats')
+    op.drop_table('daily_class_stats')
@@ -0,0 +1,30 @@
+"""Add activity_minute_stats counters table
+
+Revision ID: e8a4c61b2d57
+Revises: d5b3f7a90c12
+Create Date: 2026-10-16 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e8a4c61b2d57'
+down_revision = 'd5b3f7a90c12'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('activity_minute_stats',
+    sa.Column('minute', sa.DateTime(), nullable=False),
+    sa.Column('request_count', sa.Integer(), nullable=False),
+    sa.Column('failed_count', sa.Integer(), nullable=False),
+    sa.Column('error_count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('minute')
+    )
+
+
+def downgrade():
+    op.drop_table('activity_minute_stats')
@@ -6,5 +6,12 @@ source .venv/bin/activate
 # Install new package
 pip3 install -r requirements.txt
 
+# Apply migrations (tables and backfills) before perf init runs create_all
+FLASK_APP=wsgi.py flask db upgrade
+
+# One-time setup (indexes, cache warm-up) so workers boot without it
+FLASK_APP=wsgi.py flask perf init
+
 # Start Gunicorn to run your Django application
-gunicorn wsgi:app -b 0.0.0.0:5000
\ No newline at end of file
+# Threaded workers: each open live-monitoring SSE stream holds a thread, not a whole worker
+gunicorn wsgi:app -b 0.0.0.0:5000 --worker-class gthread --workers ${GUNICORN_WORKERS:-2} --threads ${GUNICORN_THREADS:-16}
\ No newline at end of file